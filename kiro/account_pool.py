@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Indexed account pool for multi-account round-robin.
+
+The pool keeps accounts in slots (list positions) and maintains:
+- a key -> slot index, so lookups by auth_kv key are O(1);
+- a sorted list of eligible slots, so the next round-robin account is found
+  with a binary search instead of a scan over quarantined accounts;
+- a min-heap of quarantine expiries, so accounts re-enter rotation lazily
+  when their quarantine ends.
+
+Accounts are AccountRecord objects with fixed __slots__. They keep
+mapping-style access (record["key"], record.get("key")) so code written
+against the original account dictionaries keeps working.
+
+Everything here is synchronous and never awaits, so pool mutations are
+atomic on the event loop.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+# Upstream status events kept per account for the recent 429/403 counts
+STATUS_EVENTS_MAXLEN = 256
+
+
+class AccountRecord:
+    """
+    One account of the round-robin pool.
+
+    Assigning quarantine_until notifies the owning pool, which moves the
+    account in or out of the eligible set. in_flight, ttft_ewma, weight and
+    sched_credit are runtime scheduling state (see kiro/account_scheduler.py).
+    status_events, last_refresh_* and loaded_* are diagnostics for
+    /admin/accounts.
+    """
+
+    __slots__ = (
+        "key",
+        "access_token",
+        "refresh_token",
+        "profile_arn",
+        "expires_at",
+        "sso_region",
+        "scopes",
+        "provider",
+        "client_id",
+        "client_secret",
+        "auth_type",
+        "in_flight",
+        "ttft_ewma",
+        "weight",
+        "sched_credit",
+        "status_events",
+        "last_refresh_seconds",
+        "last_refresh_at",
+        "loaded_from",
+        "loaded_via",
+        "loaded_at",
+        "_quarantine_until",
+        "_pool",
+        "_slot",
+    )
+
+    def __init__(
+        self,
+        key: Optional[str] = None,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+        profile_arn: Optional[str] = None,
+        expires_at: Optional[datetime] = None,
+        sso_region: Optional[str] = None,
+        scopes: Optional[List[str]] = None,
+        provider: Optional[str] = None,
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        auth_type: Any = None,
+        quarantine_until: Optional[datetime] = None,
+        weight: float = 1.0,
+    ) -> None:
+        self.key = key
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.profile_arn = profile_arn
+        self.expires_at = expires_at
+        self.sso_region = sso_region
+        self.scopes = scopes
+        self.provider = provider
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth_type = auth_type
+        self.in_flight = 0
+        self.ttft_ewma: Optional[float] = None
+        self.weight = weight
+        self.sched_credit = 0.0
+        self.status_events: Optional[Deque[Tuple[float, int]]] = None
+        self.last_refresh_seconds: Optional[float] = None
+        self.last_refresh_at: Optional[datetime] = None
+        self.loaded_from: Optional[str] = None
+        self.loaded_via: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+        self._quarantine_until = quarantine_until
+        self._pool: Optional["AccountPool"] = None
+        self._slot = -1
+
+    @property
+    def quarantine_until(self) -> Optional[datetime]:
+        """Time until which the account is excluded from selection."""
+        return self._quarantine_until
+
+    @quarantine_until.setter
+    def quarantine_until(self, value: Optional[datetime]) -> None:
+        self._quarantine_until = value
+        if self._pool is not None:
+            self._pool._on_quarantine_changed(self)
+
+    def inherit_runtime_state(self, previous: "AccountRecord") -> None:
+        """
+        Carry quarantine and scheduling state over from the record this one replaces.
+
+        Args:
+            previous: Record for the same key before a reload.
+        """
+        self.in_flight = previous.in_flight
+        self.ttft_ewma = previous.ttft_ewma
+        self.sched_credit = previous.sched_credit
+        self.status_events = previous.status_events
+        self.last_refresh_seconds = previous.last_refresh_seconds
+        self.last_refresh_at = previous.last_refresh_at
+        if previous.quarantine_until is not None:
+            self.quarantine_until = previous.quarantine_until
+
+    def mark_loaded(self, source: str, trigger: str) -> None:
+        """
+        Remember where and why this record's credentials were last read.
+
+        Args:
+            source: Credential store ("sqlite" or "mongodb").
+            trigger: "startup", "pool_reload" or "account_reload".
+        """
+        self.loaded_from = source
+        self.loaded_via = trigger
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def record_status(self, status_code: int, now: float) -> None:
+        """
+        Remember an upstream error status (429, 403) received with this account.
+
+        Args:
+            status_code: HTTP status of the upstream response.
+            now: Monotonic timestamp of the response.
+        """
+        if self.status_events is None:
+            self.status_events = deque(maxlen=STATUS_EVENTS_MAXLEN)
+        self.status_events.append((now, status_code))
+
+    def count_recent_statuses(self, since: float) -> Dict[int, int]:
+        """
+        Count error statuses received at or after a monotonic timestamp.
+
+        Args:
+            since: Monotonic timestamp where the window starts.
+
+        Returns:
+            Mapping of status code to count (only codes that occurred).
+        """
+        counts: Dict[int, int] = {}
+        if not self.status_events:
+            return counts
+        # Events are appended in time order, so scan back from the newest
+        for timestamp, status_code in reversed(self.status_events):
+            if timestamp < since:
+                break
+            counts[status_code] = counts.get(status_code, 0) + 1
+        return counts
+
+    def __getitem__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise KeyError(name)
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name.startswith("_") or not hasattr(self, name):
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Mapping-style read with a default, like dict.get."""
+        if name.startswith("_"):
+            return default
+        return getattr(self, name, default)
+
+    def __repr__(self) -> str:
+        return f"AccountRecord(key={self.key!r}, quarantine_until={self._quarantine_until!r})"
+
+
+class AccountPool:
+    """
+    Slot-indexed account container with O(log n) round-robin selection.
+
+    Supports len(), iteration and indexing by slot like the list it replaces.
+    """
+
+    def __init__(self, records: Optional[List[AccountRecord]] = None) -> None:
+        self._records: List[AccountRecord] = []
+        self._slots: Dict[str, int] = {}
+        self._ready: List[int] = []
+        self._ready_set: Set[int] = set()
+        self._quarantine_heap: List[Tuple[float, int]] = []
+        if records:
+            self.replace(records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __bool__(self) -> bool:
+        return bool(self._records)
+
+    def __iter__(self) -> Iterator[AccountRecord]:
+        return iter(self._records)
+
+    def __getitem__(self, slot: int) -> AccountRecord:
+        return self._records[slot]
+
+    def replace(self, records: List[AccountRecord]) -> None:
+        """
+        Replace every account and rebuild the index, eligible set and heap.
+
+        Args:
+            records: New accounts in round-robin order.
+        """
+        for old in self._records:
+            old._pool = None
+        self._records = list(records)
+        self._slots = {}
+        self._ready = []
+        self._ready_set = set()
+        self._quarantine_heap = []
+        for slot, record in enumerate(self._records):
+            record._pool = self
+            record._slot = slot
+            if record.key:
+                self._slots[str(record.key)] = slot
+            self._track(record)
+
+    def replace_record(self, record: AccountRecord) -> bool:
+        """
+        Put a record in place of the pool account with the same key.
+
+        Args:
+            record: Replacement account.
+
+        Returns:
+            True when an account with that key existed and was replaced.
+        """
+        slot = self._slots.get(str(record.key)) if record.key else None
+        if slot is None:
+            return False
+        self._records[slot]._pool = None
+        record._pool = self
+        record._slot = slot
+        self._records[slot] = record
+        self._discard_ready(slot)
+        self._track(record)
+        return True
+
+    def find(self, key: Optional[str]) -> Optional[AccountRecord]:
+        """Look up an account by auth_kv key."""
+        if not key:
+            return None
+        slot = self._slots.get(key)
+        return self._records[slot] if slot is not None else None
+
+    def slot_of(self, key: Optional[str]) -> Optional[int]:
+        """Return the slot of an account key, or None if it is not pooled."""
+        if not key:
+            return None
+        return self._slots.get(key)
+
+    def next_eligible_slot(self, after: int, now: float) -> Optional[int]:
+        """
+        Find the first eligible slot after `after`, wrapping around.
+
+        Args:
+            after: Slot of the previously selected account (-1 for none).
+            now: Current UNIX timestamp, used to release expired quarantines.
+
+        Returns:
+            Slot of the next eligible account, or None if all are quarantined.
+        """
+        self._release_expired(now)
+        if not self._ready:
+            return None
+        position = bisect_right(self._ready, after)
+        if position == len(self._ready):
+            position = 0
+        return self._ready[position]
+
+    def eligible_slots(self, now: float) -> List[int]:
+        """
+        Return the sorted slots of accounts that are not quarantined.
+
+        The list is owned by the pool and must not be modified.
+
+        Args:
+            now: Current UNIX timestamp, used to release expired quarantines.
+        """
+        self._release_expired(now)
+        return self._ready
+
+    def clear_quarantine(self) -> None:
+        """Return every account to rotation."""
+        for record in self._records:
+            record.quarantine_until = None
+        self._quarantine_heap = []
+
+    def _on_quarantine_changed(self, record: AccountRecord) -> None:
+        """Re-track one record after its quarantine mark changed."""
+        self._discard_ready(record._slot)
+        self._track(record)
+
+    def _track(self, record: AccountRecord) -> None:
+        """Add a record to the eligible set, or schedule it on the quarantine heap."""
+        until = record._quarantine_until
+        if until is None:
+            self._add_ready(record._slot)
+        else:
+            heapq.heappush(self._quarantine_heap, (until.timestamp(), record._slot))
+
+    def _release_expired(self, now: float) -> None:
+        """Move accounts whose quarantine has ended back to the eligible set."""
+        heap = self._quarantine_heap
+        while heap and heap[0][0] <= now:
+            expiry, slot = heapq.heappop(heap)
+            if slot >= len(self._records):
+                continue
+            until = self._records[slot]._quarantine_until
+            # Skip stale entries left behind by re-quarantine or replacement.
+            if until is not None and until.timestamp() == expiry:
+                self._add_ready(slot)
+
+    def _add_ready(self, slot: int) -> None:
+        if slot not in self._ready_set:
+            self._ready_set.add(slot)
+            insort(self._ready, slot)
+
+    def _discard_ready(self, slot: int) -> None:
+        if slot in self._ready_set:
+            self._ready_set.discard(slot)
+            del self._ready[bisect_left(self._ready, slot)]
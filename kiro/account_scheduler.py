@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Account scheduling policies for multi-account mode.
+
+A policy picks the next account slot from the eligible (non-quarantined)
+accounts of an AccountPool. Policies read per-account runtime state kept on
+AccountRecord:
+- in_flight: upstream requests/streams currently using the account,
+  maintained by KiroHttpClient.request_with_retry;
+- ttft_ewma: exponentially weighted time to first token, in seconds,
+  sampled by parse_kiro_stream at the first content event;
+- weight / sched_credit: configured quota weight and smooth weighted
+  round-robin credit.
+
+Available policies (ACCOUNT_SCHEDULING_POLICY):
+- round_robin: strict rotation (default, previous behavior)
+- least_in_flight: fewest in-flight requests, ties in rotation order
+- p2c_ttft: power of two random choices on ttft_ewma * (in_flight + 1)
+- weighted: smooth weighted round-robin by per-account quota weight
+
+round_robin (a bisect) and p2c_ttft (two samples) do not scan the pool.
+least_in_flight and weighted scan every eligible account, so a pick is
+O(n); that is negligible for pools of tens of accounts, but pools in the
+thousands would need an indexed structure (e.g. a heap keyed on in_flight).
+"""
+
+import random
+from bisect import bisect_right
+from typing import Dict, Optional, Type
+
+from loguru import logger
+
+from kiro.account_pool import AccountPool, AccountRecord
+
+
+class SchedulingPolicy:
+    """Base class for account scheduling policies."""
+
+    name: str = ""
+
+    def select(self, pool: AccountPool, after: int, now: float) -> Optional[int]:
+        """
+        Pick the slot of the next account to use.
+
+        Args:
+            pool: Account pool to choose from.
+            after: Slot selected last time (-1 for none).
+            now: Current UNIX timestamp.
+
+        Returns:
+            Selected slot, or None when every account is quarantined.
+        """
+        raise NotImplementedError
+
+
+class RoundRobinPolicy(SchedulingPolicy):
+    """Strict rotation over eligible accounts."""
+
+    name = "round_robin"
+
+    def select(self, pool: AccountPool, after: int, now: float) -> Optional[int]:
+        return pool.next_eligible_slot(after, now)
+
+
+class LeastInFlightPolicy(SchedulingPolicy):
+    """
+    Account with the fewest in-flight requests; ties go to rotation order.
+
+    Scans the eligible accounts (O(n) per pick), stopping early at an idle one.
+    """
+
+    name = "least_in_flight"
+
+    def select(self, pool: AccountPool, after: int, now: float) -> Optional[int]:
+        slots = pool.eligible_slots(now)
+        if not slots:
+            return None
+
+        count = len(slots)
+        start = bisect_right(slots, after)
+        best_slot = slots[start % count]
+        best_load = pool[best_slot].in_flight
+        for offset in range(1, count):
+            if best_load == 0:
+                break
+            slot = slots[(start + offset) % count]
+            load = pool[slot].in_flight
+            if load < best_load:
+                best_slot, best_load = slot, load
+        return best_slot
+
+
+class PowerOfTwoTtftPolicy(SchedulingPolicy):
+    """
+    Power of two random choices on expected wait.
+
+    Samples two eligible accounts and keeps the one with the lower
+    ttft_ewma * (in_flight + 1). Accounts without a latency sample score
+    zero so they get measured quickly.
+    """
+
+    name = "p2c_ttft"
+
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        self._random = rng or random.Random()
+
+    @staticmethod
+    def _cost(record: AccountRecord) -> tuple:
+        ttft = record.ttft_ewma or 0.0
+        return (ttft * (record.in_flight + 1), record.in_flight)
+
+    def select(self, pool: AccountPool, after: int, now: float) -> Optional[int]:
+        slots = pool.eligible_slots(now)
+        if not slots:
+            return None
+        if len(slots) == 1:
+            return slots[0]
+
+        first, second = self._random.sample(slots, 2)
+        if self._cost(pool[second]) < self._cost(pool[first]):
+            return second
+        return first
+
+
+class WeightedPolicy(SchedulingPolicy):
+    """
+    Smooth weighted round-robin by per-account quota weight.
+
+    Each pick adds every eligible account's weight to its credit, takes the
+    account with the highest credit and charges it the total weight, so an
+    account with weight 3 gets three picks for every one of a weight-1 peer
+    without bursts. Every pick touches every eligible account (O(n)).
+    """
+
+    name = "weighted"
+
+    def select(self, pool: AccountPool, after: int, now: float) -> Optional[int]:
+        slots = pool.eligible_slots(now)
+        if not slots:
+            return None
+
+        total_weight = 0.0
+        best: Optional[AccountRecord] = None
+        best_slot = slots[0]
+        for slot in slots:
+            record = pool[slot]
+            record.sched_credit += record.weight
+            total_weight += record.weight
+            if best is None or record.sched_credit > best.sched_credit:
+                best, best_slot = record, slot
+
+        if total_weight <= 0:
+            return pool.next_eligible_slot(after, now)
+        best.sched_credit -= total_weight
+        return best_slot
+
+
+SCHEDULING_POLICIES: Dict[str, Type[SchedulingPolicy]] = {
+    policy.name: policy
+    for policy in (RoundRobinPolicy, LeastInFlightPolicy, PowerOfTwoTtftPolicy, WeightedPolicy)
+}
+
+
+def create_scheduling_policy(name: str) -> SchedulingPolicy:
+    """
+    Create a scheduling policy by name.
+
+    Args:
+        name: Policy name from SCHEDULING_POLICIES.
+
+    Returns:
+        Policy instance; round-robin for unknown names.
+    """
+    policy_class = SCHEDULING_POLICIES.get(name)
+    if policy_class is None:
+        logger.warning(f"Unknown account scheduling policy '{name}', using round_robin")
+        policy_class = RoundRobinPolicy
+    return policy_class()
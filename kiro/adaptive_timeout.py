@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Adaptive per-model first-token timeout.
+
+A single FIRST_TOKEN_TIMEOUT either kills healthy slow requests (large-context
+Opus) or waits far too long on dead fast ones (small Haiku prompts). Instead,
+the gateway keeps a streaming quantile sketch of the first-token wait per
+(model, context-size bucket) and derives the timeout from it:
+
+    timeout = clamp(quantile(FIRST_TOKEN_TIMEOUT_QUANTILE) * FIRST_TOKEN_TIMEOUT_MULTIPLIER,
+                    FIRST_TOKEN_TIMEOUT_MIN, FIRST_TOKEN_TIMEOUT_MAX)
+
+Until a bucket has FIRST_TOKEN_TIMEOUT_MIN_SAMPLES observations the static
+FIRST_TOKEN_TIMEOUT is used. A wait that hits the timeout is recorded as a
+sample equal to the timeout, so repeated timeouts raise the learned value
+(up to FIRST_TOKEN_TIMEOUT_MAX) instead of being invisible to it.
+"""
+
+import math
+from bisect import bisect_right
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from kiro.config import (
+    ADAPTIVE_FIRST_TOKEN_TIMEOUT,
+    FIRST_TOKEN_CONTEXT_BUCKETS,
+    FIRST_TOKEN_TIMEOUT,
+    FIRST_TOKEN_TIMEOUT_MAX,
+    FIRST_TOKEN_TIMEOUT_MIN,
+    FIRST_TOKEN_TIMEOUT_MIN_SAMPLES,
+    FIRST_TOKEN_TIMEOUT_MULTIPLIER,
+    FIRST_TOKEN_TIMEOUT_QUANTILE,
+)
+from kiro.services import services
+
+# (model, context bucket index)
+TimeoutKey = Tuple[str, int]
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic bins (as in DDSketch), so any quantile
+    is returned within `relative_accuracy` of the true value using a few
+    hundred bins for the whole 1ms..10min range. When the total count
+    exceeds `decay_count` all bins are halved, so old observations fade and
+    the sketch follows upstream latency drift.
+    """
+
+    MIN_VALUE = 0.001
+
+    def __init__(self, relative_accuracy: float = 0.02, decay_count: int = 1000) -> None:
+        """
+        Args:
+            relative_accuracy: Maximum relative error of returned quantiles.
+            decay_count: Total count at which all bins are halved.
+        """
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._decay_count = decay_count
+        self._bins: Dict[int, float] = {}
+        self._sorted_bins: Optional[List[Tuple[int, float]]] = None
+        self.count = 0.0
+
+    def add(self, value: float) -> None:
+        """Record one observation (seconds)."""
+        index = math.ceil(math.log(max(value, self.MIN_VALUE)) / self._log_gamma)
+        self._bins[index] = self._bins.get(index, 0.0) + 1.0
+        self.count += 1.0
+        self._sorted_bins = None
+        if self.count > self._decay_count:
+            self._decay()
+
+    def _decay(self) -> None:
+        """Halve every bin, dropping bins that fade out."""
+        self._bins = {index: count / 2 for index, count in self._bins.items() if count >= 0.5}
+        self.count = sum(self._bins.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Return the estimated q-quantile.
+
+        Args:
+            q: Quantile in [0, 1].
+
+        Returns:
+            Estimated value, or None when the sketch is empty.
+        """
+        if self.count <= 0:
+            return None
+        if self._sorted_bins is None:
+            self._sorted_bins = sorted(self._bins.items())
+        rank = min(max(q, 0.0), 1.0) * (self.count - 1)
+        cumulative = 0.0
+        index = self._sorted_bins[-1][0]
+        for index, count in self._sorted_bins:
+            cumulative += count
+            if cumulative > rank:
+                break
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+
+class AdaptiveFirstTokenTimeout:
+    """
+    Learns first-token timeouts per model and context-size bucket.
+
+    All methods are synchronous and never await, so sketches are updated
+    atomically on the event loop.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ADAPTIVE_FIRST_TOKEN_TIMEOUT,
+        default_timeout: float = FIRST_TOKEN_TIMEOUT,
+        quantile: float = FIRST_TOKEN_TIMEOUT_QUANTILE,
+        multiplier: float = FIRST_TOKEN_TIMEOUT_MULTIPLIER,
+        minimum: float = FIRST_TOKEN_TIMEOUT_MIN,
+        maximum: float = FIRST_TOKEN_TIMEOUT_MAX,
+        min_samples: int = FIRST_TOKEN_TIMEOUT_MIN_SAMPLES,
+        context_buckets: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Args:
+            enabled: When False, timeout_for() always returns default_timeout.
+            default_timeout: Timeout used until a bucket has enough samples.
+            quantile: First-token wait quantile the timeout is based on.
+            multiplier: Head-room applied to the quantile.
+            minimum: Lower clamp of learned timeouts (seconds).
+            maximum: Upper clamp of learned timeouts (seconds).
+            min_samples: Observations needed before a bucket is trusted.
+            context_buckets: Ascending prompt-token boundaries of the buckets.
+        """
+        self.enabled = enabled
+        self.default_timeout = default_timeout
+        self.quantile = quantile
+        self.multiplier = multiplier
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.min_samples = min_samples
+        self.context_buckets = sorted(FIRST_TOKEN_CONTEXT_BUCKETS if context_buckets is None else context_buckets)
+        self._sketches: Dict[TimeoutKey, QuantileSketch] = {}
+
+    def key(self, model: str, context_tokens: int) -> TimeoutKey:
+        """
+        Map a request to its sketch key.
+
+        Args:
+            model: Requested model name.
+            context_tokens: Estimated prompt size in tokens.
+        """
+        return (model, bisect_right(self.context_buckets, context_tokens))
+
+    def timeout_for(self, key: TimeoutKey) -> float:
+        """
+        Return the first-token timeout for a request.
+
+        Args:
+            key: Sketch key from key().
+
+        Returns:
+            Learned timeout in seconds, or the static default.
+        """
+        if not self.enabled:
+            return self.default_timeout
+        sketch = self._sketches.get(key)
+        if sketch is None or sketch.count < self.min_samples:
+            return self.default_timeout
+        return self._learned_timeout(sketch)
+
+    def _learned_timeout(self, sketch: QuantileSketch) -> float:
+        observed = sketch.quantile(self.quantile) or 0.0
+        return min(self.maximum, max(self.minimum, observed * self.multiplier))
+
+    def record(self, key: TimeoutKey, seconds: float) -> None:
+        """
+        Record how long a request waited for its first token.
+
+        Args:
+            key: Sketch key from key().
+            seconds: Wait time; the full timeout if none arrived.
+        """
+        if not self.enabled:
+            return
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            sketch = self._sketches[key] = QuantileSketch()
+        sketch.add(seconds)
+
+    def observer(self, key: TimeoutKey) -> Callable[[float], None]:
+        """Return a callback recording first-token waits for `key` (for parse_kiro_stream)."""
+        return partial(self.record, key)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Describe every sketch, for diagnostics.
+
+        Returns:
+            One dict per (model, bucket) with sample count, p50, p99 and the
+            timeout currently applied.
+        """
+        rows = []
+        for (model, bucket), sketch in sorted(self._sketches.items()):
+            rows.append({
+                "model": model,
+                "context_bucket": bucket,
+                "samples": round(sketch.count, 1),
+                "p50": sketch.quantile(0.5),
+                "p99": sketch.quantile(0.99),
+                "timeout": self.timeout_for((model, bucket)),
+            })
+        return rows
+
+
+services.register("adaptive_first_token_timeout", AdaptiveFirstTokenTimeout)
+
+
+def get_adaptive_first_token_timeout() -> AdaptiveFirstTokenTimeout:
+    """Return the process-wide adaptive timeout model (see kiro/services.py)."""
+    return services.get("adaptive_first_token_timeout")
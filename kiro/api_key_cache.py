@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+In-process cache for MongoDB API-key lookups.
+
+With API_KEY_SOURCE=mongodb every request authenticates with a users
+collection lookup. ApiKeyCache keeps recent results in a bounded LRU with
+a TTL (active user documents) and a shorter negative TTL (unknown or
+inactive keys), so most requests never reach MongoDB.
+
+Misses run the blocking lookup through AsyncMongoStore (bounded thread
+pool with a deadline), and concurrent misses for the same key share one
+lookup. Lookup errors and timeouts are never cached.
+
+Optionally, a MongoDB change stream on the users collection invalidates
+entries as soon as a user is updated, deactivated, deleted or created,
+instead of waiting for the TTL.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from loguru import logger
+
+from kiro.config import (
+    API_KEY_CACHE_TTL_SECONDS,
+    API_KEY_CACHE_NEGATIVE_TTL_SECONDS,
+    API_KEY_CACHE_MAX_ENTRIES,
+    MONGODB_USER_API_KEY_FIELD,
+)
+from kiro.mongodb_async import get_async_mongo_store
+from kiro.services import services
+
+UserDoc = Dict[str, Any]
+Loader = Callable[[str], Optional[UserDoc]]
+
+# Wait before reopening a change stream that failed
+CHANGE_STREAM_RETRY_SECONDS = 5.0
+
+
+class ApiKeyCache:
+    """
+    TTL + LRU cache of API key -> active user document (or None).
+
+    All methods except the change-stream thread run on the event loop, so
+    the cache structures need no locks.
+    """
+
+    def __init__(
+        self,
+        ttl: float = API_KEY_CACHE_TTL_SECONDS,
+        negative_ttl: float = API_KEY_CACHE_NEGATIVE_TTL_SECONDS,
+        max_entries: int = API_KEY_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            ttl: Seconds an active user document stays cached (0 = not cached).
+            negative_ttl: Seconds an unknown/inactive key stays cached (0 = not cached).
+            max_entries: Maximum cached keys; the least recently used is evicted.
+            clock: Monotonic time source (for tests).
+        """
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        # api_key -> (expires_at, user_doc or None), in LRU order
+        self._entries: "OrderedDict[str, Tuple[float, Optional[UserDoc]]]" = OrderedDict()
+        # user _id -> cached api keys, for change-stream invalidation
+        self._keys_by_user: Dict[Any, Set[str]] = {}
+        self._flights: Dict[str, "asyncio.Future[Optional[UserDoc]]"] = {}
+        # Bumped by every invalidation; lookups started before it are not stored
+        self._generation = 0
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, api_key: str, loader: Loader) -> Optional[UserDoc]:
+        """
+        Return the active user document for an API key.
+
+        Args:
+            api_key: Incoming API key.
+            loader: Blocking lookup used on a miss (find_active_user_by_api_key).
+
+        Returns:
+            User document, or None for unknown or inactive keys.
+
+        Raises:
+            MongoStoreTimeoutError: If the lookup misses its deadline.
+            Whatever the loader raises (e.g. MongoStoreUnavailableError).
+        """
+        entry = self._entries.get(api_key)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._entries.move_to_end(api_key)
+                return entry[1]
+            self._drop(api_key)
+
+        flight = self._flights.get(api_key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._load(api_key, loader))
+            self._flights[api_key] = flight
+
+            def _on_done(done: "asyncio.Future[Optional[UserDoc]]") -> None:
+                if self._flights.get(api_key) is done:
+                    del self._flights[api_key]
+                if not done.cancelled():
+                    done.exception()  # Mark retrieved when every waiter was cancelled
+
+            flight.add_done_callback(_on_done)
+        # Shielded so one cancelled request does not fail the others waiting on it
+        return await asyncio.shield(flight)
+
+    async def _load(self, api_key: str, loader: Loader) -> Optional[UserDoc]:
+        """Run the blocking lookup off the event loop and cache its result."""
+        generation = self._generation
+        user_doc = await get_async_mongo_store().run("find_user", loader, api_key)
+        if generation == self._generation:
+            self._store(api_key, user_doc)
+        return user_doc
+
+    def _store(self, api_key: str, user_doc: Optional[UserDoc]) -> None:
+        ttl = self._ttl if user_doc is not None else self._negative_ttl
+        if ttl <= 0:
+            return
+        self._drop(api_key)
+        self._entries[api_key] = (self._clock() + ttl, user_doc)
+        if user_doc is not None and "_id" in user_doc:
+            self._keys_by_user.setdefault(user_doc["_id"], set()).add(api_key)
+        while len(self._entries) > self._max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, api_key: str) -> None:
+        entry = self._entries.pop(api_key, None)
+        if entry is None or entry[1] is None or "_id" not in entry[1]:
+            return
+        user_id = entry[1]["_id"]
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(api_key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def invalidate_key(self, api_key: str) -> None:
+        """Forget one API key (positive or negative entry)."""
+        self._generation += 1
+        self._drop(api_key)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """Forget every API key cached for a user document _id."""
+        self._generation += 1
+        for api_key in list(self._keys_by_user.get(user_id, ())):
+            self._drop(api_key)
+
+    def clear(self) -> None:
+        """Forget everything."""
+        self._generation += 1
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    def apply_change_event(self, change: Dict[str, Any]) -> None:
+        """
+        Invalidate entries affected by one users-collection change event.
+
+        The old entry is found through the document _id; the key in the
+        current document is dropped too, so a key cached as unknown becomes
+        valid as soon as its user is created or activated.
+
+        Args:
+            change: Change stream event document.
+        """
+        document_key = change.get("documentKey") or {}
+        if "_id" in document_key:
+            self.invalidate_user(document_key["_id"])
+        for document in (
+            change.get("fullDocument"),
+            (change.get("updateDescription") or {}).get("updatedFields"),
+        ):
+            if isinstance(document, dict) and isinstance(document.get(MONGODB_USER_API_KEY_FIELD), str):
+                self.invalidate_key(document[MONGODB_USER_API_KEY_FIELD])
+        if change.get("operationType") in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.clear()
+
+    def start_change_stream(self, open_stream: Callable[[], Any]) -> bool:
+        """
+        Start invalidating entries from a users-collection change stream.
+
+        The stream is read on a daemon thread; events are applied on the
+        event loop. If the stream breaks, the whole cache is cleared (events
+        may have been missed) and the stream is reopened.
+
+        Args:
+            open_stream: Blocking callable returning a pymongo change stream
+                (open_users_change_stream).
+
+        Returns:
+            True when the watcher was started, False if already running.
+        """
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return False
+        loop = asyncio.get_running_loop()
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_changes,
+            args=(loop, open_stream),
+            name="api-key-change-stream",
+            daemon=True,
+        )
+        self._watch_thread.start()
+        logger.info("API-key cache invalidation from MongoDB change stream started")
+        return True
+
+    def _watch_changes(self, loop: asyncio.AbstractEventLoop, open_stream: Callable[[], Any]) -> None:
+        """Change-stream reader loop (runs on the watcher thread)."""
+        while not self._watch_stop.is_set():
+            try:
+                stream = open_stream()
+                try:
+                    # A dead stream (after an invalidate event) is reopened
+                    while not self._watch_stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is not None:
+                            loop.call_soon_threadsafe(self.apply_change_event, change)
+                finally:
+                    stream.close()
+            except Exception as error:
+                if self._watch_stop.is_set():
+                    return
+                logger.warning(f"API-key cache change stream failed, clearing cache and retrying: {error}")
+                try:
+                    loop.call_soon_threadsafe(self.clear)
+                except RuntimeError:
+                    return  # Event loop closed
+                self._watch_stop.wait(CHANGE_STREAM_RETRY_SECONDS)
+
+    async def close(self) -> None:
+        """Stop the change-stream watcher."""
+        self._watch_stop.set()
+        thread = self._watch_thread
+        self._watch_thread = None
+        if thread is not None and thread.is_alive():
+            await asyncio.get_running_loop().run_in_executor(None, thread.join, 5.0)
+
+
+def _discard_api_key_cache(cache: ApiKeyCache) -> None:
+    """Signal a dropped cache's watcher thread to exit."""
+    cache._watch_stop.set()
+
+
+services.register("api_key_cache", ApiKeyCache, discard=_discard_api_key_cache)
+
+
+def get_api_key_cache() -> ApiKeyCache:
+    """Return the process-wide API-key cache (see kiro/services.py)."""
+    return services.get("api_key_cache")
@@ -23,18 +23,22 @@ Authentication manager for Kiro API.
 Manages the lifecycle of access tokens:
 - Loading credentials from .env or JSON file
 - Automatic token refresh on expiration
-- Thread-safe refresh using asyncio.Lock
+- Lock-free token reads with per-account single-flight refresh
 - Support for both Kiro Desktop Auth and AWS SSO OIDC (kiro-cli)
 """
 
 import asyncio
 from contextvars import ContextVar
+import functools
+import heapq
 import json
+import random
 import sqlite3
+import time
 from datetime import datetime, timezone, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import httpx
 from loguru import logger
@@ -49,14 +53,29 @@ try:
 except ImportError:
     certifi = None
 
+from kiro.account_pool import AccountPool, AccountRecord
+from kiro.account_scheduler import SchedulingPolicy, create_scheduling_policy
+from kiro.metrics import AUTH_REFRESH_SECONDS, account_metrics_label
 from kiro.config import (
     TOKEN_REFRESH_THRESHOLD,
+    TOKEN_BACKGROUND_REFRESH_CONCURRENCY,
+    TOKEN_BACKGROUND_REFRESH_JITTER_SECONDS,
     AUTH_POOL_RELOAD_INTERVAL_SECONDS,
+    ACCOUNT_SCHEDULING_POLICY,
+    ACCOUNT_TTFT_EWMA_ALPHA,
+    ACCOUNT_WEIGHTS,
+    ACCOUNT_STATUS_WINDOW_SECONDS,
     get_kiro_refresh_url,
     get_kiro_api_host,
     get_kiro_q_host,
     get_aws_sso_oidc_url,
 )
+from kiro.credential_store import (
+    CredentialStore,
+    FileCredentialStore,
+    MongoCredentialStore,
+    SqliteCredentialStore,
+)
 from kiro.utils import get_machine_fingerprint
 
 
@@ -78,6 +97,24 @@ MONGODB_TOKEN_KEYS = SQLITE_TOKEN_KEYS
 # Default quarantine window for failing accounts in round-robin pool.
 DEFAULT_ACCOUNT_QUARANTINE_SECONDS = 60
 
+# Delay before the background scheduler retries a failed refresh for an account;
+# doubles with each consecutive failure up to BACKGROUND_REFRESH_MAX_RETRY_SECONDS.
+BACKGROUND_REFRESH_RETRY_SECONDS = 30
+BACKGROUND_REFRESH_MAX_RETRY_SECONDS = 30 * 60
+
+# Consecutive background refresh failures after which a pool account is
+# quarantined until its next retry.
+BACKGROUND_REFRESH_QUARANTINE_FAILURES = 3
+
+# Upper bound on how long the background scheduler sleeps between schedule checks,
+# so accounts added by a pool reload are picked up promptly.
+BACKGROUND_REFRESH_MAX_SLEEP_SECONDS = 30
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    """Return value.isoformat(), or None when value is None."""
+    return value.isoformat() if value is not None else None
+
 
 class AuthType(Enum):
     """
@@ -171,6 +208,8 @@ class KiroAuthManager:
         self._mongodb_db_name = mongodb_db_name
         self._mongodb_collection = mongodb_collection
         self._mongodb_client: Optional[Any] = None
+        # Credential stores by (source, location); blocking I/O runs on their executors.
+        self._credential_stores: Dict[Tuple[str, str], CredentialStore] = {}
         
         # AWS SSO OIDC specific fields
         self._client_id: Optional[str] = client_id
@@ -185,8 +224,11 @@ class KiroAuthManager:
         self._sqlite_token_key: Optional[str] = None
 
         # Multi-account pool loaded from SQLite (single-account mode keeps this empty).
-        self._account_pool: List[Dict[str, Any]] = []
+        self._account_pool: AccountPool = AccountPool()
         self._round_robin_index: int = -1
+        self._scheduling_policy: SchedulingPolicy = create_scheduling_policy(ACCOUNT_SCHEDULING_POLICY)
+        self._account_weights: Dict[str, float] = dict(ACCOUNT_WEIGHTS)
+        self._ttft_ewma_alpha: float = ACCOUNT_TTFT_EWMA_ALPHA
         self._account_quarantine_seconds: int = DEFAULT_ACCOUNT_QUARANTINE_SECONDS
         self._request_account_key: ContextVar[Optional[str]] = ContextVar("request_account_key", default=None)
         self._account_pool_reload_interval_seconds: int = AUTH_POOL_RELOAD_INTERVAL_SECONDS
@@ -194,7 +236,25 @@ class KiroAuthManager:
         
         self._access_token: Optional[str] = None
         self._expires_at: Optional[datetime] = None
+        # Guards full account-pool reloads only; token reads never take it.
         self._lock = asyncio.Lock()
+        # In-flight refresh per account key, so concurrent callers share one round-trip.
+        self._refresh_flights: Dict[str, "asyncio.Future[None]"] = {}
+        self._refreshing_account_key: ContextVar[Optional[str]] = ContextVar(
+            "refreshing_account_key", default=None
+        )
+
+        # Background refresh schedule: min-heap of (due_timestamp, account_key).
+        # Heap entries are invalidated lazily by comparing against _refresh_due_at.
+        self._refresh_heap: List[Tuple[float, str]] = []
+        self._refresh_due_at: Dict[str, float] = {}
+        self._refresh_scheduled_expiry: Dict[str, Optional[datetime]] = {}
+        # Consecutive background refresh failures per account key (drives backoff and quarantine).
+        self._refresh_failures: Dict[str, int] = {}
+        self._background_refresh_task: Optional[asyncio.Task[Any]] = None
+        self._background_refresh_jobs: Set["asyncio.Task[None]"] = set()
+        self._background_refresh_semaphore = asyncio.Semaphore(TOKEN_BACKGROUND_REFRESH_CONCURRENCY)
+        self._background_refresh_jitter_seconds: float = TOKEN_BACKGROUND_REFRESH_JITTER_SECONDS
         
         # Auth type will be determined after loading credentials
         self._auth_type: AuthType = AuthType.KIRO_DESKTOP
@@ -370,7 +430,7 @@ class KiroAuthManager:
         token_key: str,
         token_data: Dict[str, Any],
         registration_map: Dict[str, Dict[str, Any]],
-    ) -> Dict[str, Any]:
+    ) -> AccountRecord:
         """
         Build an in-memory account object from SQLite token and registration payloads.
 
@@ -380,7 +440,7 @@ class KiroAuthManager:
             registration_map: Registration payloads keyed by auth_kv key.
 
         Returns:
-            Account dictionary used by round-robin selection.
+            Account record used by round-robin selection.
         """
         registration_data: Dict[str, Any] = {}
         for reg_key in self._registration_candidates_for_token_key(token_key):
@@ -401,27 +461,27 @@ class KiroAuthManager:
 
         auth_type = AuthType.AWS_SSO_OIDC if client_id and client_secret else AuthType.KIRO_DESKTOP
 
-        return {
-            "key": token_key,
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "profile_arn": profile_arn,
-            "expires_at": expires_at,
-            "sso_region": sso_region,
-            "scopes": scopes,
-            "provider": provider,
-            "client_id": client_id,
-            "client_secret": client_secret,
-            "auth_type": auth_type,
-            "quarantine_until": None,
-        }
+        return AccountRecord(
+            key=token_key,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            profile_arn=profile_arn,
+            expires_at=expires_at,
+            sso_region=sso_region,
+            scopes=scopes,
+            provider=provider,
+            client_id=client_id,
+            client_secret=client_secret,
+            auth_type=auth_type,
+            weight=self._account_weights.get(token_key, 1.0),
+        )
 
-    def _set_active_account(self, account: Dict[str, Any]) -> None:
+    def _set_active_account(self, account: AccountRecord) -> None:
         """
         Copy selected account data into active fields.
 
         Args:
-            account: Account dictionary.
+            account: Account record.
         """
         self._sqlite_token_key = account.get("key")
         self._access_token = account.get("access_token")
@@ -439,59 +499,53 @@ class KiroAuthManager:
         if not self._sqlite_token_key:
             return
 
-        for account in self._account_pool:
-            if account.get("key") != self._sqlite_token_key:
-                continue
-            account["access_token"] = self._access_token
-            account["refresh_token"] = self._refresh_token
-            account["profile_arn"] = self._profile_arn
-            account["expires_at"] = self._expires_at
-            account["sso_region"] = self._sso_region
-            account["scopes"] = self._scopes
-            account["client_id"] = self._client_id
-            account["client_secret"] = self._client_secret
-            account["auth_type"] = self._auth_type
-            break
-
-    def _find_account_by_key(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        account = self._account_pool.find(self._sqlite_token_key)
+        if account is None:
+            return
+        account.access_token = self._access_token
+        account.refresh_token = self._refresh_token
+        account.profile_arn = self._profile_arn
+        account.expires_at = self._expires_at
+        account.sso_region = self._sso_region
+        account.scopes = self._scopes
+        account.client_id = self._client_id
+        account.client_secret = self._client_secret
+        account.auth_type = self._auth_type
+
+    def _find_account_by_key(self, key: Optional[str]) -> Optional[AccountRecord]:
         """Find an account in the pool by SQLite key."""
-        if not key:
-            return None
-        for account in self._account_pool:
-            if account.get("key") == key:
-                return account
-        return None
+        return self._account_pool.find(key)
 
-    def _is_account_eligible(self, account: Dict[str, Any]) -> bool:
+    def _is_account_eligible(self, account: AccountRecord) -> bool:
         """Check whether account is eligible for round-robin selection."""
         quarantine_until = account.get("quarantine_until")
         if quarantine_until is None:
             return True
         return quarantine_until <= datetime.now(timezone.utc)
 
-    def _select_next_account_locked(self) -> Optional[Dict[str, Any]]:
+    def _select_next_account_locked(self) -> Optional[AccountRecord]:
         """
-        Select next eligible account in deterministic round-robin order.
+        Select next eligible account using the configured scheduling policy.
+
+        The default policy is deterministic round-robin: eligible slots are kept
+        sorted by the pool, so this is a binary search rather than a scan over
+        quarantined accounts. Never awaits, so it is atomic on the event loop
+        and needs no lock.
 
         Returns:
-            Selected account dictionary or None if account pool is empty.
+            Selected account record or None if account pool is empty.
         """
         if not self._account_pool:
             return None
 
-        total = len(self._account_pool)
-        for _ in range(total):
-            self._round_robin_index = (self._round_robin_index + 1) % total
-            candidate = self._account_pool[self._round_robin_index]
-            if self._is_account_eligible(candidate):
-                return candidate
+        slot = self._scheduling_policy.select(self._account_pool, self._round_robin_index, time.time())
+        if slot is None:
+            self._account_pool.clear_quarantine()
+            slot = (self._round_robin_index + 1) % len(self._account_pool)
+        self._round_robin_index = slot
+        return self._account_pool[slot]
 
-        for account in self._account_pool:
-            account["quarantine_until"] = None
-        self._round_robin_index = (self._round_robin_index + 1) % total
-        return self._account_pool[self._round_robin_index]
-
-    def _get_or_select_request_account_locked(self, force_next: bool = False) -> Optional[Dict[str, Any]]:
+    def _get_or_select_request_account_locked(self, force_next: bool = False) -> Optional[AccountRecord]:
         """
         Get request-scoped account or select next one in round-robin.
 
@@ -522,7 +576,7 @@ class KiroAuthManager:
         if not account:
             return
 
-        account["quarantine_until"] = datetime.now(timezone.utc) + timedelta(
+        account.quarantine_until = datetime.now(timezone.utc) + timedelta(
             seconds=self._account_quarantine_seconds
         )
         logger.warning(
@@ -537,12 +591,236 @@ class KiroAuthManager:
         account = self._find_account_by_key(current_key)
         if not account:
             return
-        account["quarantine_until"] = None
+        account.quarantine_until = None
 
     def clear_request_account(self) -> None:
         """Clear request-scoped selected account key."""
         self._request_account_key.set(None)
 
+    def acquire_request_account(self) -> Optional[str]:
+        """
+        Count one in-flight upstream call against the request-scoped account.
+
+        Returns:
+            Account key to pass to release_account(), or None in single-account mode.
+        """
+        key = self._request_account_key.get()
+        account = self._find_account_by_key(key)
+        if account is None:
+            return None
+        account.in_flight += 1
+        return key
+
+    def release_account(self, key: Optional[str]) -> None:
+        """
+        Finish an in-flight upstream call started with acquire_request_account().
+
+        Args:
+            key: Account key returned by acquire_request_account().
+        """
+        account = self._find_account_by_key(key)
+        if account is not None and account.in_flight > 0:
+            account.in_flight -= 1
+
+    def record_account_latency(self, key: Optional[str], seconds: float) -> None:
+        """
+        Fold a time-to-first-token sample into the account's EWMA.
+
+        Args:
+            key: Account key the request was sent with.
+            seconds: Time from sending the request to the first content event
+                of the stream (see KiroHttpClient._first_token_recorder).
+        """
+        account = self._find_account_by_key(key)
+        if account is None:
+            return
+        if account.ttft_ewma is None:
+            account.ttft_ewma = seconds
+        else:
+            alpha = self._ttft_ewma_alpha
+            account.ttft_ewma = alpha * seconds + (1 - alpha) * account.ttft_ewma
+
+    def record_account_status(self, key: Optional[str], status_code: int) -> None:
+        """
+        Count an upstream error status (429, 403) against an account.
+
+        Args:
+            key: Account key the request was sent with.
+            status_code: HTTP status of the upstream response.
+        """
+        account = self._find_account_by_key(key)
+        if account is not None:
+            account.record_status(status_code, time.monotonic())
+
+    def cool_down_request_account(self, seconds: float, reason: str) -> bool:
+        """
+        Put the request-scoped account on cooldown and drop it from the request.
+
+        The next get_access_token() call then selects another account. An
+        existing longer cooldown is kept.
+
+        Args:
+            seconds: Cooldown length (e.g. from Retry-After).
+            reason: Short cause for the log line ("429", "quota").
+
+        Returns:
+            True when another account is eligible right now, so the caller can
+            retry immediately; False in single-account mode or when every
+            account is cooling down.
+        """
+        key = self._request_account_key.get()
+        account = self._find_account_by_key(key)
+        if account is None:
+            return False
+
+        until = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+        if account.quarantine_until is None or account.quarantine_until < until:
+            account.quarantine_until = until
+        self._request_account_key.set(None)
+        logger.warning(f"Account key {key} cooling down for {seconds:.0f}s after {reason}")
+        return bool(self._account_pool.eligible_slots(time.time()))
+
+    def seconds_until_account_available(self) -> Optional[float]:
+        """
+        Time until the first cooling-down account becomes eligible again.
+
+        Returns:
+            Seconds (0 if an account is eligible now), or None without an account pool.
+        """
+        if not self._account_pool:
+            return None
+        now = time.time()
+        if self._account_pool.eligible_slots(now):
+            return 0.0
+        expiries = [
+            account.quarantine_until.timestamp()
+            for account in self._account_pool
+            if account.quarantine_until is not None
+        ]
+        return max(min(expiries) - now, 0.0) if expiries else 0.0
+
+    def account_snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Describe the runtime state of every pooled account.
+
+        Used by /metrics and /admin/accounts, so it only reads fields already
+        in memory. Secrets (tokens, client secret) are never included.
+
+        Returns:
+            One dict per account with key, metrics_label (the opaque account
+            label used by /metrics), auth_type, token_expires_at,
+            in_flight, quarantined, quarantine_until, recent_429 and
+            recent_403 (within ACCOUNT_STATUS_WINDOW_SECONDS), ttft_ewma,
+            weight, last_refresh_seconds, last_refresh_at and last_reload.
+            Timestamps are ISO strings or None. Empty without an account pool.
+        """
+        now = datetime.now(timezone.utc)
+        since = time.monotonic() - ACCOUNT_STATUS_WINDOW_SECONDS
+        rows = []
+        for account in self._account_pool:
+            until = account.quarantine_until
+            quarantined = until is not None and until > now
+            statuses = account.count_recent_statuses(since)
+            auth_type = account.auth_type
+            rows.append({
+                "key": account.key,
+                "metrics_label": account_metrics_label(account.key),
+                "auth_type": auth_type.value if isinstance(auth_type, AuthType) else auth_type,
+                "token_expires_at": _isoformat(account.expires_at),
+                "in_flight": account.in_flight,
+                "quarantined": quarantined,
+                "quarantine_until": until.isoformat() if quarantined else None,
+                "recent_429": statuses.get(429, 0),
+                "recent_403": statuses.get(403, 0),
+                "ttft_ewma": account.ttft_ewma,
+                "weight": account.weight,
+                "last_refresh_seconds": account.last_refresh_seconds,
+                "last_refresh_at": _isoformat(account.last_refresh_at),
+                "last_reload": {
+                    "source": account.loaded_from,
+                    "trigger": account.loaded_via,
+                    "at": _isoformat(account.loaded_at),
+                },
+            })
+        return rows
+
+    def _activate_account_by_key(self, key: Optional[str]) -> None:
+        """
+        Re-install an account into the active fields after an await point.
+
+        Active scalar fields are shared by all requests, so another request may
+        have swapped them while this one was suspended. The pool entry is looked
+        up by key because reloads replace account objects.
+
+        Args:
+            key: Account key to activate. No-op when None or not in the pool.
+        """
+        account = self._find_account_by_key(key)
+        if account is not None:
+            self._set_active_account(account)
+
+    def _resume_refresh_account(self) -> None:
+        """Restore the account being refreshed in the current refresh flight, if any."""
+        key = self._refreshing_account_key.get()
+        if key and self._sqlite_token_key != key:
+            self._activate_account_by_key(key)
+
+    async def _run_account_refresh(self, account: Optional[AccountRecord]) -> None:
+        """
+        Refresh one account's token inside its single-flight task.
+
+        Args:
+            account: Pool account to refresh, or None for single-account mode.
+        """
+        if account is None:
+            await self._refresh_token_request()
+            self._sync_active_account_state()
+            return
+
+        key = account.get("key")
+        self._refreshing_account_key.set(key)
+        self._set_active_account(account)
+        started = time.perf_counter()
+        try:
+            await self._refresh_token_request()
+            self._sync_active_account_state()
+        finally:
+            # Looked up again: a failed refresh may have reloaded the record
+            refreshed = self._find_account_by_key(key)
+            if refreshed is not None:
+                refreshed.last_refresh_seconds = time.perf_counter() - started
+                refreshed.last_refresh_at = datetime.now(timezone.utc)
+
+    async def _refresh_account_single_flight(self, account: Optional[AccountRecord]) -> None:
+        """
+        Refresh an account's token, joining a refresh already in flight for it.
+
+        Concurrent callers for the same account await one shared refresh task;
+        refreshes for other accounts proceed independently. The task is shielded
+        so a cancelled caller does not abort the refresh for the others.
+
+        Args:
+            account: Pool account to refresh, or None for single-account mode.
+
+        Raises:
+            Whatever the underlying refresh raises, delivered to every waiter.
+        """
+        flight_key = str(account.get("key")) if account is not None else ""
+        flight = self._refresh_flights.get(flight_key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._run_account_refresh(account))
+            self._refresh_flights[flight_key] = flight
+
+            def _on_done(done: "asyncio.Future[None]") -> None:
+                if self._refresh_flights.get(flight_key) is done:
+                    del self._refresh_flights[flight_key]
+                if not done.cancelled():
+                    done.exception()  # Mark retrieved when every waiter was cancelled
+
+            flight.add_done_callback(_on_done)
+
+        await asyncio.shield(flight)
+
     def _supports_periodic_account_pool_reload(self) -> bool:
         """Return whether periodic full-pool reload is supported for current auth source."""
         normalized_source = (self._auth_source or "auto").strip().lower()
@@ -554,44 +832,96 @@ class KiroAuthManager:
             return bool(self._sqlite_db)
         return False
 
+    def _account_pool_reader(self) -> Optional[Tuple[CredentialStore, Callable[[Any], Any]]]:
+        """Return the store and reader used for a full account-pool read, if any."""
+        normalized_source = (self._auth_source or "auto").strip().lower()
+        if normalized_source == "mongodb":
+            return self._get_credential_store("mongodb"), self._read_mongodb_auth_docs
+        if self._sqlite_db:
+            return self._get_credential_store("sqlite", self._sqlite_db), self._read_sqlite_auth_rows
+        return None
+
     def _reload_account_pool_from_source_locked(self) -> bool:
         """
-        Reload full account pool from configured DB source.
+        Reload full account pool from configured DB source (blocking).
 
         Returns:
             True when pool refresh applied successfully, False otherwise.
         """
         if not self._supports_periodic_account_pool_reload():
             return False
+        pool_reader = self._account_pool_reader()
+        if pool_reader is None:
+            return False
 
-        previous_accounts_by_key: Dict[str, Dict[str, Any]] = {
-            str(account.get("key")): account
-            for account in self._account_pool
-            if account.get("key")
-        }
+        store, reader = pool_reader
+        try:
+            payload = store.read(reader)
+        except Exception as error:
+            logger.error(f"Failed to read account pool from {store.source}: {error}")
+            return False
+        return self._apply_account_pool_payload(store.source, payload)
+
+    async def _reload_account_pool_from_source(self) -> bool:
+        """
+        Reload full account pool from configured DB source without blocking the event loop.
+
+        Returns:
+            True when pool refresh applied successfully, False otherwise.
+        """
+        if not self._supports_periodic_account_pool_reload():
+            return False
+        pool_reader = self._account_pool_reader()
+        if pool_reader is None:
+            return False
+
+        store, reader = pool_reader
+        try:
+            payload = await store.run(store.read, reader)
+        except Exception as error:
+            logger.error(f"Failed to read account pool from {store.source}: {error}")
+            return False
+        return self._apply_account_pool_payload(store.source, payload)
+
+    def _apply_account_pool_payload(self, source: str, payload: Any) -> bool:
+        """
+        Replace the account pool with freshly read DB rows.
+
+        Quarantine marks, scheduling state, the round-robin cursor and the request-selected
+        account survive the reload.
+
+        Args:
+            source: Store source the payload was read from ("sqlite" or "mongodb").
+            payload: Raw rows from _read_sqlite_auth_rows or _read_mongodb_auth_docs.
+
+        Returns:
+            True when pool refresh applied successfully, False otherwise.
+        """
+        if payload is None:
+            return False
+
+        previous_pool = self._account_pool
         previous_round_robin_key: Optional[str] = None
         if 0 <= self._round_robin_index < len(self._account_pool):
             previous_round_robin_key = self._account_pool[self._round_robin_index].get("key")
         selected_request_key = self._request_account_key.get()
 
-        normalized_source = (self._auth_source or "auto").strip().lower()
-        if normalized_source == "mongodb":
-            reloaded = self._load_credentials_from_mongodb()
-        elif self._sqlite_db:
-            reloaded = self._load_credentials_from_sqlite(self._sqlite_db)
+        if source == "mongodb":
+            reloaded = self._apply_mongodb_auth_docs(payload)
         else:
-            reloaded = False
+            reloaded = self._apply_sqlite_auth_rows(payload, str(self._sqlite_db))
 
         if not reloaded:
             return False
 
         for account in self._account_pool:
+            account.mark_loaded(source, "pool_reload")
             account_key = account.get("key")
             if not account_key:
                 continue
-            previous = previous_accounts_by_key.get(str(account_key))
+            previous = previous_pool.find(str(account_key))
             if previous is not None:
-                account["quarantine_until"] = previous.get("quarantine_until")
+                account.inherit_runtime_state(previous)
 
         if selected_request_key:
             selected_account = self._find_account_by_key(selected_request_key)
@@ -601,11 +931,9 @@ class KiroAuthManager:
                 self._request_account_key.set(selected_request_key)
                 self._set_active_account(selected_account)
 
-        if previous_round_robin_key:
-            for index, account in enumerate(self._account_pool):
-                if account.get("key") == previous_round_robin_key:
-                    self._round_robin_index = index
-                    break
+        previous_round_robin_slot = self._account_pool.slot_of(previous_round_robin_key)
+        if previous_round_robin_slot is not None:
+            self._round_robin_index = previous_round_robin_slot
 
         return True
 
@@ -615,7 +943,7 @@ class KiroAuthManager:
             while True:
                 await asyncio.sleep(self._account_pool_reload_interval_seconds)
                 async with self._lock:
-                    reloaded = self._reload_account_pool_from_source_locked()
+                    reloaded = await self._reload_account_pool_from_source()
                     if reloaded:
                         logger.debug(
                             "Periodic account-pool reload completed (interval=%ss)",
@@ -664,6 +992,203 @@ class KiroAuthManager:
         except asyncio.CancelledError:
             pass
 
+    def _iter_refresh_candidates(self) -> List[Tuple[str, Optional[datetime]]]:
+        """
+        List accounts tracked by the background refresh scheduler.
+
+        Returns:
+            (key, expires_at) pairs. Single-account mode uses the empty key.
+        """
+        if self._account_pool:
+            return [
+                (str(account["key"]), account.get("expires_at"))
+                for account in self._account_pool
+                if account.get("key") and account.get("refresh_token")
+            ]
+        if self._refresh_token:
+            return [("", self._expires_at)]
+        return []
+
+    def _schedule_token_refresh(self, key: str, due_at: float) -> None:
+        """
+        Push a refresh deadline for an account, superseding any earlier one.
+
+        Args:
+            key: Account key ("" in single-account mode).
+            due_at: Unix timestamp when the refresh should start.
+        """
+        self._refresh_due_at[key] = due_at
+        heapq.heappush(self._refresh_heap, (due_at, key))
+
+        # Drop superseded entries once they dominate the heap.
+        if len(self._refresh_heap) > 2 * len(self._refresh_due_at) + 16:
+            self._refresh_heap = [(due, k) for k, due in self._refresh_due_at.items()]
+            heapq.heapify(self._refresh_heap)
+
+    def _reconcile_token_refresh_schedule(self) -> None:
+        """
+        Sync the refresh schedule with the current account pool.
+
+        New accounts and accounts whose expiry changed (refreshed by a request,
+        reloaded from the DB) get a new deadline: TOKEN_REFRESH_THRESHOLD plus a
+        random jitter before expiry. Accounts that left the pool are forgotten.
+        """
+        now = time.time()
+        seen: Set[str] = set()
+        for key, expires_at in self._iter_refresh_candidates():
+            seen.add(key)
+            if key in self._refresh_scheduled_expiry and self._refresh_scheduled_expiry[key] == expires_at:
+                continue
+            if key in self._refresh_scheduled_expiry:
+                # Refreshed elsewhere (request path, pool reload): earlier failures no longer count
+                self._refresh_failures.pop(key, None)
+            self._refresh_scheduled_expiry[key] = expires_at
+            if expires_at is None:
+                due_at = now
+            else:
+                lead = TOKEN_REFRESH_THRESHOLD + random.uniform(0, self._background_refresh_jitter_seconds)
+                due_at = max(now, expires_at.timestamp() - lead)
+            self._schedule_token_refresh(key, due_at)
+
+        for key in list(self._refresh_scheduled_expiry):
+            if key not in seen:
+                self._refresh_scheduled_expiry.pop(key, None)
+                self._refresh_due_at.pop(key, None)
+                self._refresh_failures.pop(key, None)
+
+    def _pop_due_token_refreshes(self, now: float) -> List[str]:
+        """
+        Pop every account whose refresh deadline has passed.
+
+        Args:
+            now: Current unix timestamp.
+
+        Returns:
+            Account keys due for refresh, earliest first.
+        """
+        due_keys: List[str] = []
+        while self._refresh_heap and self._refresh_heap[0][0] <= now:
+            due_at, key = heapq.heappop(self._refresh_heap)
+            if self._refresh_due_at.get(key) != due_at:
+                continue  # Superseded or forgotten entry
+            del self._refresh_due_at[key]
+            due_keys.append(key)
+        return due_keys
+
+    async def _background_refresh_account(self, key: str) -> None:
+        """
+        Refresh one account ahead of expiry, bounded by the concurrency cap.
+
+        Joins a request-driven refresh already in flight for the account. On
+        failure the account is retried with capped exponential backoff
+        (BACKGROUND_REFRESH_RETRY_SECONDS doubling up to
+        BACKGROUND_REFRESH_MAX_RETRY_SECONDS); after
+        BACKGROUND_REFRESH_QUARANTINE_FAILURES consecutive failures a pool
+        account is also quarantined until that retry.
+
+        Args:
+            key: Account key ("" in single-account mode).
+        """
+        async with self._background_refresh_semaphore:
+            account: Optional[AccountRecord] = None
+            if key:
+                account = self._find_account_by_key(key)
+                if account is None:
+                    return
+                expires_at = account.get("expires_at")
+            else:
+                expires_at = self._expires_at
+
+            if self._refresh_scheduled_expiry.get(key) != expires_at:
+                return  # Already refreshed elsewhere; reconcile will reschedule
+
+            try:
+                await self._refresh_account_single_flight(account)
+                self._refresh_failures.pop(key, None)
+                logger.debug(f"Background token refresh completed for account key {key or '<default>'}")
+            except Exception as error:
+                failures = self._refresh_failures.get(key, 0) + 1
+                self._refresh_failures[key] = failures
+                retry_seconds = min(
+                    BACKGROUND_REFRESH_RETRY_SECONDS * 2 ** (failures - 1),
+                    BACKGROUND_REFRESH_MAX_RETRY_SECONDS,
+                )
+                logger.warning(
+                    f"Background token refresh failed for account key {key or '<default>'} "
+                    f"({failures} in a row, retrying in {retry_seconds}s): {error}"
+                )
+                self._schedule_token_refresh(key, time.time() + retry_seconds)
+                if account is not None and failures >= BACKGROUND_REFRESH_QUARANTINE_FAILURES:
+                    until = datetime.now(timezone.utc) + timedelta(seconds=retry_seconds)
+                    if account.quarantine_until is None or account.quarantine_until < until:
+                        account.quarantine_until = until
+                    logger.warning(
+                        f"Account key {key} quarantined for {retry_seconds}s after "
+                        f"{failures} failed background refreshes"
+                    )
+
+    async def _background_token_refresh_loop(self) -> None:
+        """Refresh accounts from the min-heap schedule as their deadlines pass."""
+        try:
+            while True:
+                self._reconcile_token_refresh_schedule()
+                now = time.time()
+                for key in self._pop_due_token_refreshes(now):
+                    job = asyncio.create_task(self._background_refresh_account(key))
+                    self._background_refresh_jobs.add(job)
+                    job.add_done_callback(self._background_refresh_jobs.discard)
+
+                sleep_seconds = float(BACKGROUND_REFRESH_MAX_SLEEP_SECONDS)
+                if self._refresh_heap:
+                    sleep_seconds = min(sleep_seconds, max(self._refresh_heap[0][0] - now, 0.0))
+                # Give running jobs a chance to update expiries before the next pass.
+                await asyncio.sleep(max(sleep_seconds, 1.0))
+        except asyncio.CancelledError:
+            logger.debug("Background token refresh task cancelled")
+            raise
+
+    def start_background_token_refresh(self) -> bool:
+        """
+        Start the background task that refreshes tokens before they expire.
+
+        Returns:
+            True when task is started, False when task is skipped or already running.
+        """
+        if self._background_refresh_task and not self._background_refresh_task.done():
+            return False
+        if not self._iter_refresh_candidates():
+            return False
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("Skipping background token refresh start: no running event loop")
+            return False
+
+        self._background_refresh_task = loop.create_task(self._background_token_refresh_loop())
+        logger.info(
+            f"Started background token refresh "
+            f"(concurrency={TOKEN_BACKGROUND_REFRESH_CONCURRENCY}, "
+            f"jitter={self._background_refresh_jitter_seconds}s)"
+        )
+        return True
+
+    async def stop_background_token_refresh(self) -> None:
+        """Stop the background token refresh task and any refreshes it started."""
+        tasks: List["asyncio.Task[Any]"] = list(self._background_refresh_jobs)
+        if self._background_refresh_task:
+            tasks.append(self._background_refresh_task)
+            self._background_refresh_task = None
+        self._background_refresh_jobs.clear()
+
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
     async def get_profile_arn_for_request(self) -> Optional[str]:
         """
         Resolve profile ARN for current request account.
@@ -671,56 +1196,121 @@ class KiroAuthManager:
         Returns:
             Profile ARN for request-selected account, or fallback profile ARN.
         """
-        async with self._lock:
-            if self._account_pool:
-                account = self._get_or_select_request_account_locked()
-                if account:
-                    self._set_active_account(account)
-            return self._profile_arn
+        if self._account_pool:
+            account = self._get_or_select_request_account_locked()
+            if account:
+                self._set_active_account(account)
+        return self._profile_arn
 
-    def _reload_active_account_from_sqlite_locked(self) -> None:
+    def _read_sqlite_account_row(
+        self,
+        key: str,
+        cursor: sqlite3.Cursor,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]]:
         """
-        Reload currently selected account from SQLite.
+        Read one token row and the registration rows from SQLite (blocking).
 
-        This pulls fresh values for only the active account key.
+        Args:
+            key: auth_kv token key.
+            cursor: SQLite cursor.
+
+        Returns:
+            (token_data, registration_map), or None when the key is missing.
+        """
+        cursor.execute("SELECT value FROM auth_kv WHERE key = ?", (key,))
+        token_row = cursor.fetchone()
+        if not token_row:
+            return None
+
+        token_data = json.loads(token_row[0])
+        if not isinstance(token_data, dict):
+            return None
+
+        registration_map: Dict[str, Dict[str, Any]] = {}
+        for reg_key, reg_value in self._iter_auth_kv_rows(cursor, SQLITE_REGISTRATION_KEYS):
+            try:
+                registration_map[reg_key] = json.loads(reg_value)
+            except json.JSONDecodeError:
+                continue
+        return token_data, registration_map
+
+    @staticmethod
+    def _read_mongodb_account_doc(
+        key: str,
+        collection: Any,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]]:
+        """
+        Read one token document from MongoDB (blocking).
+
+        Args:
+            key: auth_kv token key.
+            collection: MongoDB collection object.
+
+        Returns:
+            (token_data, empty registration map), or None when the key is missing.
+        """
+        doc = collection.find_one({"key": key}, {"_id": 0, "value": 1})
+        if not doc or not isinstance(doc.get("value"), dict):
+            return None
+        return doc["value"], {}
+
+    def _apply_reloaded_account(
+        self,
+        key: str,
+        token_data: Dict[str, Any],
+        registration_map: Dict[str, Dict[str, Any]],
+        source: str,
+    ) -> bool:
+        """
+        Replace one pool account with freshly read token data, keeping its quarantine and scheduling state.
+
+        Args:
+            key: auth_kv token key.
+            token_data: Parsed token payload.
+            registration_map: Registration payloads keyed by auth_kv key.
+            source: Store the payload was read from ("sqlite" or "mongodb").
+
+        Returns:
+            True when the account was found in the pool and replaced.
         """
-        if not self._sqlite_db or not self._sqlite_token_key:
+        refreshed_account = self._build_account_from_sqlite_row(key, token_data, registration_map)
+        account = self._account_pool.find(key)
+        if account is None:
+            return False
+        refreshed_account.inherit_runtime_state(account)
+        refreshed_account.mark_loaded(source, "account_reload")
+        return self._account_pool.replace_record(refreshed_account)
+
+    async def _reload_active_account_from_source(self, key: Optional[str]) -> None:
+        """
+        Reload one account from the DB source without blocking the event loop.
+
+        This pulls fresh values for only the given account key. The pool entry
+        is replaced; callers re-activate the account afterwards.
+
+        Args:
+            key: auth_kv token key of the account to reload.
+        """
+        if not key:
             return
 
-        path = Path(self._sqlite_db).expanduser()
-        if not path.exists():
+        if self._auth_source == "mongodb":
+            store = self._get_credential_store("mongodb")
+            reader = functools.partial(self._read_mongodb_account_doc, key)
+        elif self._sqlite_db:
+            store = self._get_credential_store("sqlite", self._sqlite_db)
+            reader = functools.partial(self._read_sqlite_account_row, key)
+        else:
             return
 
-        conn = sqlite3.connect(str(path))
-        cursor = conn.cursor()
         try:
-            cursor.execute("SELECT value FROM auth_kv WHERE key = ?", (self._sqlite_token_key,))
-            token_row = cursor.fetchone()
-            if not token_row:
-                return
-
-            token_data = json.loads(token_row[0])
-            registration_rows = self._iter_auth_kv_rows(cursor, SQLITE_REGISTRATION_KEYS)
-            registration_map: Dict[str, Dict[str, Any]] = {}
-            for reg_key, reg_value in registration_rows:
-                try:
-                    registration_map[reg_key] = json.loads(reg_value)
-                except json.JSONDecodeError:
-                    continue
+            payload = await store.run(store.read, reader)
+        except Exception as error:
+            logger.warning(f"Failed to reload {store.source} auth key {key}: {error}")
+            return
 
-            refreshed_account = self._build_account_from_sqlite_row(
-                self._sqlite_token_key,
-                token_data,
-                registration_map,
-            )
-            for idx, account in enumerate(self._account_pool):
-                if account.get("key") == self._sqlite_token_key:
-                    refreshed_account["quarantine_until"] = account.get("quarantine_until")
-                    self._account_pool[idx] = refreshed_account
-                    self._set_active_account(refreshed_account)
-                    return
-        finally:
-            conn.close()
+        if payload is not None:
+            self._apply_reloaded_account(key, *payload, source=store.source)
 
     def _get_mongodb_collection(self) -> Optional[Any]:
         """
@@ -757,30 +1347,45 @@ class KiroAuthManager:
         Document format:
             {"key": "kirocli:social:token", "value": { ...token payload... }}
         """
-        collection = self._get_mongodb_collection()
-        if collection is None:
-            return False
-
         try:
-            token_docs = self._iter_mongodb_auth_docs(collection, MONGODB_TOKEN_KEYS)
+            token_docs = self._get_credential_store("mongodb").read(self._read_mongodb_auth_docs)
         except Exception as error:
             logger.error(f"Failed to query MongoDB auth documents: {error}")
             return False
 
-        parsed_accounts: List[Dict[str, Any]] = []
+        if token_docs is None:
+            return False
+        return self._apply_mongodb_auth_docs(token_docs)
+
+    def _read_mongodb_auth_docs(self, collection: Any) -> List[tuple[str, Dict[str, Any]]]:
+        """Read all token documents from the MongoDB auth_kv collection (blocking)."""
+        return self._iter_mongodb_auth_docs(collection, MONGODB_TOKEN_KEYS)
+
+    def _apply_mongodb_auth_docs(self, token_docs: List[tuple[str, Dict[str, Any]]]) -> bool:
+        """
+        Build the account pool from MongoDB token documents.
+
+        Args:
+            token_docs: (key, token_payload) pairs.
+
+        Returns:
+            True when at least one valid account was loaded.
+        """
+        parsed_accounts: List[AccountRecord] = []
         registration_map: Dict[str, Dict[str, Any]] = {}
         for token_key, token_value in token_docs:
             account = self._build_account_from_sqlite_row(token_key, token_value, registration_map)
             if not account.get("refresh_token"):
                 logger.warning(f"Skipping MongoDB auth key {token_key}: missing refresh_token")
                 continue
+            account.mark_loaded("mongodb", "startup")
             parsed_accounts.append(account)
 
         if not parsed_accounts:
             logger.warning("No valid credentials loaded from MongoDB auth_kv collection")
             return False
 
-        self._account_pool = parsed_accounts
+        self._account_pool = AccountPool(parsed_accounts)
         self._round_robin_index = -1
         self._set_active_account(self._account_pool[0])
         logger.info(
@@ -789,87 +1394,12 @@ class KiroAuthManager:
         )
         return True
 
-    def _reload_active_account_from_mongodb_locked(self) -> None:
-        """Reload active account payload from MongoDB by key."""
-        if not self._sqlite_token_key:
-            return
-
-        collection = self._get_mongodb_collection()
-        if collection is None:
-            return
-
-        try:
-            doc = collection.find_one({"key": self._sqlite_token_key}, {"_id": 0, "value": 1})
-        except Exception as error:
-            logger.warning(f"Failed to reload MongoDB auth key {self._sqlite_token_key}: {error}")
-            return
-
-        if not doc or not isinstance(doc.get("value"), dict):
-            return
-
-        refreshed_account = self._build_account_from_sqlite_row(
-            self._sqlite_token_key,
-            doc["value"],
-            {},
-        )
-        for idx, account in enumerate(self._account_pool):
-            if account.get("key") == self._sqlite_token_key:
-                refreshed_account["quarantine_until"] = account.get("quarantine_until")
-                self._account_pool[idx] = refreshed_account
-                self._set_active_account(refreshed_account)
-                return
-
     def _save_credentials_to_mongodb(self) -> None:
-        """Persist active account credentials back to MongoDB auth_kv."""
-        collection = self._get_mongodb_collection()
-        if collection is None:
-            return
-
-        candidate_keys: List[str] = []
-        if self._sqlite_token_key:
-            candidate_keys.append(self._sqlite_token_key)
-
-        current_request_key = self._request_account_key.get()
-        if current_request_key and current_request_key not in candidate_keys:
-            candidate_keys.append(current_request_key)
-
-        for account in self._account_pool:
-            account_key = account.get("key")
-            if account_key and account_key not in candidate_keys:
-                candidate_keys.append(account_key)
-
-        for fallback_key in MONGODB_TOKEN_KEYS:
-            if fallback_key not in candidate_keys:
-                candidate_keys.append(fallback_key)
-
-        for key in candidate_keys:
-            doc = collection.find_one({"key": key}, {"_id": 0, "value": 1})
-            if not doc or not isinstance(doc.get("value"), dict):
-                continue
+        """Persist active account credentials back to MongoDB auth_kv (blocking)."""
+        record = self._build_credentials_record(MONGODB_TOKEN_KEYS)
+        saved_key = self._get_credential_store("mongodb").write_records([record])[0]
+        self._apply_saved_credentials_key(saved_key)
 
-            existing_data = dict(doc["value"])
-            existing_data["access_token"] = self._access_token
-            existing_data["refresh_token"] = self._refresh_token
-            existing_data["expires_at"] = self._expires_at.isoformat() if self._expires_at else None
-            existing_data["region"] = self._sso_region or self._region
-            if self._scopes:
-                existing_data["scopes"] = self._scopes
-            if self._profile_arn:
-                existing_data["profile_arn"] = self._profile_arn
-
-            result = collection.update_one(
-                {"key": key},
-                {"$set": {"value": existing_data}},
-                upsert=False,
-            )
-            if result.modified_count > 0 or result.matched_count > 0:
-                self._sqlite_token_key = key
-                self._sync_active_account_state()
-                logger.debug(f"Credentials saved to MongoDB auth key: {key}")
-                return
-
-        logger.warning("Failed to save credentials to MongoDB: no matching keys found")
-    
     def _load_credentials_from_sqlite(self, db_path: str) -> bool:
         """
         Loads credentials from kiro-cli SQLite database.
@@ -898,51 +1428,11 @@ class KiroAuthManager:
                 logger.warning(f"SQLite database not found: {db_path}")
                 return False
             
-            conn = sqlite3.connect(str(path))
-            cursor = conn.cursor()
-
-            registration_rows = self._iter_auth_kv_rows(cursor, SQLITE_REGISTRATION_KEYS)
-            registration_map: Dict[str, Dict[str, Any]] = {}
-            for reg_key, reg_value in registration_rows:
-                try:
-                    registration_map[reg_key] = json.loads(reg_value)
-                except json.JSONDecodeError as reg_error:
-                    logger.warning(f"Invalid registration JSON in key {reg_key}: {reg_error}")
-
-            token_rows = self._iter_auth_kv_rows(cursor, SQLITE_TOKEN_KEYS)
-            parsed_accounts: List[Dict[str, Any]] = []
-
-            for token_key, token_value in token_rows:
-                try:
-                    token_data = json.loads(token_value)
-                except json.JSONDecodeError as parse_error:
-                    logger.warning(f"Invalid token JSON in key {token_key}: {parse_error}")
-                    continue
-
-                if not isinstance(token_data, dict):
-                    logger.warning(f"Unexpected token payload type for key {token_key}: {type(token_data)}")
-                    continue
-
-                account = self._build_account_from_sqlite_row(token_key, token_data, registration_map)
-                if not account.get("refresh_token"):
-                    logger.warning(f"Skipping SQLite key {token_key}: missing refresh_token")
-                    continue
-                parsed_accounts.append(account)
-
-            conn.close()
-
-            if parsed_accounts:
-                self._account_pool = parsed_accounts
-                self._round_robin_index = -1
-                first_account = self._account_pool[0]
-                self._set_active_account(first_account)
-                logger.info(
-                    f"Loaded {len(self._account_pool)} account(s) from SQLite database: {db_path}"
-                )
-                return True
-            else:
-                logger.warning(f"No valid credentials found in SQLite database: {db_path}")
+            rows = self._get_credential_store("sqlite", db_path).read(self._read_sqlite_auth_rows)
+            if rows is None:
+                logger.warning(f"SQLite database not found: {db_path}")
                 return False
+            return self._apply_sqlite_auth_rows(rows, db_path)
             
         except sqlite3.Error as e:
             logger.error(f"SQLite error loading credentials: {e}")
@@ -952,6 +1442,77 @@ class KiroAuthManager:
             logger.error(f"Error loading credentials from SQLite: {e}")
         return False
     
+    def _read_sqlite_auth_rows(
+        self,
+        cursor: sqlite3.Cursor,
+    ) -> Tuple[List[tuple[str, str]], List[tuple[str, str]]]:
+        """
+        Read all registration and token rows from SQLite auth_kv (blocking).
+
+        Args:
+            cursor: SQLite cursor.
+
+        Returns:
+            (registration_rows, token_rows) as (key, raw JSON value) pairs.
+        """
+        registration_rows = self._iter_auth_kv_rows(cursor, SQLITE_REGISTRATION_KEYS)
+        token_rows = self._iter_auth_kv_rows(cursor, SQLITE_TOKEN_KEYS)
+        return registration_rows, token_rows
+
+    def _apply_sqlite_auth_rows(
+        self,
+        rows: Tuple[List[tuple[str, str]], List[tuple[str, str]]],
+        db_path: str,
+    ) -> bool:
+        """
+        Build the account pool from SQLite auth_kv rows.
+
+        Args:
+            rows: (registration_rows, token_rows) from _read_sqlite_auth_rows.
+            db_path: Database path, for logging.
+
+        Returns:
+            True when at least one valid account was loaded.
+        """
+        registration_rows, token_rows = rows
+        registration_map: Dict[str, Dict[str, Any]] = {}
+        for reg_key, reg_value in registration_rows:
+            try:
+                registration_map[reg_key] = json.loads(reg_value)
+            except json.JSONDecodeError as reg_error:
+                logger.warning(f"Invalid registration JSON in key {reg_key}: {reg_error}")
+
+        parsed_accounts: List[AccountRecord] = []
+        for token_key, token_value in token_rows:
+            try:
+                token_data = json.loads(token_value)
+            except json.JSONDecodeError as parse_error:
+                logger.warning(f"Invalid token JSON in key {token_key}: {parse_error}")
+                continue
+
+            if not isinstance(token_data, dict):
+                logger.warning(f"Unexpected token payload type for key {token_key}: {type(token_data)}")
+                continue
+
+            account = self._build_account_from_sqlite_row(token_key, token_data, registration_map)
+            if not account.get("refresh_token"):
+                logger.warning(f"Skipping SQLite key {token_key}: missing refresh_token")
+                continue
+            account.mark_loaded("sqlite", "startup")
+            parsed_accounts.append(account)
+
+        if not parsed_accounts:
+            logger.warning(f"No valid credentials found in SQLite database: {db_path}")
+            return False
+
+        self._account_pool = AccountPool(parsed_accounts)
+        self._round_robin_index = -1
+        self._set_active_account(self._account_pool[0])
+        logger.info(
+            f"Loaded {len(self._account_pool)} account(s) from SQLite database: {db_path}"
+        )
+        return True
+    
     def _load_credentials_from_file(self, file_path: str) -> None:
         """
         Loads credentials from a JSON file.
@@ -1061,7 +1622,7 @@ class KiroAuthManager:
     
     def _save_credentials_to_file(self) -> None:
         """
-        Saves updated credentials to a JSON file.
+        Saves updated credentials to a JSON file (blocking).
         
         Updates the existing file while preserving other fields.
         """
@@ -1069,34 +1630,14 @@ class KiroAuthManager:
             return
         
         try:
-            path = Path(self._creds_file).expanduser()
-            
-            # Read existing data
-            existing_data = {}
-            if path.exists():
-                with open(path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            
-            # Update data
-            existing_data['accessToken'] = self._access_token
-            existing_data['refreshToken'] = self._refresh_token
-            if self._expires_at:
-                existing_data['expiresAt'] = self._expires_at.isoformat()
-            if self._profile_arn:
-                existing_data['profileArn'] = self._profile_arn
-            
-            # Save
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, indent=2, ensure_ascii=False)
-            
-            logger.debug(f"Credentials saved to {self._creds_file}")
-            
+            record = self._build_credentials_record([])
+            self._get_credential_store("file", self._creds_file).write_records([record])
         except Exception as e:
             logger.error(f"Error saving credentials: {e}")
     
     def _save_credentials_to_sqlite(self) -> None:
         """
-        Saves updated credentials back to SQLite database.
+        Saves updated credentials back to SQLite database (blocking).
         
         This ensures that tokens refreshed by the gateway are persisted
         and available after gateway restart or for other processes reading
@@ -1116,74 +1657,127 @@ class KiroAuthManager:
             return
         
         try:
-            path = Path(self._sqlite_db).expanduser()
-            if not path.exists():
-                logger.warning(f"SQLite database not found for writing: {self._sqlite_db}")
-                return
-            
-            # Use timeout to avoid blocking if database is locked
-            conn = sqlite3.connect(str(path), timeout=5.0)
-            cursor = conn.cursor()
-            
-            candidate_keys: List[str] = []
-            if self._sqlite_token_key:
-                candidate_keys.append(self._sqlite_token_key)
-
-            current_request_key = self._request_account_key.get()
-            if current_request_key and current_request_key not in candidate_keys:
-                candidate_keys.append(current_request_key)
-
-            for account in self._account_pool:
-                account_key = account.get("key")
-                if account_key and account_key not in candidate_keys:
-                    candidate_keys.append(account_key)
-
-            for fallback_key in SQLITE_TOKEN_KEYS:
-                if fallback_key not in candidate_keys:
-                    candidate_keys.append(fallback_key)
-
-            for key in candidate_keys:
-                cursor.execute("SELECT value FROM auth_kv WHERE key = ?", (key,))
-                row = cursor.fetchone()
-                if not row:
-                    continue
-
-                try:
-                    existing_data = json.loads(row[0])
-                    if not isinstance(existing_data, dict):
-                        existing_data = {}
-                except json.JSONDecodeError:
-                    existing_data = {}
-
-                existing_data["access_token"] = self._access_token
-                existing_data["refresh_token"] = self._refresh_token
-                existing_data["expires_at"] = self._expires_at.isoformat() if self._expires_at else None
-                existing_data["region"] = self._sso_region or self._region
-                if self._scopes:
-                    existing_data["scopes"] = self._scopes
-                if self._profile_arn:
-                    existing_data["profile_arn"] = self._profile_arn
-
-                cursor.execute(
-                    "UPDATE auth_kv SET value = ? WHERE key = ?",
-                    (json.dumps(existing_data), key),
-                )
-                if cursor.rowcount > 0:
-                    conn.commit()
-                    conn.close()
-                    self._sqlite_token_key = key
-                    self._sync_active_account_state()
-                    logger.debug(f"Credentials saved to SQLite key: {key}")
-                    return
-
-            conn.close()
-            logger.warning("Failed to save credentials to SQLite: no matching keys found")
-            
+            record = self._build_credentials_record(SQLITE_TOKEN_KEYS)
+            saved_key = self._get_credential_store("sqlite", self._sqlite_db).write_records([record])[0]
+            self._apply_saved_credentials_key(saved_key)
         except sqlite3.Error as e:
             logger.error(f"SQLite error saving credentials: {e}")
         except Exception as e:
             logger.error(f"Error saving credentials to SQLite: {e}")
     
+    def _get_credential_store(self, source: str, location: str = "") -> CredentialStore:
+        """
+        Return the credential store for a source, creating it on first use.
+
+        Args:
+            source: "sqlite", "mongodb" or "file".
+            location: Database or file path (unused for MongoDB).
+
+        Returns:
+            Cached credential store.
+        """
+        store_key = (source, location)
+        store = self._credential_stores.get(store_key)
+        if store is None:
+            if source == "sqlite":
+                store = SqliteCredentialStore(location)
+            elif source == "mongodb":
+                store = MongoCredentialStore(self._get_mongodb_collection)
+            elif source == "file":
+                store = FileCredentialStore(location)
+            else:
+                store = CredentialStore()
+            self._credential_stores[store_key] = store
+        return store
+
+    def _build_credentials_record(self, fallback_keys: List[str]) -> Dict[str, Any]:
+        """
+        Snapshot the active account into a credentials record for persistence.
+
+        Candidate keys are tried in order: the key the account was loaded from,
+        the request-selected key, the rest of the pool, then the fallback keys.
+
+        Args:
+            fallback_keys: Source-specific default token keys.
+
+        Returns:
+            Credentials record (see kiro.credential_store).
+        """
+        candidate_keys: List[str] = []
+        if self._sqlite_token_key:
+            candidate_keys.append(self._sqlite_token_key)
+
+        current_request_key = self._request_account_key.get()
+        if current_request_key and current_request_key not in candidate_keys:
+            candidate_keys.append(current_request_key)
+
+        for account in self._account_pool:
+            account_key = account.get("key")
+            if account_key and account_key not in candidate_keys:
+                candidate_keys.append(account_key)
+
+        for fallback_key in fallback_keys:
+            if fallback_key not in candidate_keys:
+                candidate_keys.append(fallback_key)
+
+        return {
+            "candidate_keys": candidate_keys,
+            "access_token": self._access_token,
+            "refresh_token": self._refresh_token,
+            "expires_at": self._expires_at.isoformat() if self._expires_at else None,
+            "region": self._sso_region or self._region,
+            "scopes": self._scopes,
+            "profile_arn": self._profile_arn,
+        }
+
+    def _apply_saved_credentials_key(self, saved_key: Optional[str]) -> None:
+        """Remember which auth_kv key the active account was saved to."""
+        if not saved_key:
+            return
+        self._sqlite_token_key = saved_key
+        self._sync_active_account_state()
+
+    async def _persist_refreshed_credentials(self) -> None:
+        """
+        Save refreshed credentials to the active configured source off the event loop.
+
+        The refreshed fields are copied into the pool entry before the write, so
+        they survive other requests swapping the active fields meanwhile. Write
+        errors are logged: the new token is already usable in memory.
+        """
+        self._sync_active_account_state()
+
+        if self._auth_source == "mongodb":
+            store = self._get_credential_store("mongodb")
+            fallback_keys = MONGODB_TOKEN_KEYS
+        elif self._sqlite_db:
+            store = self._get_credential_store("sqlite", self._sqlite_db)
+            fallback_keys = SQLITE_TOKEN_KEYS
+        elif self._creds_file:
+            store = self._get_credential_store("file", self._creds_file)
+            fallback_keys = []
+        else:
+            return
+
+        try:
+            saved_key = await store.save(self._build_credentials_record(fallback_keys))
+        except Exception as error:
+            logger.error(f"Error saving credentials to {store.source}: {error}")
+            return
+
+        self._resume_refresh_account()
+        self._apply_saved_credentials_key(saved_key)
+
+    async def close_credential_stores(self) -> None:
+        """Flush pending credential writes and release store connections and threads."""
+        stores = list(self._credential_stores.values())
+        self._credential_stores.clear()
+        for store in stores:
+            try:
+                await store.aclose()
+            except Exception as error:
+                logger.warning(f"Error closing {store.source} credential store: {error}")
+    
     def is_token_expiring_soon(self) -> bool:
         """
         Checks if the token is expiring soon.
@@ -1225,14 +1819,22 @@ class KiroAuthManager:
         - KIRO_DESKTOP: Uses Kiro Desktop Auth endpoint
         - AWS_SSO_OIDC: Uses AWS SSO OIDC endpoint
         
+        The refresh latency is recorded in kiro_auth_refresh_seconds.
+        
         Raises:
             ValueError: If refresh token is not set or response doesn't contain accessToken
             httpx.HTTPError: On HTTP request error
         """
-        if self._auth_type == AuthType.AWS_SSO_OIDC:
-            await self._refresh_token_aws_sso_oidc()
-        else:
-            await self._refresh_token_kiro_desktop()
+        started = time.perf_counter()
+        result = "error"
+        try:
+            if self._auth_type == AuthType.AWS_SSO_OIDC:
+                await self._refresh_token_aws_sso_oidc()
+            else:
+                await self._refresh_token_kiro_desktop()
+            result = "success"
+        finally:
+            AUTH_REFRESH_SECONDS.labels(result).observe(time.perf_counter() - started)
     
     async def _refresh_token_kiro_desktop(self) -> None:
         """
@@ -1263,6 +1865,8 @@ class KiroAuthManager:
             response.raise_for_status()
             data = response.json()
         
+        self._resume_refresh_account()
+        
         new_access_token = data.get("accessToken")
         new_refresh_token = data.get("refreshToken")
         expires_in = data.get("expiresIn", 3600)
@@ -1288,12 +1892,7 @@ class KiroAuthManager:
         logger.info(f"Token refreshed via Kiro Desktop Auth, expires: {self._expires_at.isoformat()}")
         
         # Save refreshed credentials to active configured source.
-        if self._auth_source == "mongodb":
-            self._save_credentials_to_mongodb()
-        elif self._sqlite_db:
-            self._save_credentials_to_sqlite()
-        else:
-            self._save_credentials_to_file()
+        await self._persist_refreshed_credentials()
     
     async def _refresh_token_aws_sso_oidc(self) -> None:
         """
@@ -1324,10 +1923,9 @@ class KiroAuthManager:
             # 400 = invalid_request, likely stale token after kiro-cli re-login
             if e.response.status_code == 400 and (self._sqlite_db or self._auth_source == "mongodb"):
                 logger.warning("Token refresh failed with 400, reloading credentials and retrying...")
-                if self._auth_source == "mongodb":
-                    self._reload_active_account_from_mongodb_locked()
-                else:
-                    self._reload_active_account_from_sqlite_locked()
+                account_key = self._refreshing_account_key.get() or self._sqlite_token_key
+                await self._reload_active_account_from_source(account_key)
+                self._activate_account_by_key(account_key)
                 await self._do_aws_sso_oidc_refresh()
             else:
                 raise
@@ -1401,6 +1999,8 @@ class KiroAuthManager:
             
             result = response.json()
         
+        self._resume_refresh_account()
+        
         # AWS SSO OIDC CreateToken API returns camelCase fields
         new_access_token = result.get("accessToken")
         new_refresh_token = result.get("refreshToken")
@@ -1420,19 +2020,16 @@ class KiroAuthManager:
         logger.info(f"Token refreshed via AWS SSO OIDC, expires: {self._expires_at.isoformat()}")
         
         # Save refreshed credentials to active configured source.
-        if self._auth_source == "mongodb":
-            self._save_credentials_to_mongodb()
-        elif self._sqlite_db:
-            self._save_credentials_to_sqlite()
-        else:
-            self._save_credentials_to_file()
+        await self._persist_refreshed_credentials()
     
     async def get_access_token(self) -> str:
         """
         Returns a valid access_token, refreshing it if necessary.
         
-        Thread-safe method using asyncio.Lock.
-        Automatically refreshes the token if it has expired or is about to expire.
+        The read path is lock-free: a still-valid token for the selected account
+        is returned without awaiting anything. Expiring tokens are refreshed via a
+        per-account single-flight task, so concurrent callers for the same account
+        share one refresh and other accounts are never blocked by it.
         
         For SQLite mode (kiro-cli): implements graceful degradation when refresh fails.
         If kiro-cli has been running and refreshing tokens in memory (without persisting
@@ -1445,112 +2042,114 @@ class KiroAuthManager:
         Raises:
             ValueError: If unable to obtain access token
         """
-        async with self._lock:
-            account_attempts = max(len(self._account_pool), 1)
-            last_error: Optional[Exception] = None
-
-            for attempt in range(account_attempts):
-                force_next = attempt > 0
-                selected_account = self._get_or_select_request_account_locked(force_next=force_next)
-                if selected_account:
-                    self._set_active_account(selected_account)
+        account_attempts = max(len(self._account_pool), 1)
+        last_error: Optional[Exception] = None
 
-                # Token is valid and not expiring soon - just return it
+        for attempt in range(account_attempts):
+            force_next = attempt > 0
+            selected_account = self._get_or_select_request_account_locked(force_next=force_next)
+            if selected_account:
+                self._set_active_account(selected_account)
+            selected_key = selected_account.get("key") if selected_account else None
+
+            # Token is valid and not expiring soon - just return it
+            if self._access_token and not self.is_token_expiring_soon():
+                self._mark_current_account_healthy_locked()
+                return self._access_token
+        
+            # DB-backed mode: reload selected credentials first in case another client updated them.
+            if (self._sqlite_db or self._auth_source == "mongodb") and self.is_token_expiring_soon():
+                logger.debug("DB-backed mode: reloading selected credentials before refresh attempt")
+                await self._reload_active_account_from_source(selected_key)
+                self._activate_account_by_key(selected_key)
+                # Check if reloaded token is now valid
                 if self._access_token and not self.is_token_expiring_soon():
+                    logger.debug("Credential reload provided fresh token, no refresh needed")
                     self._mark_current_account_healthy_locked()
-                    self._sync_active_account_state()
                     return self._access_token
-            
-                # DB-backed mode: reload selected credentials first in case another client updated them.
-                if (self._sqlite_db or self._auth_source == "mongodb") and self.is_token_expiring_soon():
-                    logger.debug("DB-backed mode: reloading selected credentials before refresh attempt")
-                    if self._auth_source == "mongodb":
-                        self._reload_active_account_from_mongodb_locked()
-                    else:
-                        self._reload_active_account_from_sqlite_locked()
-                    # Check if reloaded token is now valid
-                    if self._access_token and not self.is_token_expiring_soon():
-                        logger.debug("Credential reload provided fresh token, no refresh needed")
-                        self._mark_current_account_healthy_locked()
-                        self._sync_active_account_state()
-                        return self._access_token
-            
-                # Try to refresh the token
-                try:
-                    await self._refresh_token_request()
-                except httpx.HTTPStatusError as e:
-                    # Graceful degradation for SQLite mode when refresh fails twice
-                    # This happens when kiro-cli refreshed tokens in memory without persisting
-                    if e.response.status_code == 400 and (self._sqlite_db or self._auth_source == "mongodb"):
+                selected_account = self._find_account_by_key(selected_key) or selected_account
+        
+            # Try to refresh the token
+            try:
+                await self._refresh_account_single_flight(selected_account)
+            except httpx.HTTPStatusError as e:
+                self._activate_account_by_key(selected_key)
+                # Graceful degradation for SQLite mode when refresh fails twice
+                # This happens when kiro-cli refreshed tokens in memory without persisting
+                if e.response.status_code == 400 and (self._sqlite_db or self._auth_source == "mongodb"):
+                    logger.warning(
+                        "Token refresh failed with 400 after credential reload. "
+                        "This may happen if external clients refreshed tokens without persisting."
+                    )
+                    # Check if access_token is still usable
+                    if self._access_token and not self.is_token_expired():
                         logger.warning(
-                            "Token refresh failed with 400 after credential reload. "
-                            "This may happen if external clients refreshed tokens without persisting."
+                            "Using existing access_token until it expires. "
+                            "Run 'kiro-cli login' when convenient to refresh credentials."
                         )
-                        # Check if access_token is still usable
-                        if self._access_token and not self.is_token_expired():
-                            logger.warning(
-                                "Using existing access_token until it expires. "
-                                "Run 'kiro-cli login' when convenient to refresh credentials."
-                            )
-                            self._mark_current_account_healthy_locked()
-                            self._sync_active_account_state()
-                            return self._access_token
-                        degraded_error = ValueError(
-                            "Token expired and refresh failed. "
-                            "Please run 'kiro-cli login' to refresh your credentials."
-                        )
-                        last_error = degraded_error
-                        if len(self._account_pool) > 1:
-                            self._mark_current_account_unhealthy_locked()
-                            continue
-                        raise degraded_error
-
-                    last_error = e
-                    if len(self._account_pool) > 1:
-                        self._mark_current_account_unhealthy_locked()
-                        continue
-                    raise
-                except ValueError as e:
-                    last_error = e
+                        self._mark_current_account_healthy_locked()
+                        return self._access_token
+                    degraded_error = ValueError(
+                        "Token expired and refresh failed. "
+                        "Please run 'kiro-cli login' to refresh your credentials."
+                    )
+                    last_error = degraded_error
                     if len(self._account_pool) > 1:
                         self._mark_current_account_unhealthy_locked()
                         continue
-                    raise
+                    raise degraded_error
 
-                if self._access_token:
-                    self._mark_current_account_healthy_locked()
-                    self._sync_active_account_state()
-                    return self._access_token
-
-                last_error = ValueError("Failed to obtain access token")
+                last_error = e
+                if len(self._account_pool) > 1:
+                    self._mark_current_account_unhealthy_locked()
+                    continue
+                raise
+            except ValueError as e:
+                last_error = e
                 if len(self._account_pool) > 1:
                     self._mark_current_account_unhealthy_locked()
                     continue
-                raise last_error
+                raise
+
+            # Other requests may have swapped the active fields while we awaited.
+            self._activate_account_by_key(selected_key)
+            if self._access_token:
+                self._mark_current_account_healthy_locked()
+                return self._access_token
+
+            last_error = ValueError("Failed to obtain access token")
+            if len(self._account_pool) > 1:
+                self._mark_current_account_unhealthy_locked()
+                continue
+            raise last_error
 
-            if last_error:
-                raise last_error
-            raise ValueError("Failed to obtain access token")
+        if last_error:
+            raise last_error
+        raise ValueError("Failed to obtain access token")
     
     async def force_refresh(self) -> str:
         """
         Forces a token refresh.
         
-        Used when receiving a 403 error from the API.
+        Used when receiving a 403 error from the API. Joins a refresh already
+        in flight for the request account instead of starting a second one.
         
         Returns:
             New access token
         """
-        async with self._lock:
-            if self._account_pool:
-                account = self._get_or_select_request_account_locked()
-                if account:
-                    self._set_active_account(account)
-            await self._refresh_token_request()
-            if not self._access_token:
-                raise ValueError("Failed to obtain access token during force refresh")
-            refreshed_token = self._access_token
-            return refreshed_token
+        account: Optional[AccountRecord] = None
+        if self._account_pool:
+            account = self._get_or_select_request_account_locked()
+            if account:
+                self._set_active_account(account)
+        account_key = account.get("key") if account else None
+
+        await self._refresh_account_single_flight(account)
+        self._activate_account_by_key(account_key)
+        if not self._access_token:
+            raise ValueError("Failed to obtain access token during force refresh")
+        refreshed_token = self._access_token
+        return refreshed_token
     
     @property
     def profile_arn(self) -> Optional[str]:
@@ -1581,3 +2180,8 @@ class KiroAuthManager:
     def auth_type(self) -> AuthType:
         """Authentication type (KIRO_DESKTOP or AWS_SSO_OIDC)."""
         return self._auth_type
+    
+    @property
+    def auth_source(self) -> str:
+        """Configured credential source (auto/sqlite/file/env/mongodb)."""
+        return self._auth_source
@@ -22,10 +22,13 @@ from kiro.config import (
     BILLING_DEFAULT_CACHE_WRITE_PRICE_PER_MTOK,
     BILLING_DEFAULT_CACHE_HIT_PRICE_PER_MTOK,
     BILLING_DEFAULT_MULTIPLIER,
+    BILLING_LEDGER_ENABLED,
     get_billing_model_prices,
 )
+from kiro.credit_ledger import CreditReservation, get_credit_ledger
 from kiro.model_resolver import normalize_model_name
-from kiro.mongodb_store import has_sufficient_credits, deduct_credits_atomic
+from kiro.mongodb_async import get_async_mongo_store
+from kiro.mongodb_store import has_sufficient_credits, deduct_credits_atomic, MongoStoreTimeoutError
 
 
 class BillingError(Exception):
@@ -312,37 +315,77 @@ def calculate_preflight_charge(model_id: str, prompt_tokens: int, tool_tokens: i
     return calculate_charge_from_usage(model_id, usage)
 
 
-def ensure_user_has_sufficient_credits(user_id: Any, required_credits: Decimal) -> None:
+async def ensure_user_has_sufficient_credits(user_id: Any, required_credits: Decimal) -> Optional[CreditReservation]:
     """
     Enforce sufficient credits for a user before request execution.
 
+    With BILLING_LEDGER_ENABLED the required credits are reserved in the
+    credit ledger (usually without a MongoDB round-trip) and the reservation
+    is returned; pass it to deduct_credits_for_usage, or release it with
+    release_credit_reservation if the request fails. Otherwise the balance
+    is read from MongoDB off the event loop; like any other lookup failure,
+    a timeout counts as insufficient.
+
     Args:
         user_id: User identifier.
         required_credits: Required credits for preflight check.
 
+    Returns:
+        Reservation holding the credits, or None when nothing was reserved.
+
     Raises:
         InsufficientCreditsError: If billing enforcement is enabled and balance is insufficient.
     """
     if not BILLING_ENABLED or not BILLING_ENFORCE_SUFFICIENT_CREDITS:
-        return
+        return None
 
     if required_credits <= Decimal("0"):
-        return
-
-    if not has_sufficient_credits(user_id, required_credits):
+        return None
+
+    reservation = None
+    if BILLING_LEDGER_ENABLED:
+        reservation = await get_credit_ledger().reserve(user_id, required_credits)
+        sufficient = reservation is not None
+    else:
+        try:
+            sufficient = await get_async_mongo_store().run(
+                "check_credits", has_sufficient_credits, user_id, required_credits
+            )
+        except MongoStoreTimeoutError as exc:
+            logger.error(f"MongoDB credit balance lookup failed: {exc}")
+            sufficient = False
+
+    if not sufficient:
         raise InsufficientCreditsError(
             f"Insufficient credits: requires at least {required_credits} credits."
         )
+    return reservation
 
 
-def deduct_credits_for_usage(user_id: Any, model_id: str, usage: Dict[str, Any]) -> Decimal:
+async def deduct_credits_for_usage(
+    user_id: Any,
+    model_id: str,
+    usage: Dict[str, Any],
+    reservation: Optional[CreditReservation] = None,
+    request_id: Optional[str] = None,
+) -> Decimal:
     """
-    Calculate and atomically deduct credits from user balance.
+    Calculate and deduct credits from user balance.
+
+    With BILLING_LEDGER_ENABLED the charge settles the request's reservation
+    in the credit ledger (and is fsynced to the billing journal when one is
+    open) and reaches MongoDB with the next write-behind flush; it is
+    recorded even when it exceeds the remaining balance, and it is applied at
+    most once per request_id: settling the same request again charges nothing.
+    Otherwise it is deducted atomically off the event loop with the MongoDB
+    write deadline, and a timeout is reported like any other failed deduction.
 
     Args:
         user_id: User identifier.
         model_id: Requested model ID.
         usage: Final usage payload.
+        reservation: Reservation from ensure_user_has_sufficient_credits, if any.
+        request_id: Idempotency key of the request's charge (generate_request_id()).
 
     Returns:
         Deducted charge amount.
@@ -352,10 +395,23 @@ def deduct_credits_for_usage(user_id: Any, model_id: str, usage: Dict[str, Any])
         UnknownModelPricingError: If model pricing cannot be resolved and policy=reject.
     """
     charge = calculate_charge_from_usage(model_id, usage)
+    if BILLING_LEDGER_ENABLED:
+        await get_credit_ledger().settle(user_id, charge, reservation, request_id=request_id, model=model_id)
+        if charge > Decimal("0"):
+            logger.info(f"Deducted {charge} credits for user request (model={model_id})")
+        return max(charge, Decimal("0"))
+
+    release_credit_reservation(reservation)
     if charge <= Decimal("0"):
         return Decimal("0")
 
-    deduction_ok = deduct_credits_atomic(user_id, charge)
+    try:
+        deduction_ok = await get_async_mongo_store().run(
+            "deduct_credits", deduct_credits_atomic, user_id, charge, write=True
+        )
+    except MongoStoreTimeoutError as exc:
+        logger.error(f"MongoDB atomic credit deduction failed: {exc}")
+        deduction_ok = False
     if not deduction_ok:
         raise InsufficientCreditsError(
             f"Credit deduction failed for user due to insufficient balance: {charge}."
@@ -363,3 +419,16 @@ def deduct_credits_for_usage(user_id: Any, model_id: str, usage: Dict[str, Any])
 
     logger.info(f"Deducted {charge} credits for user request (model={model_id})")
     return charge
+
+
+def release_credit_reservation(reservation: Optional[CreditReservation]) -> None:
+    """
+    Give back credits reserved for a request that will not be charged.
+
+    Safe to call with None or with an already settled reservation.
+
+    Args:
+        reservation: Reservation from ensure_user_has_sufficient_credits.
+    """
+    if reservation is not None:
+        reservation.release()
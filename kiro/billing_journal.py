@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Durable local journal of billing charges.
+
+The credit ledger (kiro/credit_ledger.py) settles charges in memory and
+writes them to MongoDB later. The journal makes that safe: every charge is
+appended to a local segment file and fsynced before the request sees its
+final usage event, so a crash or a MongoDB outage cannot lose it.
+
+Layout: BILLING_JOURNAL_DIR holds segment files named after their first
+sequence number, one JSON object per line:
+
+    {"t": "charge", "seq": 42, "rid": "...", "user": ..., "amount": "0.0123", "model": "..."}
+    {"t": "ack", "seq": 40}
+
+Charges get consecutive sequence numbers. Once the ledger has applied
+charges to MongoDB it marks them applied, and the journal records an ack
+with the highest sequence number up to which every charge is applied.
+Segments whose charges are all acknowledged are deleted. Concurrent
+appends are written and fsynced together (group commit).
+
+MongoDB application is idempotent by request ID (see
+mongodb_store.apply_credit_charges), so replaying a charge that was applied
+before the crash but not yet acknowledged is harmless, as long as its ID is
+still among the last MONGODB_CREDITS_APPLIED_KEEP charges of that user.
+
+On startup the ledger replays unacknowledged charges automatically. To
+recover without starting the gateway:
+
+    python -m kiro.billing_journal status
+    python -m kiro.billing_journal replay
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from kiro.config import BILLING_JOURNAL_DIR, BILLING_JOURNAL_SEGMENT_BYTES
+
+try:
+    from bson import json_util
+except ImportError:  # pragma: no cover - exercised only when dependency missing
+    json_util = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+SEGMENT_SUFFIX = ".journal"
+LOCK_FILE = "LOCK"
+
+# Charges per bulk_write when replaying from the command line
+REPLAY_BATCH_SIZE = 500
+
+
+class JournalLockedError(RuntimeError):
+    """Raised when another process already owns the journal directory."""
+
+
+class ChargeRecord:
+    """One settled charge: the unit written to the journal and applied to MongoDB."""
+
+    __slots__ = ("seq", "request_id", "user_id", "amount", "model")
+
+    def __init__(self, request_id: str, user_id: Any, amount: Decimal, model: Optional[str] = None, seq: int = 0) -> None:
+        self.seq = seq
+        self.request_id = request_id
+        self.user_id = user_id
+        self.amount = amount
+        self.model = model
+
+    def to_line(self) -> bytes:
+        payload = {
+            "t": "charge",
+            "seq": self.seq,
+            "rid": self.request_id,
+            "user": self.user_id,
+            "amount": str(self.amount),
+            "model": self.model,
+        }
+        return (_dumps(payload) + "\n").encode("utf-8")
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "ChargeRecord":
+        return cls(payload["rid"], payload["user"], Decimal(payload["amount"]), payload.get("model"), payload["seq"])
+
+
+def _dumps(payload: Dict[str, Any]) -> str:
+    # json_util keeps ObjectId user IDs round-trippable ({"$oid": ...})
+    if json_util is not None:
+        return json.dumps(payload, default=json_util.default, separators=(",", ":"))
+    return json.dumps(payload, default=str, separators=(",", ":"))
+
+
+def _loads(line: str) -> Dict[str, Any]:
+    if json_util is not None:
+        return json.loads(line, object_hook=json_util.object_hook)
+    return json.loads(line)
+
+
+def _ack_line(seq: int) -> bytes:
+    return (_dumps({"t": "ack", "seq": seq}) + "\n").encode("utf-8")
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Make file creation/removal durable (POSIX only)."""
+    if os.name != "posix":
+        return
+    fd = os.open(str(directory), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class BillingJournal:
+    """
+    Append-only segment journal with group-committed fsyncs.
+
+    append() and mark_applied() run on the event loop; file I/O runs on a
+    single writer thread, so segment state is only touched by that thread.
+    """
+
+    def __init__(self, directory: str = BILLING_JOURNAL_DIR, segment_bytes: int = BILLING_JOURNAL_SEGMENT_BYTES) -> None:
+        """
+        Args:
+            directory: Journal directory (created if missing).
+            segment_bytes: Size after which a new segment file is started.
+        """
+        self._dir = Path(directory)
+        self._segment_bytes = segment_bytes
+        self._next_seq = 1
+        self._acked = 0
+        self._applied: Set[int] = set()
+        # (line, charge seq or 0 for acks, waiter or None)
+        self._queue: List[Tuple[bytes, int, Optional["asyncio.Future[None]"]]] = []
+        self._write_task: Optional["asyncio.Task[None]"] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Writer-thread state
+        self._file: Optional[Any] = None
+        self._current_path: Optional[Path] = None
+        self._segment_size = 0
+        self._segment_last_seq = 0
+        self._closed_segments: List[Tuple[Path, int]] = []
+        self._lock_handle: Optional[Any] = None
+
+    @property
+    def directory(self) -> Path:
+        return self._dir
+
+    @property
+    def acked_seq(self) -> int:
+        """Highest sequence number up to which every charge is applied."""
+        return self._acked
+
+    # ------------------------------------------------------------------
+    # Opening and recovery (blocking)
+    # ------------------------------------------------------------------
+
+    def open(self) -> List[ChargeRecord]:
+        """
+        Lock the directory, read existing segments and start a new segment (blocking).
+
+        Returns:
+            Charges not acknowledged yet, in sequence order.
+
+        Raises:
+            JournalLockedError: If another process holds the journal.
+        """
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lock()
+
+        charges, segments = self._scan_segments()
+        self._closed_segments.extend(segments)
+        last_seq = max((segment_last for _path, segment_last in segments), default=0)
+
+        self._next_seq = max(last_seq, self._acked) + 1
+        # Drop fully acknowledged (and empty) segments before a new segment may reuse a name
+        self._delete_acked_segments(self._acked)
+        self._start_segment()
+        pending = [charges[seq] for seq in sorted(charges) if seq > self._acked]
+        # Sequence numbers lost to a torn or failed write must not hold back the watermark
+        self._applied = set(range(self._acked + 1, self._next_seq)) - {record.seq for record in pending}
+        if pending:
+            logger.warning(f"Billing journal: {len(pending)} unacknowledged charge(s) to replay from {self._dir}")
+        return pending
+
+    def scan(self) -> List[ChargeRecord]:
+        """
+        Read the unacknowledged charges without taking the journal (blocking).
+
+        Unlike open(), nothing is locked, created, deleted or written, so a
+        running gateway's journal can be inspected. A missing directory is
+        read as an empty journal.
+
+        Returns:
+            Charges not acknowledged yet, in sequence order.
+        """
+        if not self._dir.is_dir():
+            return []
+        charges, _segments = self._scan_segments(missing_ok=True)
+        return [charges[seq] for seq in sorted(charges) if seq > self._acked]
+
+    def _scan_segments(self, missing_ok: bool = False) -> Tuple[Dict[int, ChargeRecord], List[Tuple[Path, int]]]:
+        """
+        Read every segment, raising the ack watermark to the highest ack seen.
+
+        Args:
+            missing_ok: Skip segments deleted while reading (a running writer
+                        drops acknowledged segments).
+
+        Returns:
+            Charges by sequence number, and each segment with its last charge seq.
+        """
+        charges: Dict[int, ChargeRecord] = {}
+        segments: List[Tuple[Path, int]] = []
+        for path in self._segment_paths():
+            try:
+                payloads = self._read_segment(path)
+            except FileNotFoundError:
+                if not missing_ok:
+                    raise
+                continue
+            segment_last = 0
+            for payload in payloads:
+                if payload.get("t") == "charge":
+                    record = ChargeRecord.from_payload(payload)
+                    charges[record.seq] = record
+                    segment_last = max(segment_last, record.seq)
+                elif payload.get("t") == "ack":
+                    self._acked = max(self._acked, int(payload["seq"]))
+            segments.append((path, segment_last))
+        return charges, segments
+
+    def _lock(self) -> None:
+        self._lock_handle = open(self._dir / LOCK_FILE, "a+")
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_handle.close()
+            self._lock_handle = None
+            raise JournalLockedError(f"Billing journal {self._dir} is in use by another process")
+
+    def _segment_paths(self) -> List[Path]:
+        return sorted(self._dir.glob(f"*{SEGMENT_SUFFIX}"))
+
+    @staticmethod
+    def _read_segment(path: Path) -> List[Dict[str, Any]]:
+        """Parse a segment, dropping a torn last line left by a crash mid-write."""
+        payloads = []
+        with open(path, "rb") as handle:
+            data = handle.read()
+        lines = data.split(b"\n")
+        for index, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                payloads.append(_loads(line.decode("utf-8")))
+            except (ValueError, UnicodeDecodeError):
+                if index == len(lines) - 1:
+                    logger.warning(f"Billing journal: ignoring torn record at the end of {path.name}")
+                else:
+                    logger.error(f"Billing journal: skipping corrupt record in {path.name}")
+        return payloads
+
+    def _start_segment(self) -> None:
+        """Open a new segment starting with the current ack watermark (writer thread)."""
+        if self._file is not None:
+            self._file.close()
+            self._closed_segments.append((self._current_path, self._segment_last_seq))
+        self._current_path = self._dir / f"{self._next_seq:020d}{SEGMENT_SUFFIX}"
+        self._file = open(self._current_path, "ab")
+        header = _ack_line(self._acked)
+        self._file.write(header)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        _fsync_directory(self._dir)
+        self._segment_size = len(header)
+        self._segment_last_seq = 0
+
+    def _delete_acked_segments(self, acked: int) -> None:
+        remaining = []
+        for path, last_seq in self._closed_segments:
+            if last_seq <= acked:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            else:
+                remaining.append((path, last_seq))
+        if len(remaining) != len(self._closed_segments):
+            _fsync_directory(self._dir)
+        self._closed_segments = remaining
+
+    # ------------------------------------------------------------------
+    # Appending (event loop)
+    # ------------------------------------------------------------------
+
+    async def append(self, record: ChargeRecord) -> ChargeRecord:
+        """
+        Assign the next sequence number to a charge and wait until it is on disk.
+
+        Args:
+            record: Charge to journal (its seq is set here).
+
+        Returns:
+            The same record.
+        """
+        record.seq = self._next_seq
+        self._next_seq += 1
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._queue.append((record.to_line(), record.seq, waiter))
+        self._ensure_writer()
+        await asyncio.shield(waiter)
+        return record
+
+    def mark_applied(self, seqs: List[int]) -> None:
+        """
+        Record that charges were applied to MongoDB and advance the ack watermark.
+
+        The ack itself is written with the next batch; losing it only means
+        the charges are replayed (idempotently) after a crash.
+        """
+        self._applied.update(seqs)
+        acked = self._acked
+        while acked + 1 in self._applied:
+            acked += 1
+            self._applied.discard(acked)
+        if acked != self._acked:
+            self._acked = acked
+            self._queue.append((_ack_line(acked), 0, None))
+            self._ensure_writer()
+
+    def _ensure_writer(self) -> None:
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.get_running_loop().create_task(self._write_pending())
+
+    async def _write_pending(self) -> None:
+        """Write and fsync queued lines in batches until the queue is empty."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="billing-journal")
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            batch, self._queue = self._queue, []
+            try:
+                await loop.run_in_executor(
+                    self._executor,
+                    self._write_batch,
+                    b"".join(line for line, _, _ in batch),
+                    max(seq for _, seq, _ in batch),
+                    self._acked,
+                )
+            except Exception as error:
+                logger.error(f"Billing journal write failed: {error}")
+                for _, _, waiter in batch:
+                    if waiter is not None and not waiter.done():
+                        waiter.set_exception(error)
+                continue
+            for _, _, waiter in batch:
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(None)
+
+    def _write_batch(self, data: bytes, last_seq: int, acked: int) -> None:
+        """Append a batch, fsync once, rotate and drop acknowledged segments (writer thread)."""
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._segment_size += len(data)
+        self._segment_last_seq = max(self._segment_last_seq, last_seq)
+        if self._segment_size >= self._segment_bytes:
+            self._start_segment()
+        self._delete_acked_segments(acked)
+
+    async def close(self) -> None:
+        """Write what is queued, close the segment and release the directory lock."""
+        while self._write_task is not None and not self._write_task.done():
+            await self._write_task
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._close_files)
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        else:
+            self._close_files()
+
+    def _close_files(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_handle is not None:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+
+# ----------------------------------------------------------------------
+# Command line recovery
+# ----------------------------------------------------------------------
+
+async def replay_journal(directory: str, batch_size: int = REPLAY_BATCH_SIZE) -> int:
+    """
+    Apply every unacknowledged charge in a journal to MongoDB.
+
+    Must not run while a gateway owns the directory (the journal lock
+    prevents it).
+
+    Args:
+        directory: Journal directory.
+        batch_size: Charges per bulk_write.
+
+    Returns:
+        Number of charges applied (already applied ones are skipped by MongoDB).
+
+    Raises:
+        RuntimeError: If MongoDB rejects a batch or a charge's user has no
+            credits document; charges applied before stay acknowledged.
+    """
+    from kiro.mongodb_store import apply_credit_charges
+
+    journal = BillingJournal(directory)
+    loop = asyncio.get_running_loop()
+    pending = await loop.run_in_executor(None, journal.open)
+    try:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            result = await loop.run_in_executor(None, apply_credit_charges, batch)
+            if result is None:
+                raise RuntimeError(f"MongoDB rejected replay batch starting at seq {batch[0].seq}")
+            if result.missing:
+                # The ack watermark is contiguous: stop before the first charge that was not applied
+                missing = {id(record) for record in result.missing}
+                journal.mark_applied([record.seq for record in batch if id(record) not in missing])
+                raise RuntimeError(
+                    f"No credits document for {len(result.missing)} charge(s) "
+                    f"(first at seq {min(record.seq for record in result.missing)}); they stay in the journal"
+                )
+            journal.mark_applied([record.seq for record in batch])
+    finally:
+        await journal.close()
+    return len(pending)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for python -m kiro.billing_journal."""
+    parser = argparse.ArgumentParser(
+        prog="python -m kiro.billing_journal",
+        description="Inspect or replay the local billing journal.",
+    )
+    parser.add_argument("command", choices=("status", "replay"))
+    parser.add_argument(
+        "--dir",
+        default=BILLING_JOURNAL_DIR,
+        help=f"Journal directory (default: {BILLING_JOURNAL_DIR}, env: BILLING_JOURNAL_DIR)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "replay":
+            applied = asyncio.run(replay_journal(args.dir))
+            print(f"Replayed {applied} charge(s) from {args.dir}")
+            return 0
+
+        journal = BillingJournal(args.dir)
+        pending = journal.scan()
+        total = sum((record.amount for record in pending), Decimal("0"))
+        print(f"{len(pending)} unacknowledged charge(s), {total} credits, acked through seq {journal.acked_seq}")
+        return 0
+    except JournalLockedError as error:
+        print(f"{error}; stop the gateway first", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
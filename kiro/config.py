@@ -149,6 +149,14 @@ PROXY_API_KEY: str = os.getenv("PROXY_API_KEY", "my-super-secret-password-123")
 _API_KEY_SOURCE_RAW = os.getenv("API_KEY_SOURCE", "env").strip().lower()
 API_KEY_SOURCE: str = _API_KEY_SOURCE_RAW if _API_KEY_SOURCE_RAW in ("env", "mongodb") else "env"
 
+# API key for admin endpoints (/admin/*), passed as Authorization: Bearer.
+# Separate from client keys; admin endpoints are disabled (404) when empty.
+ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
+
+# API key for the Prometheus /metrics endpoint, passed as Authorization: Bearer.
+# Falls back to ADMIN_API_KEY when empty; /metrics is disabled (404) when both are empty.
+METRICS_API_KEY: str = os.getenv("METRICS_API_KEY", "")
+
 # MongoDB settings for API key lookup and billing
 MONGODB_URI: str = os.getenv("MONGODB_URI", "")
 MONGODB_DB_NAME: str = os.getenv("MONGODB_DB_NAME", "fproxy")
@@ -160,6 +168,11 @@ MONGODB_USER_ID_FIELD: str = os.getenv("MONGODB_USER_ID_FIELD", "_id")
 MONGODB_USER_ACTIVE_FIELD: str = os.getenv("MONGODB_USER_ACTIVE_FIELD", "isActive")
 MONGODB_CREDITS_USER_ID_FIELD: str = os.getenv("MONGODB_CREDITS_USER_ID_FIELD", "userId")
 MONGODB_CREDITS_BALANCE_FIELD: str = os.getenv("MONGODB_CREDITS_BALANCE_FIELD", "credits")
+# Request IDs of the last charges applied to a credits document (makes charge flushes idempotent).
+# Only the last MONGODB_CREDITS_APPLIED_KEEP IDs per user are kept: a charge replayed after its ID
+# has left that window (more newer charges for the same user) is deducted again.
+MONGODB_CREDITS_APPLIED_FIELD: str = os.getenv("MONGODB_CREDITS_APPLIED_FIELD", "appliedChargeIds")
+MONGODB_CREDITS_APPLIED_KEEP: int = max(1, _parse_int_env("MONGODB_CREDITS_APPLIED_KEEP", 1000))
 
 # Billing settings
 BILLING_ENABLED: bool = _parse_bool_env("BILLING_ENABLED", False)
@@ -198,6 +211,47 @@ BILLING_DEFAULT_CACHE_WRITE_PRICE_PER_MTOK: float = _parse_float_env("BILLING_DE
 BILLING_DEFAULT_CACHE_HIT_PRICE_PER_MTOK: float = _parse_float_env("BILLING_DEFAULT_CACHE_HIT_PRICE_PER_MTOK", 0.3)
 BILLING_DEFAULT_MULTIPLIER: float = _parse_float_env("BILLING_DEFAULT_MULTIPLIER", 1.1)
 
+# Credit reservation ledger (kiro/credit_ledger.py).
+# Preflight checks reserve credits against a cached balance and final charges are
+# flushed to MongoDB in one bulk write per interval, instead of two round-trips per request.
+BILLING_LEDGER_ENABLED: bool = _parse_bool_env("BILLING_LEDGER_ENABLED", True)
+BILLING_LEDGER_FLUSH_INTERVAL_MS: int = max(10, _parse_int_env("BILLING_LEDGER_FLUSH_INTERVAL_MS", 500))
+# Cached balances are re-read in the background after this many seconds, picking up
+# top-ups and deductions made by other gateway processes
+BILLING_LEDGER_BALANCE_TTL_SECONDS: float = max(1.0, _parse_float_env("BILLING_LEDGER_BALANCE_TTL_SECONDS", 30.0))
+# Reservations never settled or released (e.g. abandoned streams) expire after this many seconds
+BILLING_RESERVATION_TTL_SECONDS: float = max(60.0, _parse_float_env("BILLING_RESERVATION_TTL_SECONDS", 900.0))
+
+# Durable billing journal (kiro/billing_journal.py): ledger charges are fsynced to
+# local segment files before the response completes and replayed after a crash.
+BILLING_JOURNAL_ENABLED: bool = _parse_bool_env("BILLING_JOURNAL_ENABLED", True)
+# Directory for journal segment files (one gateway process per directory)
+BILLING_JOURNAL_DIR: str = os.getenv("BILLING_JOURNAL_DIR", "billing_journal")
+# A new segment file is started once the current one reaches this size
+BILLING_JOURNAL_SEGMENT_BYTES: int = max(4096, _parse_int_env("BILLING_JOURNAL_SEGMENT_BYTES", 4 * 1024 * 1024))
+
+# API-key lookup cache (API_KEY_SOURCE=mongodb).
+# Active user documents are cached for API_KEY_CACHE_TTL_SECONDS and unknown or
+# inactive keys for API_KEY_CACHE_NEGATIVE_TTL_SECONDS; 0 disables that side of the cache.
+API_KEY_CACHE_TTL_SECONDS: float = max(0.0, _parse_float_env("API_KEY_CACHE_TTL_SECONDS", 60.0))
+API_KEY_CACHE_NEGATIVE_TTL_SECONDS: float = max(
+    0.0, _parse_float_env("API_KEY_CACHE_NEGATIVE_TTL_SECONDS", 10.0)
+)
+# Maximum cached keys; least recently used keys are evicted first
+API_KEY_CACHE_MAX_ENTRIES: int = max(1, _parse_int_env("API_KEY_CACHE_MAX_ENTRIES", 10000))
+# Invalidate cached keys from a MongoDB change stream on the users collection
+# (requires a replica set or Atlas)
+API_KEY_CACHE_CHANGE_STREAM: bool = _parse_bool_env("API_KEY_CACHE_CHANGE_STREAM", False)
+
+# MongoDB access from request handlers (API-key lookups, credit checks and deductions).
+# Blocking pymongo calls run on a bounded thread pool of MONGODB_MAX_POOL_SIZE threads,
+# which is also the pymongo connection pool size, so a thread never waits for a connection.
+MONGODB_MAX_POOL_SIZE: int = max(1, _parse_int_env("MONGODB_MAX_POOL_SIZE", 16))
+# Deadline for one read (user lookup, balance check), including time queued for a thread
+MONGODB_READ_TIMEOUT_SECONDS: float = max(0.05, _parse_float_env("MONGODB_READ_TIMEOUT_SECONDS", 2.0))
+# Deadline for one write (credit deduction)
+MONGODB_WRITE_TIMEOUT_SECONDS: float = max(0.05, _parse_float_env("MONGODB_WRITE_TIMEOUT_SECONDS", 5.0))
+
 
 def get_billing_model_prices() -> List[Dict[str, object]]:
     """
@@ -327,6 +381,57 @@ AUTH_POOL_RELOAD_INTERVAL_SECONDS: int = max(
     1,
 )
 
+# Account scheduling policy for multi-account pools:
+# - round_robin: strict rotation (default)
+# - least_in_flight: account with the fewest in-flight upstream requests
+# - p2c_ttft: power of two random choices on EWMA time-to-first-token x load
+# - weighted: smooth weighted round-robin by ACCOUNT_WEIGHTS
+_ACCOUNT_SCHEDULING_POLICY_RAW = os.getenv("ACCOUNT_SCHEDULING_POLICY", "round_robin").strip().lower()
+ACCOUNT_SCHEDULING_POLICY: str = _ACCOUNT_SCHEDULING_POLICY_RAW if _ACCOUNT_SCHEDULING_POLICY_RAW in (
+    "round_robin",
+    "least_in_flight",
+    "p2c_ttft",
+    "weighted",
+) else "round_robin"
+
+# Smoothing factor for the per-account time-to-first-token EWMA (0 < alpha <= 1).
+# Sampled at the first content event of each stream, not when headers arrive.
+ACCOUNT_TTFT_EWMA_ALPHA: float = min(
+    max(_parse_float_env("ACCOUNT_TTFT_EWMA_ALPHA", 0.3), 0.01),
+    1.0,
+)
+
+
+def _parse_account_weights(raw: str) -> Dict[str, float]:
+    """
+    Parse per-account quota weights from "key=weight,key=weight".
+
+    Invalid or negative entries are skipped.
+
+    Args:
+        raw: Raw ACCOUNT_WEIGHTS value.
+
+    Returns:
+        Weights keyed by auth_kv token key.
+    """
+    weights: Dict[str, float] = {}
+    for item in raw.split(","):
+        key, separator, value = item.strip().rpartition("=")
+        if not separator or not key.strip():
+            continue
+        try:
+            weight = float(value)
+        except ValueError:
+            continue
+        if weight >= 0:
+            weights[key.strip()] = weight
+    return weights
+
+
+# Per-account quota weights used by the "weighted" policy (unlisted accounts weigh 1.0)
+# Example: ACCOUNT_WEIGHTS="kirocli:social:token=3,kirocli:social:token:acct-b=1"
+ACCOUNT_WEIGHTS: Dict[str, float] = _parse_account_weights(os.getenv("ACCOUNT_WEIGHTS", ""))
+
 # ==================================================================================================
 # Kiro API URL Templates
 # ==================================================================================================
@@ -354,6 +459,21 @@ KIRO_Q_HOST_TEMPLATE: str = "https://q.{region}.amazonaws.com"
 # Default 10 minutes - refresh token in advance to avoid errors
 TOKEN_REFRESH_THRESHOLD: int = 600
 
+# Background token refresh for all accounts in the pool.
+# Each account is refreshed shortly before TOKEN_REFRESH_THRESHOLD so that requests
+# almost never pay refresh latency on their critical path.
+TOKEN_BACKGROUND_REFRESH_ENABLED: bool = _parse_bool_env("TOKEN_BACKGROUND_REFRESH_ENABLED", True)
+
+# Maximum number of accounts refreshed concurrently by the background scheduler
+TOKEN_BACKGROUND_REFRESH_CONCURRENCY: int = max(
+    1, _parse_int_env("TOKEN_BACKGROUND_REFRESH_CONCURRENCY", 2)
+)
+
+# Random extra lead time (seconds) so accounts loaded together do not refresh in lockstep
+TOKEN_BACKGROUND_REFRESH_JITTER_SECONDS: float = max(
+    0.0, _parse_float_env("TOKEN_BACKGROUND_REFRESH_JITTER_SECONDS", 60.0)
+)
+
 # ==================================================================================================
 # Retry Configuration
 # ==================================================================================================
@@ -365,6 +485,44 @@ MAX_RETRIES: int = 3
 # Uses exponential backoff: delay * (2 ** attempt)
 BASE_RETRY_DELAY: float = 1.0
 
+# Cooldown (seconds) for an account that received 429 without a Retry-After header.
+# During cooldown the account is skipped and the request retries on another account.
+ACCOUNT_RATE_LIMIT_COOLDOWN_SECONDS: float = max(
+    0.0, _parse_float_env("ACCOUNT_RATE_LIMIT_COOLDOWN_SECONDS", 30.0)
+)
+
+# Cooldown (seconds) for an account that reported an exhausted quota (MONTHLY_REQUEST_COUNT)
+ACCOUNT_QUOTA_COOLDOWN_SECONDS: float = max(
+    0.0, _parse_float_env("ACCOUNT_QUOTA_COOLDOWN_SECONDS", 3600.0)
+)
+
+# Window (seconds) for the per-account recent 429/403 counts shown by /admin/accounts
+ACCOUNT_STATUS_WINDOW_SECONDS: float = max(
+    1.0, _parse_float_env("ACCOUNT_STATUS_WINDOW_SECONDS", 300.0)
+)
+
+# Longest wait (seconds) before retrying a 429 when no other account is available
+RATE_LIMIT_MAX_BACKOFF_SECONDS: float = max(
+    0.0, _parse_float_env("RATE_LIMIT_MAX_BACKOFF_SECONDS", 10.0)
+)
+
+# Upper bound (seconds) for a single retry delay; delays use decorrelated jitter
+# between BASE_RETRY_DELAY and 3x the previous delay
+RETRY_MAX_DELAY: float = max(BASE_RETRY_DELAY, _parse_float_env("RETRY_MAX_DELAY", 8.0))
+
+# Process-wide retry budget (token bucket) shared by all requests.
+# Each request adds RETRY_BUDGET_RATIO tokens, each retry costs one token,
+# so retries stay near RETRY_BUDGET_RATIO of traffic during upstream outages.
+# When the budget is empty, requests fail fast with 503 instead of retrying.
+RETRY_BUDGET_ENABLED: bool = _parse_bool_env("RETRY_BUDGET_ENABLED", True)
+RETRY_BUDGET_RATIO: float = max(0.0, _parse_float_env("RETRY_BUDGET_RATIO", 0.2))
+
+# Tokens added per second regardless of traffic, so low-traffic gateways can still retry
+RETRY_BUDGET_MIN_PER_SECOND: float = max(0.0, _parse_float_env("RETRY_BUDGET_MIN_PER_SECOND", 1.0))
+
+# Bucket capacity (saved-up retries available for a burst of failures)
+RETRY_BUDGET_BURST: float = max(1.0, _parse_float_env("RETRY_BUDGET_BURST", 20.0))
+
 # ==================================================================================================
 # Hidden Models Configuration
 # ==================================================================================================
@@ -457,6 +615,53 @@ MODEL_CACHE_TTL: int = 3600
 # Default maximum number of input tokens
 DEFAULT_MAX_INPUT_TOKENS: int = 200000
 
+# ==================================================================================================
+# Tokenizer Settings
+# ==================================================================================================
+
+# Memory budget in bytes for memoized per-message token counts. Agent clients resend
+# the same history every turn, so only new or changed messages are re-encoded.
+# 0 disables the cache.
+TOKENIZER_CACHE_MAX_BYTES: int = max(0, _parse_int_env("TOKENIZER_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+# Messages and tool definitions shorter than this (serialized, in characters) are
+# counted directly; encoding them is cheaper than caching them.
+TOKENIZER_CACHE_MIN_CHARS: int = max(0, _parse_int_env("TOKENIZER_CACHE_MIN_CHARS", 256))
+
+# Requests whose strings total at least this many characters are tokenized on a
+# dedicated thread pool (tiktoken encode_batch) instead of on the event loop.
+TOKENIZER_OFFLOAD_MIN_CHARS: int = max(0, _parse_int_env("TOKENIZER_OFFLOAD_MIN_CHARS", 32768))
+
+# Tokenizer pool threads, also used as encode_batch parallelism
+TOKENIZER_THREADS: int = max(1, _parse_int_env("TOKENIZER_THREADS", min(4, os.cpu_count() or 1)))
+
+# ==================================================================================================
+# Token Calibration Settings
+# ==================================================================================================
+
+# Fit a per-model correction of local token estimates from the contextUsagePercentage
+# Kiro reports, and use it for preflight billing and fallback usage
+# (instead of the static CLAUDE_CORRECTION_FACTOR)
+TOKEN_CALIBRATION_ENABLED: bool = _parse_bool_env("TOKEN_CALIBRATION_ENABLED", True)
+
+# JSON file the fitted corrections are saved to and loaded from at startup
+TOKEN_CALIBRATION_FILE: str = os.getenv("TOKEN_CALIBRATION_FILE", "token_calibration.json")
+
+# Samples a model needs before its fitted correction is used
+TOKEN_CALIBRATION_MIN_SAMPLES: int = max(1, _parse_int_env("TOKEN_CALIBRATION_MIN_SAMPLES", 20))
+
+# Number of samples after which an observation counts half (older samples fade out)
+TOKEN_CALIBRATION_HALF_LIFE: int = max(1, _parse_int_env("TOKEN_CALIBRATION_HALF_LIFE", 200))
+
+# Seconds between saves of changed corrections
+TOKEN_CALIBRATION_SAVE_INTERVAL_SECONDS: float = max(
+    1.0, _parse_float_env("TOKEN_CALIBRATION_SAVE_INTERVAL_SECONDS", 60.0)
+)
+
+# Once a model is calibrated, requests with at least this many characters are estimated
+# from their length instead of being tokenized with tiktoken. 0 always uses tiktoken.
+TOKENIZER_ESTIMATE_ONLY_MIN_CHARS: int = max(0, _parse_int_env("TOKENIZER_ESTIMATE_ONLY_MIN_CHARS", 1_000_000))
+
 # ==================================================================================================
 # Tool Description Handling (Kiro API Limitations)
 # ==================================================================================================
@@ -490,6 +695,22 @@ TOOL_DESCRIPTION_MAX_LENGTH: int = int(os.getenv("TOOL_DESCRIPTION_MAX_LENGTH",
 # Default: true (enabled)
 TRUNCATION_RECOVERY: bool = os.getenv("TRUNCATION_RECOVERY", "true").lower() in ("true", "1", "yes")
 
+# ==================================================================================================
+# Tool Call Streaming Settings
+# ==================================================================================================
+
+# Forward tool call input to the client as it arrives from Kiro API
+# (Anthropic input_json_delta / OpenAI delta.tool_calls[i].function.arguments fragments)
+# instead of sending all tool calls in one burst after the upstream stream ends.
+# Large tool inputs (e.g. writing whole files) reach the client tens of seconds earlier.
+# Only streaming responses forward fragments; non-streaming responses always return the
+# deduplicated, normalized calls. Calls without input, and repeats of an earlier call under a
+# new toolUseId, are held back and sent (or dropped) with the final calls.
+# Note: when Kiro API truncates tool input mid-stream, the partial JSON has already been
+# forwarded; set to false to buffer tool calls and send normalized arguments at the end.
+# Default: true (enabled)
+TOOL_INPUT_STREAMING: bool = _parse_bool_env("TOOL_INPUT_STREAMING", True)
+
 # ==================================================================================================
 # Logging Settings
 # ==================================================================================================
@@ -518,11 +739,112 @@ FIRST_TOKEN_TIMEOUT: float = float(os.getenv("FIRST_TOKEN_TIMEOUT", "15"))
 # Default: 300 seconds (5 minutes) - generous timeout to avoid premature disconnects.
 STREAMING_READ_TIMEOUT: float = float(os.getenv("STREAMING_READ_TIMEOUT", "300"))
 
+# Inter-chunk stall watchdog (after the first token).
+# A stream that sends no upstream frame for STREAM_STALL_TIMEOUT seconds is aborted
+# with a structured error and is not billed, releasing its account slot, socket and
+# client connection long before STREAMING_READ_TIMEOUT. 0 disables the watchdog.
+STREAM_STALL_TIMEOUT: float = max(0.0, _parse_float_env("STREAM_STALL_TIMEOUT", 120.0))
+
+# While waiting for upstream, a keep-alive (SSE comment / Anthropic ping) is sent to the
+# client every STREAM_KEEPALIVE_INTERVAL seconds so proxies do not drop the connection.
+# 0 disables keep-alives.
+STREAM_KEEPALIVE_INTERVAL: float = max(0.0, _parse_float_env("STREAM_KEEPALIVE_INTERVAL", 15.0))
+
 # Maximum number of attempts on first token timeout.
 # After exhausting all attempts, an error will be returned.
 # Default: 3 attempts
 FIRST_TOKEN_MAX_RETRIES: int = int(os.getenv("FIRST_TOKEN_MAX_RETRIES", "3"))
 
+
+def _parse_context_buckets(raw: str) -> List[int]:
+    """
+    Parse ascending prompt-token bucket boundaries from "8000,32000,100000".
+
+    Invalid or non-positive entries are skipped.
+
+    Args:
+        raw: Raw FIRST_TOKEN_CONTEXT_BUCKETS value.
+
+    Returns:
+        Sorted unique boundaries.
+    """
+    bounds = set()
+    for item in raw.split(","):
+        try:
+            value = int(item.strip())
+        except ValueError:
+            continue
+        if value > 0:
+            bounds.add(value)
+    return sorted(bounds)
+
+
+# Adaptive first-token timeout.
+# The gateway learns the first-token wait per model and prompt-size bucket and uses
+# clamp(quantile * multiplier, MIN, MAX) instead of FIRST_TOKEN_TIMEOUT once a bucket
+# has FIRST_TOKEN_TIMEOUT_MIN_SAMPLES observations.
+ADAPTIVE_FIRST_TOKEN_TIMEOUT: bool = _parse_bool_env("ADAPTIVE_FIRST_TOKEN_TIMEOUT", True)
+FIRST_TOKEN_TIMEOUT_QUANTILE: float = min(1.0, max(0.0, _parse_float_env("FIRST_TOKEN_TIMEOUT_QUANTILE", 0.99)))
+FIRST_TOKEN_TIMEOUT_MULTIPLIER: float = max(1.0, _parse_float_env("FIRST_TOKEN_TIMEOUT_MULTIPLIER", 1.5))
+FIRST_TOKEN_TIMEOUT_MIN: float = max(1.0, _parse_float_env("FIRST_TOKEN_TIMEOUT_MIN", 5.0))
+# Kept below STREAMING_READ_TIMEOUT so the read timeout never fires first
+FIRST_TOKEN_TIMEOUT_MAX: float = min(
+    STREAMING_READ_TIMEOUT,
+    max(FIRST_TOKEN_TIMEOUT_MIN, _parse_float_env("FIRST_TOKEN_TIMEOUT_MAX", 90.0)),
+)
+FIRST_TOKEN_TIMEOUT_MIN_SAMPLES: int = max(1, _parse_int_env("FIRST_TOKEN_TIMEOUT_MIN_SAMPLES", 50))
+
+# Prompt-token boundaries of the context-size buckets (comma-separated)
+FIRST_TOKEN_CONTEXT_BUCKETS: List[int] = _parse_context_buckets(
+    os.getenv("FIRST_TOKEN_CONTEXT_BUCKETS", "8000,32000,100000")
+)
+
+# Hedged first-token requests (opt-in).
+# When no first byte has arrived by HEDGE_TTFT_PERCENTILE of recently observed
+# time-to-first-byte, a second request is fired (on another account when
+# pooled) and whichever answers first is streamed.
+HEDGE_ENABLED: bool = _parse_bool_env("HEDGE_ENABLED", False)
+
+# Quantile of observed TTFT after which the hedge fires (0-1). Default: 0.95
+HEDGE_TTFT_PERCENTILE: float = min(1.0, max(0.0, _parse_float_env("HEDGE_TTFT_PERCENTILE", 0.95)))
+
+# Number of recent TTFT samples kept for the quantile, and samples needed before hedging starts
+HEDGE_TTFT_WINDOW: int = max(1, _parse_int_env("HEDGE_TTFT_WINDOW", 500))
+HEDGE_MIN_SAMPLES: int = max(1, _parse_int_env("HEDGE_MIN_SAMPLES", 20))
+
+# Never hedge earlier than this (seconds)
+HEDGE_MIN_DELAY_SECONDS: float = max(0.0, _parse_float_env("HEDGE_MIN_DELAY_SECONDS", 1.0))
+
+# Hedge rate guardrail: each request adds HEDGE_BUDGET_RATIO tokens, each hedge costs one,
+# so at most ~10% of requests are hedged even when upstream is slow for everyone.
+HEDGE_BUDGET_RATIO: float = max(0.0, _parse_float_env("HEDGE_BUDGET_RATIO", 0.1))
+HEDGE_BUDGET_BURST: float = max(1.0, _parse_float_env("HEDGE_BUDGET_BURST", 5.0))
+
+# ==================================================================================================
+# Streaming Connection Pool Settings
+# ==================================================================================================
+
+# Reuse upstream connections for streaming requests.
+# Without pooling every streamed completion pays DNS + TCP + TLS handshakes (150-400 ms TTFT).
+# The pool still guards against the CLOSE_WAIT leaks from issues #38/#54:
+# - idle connections are health-checked on checkout and expire after STREAMING_POOL_KEEPALIVE_EXPIRY
+# - the whole pool is recycled after a network interface change (VPN up/down) or a read error
+# - no connection is reused after STREAMING_POOL_MAX_CONNECTION_AGE seconds
+# Set to false to go back to a fresh client with "Connection: close" per streaming request.
+STREAMING_POOL_ENABLED: bool = _parse_bool_env("STREAMING_POOL_ENABLED", True)
+
+# Maximum number of idle keep-alive connections kept for streaming
+STREAMING_POOL_MAX_KEEPALIVE: int = max(1, _parse_int_env("STREAMING_POOL_MAX_KEEPALIVE", 20))
+
+# Idle connections are closed after this many seconds
+STREAMING_POOL_KEEPALIVE_EXPIRY: float = max(1.0, _parse_float_env("STREAMING_POOL_KEEPALIVE_EXPIRY", 30.0))
+
+# Connections are not reused once the pool is older than this (seconds)
+STREAMING_POOL_MAX_CONNECTION_AGE: float = max(10.0, _parse_float_env("STREAMING_POOL_MAX_CONNECTION_AGE", 300.0))
+
+# How often to compare local network interfaces/route against the last snapshot (seconds)
+STREAMING_POOL_NETWORK_CHECK_INTERVAL: float = max(0.0, _parse_float_env("STREAMING_POOL_NETWORK_CHECK_INTERVAL", 5.0))
+
 # ==================================================================================================
 # Debug Settings
 # ==================================================================================================
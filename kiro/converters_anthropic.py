@@ -24,11 +24,14 @@ This module is an adapter layer that converts Anthropic-specific formats
 to the unified format used by converters_core.py.
 """
 
+import json
+import time
 from typing import Any, Dict, List, Optional
 
 from loguru import logger
 
 from kiro.config import HIDDEN_MODELS
+from kiro.metrics import REQUEST_CONVERSION_SECONDS
 from kiro.model_resolver import get_model_id_for_kiro
 from kiro.models_anthropic import (
     AnthropicMessagesRequest,
@@ -369,6 +372,86 @@ def convert_anthropic_tools(
     return unified_tools if unified_tools else None
 
 
+def convert_anthropic_messages_for_tokenizer(
+    messages: List[AnthropicMessage],
+    system: Any = None,
+) -> List[Dict[str, Any]]:
+    """
+    Converts Anthropic messages to the OpenAI-style dicts counted by the tokenizer.
+
+    tool_use blocks become tool_calls, each tool_result becomes a tool message
+    and images become image_url parts, so none of them is dropped from the
+    count. Identical messages produce identical dicts, so repeated turns of a
+    conversation hit the tokenizer's per-message count cache.
+
+    Args:
+        messages: List of Anthropic messages
+        system: System prompt in string or list format (counted as a leading message)
+
+    Returns:
+        List of messages in tokenizer (OpenAI) format
+    """
+    tokenizer_messages: List[Dict[str, Any]] = []
+    system_prompt = extract_system_prompt(system)
+    if system_prompt:
+        tokenizer_messages.append({"role": "system", "content": system_prompt})
+
+    for message in convert_anthropic_messages(messages):
+        tokenizer_message: Dict[str, Any] = {"role": message.role, "content": message.content}
+        if message.images:
+            tokenizer_message["content"] = [{"type": "text", "text": message.content}]
+            tokenizer_message["content"].extend({"type": "image_url"} for _ in message.images)
+        if message.tool_calls:
+            tokenizer_message["tool_calls"] = []
+            for tool_call in message.tool_calls:
+                arguments = tool_call["function"]["arguments"]
+                tokenizer_message["tool_calls"].append({
+                    "id": tool_call["id"],
+                    "type": "function",
+                    "function": {
+                        "name": tool_call["function"]["name"],
+                        "arguments": arguments if isinstance(arguments, str)
+                        else json.dumps(arguments, ensure_ascii=False),
+                    },
+                })
+        tokenizer_messages.append(tokenizer_message)
+        for tool_result in message.tool_results or []:
+            tokenizer_messages.append({
+                "role": "tool",
+                "tool_call_id": tool_result["tool_use_id"],
+                "content": tool_result["content"],
+            })
+    return tokenizer_messages
+
+
+def convert_anthropic_tools_for_tokenizer(
+    tools: Optional[List[AnthropicTool]],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Converts Anthropic tools to the OpenAI-style function dicts counted by the tokenizer.
+
+    Args:
+        tools: List of Anthropic tools
+
+    Returns:
+        List of tools in tokenizer (OpenAI) format, or None if no tools
+    """
+    unified_tools = convert_anthropic_tools(tools)
+    if not unified_tools:
+        return None
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.input_schema,
+            },
+        }
+        for tool in unified_tools
+    ]
+
+
 def anthropic_to_kiro(
     request: AnthropicMessagesRequest, conversation_id: str, profile_arn: str
 ) -> dict:
@@ -393,6 +476,8 @@ def anthropic_to_kiro(
     Raises:
         ValueError: If there are no messages to send
     """
+    started = time.perf_counter()
+
     # Convert messages to unified format
     unified_messages = convert_anthropic_messages(request.messages)
 
@@ -424,4 +509,5 @@ def anthropic_to_kiro(
         inject_thinking=True,
     )
 
+    REQUEST_CONVERSION_SECONDS.labels("anthropic").observe(time.perf_counter() - started)
     return result.payload
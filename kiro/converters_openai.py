@@ -29,11 +29,13 @@ Contains functions for:
 - Building Kiro payload from OpenAI requests
 """
 
+import time
 from typing import Any, Dict, List, Optional, Tuple
 
 from loguru import logger
 
 from kiro.config import HIDDEN_MODELS
+from kiro.metrics import REQUEST_CONVERSION_SECONDS
 from kiro.model_resolver import get_model_id_for_kiro
 from kiro.models_openai import ChatMessage, ChatCompletionRequest, Tool
 
@@ -318,6 +320,8 @@ def build_kiro_payload(
     Raises:
         ValueError: If there are no messages to send
     """
+    started = time.perf_counter()
+    
     # Convert messages to unified format
     system_prompt, unified_messages = convert_openai_messages_to_unified(request_data.messages)
     
@@ -345,4 +349,5 @@ def build_kiro_payload(
         inject_thinking=True
     )
     
+    REQUEST_CONVERSION_SECONDS.labels("openai").observe(time.perf_counter() - started)
     return result.payload
\ No newline at end of file
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Credential persistence backends for KiroAuthManager.
+
+Each store wraps one credential source (env, JSON file, kiro-cli SQLite,
+MongoDB auth_kv) and runs its blocking I/O on a dedicated single-thread
+executor, so the event loop never waits on a locked SQLite file or a slow
+MongoDB round-trip.
+
+Stores only move raw payloads; parsing token data into accounts stays in
+KiroAuthManager. Writes are described by a credentials record:
+
+    {
+        "candidate_keys": [...],   # auth_kv keys to try, in priority order
+        "access_token": "...",
+        "refresh_token": "...",
+        "expires_at": "ISO 8601" | None,
+        "region": "...",
+        "scopes": [...] | None,
+        "profile_arn": "..." | None,
+    }
+"""
+
+import asyncio
+import functools
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from loguru import logger
+
+
+T = TypeVar("T")
+
+
+def merge_token_payload(existing_data: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge refreshed credentials into an auth_kv token payload.
+
+    Fields the gateway does not manage (provider, metadata from kiro-cli) are kept.
+
+    Args:
+        existing_data: Token payload currently stored under the key.
+        record: Credentials record to persist.
+
+    Returns:
+        Updated payload (the same dict, modified in place).
+    """
+    existing_data["access_token"] = record.get("access_token")
+    existing_data["refresh_token"] = record.get("refresh_token")
+    existing_data["expires_at"] = record.get("expires_at")
+    existing_data["region"] = record.get("region")
+    if record.get("scopes"):
+        existing_data["scopes"] = record["scopes"]
+    if record.get("profile_arn"):
+        existing_data["profile_arn"] = record["profile_arn"]
+    return existing_data
+
+
+class CredentialStore:
+    """
+    Credential source with off-loop I/O and batched writes.
+
+    Blocking primitives (`read`, `write_records`) run on a dedicated
+    single-thread executor via `run`, so one source never issues concurrent
+    I/O. Concurrent `save` calls are coalesced per account key (the newest
+    record wins) and written together in one executor job; saves arriving
+    while a batch is being written form the next batch.
+
+    The base class is the env source: there is nothing to read or persist.
+    """
+
+    source: str = "env"
+
+    def __init__(self) -> None:
+        """Initializes the store without starting any threads."""
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, List[Any]] = {}
+        self._flush_task: Optional[asyncio.Task[None]] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the store's executor, creating it on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix=f"credential-store-{self.source}",
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run a blocking callable on the store's executor.
+
+        Args:
+            func: Blocking callable.
+            *args: Positional arguments for the callable.
+
+        Returns:
+            The callable's result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args))
+
+    def read(self, reader: Callable[[Any], T]) -> Optional[T]:
+        """
+        Run a reader against the underlying source (blocking).
+
+        Args:
+            reader: Callable receiving the source handle (SQLite cursor, MongoDB collection).
+
+        Returns:
+            Reader result, or None when the source is unavailable.
+        """
+        return None
+
+    def write_records(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Persist credentials records (blocking).
+
+        Args:
+            records: Credentials records to write.
+
+        Returns:
+            For each record, the auth_kv key it was written to, or None.
+        """
+        return [None] * len(records)
+
+    async def save(self, record: Dict[str, Any]) -> Optional[str]:
+        """
+        Persist a credentials record off the event loop, batched with concurrent saves.
+
+        Args:
+            record: Credentials record to write.
+
+        Returns:
+            The auth_kv key the record was written to, or None.
+
+        Raises:
+            Exception: Whatever the blocking write raised for the batch.
+        """
+        loop = asyncio.get_running_loop()
+        candidate_keys = record.get("candidate_keys") or [""]
+        batch_key = candidate_keys[0]
+        waiter: "asyncio.Future[Optional[str]]" = loop.create_future()
+
+        entry = self._pending.get(batch_key)
+        if entry is None:
+            self._pending[batch_key] = [record, [waiter]]
+        else:
+            entry[0] = record  # Newer snapshot of the same account supersedes the queued one
+            entry[1].append(waiter)
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_pending())
+        return await waiter
+
+    async def _flush_pending(self) -> None:
+        """Write queued records in batches until the queue is empty."""
+        while self._pending:
+            batch = list(self._pending.values())
+            self._pending = {}
+            records = [entry[0] for entry in batch]
+
+            try:
+                results = await self.run(self.write_records, records)
+            except Exception as error:
+                for _, waiters in batch:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(error)
+                continue
+
+            for (_, waiters), result in zip(batch, results):
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+
+    def close(self) -> None:
+        """Release source handles (blocking)."""
+
+    async def aclose(self) -> None:
+        """Flush queued writes, release source handles and stop the executor."""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._executor is None:
+            self.close()
+            return
+        await self.run(self.close)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+
+class SqliteCredentialStore(CredentialStore):
+    """
+    kiro-cli SQLite auth_kv source over one persistent connection.
+
+    The connection is opened lazily and reused; it is dropped after an SQLite
+    error or when the database file disappears, and reopened on next use.
+    """
+
+    source = "sqlite"
+
+    def __init__(self, db_path: str, timeout: float = 5.0) -> None:
+        """
+        Initializes the SQLite store.
+
+        Args:
+            db_path: Path to kiro-cli SQLite database.
+            timeout: Seconds to wait for a locked database.
+        """
+        super().__init__()
+        self._path = Path(db_path).expanduser()
+        self._timeout = timeout
+        self._connection: Optional[sqlite3.Connection] = None
+        # Sync callers (startup load) and the executor thread share the connection.
+        self._connection_lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Return the persistent connection, or None when the database file is missing."""
+        if not self._path.exists():
+            self._close_connection()
+            return None
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                str(self._path),
+                timeout=self._timeout,
+                check_same_thread=False,
+            )
+        return self._connection
+
+    def _close_connection(self) -> None:
+        """Close and forget the persistent connection."""
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except sqlite3.Error:
+                pass
+            self._connection = None
+
+    def read(self, reader: Callable[[Any], T]) -> Optional[T]:
+        """
+        Run a reader against an SQLite cursor (blocking).
+
+        Args:
+            reader: Callable receiving an sqlite3.Cursor.
+
+        Returns:
+            Reader result, or None when the database file is missing.
+        """
+        with self._connection_lock:
+            connection = self._connect()
+            if connection is None:
+                return None
+            try:
+                return reader(connection.cursor())
+            except sqlite3.Error:
+                self._close_connection()
+                raise
+
+    def write_records(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Persist credentials records in a single transaction (blocking).
+
+        Each record is written to the first candidate key present in auth_kv.
+
+        Args:
+            records: Credentials records to write.
+
+        Returns:
+            For each record, the auth_kv key it was written to, or None.
+        """
+        with self._connection_lock:
+            connection = self._connect()
+            if connection is None:
+                logger.warning(f"SQLite database not found for writing: {self._path}")
+                return [None] * len(records)
+
+            cursor = connection.cursor()
+            try:
+                saved_keys = [self._write_record(cursor, record) for record in records]
+                connection.commit()
+            except sqlite3.Error:
+                try:
+                    connection.rollback()
+                except sqlite3.Error:
+                    pass
+                self._close_connection()
+                raise
+            return saved_keys
+
+    @staticmethod
+    def _write_record(cursor: sqlite3.Cursor, record: Dict[str, Any]) -> Optional[str]:
+        """Write one record to its first existing candidate key."""
+        for key in record.get("candidate_keys", []):
+            cursor.execute("SELECT value FROM auth_kv WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            if not row:
+                continue
+
+            try:
+                existing_data = json.loads(row[0])
+                if not isinstance(existing_data, dict):
+                    existing_data = {}
+            except json.JSONDecodeError:
+                existing_data = {}
+
+            cursor.execute(
+                "UPDATE auth_kv SET value = ? WHERE key = ?",
+                (json.dumps(merge_token_payload(existing_data, record)), key),
+            )
+            if cursor.rowcount > 0:
+                logger.debug(f"Credentials saved to SQLite key: {key}")
+                return key
+
+        logger.warning("Failed to save credentials to SQLite: no matching keys found")
+        return None
+
+    def close(self) -> None:
+        """Close the persistent connection (blocking)."""
+        with self._connection_lock:
+            self._close_connection()
+
+
+class MongoCredentialStore(CredentialStore):
+    """
+    MongoDB auth_kv source over a persistent client.
+
+    The collection getter owns client creation and caching.
+    """
+
+    source = "mongodb"
+
+    def __init__(self, collection_getter: Callable[[], Optional[Any]]) -> None:
+        """
+        Initializes the MongoDB store.
+
+        Args:
+            collection_getter: Returns the auth_kv collection, or None when unavailable.
+        """
+        super().__init__()
+        self._collection_getter = collection_getter
+
+    def read(self, reader: Callable[[Any], T]) -> Optional[T]:
+        """
+        Run a reader against the auth_kv collection (blocking).
+
+        Args:
+            reader: Callable receiving the MongoDB collection.
+
+        Returns:
+            Reader result, or None when MongoDB is unavailable.
+        """
+        collection = self._collection_getter()
+        if collection is None:
+            return None
+        return reader(collection)
+
+    def write_records(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Persist credentials records (blocking).
+
+        Args:
+            records: Credentials records to write.
+
+        Returns:
+            For each record, the auth_kv key it was written to, or None.
+        """
+        collection = self._collection_getter()
+        if collection is None:
+            return [None] * len(records)
+        return [self._write_record(collection, record) for record in records]
+
+    @staticmethod
+    def _write_record(collection: Any, record: Dict[str, Any]) -> Optional[str]:
+        """Write one record to its first existing candidate key."""
+        for key in record.get("candidate_keys", []):
+            doc = collection.find_one({"key": key}, {"_id": 0, "value": 1})
+            if not doc or not isinstance(doc.get("value"), dict):
+                continue
+
+            existing_data = merge_token_payload(dict(doc["value"]), record)
+            result = collection.update_one(
+                {"key": key},
+                {"$set": {"value": existing_data}},
+                upsert=False,
+            )
+            if result.modified_count > 0 or result.matched_count > 0:
+                logger.debug(f"Credentials saved to MongoDB auth key: {key}")
+                return key
+
+        logger.warning("Failed to save credentials to MongoDB: no matching keys found")
+        return None
+
+
+class FileCredentialStore(CredentialStore):
+    """JSON credentials file source (Kiro IDE / AWS SSO cache format)."""
+
+    source = "file"
+
+    def __init__(self, file_path: str) -> None:
+        """
+        Initializes the file store.
+
+        Args:
+            file_path: Path to JSON credentials file.
+        """
+        super().__init__()
+        self._path = Path(file_path).expanduser()
+
+    def write_records(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Persist the newest record into the credentials file (blocking).
+
+        The file holds a single account, so only the last record is written.
+        Existing fields are preserved.
+
+        Args:
+            records: Credentials records to write.
+
+        Returns:
+            None for every record (files have no auth_kv key).
+        """
+        if not records:
+            return []
+        record = records[-1]
+
+        existing_data: Dict[str, Any] = {}
+        if self._path.exists():
+            with open(self._path, 'r', encoding='utf-8') as f:
+                existing_data = json.load(f)
+
+        existing_data['accessToken'] = record.get("access_token")
+        existing_data['refreshToken'] = record.get("refresh_token")
+        if record.get("expires_at"):
+            existing_data['expiresAt'] = record["expires_at"]
+        if record.get("profile_arn"):
+            existing_data['profileArn'] = record["profile_arn"]
+
+        with open(self._path, 'w', encoding='utf-8') as f:
+            json.dump(existing_data, f, indent=2, ensure_ascii=False)
+
+        logger.debug(f"Credentials saved to {self._path}")
+        return [None] * len(records)
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+In-memory credit reservation ledger with write-behind settlement.
+
+Without the ledger every billed request costs two MongoDB round-trips: a
+balance read before the upstream call and a conditional $inc after it.
+With the ledger:
+
+- the preflight check reserves the estimated charge against a cached
+  balance, with no round-trip unless the balance is missing or the user
+  looks out of credits;
+- the final charge settles the reservation locally;
+- settled charges are flushed to MongoDB with one bulk_write every
+  BILLING_LEDGER_FLUSH_INTERVAL_MS.
+
+With a billing journal attached (kiro/billing_journal.py), each charge is
+fsynced to a local segment file before settle() returns, unacknowledged
+charges are replayed on startup, and flushed charges are acknowledged in
+the journal. Flushes are idempotent by request ID, so a replayed charge is
+never applied twice.
+
+Per user the ledger tracks:
+
+    available = balance - pending - flushing - reserved
+
+where balance is the last balance read from MongoDB minus everything this
+process has flushed since, pending is settled but not yet flushed,
+flushing is the delta being written, and reserved is held by requests in
+progress. Balances are re-read in the background after
+BILLING_LEDGER_BALANCE_TTL_SECONDS so deductions by other processes are
+picked up. Balance reads and flushes never overlap, so a read always sees
+either none or all of a flushed delta.
+
+A final charge is always recorded, even above the reservation: the usage
+already happened, so the balance may go below zero and the next
+reservation is refused. Reservations that are never settled or released
+expire after BILLING_RESERVATION_TTL_SECONDS.
+"""
+
+import asyncio
+import itertools
+import time
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from kiro.config import (
+    BILLING_LEDGER_FLUSH_INTERVAL_MS,
+    BILLING_LEDGER_BALANCE_TTL_SECONDS,
+    BILLING_RESERVATION_TTL_SECONDS,
+)
+from kiro.billing_journal import BillingJournal, ChargeRecord
+from kiro.mongodb_async import get_async_mongo_store
+from kiro.mongodb_store import apply_credit_charges, get_credit_balance, MongoStoreTimeoutError
+from kiro.services import services
+
+ZERO = Decimal("0")
+
+# Request IDs of recent charges, so settling a request again charges nothing
+SETTLED_REQUEST_IDS_KEEP = 10000
+
+
+class CreditReservation:
+    """
+    Credits held for one request until it is settled or released.
+
+    Releasing is idempotent, so error paths can release unconditionally.
+    """
+
+    __slots__ = ("reservation_id", "user_id", "amount", "expires_at", "_ledger", "_open")
+
+    def __init__(self, ledger: "CreditLedger", reservation_id: int, user_id: Any, amount: Decimal, expires_at: float) -> None:
+        self.reservation_id = reservation_id
+        self.user_id = user_id
+        self.amount = amount
+        self.expires_at = expires_at
+        self._ledger = ledger
+        self._open = True
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the credits are still held."""
+        return self._open
+
+    def release(self) -> None:
+        """Give the held credits back without charging anything."""
+        if self._open:
+            self._ledger._close_reservation(self)
+
+
+class _UserCredits:
+    """Ledger state of one user."""
+
+    __slots__ = ("balance", "loaded_at", "reserved", "pending", "flushing", "reservations")
+
+    def __init__(self) -> None:
+        self.balance: Optional[Decimal] = None
+        self.loaded_at = 0.0
+        self.reserved = ZERO
+        self.pending = ZERO
+        self.flushing = ZERO
+        self.reservations: Dict[int, CreditReservation] = {}
+
+    def available(self) -> Decimal:
+        if self.balance is None:
+            return ZERO
+        return self.balance - self.pending - self.flushing - self.reserved
+
+    def is_idle(self) -> bool:
+        return not self.reservations and self.pending == ZERO and self.flushing == ZERO
+
+
+class CreditLedger:
+    """
+    Per-user credit reservations over cached balances, flushed write-behind.
+
+    All state is mutated on the event loop without awaiting in between, so
+    it needs no locks; only MongoDB access is serialized (_db_lock).
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = BILLING_LEDGER_FLUSH_INTERVAL_MS / 1000.0,
+        balance_ttl: float = BILLING_LEDGER_BALANCE_TTL_SECONDS,
+        reservation_ttl: float = BILLING_RESERVATION_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            flush_interval: Seconds between a settlement and the flush that writes it.
+            balance_ttl: Seconds before a cached balance is re-read in the background.
+            reservation_ttl: Seconds before an unsettled reservation is dropped.
+            clock: Monotonic time source (for tests).
+        """
+        self._flush_interval = flush_interval
+        self._balance_ttl = balance_ttl
+        self._reservation_ttl = reservation_ttl
+        self._clock = clock
+        self._accounts: Dict[Any, _UserCredits] = {}
+        self._loads: Dict[Any, "asyncio.Future[None]"] = {}
+        self._ids = itertools.count(1)
+        # Settled charges waiting for the next flush
+        self._charges: List[ChargeRecord] = []
+        self._charge_seqs = itertools.count(1)
+        self._settled_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._journal: Optional[BillingJournal] = None
+        self._db_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+
+    def _lock(self) -> asyncio.Lock:
+        if self._db_lock is None:
+            self._db_lock = asyncio.Lock()
+        return self._db_lock
+
+    def available(self, user_id: Any) -> Optional[Decimal]:
+        """Credits a new reservation could take, or None when the balance is not cached."""
+        account = self._accounts.get(user_id)
+        if account is None or account.balance is None:
+            return None
+        return account.available()
+
+    async def reserve(self, user_id: Any, amount: Decimal) -> Optional[CreditReservation]:
+        """
+        Hold credits for a request.
+
+        Args:
+            user_id: User identifier.
+            amount: Estimated charge to hold.
+
+        Returns:
+            Reservation, or None when the user does not have enough credits
+            (or has no balance record).
+        """
+        account = self._accounts.get(user_id)
+        fresh = False
+        if account is None or account.balance is None:
+            await self._load_balance(user_id)
+            fresh = True
+        elif self._clock() - account.loaded_at >= self._balance_ttl:
+            self._refresh_in_background(user_id)
+
+        account = self._accounts.get(user_id)
+        if account is None:
+            return None
+        self._expire_reservations(account)
+        if account.balance is not None and account.available() >= amount:
+            return self._open_reservation(account, user_id, amount)
+
+        if not fresh:
+            # Re-read once before refusing, so a top-up is seen immediately
+            await self._load_balance(user_id)
+            account = self._accounts.get(user_id)
+            if account is not None and account.balance is not None and account.available() >= amount:
+                return self._open_reservation(account, user_id, amount)
+        return None
+
+    async def open_journal(self, journal: BillingJournal) -> int:
+        """
+        Attach a billing journal and queue its unacknowledged charges for the next flush.
+
+        Args:
+            journal: Journal to open (its directory lock is taken here).
+
+        Returns:
+            Number of charges recovered from the journal.
+
+        Raises:
+            JournalLockedError: If another process holds the journal.
+        """
+        recovered = await asyncio.get_running_loop().run_in_executor(None, journal.open)
+        self._journal = journal
+        for record in recovered:
+            self._remember_settled(record.request_id)
+            self._queue_charge(record)
+        return len(recovered)
+
+    async def settle(
+        self,
+        user_id: Any,
+        charge: Decimal,
+        reservation: Optional[CreditReservation] = None,
+        request_id: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> None:
+        """
+        Record a final charge and close its reservation; MongoDB is updated by the next flush.
+
+        With a journal attached this returns once the charge is on disk.
+
+        Args:
+            user_id: User identifier.
+            charge: Final charge (may exceed the reservation).
+            reservation: Reservation taken for the request, if any.
+            request_id: Idempotency key for the charge (generated when omitted);
+                a request ID settled before is not charged again.
+            model: Model ID, recorded in the journal.
+        """
+        if reservation is not None:
+            reservation.release()
+        if charge <= ZERO:
+            return
+        if request_id is not None:
+            if request_id in self._settled_ids:
+                logger.warning(f"Charge {request_id} was already settled, not charging it again")
+                return
+            self._remember_settled(request_id)
+        record = ChargeRecord(request_id or uuid.uuid4().hex, user_id, charge, model)
+        if self._journal is not None:
+            try:
+                await self._journal.append(record)
+            except Exception as exc:
+                # Still billed through the ledger, just not crash-safe
+                logger.error(f"Billing journal append failed, charge {record.request_id} is not durable: {exc}")
+        else:
+            record.seq = next(self._charge_seqs)
+        self._queue_charge(record)
+
+    def _remember_settled(self, request_id: str) -> None:
+        self._settled_ids[request_id] = None
+        if len(self._settled_ids) > SETTLED_REQUEST_IDS_KEEP:
+            self._settled_ids.popitem(last=False)
+
+    def _queue_charge(self, record: ChargeRecord) -> None:
+        account = self._accounts.get(record.user_id)
+        if account is None:
+            account = self._accounts[record.user_id] = _UserCredits()
+        account.pending += record.amount
+        self._charges.append(record)
+        self._schedule_flush()
+
+    def _open_reservation(self, account: _UserCredits, user_id: Any, amount: Decimal) -> CreditReservation:
+        reservation = CreditReservation(
+            self, next(self._ids), user_id, amount, self._clock() + self._reservation_ttl
+        )
+        account.reservations[reservation.reservation_id] = reservation
+        account.reserved += amount
+        return reservation
+
+    def _close_reservation(self, reservation: CreditReservation) -> None:
+        reservation._open = False
+        account = self._accounts.get(reservation.user_id)
+        if account is not None and account.reservations.pop(reservation.reservation_id, None) is not None:
+            account.reserved -= reservation.amount
+
+    def _expire_reservations(self, account: _UserCredits) -> None:
+        now = self._clock()
+        for reservation in [r for r in account.reservations.values() if r.expires_at <= now]:
+            logger.warning(
+                f"Credit reservation {reservation.reservation_id} expired without settlement "
+                f"({reservation.amount} credits released)"
+            )
+            self._close_reservation(reservation)
+
+    def _start_load(self, user_id: Any) -> "asyncio.Future[None]":
+        """Start reading the user's balance, or join the read already running."""
+        flight = self._loads.get(user_id)
+        if flight is None:
+            flight = asyncio.ensure_future(self._read_balance(user_id))
+            self._loads[user_id] = flight
+
+            def _on_done(done: "asyncio.Future[None]") -> None:
+                if self._loads.get(user_id) is done:
+                    del self._loads[user_id]
+                if not done.cancelled():
+                    done.exception()  # Mark retrieved for background refreshes
+
+            flight.add_done_callback(_on_done)
+        return flight
+
+    async def _load_balance(self, user_id: Any) -> None:
+        # Shielded so one cancelled request does not cancel the read for the others
+        await asyncio.shield(self._start_load(user_id))
+
+    def _refresh_in_background(self, user_id: Any) -> None:
+        self._start_load(user_id)
+
+    async def _read_balance(self, user_id: Any) -> None:
+        async with self._lock():
+            try:
+                balance = await get_async_mongo_store().run("get_balance", get_credit_balance, user_id)
+            except MongoStoreTimeoutError as exc:
+                logger.error(f"MongoDB credit balance lookup failed: {exc}")
+                return
+        # get_credit_balance returns None for missing records and read errors;
+        # neither replaces a balance we already know
+        if balance is None:
+            return
+        account = self._accounts.get(user_id)
+        if account is None:
+            account = self._accounts[user_id] = _UserCredits()
+        account.balance = balance
+        account.loaded_at = self._clock()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """Flush every interval while settled charges are waiting."""
+        while self._charges:
+            await asyncio.sleep(self._flush_interval)
+            # Shielded: cancelling the loop must not abandon a bulk_write half-way
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> bool:
+        """
+        Write all settled charges to MongoDB in one bulk_write.
+
+        Returns:
+            True when there was nothing to write or every charge was applied.
+            On failure the charges stay queued and are retried on the next
+            flush; MongoDB skips charges whose request ID it already applied.
+            Charges for users without a credits document also stay queued
+            (and unacknowledged in the journal) until the document exists.
+        """
+        async with self._lock():
+            charges, self._charges = self._charges, []
+            if not charges:
+                self._prune_idle()
+                return True
+            deltas: Dict[Any, Decimal] = {}
+            for record in charges:
+                deltas[record.user_id] = deltas.get(record.user_id, ZERO) + record.amount
+            for user_id, delta in deltas.items():
+                account = self._accounts[user_id]
+                account.pending -= delta
+                account.flushing += delta
+
+            try:
+                result = await get_async_mongo_store().run("flush_credits", apply_credit_charges, charges, write=True)
+            except MongoStoreTimeoutError as exc:
+                logger.error(f"MongoDB credit flush failed: {exc}")
+                result = None
+
+            for user_id, delta in deltas.items():
+                self._accounts[user_id].flushing -= delta
+            # Charges not known to be applied (e.g. no credits document) stay queued and unacknowledged
+            retry = charges if result is None else result.missing
+            retry_ids = {id(record) for record in retry}
+            duplicate_ids = {id(record) for record in result.duplicates} if result is not None else set()
+            for record in charges:
+                account = self._accounts[record.user_id]
+                if id(record) in retry_ids:
+                    account.pending += record.amount
+                elif id(record) in duplicate_ids:
+                    # Already part of MongoDB's balance (or not, if read before): re-read it
+                    account.loaded_at = float("-inf")
+                elif account.balance is not None:
+                    account.balance -= record.amount
+            if retry:
+                self._charges[:0] = retry
+            if result is None:
+                return False
+            if self._journal is not None:
+                self._journal.mark_applied([record.seq for record in charges if id(record) not in retry_ids])
+            if retry:
+                return False
+            logger.debug(f"Flushed {len(charges)} credit charge(s) for {len(deltas)} user(s)")
+            self._prune_idle()
+            return True
+
+    def _prune_idle(self) -> None:
+        """Forget users with nothing in progress whose balance is stale anyway."""
+        now = self._clock()
+        for user_id in [
+            user_id for user_id, account in self._accounts.items()
+            if account.is_idle() and now - account.loaded_at >= self._balance_ttl and user_id not in self._loads
+        ]:
+            del self._accounts[user_id]
+
+    async def close(self) -> None:
+        """Stop the flush task, write everything still pending and close the journal."""
+        task = self._flush_task
+        self._flush_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._charges and not await self.flush():
+            if self._journal is not None:
+                logger.warning(f"{len(self._charges)} credit charge(s) left in the billing journal for replay")
+            else:
+                logger.error(f"{len(self._charges)} unflushed credit charge(s) were lost at shutdown")
+        if self._journal is not None:
+            await self._journal.close()
+            self._journal = None
+
+
+def _discard_credit_ledger(ledger: CreditLedger) -> None:
+    """Stop a dropped ledger's flush task (queued charges are discarded, the journal is not closed)."""
+    if ledger._flush_task is not None:
+        ledger._flush_task.cancel()
+
+
+services.register("credit_ledger", CreditLedger, discard=_discard_credit_ledger)
+
+
+def get_credit_ledger() -> CreditLedger:
+    """Return the process-wide credit ledger (see kiro/services.py)."""
+    return services.get("credit_ledger")
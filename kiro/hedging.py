@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Hedged first-token requests.
+
+Instead of waiting the full FIRST_TOKEN_TIMEOUT before retrying, a stream
+that has not produced its first byte by the HEDGE_TTFT_PERCENTILE of
+recently observed time-to-first-byte gets a second (hedge) request, ideally
+on another account. Whichever produces a first byte first is streamed; the
+other is cancelled and closed.
+
+Guardrails keep hedging from doubling load during an outage:
+- no hedging until HEDGE_MIN_SAMPLES first-byte times have been observed;
+- the hedge delay never drops below HEDGE_MIN_DELAY_SECONDS;
+- hedges are paid from their own token bucket (see RetryBudget) that only
+  fills at HEDGE_BUDGET_RATIO per request, so at most that fraction of
+  requests is hedged, up to HEDGE_BUDGET_BURST saved-up hedges.
+"""
+
+from collections import deque
+from typing import Deque, List, Optional
+
+from kiro.config import (
+    HEDGE_BUDGET_BURST,
+    HEDGE_BUDGET_RATIO,
+    HEDGE_ENABLED,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_TTFT_PERCENTILE,
+    HEDGE_TTFT_WINDOW,
+)
+from kiro.retry_budget import RetryBudget
+from kiro.services import services
+
+
+class TtftWindow:
+    """
+    Sliding window of recent time-to-first-byte samples.
+
+    Quantiles are computed from a sorted copy that is cached until the next
+    sample, so repeated lookups between samples are cheap.
+    """
+
+    def __init__(self, size: int = HEDGE_TTFT_WINDOW) -> None:
+        """
+        Args:
+            size: Number of most recent samples kept.
+        """
+        self._samples: Deque[float] = deque(maxlen=max(size, 1))
+        self._sorted: Optional[List[float]] = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Add one first-byte latency sample."""
+        if seconds < 0:
+            return
+        self._samples.append(seconds)
+        self._sorted = None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Return the q-quantile (nearest rank) of the window.
+
+        Args:
+            q: Quantile in [0, 1].
+
+        Returns:
+            Latency in seconds, or None when the window is empty.
+        """
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        q = min(max(q, 0.0), 1.0)
+        index = min(len(self._sorted) - 1, int(q * len(self._sorted)))
+        return self._sorted[index]
+
+
+class HedgePolicy:
+    """
+    Decides when to fire a hedge request and whether one may be fired.
+
+    All methods are synchronous and never await, so state is updated
+    atomically on the event loop.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = HEDGE_ENABLED,
+        percentile: float = HEDGE_TTFT_PERCENTILE,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        min_delay: float = HEDGE_MIN_DELAY_SECONDS,
+        budget: Optional[RetryBudget] = None,
+        window: Optional[TtftWindow] = None,
+    ) -> None:
+        """
+        Args:
+            enabled: When False, hedge_delay() always returns None.
+            percentile: TTFT quantile after which a hedge is fired.
+            min_samples: Samples required before hedging starts.
+            min_delay: Lower bound of the hedge delay (seconds).
+            budget: Token bucket paying for hedges.
+            window: TTFT sample window.
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.budget = budget or RetryBudget(
+            ratio=HEDGE_BUDGET_RATIO,
+            min_per_second=0.0,
+            burst=HEDGE_BUDGET_BURST,
+        )
+        self.window = window or TtftWindow()
+
+    def record_request(self) -> None:
+        """Deposit the per-request share of hedge tokens."""
+        self.budget.record_request()
+
+    def record_ttft(self, seconds: float) -> None:
+        """Record the time to first byte of a streamed response."""
+        self.window.record(seconds)
+
+    def hedge_delay(self, first_token_timeout: float) -> Optional[float]:
+        """
+        Seconds to wait for a first byte before hedging.
+
+        Args:
+            first_token_timeout: Timeout of the attempt; a hedge is pointless
+                at or after it.
+
+        Returns:
+            Delay in seconds, or None when hedging is disabled or there are
+            not enough samples yet.
+        """
+        if not self.enabled or len(self.window) < self.min_samples:
+            return None
+        observed = self.window.quantile(self.percentile)
+        if observed is None:
+            return None
+        delay = max(observed, self.min_delay)
+        if delay >= first_token_timeout:
+            return None
+        return delay
+
+    def try_acquire(self) -> bool:
+        """
+        Withdraw one hedge token.
+
+        Returns:
+            True if a hedge may be fired, False if the hedge budget is spent.
+        """
+        return self.budget.try_acquire()
+
+
+services.register("hedge_policy", HedgePolicy)
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """Return the process-wide hedge policy (see kiro/services.py)."""
+    return services.get("hedge_policy")
@@ -22,25 +22,317 @@ HTTP client for Kiro API with retry logic support.
 
 Handles:
 - 403: automatic token refresh and retry
-- 429: exponential backoff
-- 5xx: exponential backoff
-- Timeouts: exponential backoff
+- 429 / exhausted quota: per-account cooldown (honouring Retry-After) and
+  immediate retry on another account; backoff only when no account is free
+- 5xx: backoff with decorrelated jitter
+- Timeouts: backoff with decorrelated jitter
+
+All retries draw from the process-wide retry budget (kiro/retry_budget.py);
+when it is exhausted the request fails fast with 503.
 
 Supports both per-request clients and shared application-level client
 with connection pooling for better resource management.
+
+Streaming requests can use StreamingClientPool - a keep-alive pool that is
+recycled on network changes, read errors and after a maximum age, so pooled
+connections do not leak in CLOSE_WAIT (issues #38, #54).
 """
 
 import asyncio
-from typing import Optional
+import json
+import socket
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional, Tuple
 
 import httpx
 from fastapi import HTTPException
 from loguru import logger
 
-from kiro.config import MAX_RETRIES, BASE_RETRY_DELAY, FIRST_TOKEN_MAX_RETRIES, STREAMING_READ_TIMEOUT
+from kiro.config import (
+    MAX_RETRIES,
+    BASE_RETRY_DELAY,
+    ACCOUNT_RATE_LIMIT_COOLDOWN_SECONDS,
+    ACCOUNT_QUOTA_COOLDOWN_SECONDS,
+    RATE_LIMIT_MAX_BACKOFF_SECONDS,
+    FIRST_TOKEN_MAX_RETRIES,
+    STREAMING_READ_TIMEOUT,
+    STREAMING_POOL_MAX_KEEPALIVE,
+    STREAMING_POOL_KEEPALIVE_EXPIRY,
+    STREAMING_POOL_MAX_CONNECTION_AGE,
+    STREAMING_POOL_NETWORK_CHECK_INTERVAL,
+)
 from kiro.auth import KiroAuthManager
 from kiro.utils import get_kiro_headers
 from kiro.network_errors import classify_network_error, get_short_error_message, NetworkErrorInfo
+from kiro.metrics import RETRIES_REFUSED_TOTAL, RETRIES_TOTAL
+from kiro.retry_budget import (
+    RETRY_BUDGET_EXHAUSTED_MESSAGE,
+    RetryBudget,
+    decorrelated_jitter,
+    get_retry_budget,
+)
+
+# Kiro error reason reported when an account has used up its quota
+QUOTA_EXHAUSTED_REASON = "MONTHLY_REQUEST_COUNT"
+
+# httpx response extension holding the callback run at the first content event of a stream
+FIRST_TOKEN_EXTENSION = "kiro.first_token"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header value.
+
+    Args:
+        value: Header value - delay in seconds or an HTTP date
+
+    Returns:
+        Delay in seconds (never negative), or None if absent or invalid
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def get_network_fingerprint() -> Tuple[Tuple[str, ...], Optional[str]]:
+    """
+    Returns a cheap snapshot of the local network configuration.
+    
+    Consists of the network interface names and the local address of the
+    default route. A VPN connecting or disconnecting changes at least one
+    of them. The route lookup uses an unconnected UDP socket, so no packets
+    are sent.
+    
+    Returns:
+        Tuple of (sorted interface names, default route local address)
+    """
+    try:
+        interfaces = tuple(sorted(name for _, name in socket.if_nameindex()))
+    except (OSError, AttributeError):
+        interfaces = ()
+    
+    local_address: Optional[str] = None
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            # TEST-NET-1 address: only used for the routing table lookup
+            probe.connect(("192.0.2.1", 443))
+            local_address = probe.getsockname()[0]
+    except OSError:
+        pass
+    
+    return interfaces, local_address
+
+
+class _PoolGeneration:
+    """One httpx.AsyncClient of StreamingClientPool and its active request count."""
+    
+    __slots__ = ("client", "created_at", "active")
+    
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.active = 0
+
+
+class StreamingClientPool:
+    """
+    Keep-alive connection pool for streaming requests to Kiro API.
+    
+    Streaming used to open a new client with "Connection: close" per request
+    to avoid CLOSE_WAIT leaks after VPN disconnects (issues #38, #54), paying
+    DNS + TCP + TLS handshakes every time. This pool keeps connections alive
+    and instead protects against stale connections:
+    - Idle connections are checked by httpcore on checkout (a half-closed
+      socket is dropped) and expire after keepalive_expiry seconds.
+    - The whole client is retired when the network fingerprint changes,
+      when a request reports a transport/read error, or when it is older
+      than max_connection_age. New requests get a fresh client; the retired
+      one is closed as soon as its in-flight streams are released.
+    
+    Attributes:
+        max_keepalive_connections: Maximum idle connections kept
+        keepalive_expiry: Idle connection lifetime (seconds)
+        max_connection_age: Maximum client lifetime (seconds)
+        network_check_interval: Minimum interval between network checks (seconds)
+    
+    Example:
+        >>> pool = StreamingClientPool()
+        >>> client = await pool.acquire()
+        >>> try:
+        ...     response = await client.send(request, stream=True)
+        ... finally:
+        ...     await pool.release(client)
+    """
+    
+    def __init__(
+        self,
+        max_keepalive_connections: int = STREAMING_POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = STREAMING_POOL_KEEPALIVE_EXPIRY,
+        max_connection_age: float = STREAMING_POOL_MAX_CONNECTION_AGE,
+        network_check_interval: float = STREAMING_POOL_NETWORK_CHECK_INTERVAL,
+    ):
+        """
+        Initializes the pool. Clients are created lazily on first acquire().
+        
+        Args:
+            max_keepalive_connections: Maximum idle connections kept
+            keepalive_expiry: Idle connection lifetime (seconds)
+            max_connection_age: Maximum client lifetime (seconds)
+            network_check_interval: Minimum interval between network checks (seconds)
+        """
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.max_connection_age = max_connection_age
+        self.network_check_interval = network_check_interval
+        
+        self._current: Optional[_PoolGeneration] = None
+        self._retired: List[_PoolGeneration] = []
+        self._network_fingerprint: Optional[Tuple[Tuple[str, ...], Optional[str]]] = None
+        self._last_network_check = 0.0
+        self._closed = False
+    
+    def _create_generation(self) -> _PoolGeneration:
+        """Creates a new pooled client with streaming timeouts."""
+        limits = httpx.Limits(
+            max_connections=None,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        timeout_config = httpx.Timeout(
+            connect=30.0,
+            read=STREAMING_READ_TIMEOUT,
+            write=30.0,
+            pool=30.0
+        )
+        logger.debug(
+            f"Creating pooled streaming HTTP client "
+            f"(keepalive={self.max_keepalive_connections}, expiry={self.keepalive_expiry}s, "
+            f"max_age={self.max_connection_age}s)"
+        )
+        client = httpx.AsyncClient(limits=limits, timeout=timeout_config, follow_redirects=True)
+        return _PoolGeneration(client)
+    
+    def _network_changed(self, now: float) -> bool:
+        """
+        Compares the network fingerprint with the last snapshot (rate-limited).
+        
+        Args:
+            now: Current monotonic time
+        
+        Returns:
+            True if the network configuration changed since the last check
+        """
+        if now - self._last_network_check < self.network_check_interval:
+            return False
+        self._last_network_check = now
+        
+        fingerprint = get_network_fingerprint()
+        previous = self._network_fingerprint
+        self._network_fingerprint = fingerprint
+        return previous is not None and fingerprint != previous
+    
+    def _retire_current(self, reason: str) -> None:
+        """Stops handing out the current client; it is closed once drained."""
+        if self._current is None:
+            return
+        logger.info(f"Recycling streaming connection pool: {reason}")
+        self._retired.append(self._current)
+        self._current = None
+    
+    async def _close_drained(self) -> None:
+        """Closes retired clients that have no in-flight requests."""
+        drained = [generation for generation in self._retired if generation.active <= 0]
+        if not drained:
+            return
+        self._retired = [generation for generation in self._retired if generation.active > 0]
+        for generation in drained:
+            try:
+                await generation.client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing retired streaming client: {e}")
+    
+    async def acquire(self) -> httpx.AsyncClient:
+        """
+        Returns a pooled client for one streaming request.
+        
+        Every acquire() must be paired with release().
+        
+        Returns:
+            httpx.AsyncClient shared by concurrent streaming requests
+        
+        Raises:
+            RuntimeError: If the pool is closed
+        """
+        if self._closed:
+            raise RuntimeError("Streaming connection pool is closed")
+        
+        now = time.monotonic()
+        if self._current is not None:
+            if now - self._current.created_at >= self.max_connection_age:
+                self._retire_current(f"max connection age {self.max_connection_age}s reached")
+            elif self._network_changed(now):
+                self._retire_current("network interface change detected")
+        
+        if self._current is None:
+            self._current = self._create_generation()
+            if self._network_fingerprint is None:
+                self._network_fingerprint = get_network_fingerprint()
+                self._last_network_check = now
+        
+        self._current.active += 1
+        client = self._current.client
+        
+        await self._close_drained()
+        return client
+    
+    async def release(self, client: httpx.AsyncClient, discard: bool = False) -> None:
+        """
+        Returns a client obtained from acquire().
+        
+        Args:
+            client: Client returned by acquire()
+            discard: True after a transport/read error - the client is retired
+                so its remaining keep-alive connections are not reused
+        """
+        generation = None
+        if self._current is not None and self._current.client is client:
+            generation = self._current
+        else:
+            generation = next((g for g in self._retired if g.client is client), None)
+        
+        if generation is None:
+            return
+        
+        generation.active -= 1
+        if discard and generation is self._current:
+            self._retire_current("connection error reported")
+        
+        await self._close_drained()
+    
+    async def aclose(self) -> None:
+        """Closes all clients. Called on application shutdown."""
+        self._closed = True
+        generations = self._retired + ([self._current] if self._current is not None else [])
+        self._current = None
+        self._retired = []
+        for generation in generations:
+            try:
+                await generation.client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing streaming client: {e}")
 
 
 class KiroHttpClient:
@@ -49,13 +341,14 @@ class KiroHttpClient:
     
     Automatically handles errors and retries requests:
     - 403: refreshes token and retries
-    - 429: waits with exponential backoff
+    - 429: cools the account down and retries on another account
     - 5xx: waits with exponential backoff
     - Timeouts: waits with exponential backoff
     
-    Supports two modes of operation:
+    Supports three modes of operation:
     1. Per-request client: Creates and owns its own httpx.AsyncClient
     2. Shared client: Uses an application-level shared client (recommended)
+    3. Streaming pool: Streaming requests borrow a client from StreamingClientPool
     
     Using a shared client reduces memory usage and enables connection pooling,
     which is especially important for handling concurrent requests.
@@ -78,7 +371,8 @@ class KiroHttpClient:
     def __init__(
         self,
         auth_manager: KiroAuthManager,
-        shared_client: Optional[httpx.AsyncClient] = None
+        shared_client: Optional[httpx.AsyncClient] = None,
+        streaming_pool: Optional[StreamingClientPool] = None
     ):
         """
         Initializes the HTTP client.
@@ -88,11 +382,19 @@ class KiroHttpClient:
             shared_client: Optional shared httpx.AsyncClient for connection pooling.
                           If provided, this client will be used instead of creating
                           a new one. The shared client will NOT be closed by close().
+            streaming_pool: Optional StreamingClientPool used for streaming requests
+                          when no shared client is given. The pooled client is
+                          released (not closed) by close().
         """
         self.auth_manager = auth_manager
         self._shared_client = shared_client
         self._owns_client = shared_client is None
+        self._streaming_pool = streaming_pool if shared_client is None else None
+        self._pooled = False
+        self._transport_error = False
         self.client: Optional[httpx.AsyncClient] = shared_client
+        # Account whose in-flight slot is held by an open streaming response
+        self._held_account_key: Optional[str] = None
     
     async def _get_client(self, stream: bool = False) -> httpx.AsyncClient:
         """
@@ -122,6 +424,13 @@ class KiroHttpClient:
         if self._shared_client is not None:
             return self._shared_client
         
+        # Borrow a keep-alive client from the streaming pool
+        if stream and self._streaming_pool is not None:
+            if not self._pooled:
+                self.client = await self._streaming_pool.acquire()
+                self._pooled = True
+            return self.client
+        
         # Create new client if needed (per-request mode)
         if self.client is None or self.client.is_closed:
             if stream:
@@ -144,16 +453,149 @@ class KiroHttpClient:
             self.client = httpx.AsyncClient(timeout=timeout_config, follow_redirects=True)
         return self.client
     
-    async def close(self) -> None:
+    async def _evict_pooled_client(self) -> httpx.AsyncClient:
+        """
+        Retires the pooled client after a transport error and borrows a fresh one.
+        
+        Returns:
+            New pooled client for the next attempt
+        """
+        await self._streaming_pool.release(self.client, discard=True)
+        self._pooled = False
+        self._transport_error = False
+        self.client = None
+        return await self._get_client(stream=True)
+    
+    @staticmethod
+    async def _discard_response(response: httpx.Response) -> None:
+        """Closes a response that will not be returned, freeing its connection."""
+        try:
+            await response.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing discarded response: {e}")
+    
+    @staticmethod
+    async def _is_quota_exhausted(response: httpx.Response) -> bool:
+        """
+        Checks whether an error response reports an exhausted account quota.
+        
+        The body stays cached on the response, so callers can still read it.
+        """
+        try:
+            error_json = json.loads(await response.aread())
+        except Exception:
+            return False
+        return isinstance(error_json, dict) and error_json.get("reason") == QUOTA_EXHAUSTED_REASON
+    
+    def _rate_limit_backoff(self, jitter_delay: float, retry_after: Optional[float]) -> float:
+        """
+        Computes the wait before retrying when no other account is available.
+        
+        Waits until the first account leaves cooldown (multi-account), or for
+        Retry-After / jittered backoff (single account), capped at
+        RATE_LIMIT_MAX_BACKOFF_SECONDS.
+        """
+        available_in = self.auth_manager.seconds_until_account_available()
+        if isinstance(available_in, (int, float)):
+            delay = float(available_in)
+        elif retry_after is not None:
+            delay = retry_after
+        else:
+            delay = jitter_delay
+        return min(delay, RATE_LIMIT_MAX_BACKOFF_SECONDS)
+    
+    @staticmethod
+    def _spend_retry(
+        budget: RetryBudget,
+        attempt: int,
+        max_retries: int,
+        cause: str,
+        description: Optional[str] = None,
+    ) -> None:
+        """
+        Takes a retry token before a retry, failing fast when the budget is empty.
+        
+        No token is taken on the last attempt, since no retry follows it.
+        Granted retries are counted in kiro_retries_total by cause.
+        
+        Args:
+            budget: Retry budget to withdraw from
+            attempt: Zero-based attempt that just failed
+            max_retries: Total attempts allowed
+            cause: Short, low-cardinality cause used as the metric label
+            description: Human-readable cause for logs (defaults to cause)
+        
+        Raises:
+            HTTPException: 503 when the process-wide retry budget is exhausted
+        """
+        if attempt >= max_retries - 1:
+            return
+        if budget.try_acquire():
+            RETRIES_TOTAL.labels(cause).inc()
+            return
+        RETRIES_REFUSED_TOTAL.inc()
+        logger.warning(
+            f"Retry budget exhausted, not retrying after {description or cause} "
+            f"(attempt {attempt + 1}/{max_retries})"
+        )
+        raise HTTPException(status_code=503, detail=RETRY_BUDGET_EXHAUSTED_MESSAGE)
+    
+    def _bind_payload_to_account(self, json_data: dict) -> dict:
+        """
+        Points the payload's profileArn at the account selected for this attempt.
+        
+        The payload is built for the account chosen before the request; after a
+        rotation (429, quota, auth failure) the new account needs its own ARN.
+        """
+        profile_arn = self.auth_manager.profile_arn
+        current = json_data.get("profileArn")
+        if current and isinstance(profile_arn, str) and profile_arn and current != profile_arn:
+            return {**json_data, "profileArn": profile_arn}
+        return json_data
+    
+    def _first_token_recorder(self, account_key: Optional[str], sent_at: float) -> Callable[[], None]:
+        """
+        Build the callback that feeds an account's time-to-first-token EWMA.
+        
+        Args:
+            account_key: Account the stream was opened with.
+            sent_at: time.monotonic() when the request was sent.
+        """
+        def record() -> None:
+            self.auth_manager.record_account_latency(account_key, time.monotonic() - sent_at)
+        return record
+    
+    def _release_held_account(self) -> None:
+        """Release the in-flight slot held by a finished streaming response."""
+        if self._held_account_key is not None:
+            key, self._held_account_key = self._held_account_key, None
+            self.auth_manager.release_account(key)
+
+    async def close(self, error: Optional[BaseException] = None) -> None:
         """
         Closes the HTTP client if this instance owns it.
         
         If using a shared client, this method does nothing - the shared client
         should be closed by the application lifecycle manager.
+        A client borrowed from the streaming pool is released back to it.
         
         Uses graceful exception handling to prevent errors during cleanup
         from masking the original exception in finally blocks.
+        
+        Args:
+            error: Exception that ended the stream, if any. Transport errors
+                   (e.g. read errors after a VPN flap) retire the pooled client.
         """
+        self._release_held_account()
+
+        if self._pooled:
+            self._pooled = False
+            client, self.client = self.client, None
+            discard = self._transport_error or isinstance(error, httpx.TransportError)
+            self._transport_error = False
+            await self._streaming_pool.release(client, discard=discard)
+            return
+        
         # Don't close shared clients - they're managed by the application
         if not self._owns_client:
             return
@@ -178,12 +620,22 @@ class KiroHttpClient:
         
         Automatically handles various error types:
         - 403: refreshes token via auth_manager.force_refresh() and retries
-        - 429: waits with exponential backoff (1s, 2s, 4s)
-        - 5xx: waits with exponential backoff
-        - Timeouts: waits with exponential backoff
+        - 429 / exhausted quota: cools the account down (Retry-After when
+          present) and retries immediately on another account; waits only
+          when every account is cooling down
+        - 5xx: waits with decorrelated-jitter backoff
+        - Timeouts: waits with decorrelated-jitter backoff
+        
+        Every retry spends a token from the process-wide retry budget; when the
+        budget is empty the request fails fast with 503 instead of adding load
+        to a struggling upstream.
         
         For streaming, STREAMING_READ_TIMEOUT is used for waiting between chunks.
         First token timeout is controlled separately in streaming_openai.py via asyncio.wait_for().
+
+        Each attempt counts as in-flight on the selected account, which feeds
+        the account scheduling policy. A successful streaming response keeps
+        its slot until close().
         
         Args:
             method: HTTP method (GET, POST, etc.)
@@ -195,7 +647,8 @@ class KiroHttpClient:
             httpx.Response with successful response
         
         Raises:
-            HTTPException: On failure after all attempts (502/504)
+            HTTPException: On failure after all attempts (502/504), or 503 when
+                the retry budget is exhausted
         """
         # Determine the number of retry attempts
         # FIRST_TOKEN_TIMEOUT is used in streaming_openai.py, not here
@@ -204,17 +657,29 @@ class KiroHttpClient:
         client = await self._get_client(stream=stream)
         last_error = None
         last_error_info: Optional[NetworkErrorInfo] = None
+        # A retried stream (first-token timeout) no longer uses the previous attempt
+        self._release_held_account()
+        budget = get_retry_budget()
+        budget.record_request()
+        backoff = BASE_RETRY_DELAY
         
         try:
             for attempt in range(max_retries):
+                account_key: Optional[str] = None
+                keep_account = False
                 try:
                 # Get current token
                     token = await self.auth_manager.get_access_token()
                     headers = get_kiro_headers(self.auth_manager, token)
+                    json_data = self._bind_payload_to_account(json_data)
+                    account_key = self.auth_manager.acquire_request_account()
+                    sent_at = time.monotonic()
                 
                     if stream:
                     # Prevent CLOSE_WAIT connection leak (issue #38)
-                        headers["Connection"] = "close"
+                    # Pooled clients handle this by recycling stale connections instead
+                        if not self._pooled:
+                            headers["Connection"] = "close"
                         req = client.build_request(method, url, json=json_data, headers=headers)
                         logger.debug("Sending request to Kiro API...")
                         response = await client.send(req, stream=True)
@@ -224,33 +689,76 @@ class KiroHttpClient:
                 
                 # Check status
                     if response.status_code == 200:
+                        if stream:
+                            self._held_account_key = account_key
+                            keep_account = True
+                            # Headers arrive long before the model speaks, so the account's
+                            # latency sample is taken by parse_kiro_stream at the first content event
+                            response.extensions[FIRST_TOKEN_EXTENSION] = self._first_token_recorder(
+                                account_key, sent_at
+                            )
                         return response
                 
                 # 403 - token expired, refresh and retry
                     if response.status_code == 403:
+                        self.auth_manager.record_account_status(account_key, 403)
                         logger.warning(f"Received 403, refreshing token (attempt {attempt + 1}/{MAX_RETRIES})")
+                        await self._discard_response(response)
+                        self._spend_retry(budget, attempt, max_retries, "403")
                         await self.auth_manager.force_refresh()
                         continue
                 
-                # 429 - rate limit, wait and retry
+                # 429 - rate limit: cool the account down and retry on another one
                     if response.status_code == 429:
-                        delay = BASE_RETRY_DELAY * (2 ** attempt)
-                        logger.warning(f"Received 429, waiting {delay}s (attempt {attempt + 1}/{MAX_RETRIES})")
+                        self.auth_manager.record_account_status(account_key, 429)
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if await self._is_quota_exhausted(response):
+                            cooldown, reason = ACCOUNT_QUOTA_COOLDOWN_SECONDS, "quota exhaustion"
+                        elif retry_after is not None:
+                            cooldown, reason = retry_after, "429"
+                        else:
+                            cooldown, reason = ACCOUNT_RATE_LIMIT_COOLDOWN_SECONDS, "429"
+                        await self._discard_response(response)
+                        rotated = self.auth_manager.cool_down_request_account(cooldown, reason)
+                        self._spend_retry(budget, attempt, max_retries, "429")
+                        if rotated:
+                            logger.warning(f"Received 429, retrying on another account (attempt {attempt + 1}/{max_retries})")
+                            continue
+                        backoff = decorrelated_jitter(backoff)
+                        delay = self._rate_limit_backoff(backoff, retry_after)
+                        logger.warning(f"Received 429, waiting {delay}s (attempt {attempt + 1}/{max_retries})")
                         await asyncio.sleep(delay)
                         continue
                 
                 # 5xx - server error, wait and retry
                     if 500 <= response.status_code < 600:
-                        delay = BASE_RETRY_DELAY * (2 ** attempt)
-                        logger.warning(f"Received {response.status_code}, waiting {delay}s (attempt {attempt + 1}/{MAX_RETRIES})")
+                        await self._discard_response(response)
+                        self._spend_retry(budget, attempt, max_retries, str(response.status_code))
+                        backoff = decorrelated_jitter(backoff)
+                        delay = backoff
+                        logger.warning(f"Received {response.status_code}, waiting {delay:.2f}s (attempt {attempt + 1}/{MAX_RETRIES})")
                         await asyncio.sleep(delay)
                         continue
                 
+                # Exhausted quota - rotate to another account if one is available
+                    if 400 <= response.status_code < 500 and await self._is_quota_exhausted(response):
+                        if self.auth_manager.cool_down_request_account(
+                            ACCOUNT_QUOTA_COOLDOWN_SECONDS, "quota exhaustion"
+                        ):
+                            await self._discard_response(response)
+                            self._spend_retry(budget, attempt, max_retries, "quota_exhaustion", "quota exhaustion")
+                            logger.warning(
+                                f"Received {response.status_code} (quota exhausted), retrying on another account "
+                                f"(attempt {attempt + 1}/{max_retries})"
+                            )
+                            continue
+                
                 # Other errors - return as is
                     return response
                 
                 except httpx.TimeoutException as e:
                     last_error = e
+                    self._transport_error = True
                 
                 # Classify timeout error for user-friendly messaging
                     error_info = classify_network_error(e)
@@ -260,9 +768,13 @@ class KiroHttpClient:
                     short_msg = get_short_error_message(error_info)
                 
                     if error_info.is_retryable and attempt < max_retries - 1:
-                        delay = BASE_RETRY_DELAY * (2 ** attempt)
-                        logger.warning(f"{short_msg} - waiting {delay}s (attempt {attempt + 1}/{max_retries})")
+                        self._spend_retry(budget, attempt, max_retries, error_info.category.value, short_msg)
+                        backoff = decorrelated_jitter(backoff)
+                        delay = backoff
+                        logger.warning(f"{short_msg} - waiting {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
                         await asyncio.sleep(delay)
+                        if self._pooled:
+                            client = await self._evict_pooled_client()
                     else:
                         logger.error(f"{short_msg} - no more retries (attempt {attempt + 1}/{max_retries})")
                         if not error_info.is_retryable:
@@ -270,6 +782,7 @@ class KiroHttpClient:
                 
                 except httpx.RequestError as e:
                     last_error = e
+                    self._transport_error = True
                 
                 # Classify the error for user-friendly messaging
                     error_info = classify_network_error(e)
@@ -279,13 +792,20 @@ class KiroHttpClient:
                     short_msg = get_short_error_message(error_info)
                 
                     if error_info.is_retryable and attempt < max_retries - 1:
-                        delay = BASE_RETRY_DELAY * (2 ** attempt)
-                        logger.warning(f"{short_msg} - waiting {delay}s (attempt {attempt + 1}/{max_retries})")
+                        self._spend_retry(budget, attempt, max_retries, error_info.category.value, short_msg)
+                        backoff = decorrelated_jitter(backoff)
+                        delay = backoff
+                        logger.warning(f"{short_msg} - waiting {delay:.2f}s (attempt {attempt + 1}/{max_retries})")
                         await asyncio.sleep(delay)
+                        if self._pooled:
+                            client = await self._evict_pooled_client()
                     else:
                         logger.error(f"{short_msg} - no more retries (attempt {attempt + 1}/{max_retries})")
                         if not error_info.is_retryable:
                             break  # Don't retry non-retryable errors
+                finally:
+                    if not keep_account:
+                        self.auth_manager.release_account(account_key)
         finally:
             # Clear request-scoped account selection after request lifecycle.
             self.auth_manager.clear_request_account()
@@ -321,6 +841,42 @@ class KiroHttpClient:
                     detail=f"Request failed after {max_retries} attempts. Unknown error."
                 )
     
+    def hedge_request_factory(self, method: str, url: str, json_data: dict):
+        """
+        Builds a factory for hedged streaming requests (see stream_with_first_token_retry).
+        
+        Each call opens the same request through a new KiroHttpClient that
+        shares this client's auth manager and connection settings. The
+        request-scoped account is cleared first, so in multi-account mode the
+        scheduler picks an account for the hedge (the primary's account
+        already counts one in-flight request). Runs in its own task, so the
+        cleared account does not leak into the primary request.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            json_data: Request body (profileArn is rebound to the hedge's account)
+        
+        Returns:
+            Async callable returning (response, release), where release closes
+            the hedge client.
+        """
+        async def open_hedge():
+            self.auth_manager.clear_request_account()
+            hedge_client = KiroHttpClient(
+                self.auth_manager,
+                shared_client=self._shared_client,
+                streaming_pool=self._streaming_pool,
+            )
+            try:
+                response = await hedge_client.request_with_retry(method, url, json_data, stream=True)
+            except BaseException:
+                await hedge_client.close()
+                raise
+            return response, hedge_client.close
+        
+        return open_hedge
+    
     async def __aenter__(self) -> "KiroHttpClient":
         """Async context manager support."""
         return self
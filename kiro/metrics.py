@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Prometheus-compatible metrics for the gateway hot path.
+
+Counters and histograms are recorded on every request, so recording must be
+cheaper than the work it measures. Nothing here takes a lock: each metric
+keeps one shard per thread (a plain list of numbers), writes only touch the
+calling thread's shard, and shards are summed when /metrics is scraped.
+Event-loop code therefore never contends with worker threads, and a scrape
+reads values that are at most one observation stale.
+
+Gauges describing the account pool are not updated on the hot path at all;
+the /metrics endpoint sets them from the pool right before rendering. Accounts
+are labelled with a short hash of their key rather than the key itself, so a
+scrape does not reveal which credentials the gateway holds.
+
+The text exposition format (version 0.0.4) is rendered directly, so no
+client library is needed.
+"""
+
+import hashlib
+import math
+from bisect import bisect_left
+from threading import get_ident
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets (seconds) for upstream and stream timings
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+# Buckets (seconds) for in-process CPU work such as conversion and tokenizing
+CPU_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Buckets for upstream stream sizes (bytes)
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Buckets (seconds) for database round-trips
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """Common naming, labelling and rendering for all metric types."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        """
+        Args:
+            name: Metric name (e.g. kiro_retries_total).
+            documentation: HELP text.
+            labelnames: Names of the labels every sample carries.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+
+    def labels(self, *values: str):
+        """
+        Return the child for one label combination, creating it on first use.
+
+        Args:
+            *values: Label values, in labelnames order.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            # setdefault keeps a single child if two threads race here
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _render_samples(self, lines: List[str]) -> None:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render HELP, TYPE and all samples in the text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        self._render_samples(lines)
+        return "\n".join(lines) + "\n"
+
+
+class _CounterValue:
+    """One counter series, sharded per thread."""
+
+    __slots__ = ("_shards",)
+
+    def __init__(self) -> None:
+        self._shards: Dict[int, List[float]] = {}
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add `amount` (must not be negative)."""
+        shard = self._shards.get(get_ident())
+        if shard is None:
+            shard = self._shards[get_ident()] = [0.0]
+        shard[0] += amount
+
+    def get(self) -> float:
+        """Current total across all threads."""
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = "counter"
+
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled series."""
+        self.labels().inc(amount)
+
+    def _render_samples(self, lines: List[str]) -> None:
+        for values, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}")
+
+
+class _HistogramValue:
+    """One histogram series, sharded per thread."""
+
+    __slots__ = ("_upper_bounds", "_shards")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]) -> None:
+        self._upper_bounds = upper_bounds
+        self._shards: Dict[int, List[float]] = {}
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        shard = self._shards.get(get_ident())
+        if shard is None:
+            # One slot per bucket, one for +Inf, then the running sum
+            shard = self._shards[get_ident()] = [0] * (len(self._upper_bounds) + 1) + [0.0]
+        shard[bisect_left(self._upper_bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """
+        Merge all shards.
+
+        Returns:
+            Tuple of (per-bucket counts including +Inf, sum of observations).
+        """
+        counts = [0] * (len(self._upper_bounds) + 1)
+        total = 0.0
+        for shard in list(self._shards.values()):
+            for index in range(len(counts)):
+                counts[index] += shard[index]
+            total += shard[-1]
+        return counts, total
+
+
+class Histogram(_Metric):
+    """Histogram with fixed cumulative buckets."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> None:
+        """
+        Args:
+            name: Metric name (e.g. kiro_stream_duration_seconds).
+            documentation: HELP text.
+            labelnames: Names of the labels every sample carries.
+            buckets: Bucket upper bounds; +Inf is implicit.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(bucket for bucket in buckets if bucket != math.inf))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record one observation in the unlabelled series."""
+        self.labels().observe(value)
+
+    def _render_samples(self, lines: List[str]) -> None:
+        bucket_labelnames = self.labelnames + ("le",)
+        for values, child in sorted(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(bucket_labelnames, values + (_format_value(upper_bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+class Gauge(_Metric):
+    """
+    Point-in-time values, replaced wholesale at scrape time.
+
+    Gauges are only written by the /metrics endpoint, so they are plain
+    dict assignments rather than sharded series.
+    """
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        """Set the value of one series."""
+        self._values[labelvalues] = float(value)
+
+    def replace(self, values: Dict[LabelValues, float]) -> None:
+        """Replace every series, dropping series that are no longer present."""
+        self._values = dict(values)
+
+    def _render_samples(self, lines: List[str]) -> None:
+        for values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric and return it."""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the text exposition format."""
+        return "".join(metric.render() for metric in self._metrics)
+
+
+REGISTRY = MetricsRegistry()
+
+UPSTREAM_FIRST_BYTE_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "kiro_upstream_first_byte_seconds",
+    "Time from starting to read an upstream stream to its first chunk.",
+))
+FIRST_TOKEN_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "kiro_first_token_seconds",
+    "Time from starting to read an upstream stream to its first content or thinking event.",
+))
+STREAM_DURATION_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "kiro_stream_duration_seconds",
+    "Total time spent reading an upstream stream.",
+))
+STREAM_BYTES: Histogram = REGISTRY.register(Histogram(
+    "kiro_stream_bytes",
+    "Bytes received per upstream stream.",
+    buckets=BYTE_BUCKETS,
+))
+REQUEST_CONVERSION_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "kiro_request_conversion_seconds",
+    "Time spent converting a client request into a Kiro payload.",
+    labelnames=("api",),
+    buckets=CPU_BUCKETS,
+))
+TOKENIZER_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "kiro_tokenizer_seconds",
+    "Time spent counting tokens locally.",
+    labelnames=("function",),
+    buckets=CPU_BUCKETS,
+))
+TOKENIZER_CACHE_LOOKUPS_TOTAL: Counter = REGISTRY.register(Counter(
+    "kiro_tokenizer_cache_lookups_total",
+    "Memoized token-count lookups for messages and tool definitions, by result.",
+    labelnames=("result",),
+))
+TOKEN_CORRECTION_FACTOR: Gauge = REGISTRY.register(Gauge(
+    "kiro_token_correction_factor",
+    "Fitted ratio of Kiro-reported prompt tokens to local tiktoken estimates, by API and model.",
+    labelnames=("api", "model"),
+))
+RETRIES_TOTAL: Counter = REGISTRY.register(Counter(
+    "kiro_retries_total",
+    "Upstream request retries, by cause.",
+    labelnames=("cause",),
+))
+RETRIES_REFUSED_TOTAL: Counter = REGISTRY.register(Counter(
+    "kiro_retries_refused_total",
+    "Retries refused because the retry budget was exhausted.",
+))
+AUTH_REFRESH_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "kiro_auth_refresh_seconds",
+    "Latency of access token refreshes, by result.",
+    labelnames=("result",),
+))
+MONGODB_OPERATION_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "kiro_mongodb_operation_seconds",
+    "Latency of request-path MongoDB operations including pool queueing, by operation and result.",
+    labelnames=("operation", "result"),
+    buckets=DB_BUCKETS,
+))
+ACCOUNT_IN_FLIGHT: Gauge = REGISTRY.register(Gauge(
+    "kiro_account_in_flight",
+    "Upstream calls currently in flight per account.",
+    labelnames=("account",),
+))
+ACCOUNT_QUARANTINED: Gauge = REGISTRY.register(Gauge(
+    "kiro_account_quarantined",
+    "Whether an account is currently quarantined (1) or eligible (0).",
+    labelnames=("account",),
+))
+
+
+def account_metrics_label(key: object) -> str:
+    """
+    Opaque, stable label for an account key.
+
+    The first 12 hex digits of the key's SHA-256. /admin/accounts reports the
+    same value per account so operators can map a series back to an account.
+    """
+    return hashlib.sha256(str(key).encode("utf-8")).hexdigest()[:12]
+
+
+def update_account_gauges(accounts: Iterable[Dict[str, object]]) -> None:
+    """
+    Refresh the per-account gauges from an account snapshot.
+
+    Args:
+        accounts: Rows from KiroAuthManager.account_snapshot().
+    """
+    in_flight: Dict[LabelValues, float] = {}
+    quarantined: Dict[LabelValues, float] = {}
+    for account in accounts:
+        labels = (account_metrics_label(account["key"]),)
+        in_flight[labels] = float(account["in_flight"])
+        quarantined[labels] = 1.0 if account["quarantined"] else 0.0
+    ACCOUNT_IN_FLIGHT.replace(in_flight)
+    ACCOUNT_QUARANTINED.replace(quarantined)
+
+
+def render_metrics(registry: Optional[MetricsRegistry] = None) -> str:
+    """Render the process-wide (or the given) registry."""
+    return (registry or REGISTRY).render()
@@ -285,6 +285,29 @@ class AnthropicMessagesRequest(BaseModel):
     model_config = {"extra": "allow"}
 
 
+class AnthropicCountTokensRequest(BaseModel):
+    """
+    Request to Anthropic Token Counting API (/v1/messages/count_tokens).
+
+    Same shape as a Messages request without max_tokens or sampling parameters.
+
+    Attributes:
+        model: Model ID (e.g., "claude-sonnet-4-5")
+        messages: List of conversation messages
+        system: System prompt (optional, string or list of content blocks)
+        tools: List of available tools
+        tool_choice: Tool selection strategy
+    """
+
+    model: str
+    messages: List[AnthropicMessage] = Field(min_length=1)
+    system: Optional[SystemPrompt] = None
+    tools: Optional[List[AnthropicTool]] = None
+    tool_choice: Optional[Union[ToolChoice, Dict[str, Any]]] = None
+
+    model_config = {"extra": "allow"}
+
+
 # ==================================================================================================
 # Response Models
 # ==================================================================================================
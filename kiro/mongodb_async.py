@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Async access to the request-path MongoDB helpers.
+
+The helpers in kiro/mongodb_store.py use synchronous pymongo. Calling them
+from a route or a streaming generator blocks the event loop, so one slow
+MongoDB round-trip stalls every stream served by the worker.
+
+AsyncMongoStore runs those helpers on a bounded thread pool sized like the
+pymongo connection pool and gives every operation a deadline:
+
+- the caller stops waiting when the deadline passes (MongoStoreTimeoutError);
+- the same deadline is applied to the pymongo call with pymongo.timeout(),
+  so a late operation is aborted by the driver instead of holding a thread;
+- an operation still queued when its caller gave up is never started.
+
+Latency (including time queued for a thread) is recorded per operation in
+kiro_mongodb_operation_seconds.
+"""
+
+import asyncio
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from kiro.config import (
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_READ_TIMEOUT_SECONDS,
+    MONGODB_WRITE_TIMEOUT_SECONDS,
+)
+from kiro.metrics import MONGODB_OPERATION_SECONDS
+from kiro.mongodb_store import MongoStoreTimeoutError
+from kiro.services import services
+
+try:
+    from pymongo import timeout as _pymongo_timeout
+except ImportError:  # pragma: no cover - exercised only when dependency missing
+    _pymongo_timeout = None
+
+
+T = TypeVar("T")
+
+
+def _run_before_deadline(deadline: float, func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a blocking MongoDB helper with the time left until the deadline (worker thread).
+
+    Raises:
+        MongoStoreTimeoutError: If the deadline passed while the call was queued.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise MongoStoreTimeoutError("MongoDB operation expired before it started")
+    guard = _pymongo_timeout(remaining) if _pymongo_timeout is not None else contextlib.nullcontext()
+    with guard:
+        return func(*args)
+
+
+class AsyncMongoStore:
+    """
+    Bounded thread pool with deadlines for blocking MongoDB helpers.
+
+    Example:
+        >>> store = get_async_mongo_store()
+        >>> user_doc = await store.run("find_user", find_active_user_by_api_key, api_key)
+        >>> ok = await store.run("deduct_credits", deduct_credits_atomic, user_id, amount, write=True)
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MONGODB_MAX_POOL_SIZE,
+        read_timeout: float = MONGODB_READ_TIMEOUT_SECONDS,
+        write_timeout: float = MONGODB_WRITE_TIMEOUT_SECONDS,
+    ) -> None:
+        """
+        Args:
+            max_workers: Threads running MongoDB calls (match the pymongo maxPoolSize).
+            read_timeout: Default deadline in seconds for reads.
+            write_timeout: Default deadline in seconds for writes.
+        """
+        self._max_workers = max_workers
+        self._read_timeout = read_timeout
+        self._write_timeout = write_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(
+        self,
+        operation: str,
+        func: Callable[..., T],
+        *args: Any,
+        write: bool = False,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        Run a blocking MongoDB helper off the event loop.
+
+        Args:
+            operation: Operation name for metrics (e.g. "find_user").
+            func: Blocking helper from kiro/mongodb_store.py.
+            *args: Arguments for func.
+            write: Use the write deadline instead of the read deadline.
+            timeout: Explicit deadline in seconds (overrides the defaults).
+
+        Returns:
+            Whatever func returns.
+
+        Raises:
+            MongoStoreTimeoutError: If the operation misses its deadline. A
+                write that timed out may still have been applied.
+            Exception: Whatever func raises.
+        """
+        if timeout is None:
+            timeout = self._write_timeout if write else self._read_timeout
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="mongodb")
+
+        started = time.monotonic()
+        result = "error"
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, _run_before_deadline, started + timeout, func, *args)
+            try:
+                value = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise MongoStoreTimeoutError(f"MongoDB {operation} timed out after {timeout:.2f}s") from None
+            result = "ok"
+            return value
+        except MongoStoreTimeoutError:
+            result = "timeout"
+            raise
+        finally:
+            MONGODB_OPERATION_SECONDS.labels(operation, result).observe(time.monotonic() - started)
+
+    def close(self) -> None:
+        """Stop accepting operations; running ones finish on their threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+services.register("async_mongo_store", AsyncMongoStore, discard=AsyncMongoStore.close)
+
+
+def get_async_mongo_store() -> AsyncMongoStore:
+    """Return the process-wide async MongoDB store (see kiro/services.py)."""
+    return services.get("async_mongo_store")
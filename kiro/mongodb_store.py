@@ -6,13 +6,15 @@ MongoDB data access helpers for API-key auth and credit billing.
 
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from loguru import logger
 
 from kiro.config import (
     MONGODB_URI,
+    MONGODB_MAX_POOL_SIZE,
     MONGODB_DB_NAME,
     MONGODB_USERS_COLLECTION,
     MONGODB_CREDITS_COLLECTION,
@@ -21,13 +23,16 @@ from kiro.config import (
     MONGODB_USER_ACTIVE_FIELD,
     MONGODB_CREDITS_USER_ID_FIELD,
     MONGODB_CREDITS_BALANCE_FIELD,
+    MONGODB_CREDITS_APPLIED_FIELD,
+    MONGODB_CREDITS_APPLIED_KEEP,
 )
 
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, UpdateOne
     from pymongo.errors import PyMongoError as MongoPyError
 except ImportError:  # pragma: no cover - exercised only when dependency missing
     MongoClient = None  # type: ignore[assignment]
+    UpdateOne = None  # type: ignore[assignment]
 
     class MongoPyError(RuntimeError):
         """Fallback Mongo error type when pymongo is unavailable."""
@@ -40,6 +45,10 @@ class MongoStoreUnavailableError(RuntimeError):
     """Raised when MongoDB operations fail due to connectivity or server issues."""
 
 
+class MongoStoreTimeoutError(MongoStoreUnavailableError):
+    """Raised when a MongoDB operation misses its deadline."""
+
+
 def _require_mongodb_dependency() -> None:
     """
     Ensure pymongo dependency is available before DB operations.
@@ -73,7 +82,7 @@ def _get_client() -> Any:
         client_factory = MongoClient
         if client_factory is None:
             raise RuntimeError("MongoDB mode requires 'pymongo'. Install dependencies from requirements.txt.")
-        _mongo_client = client_factory(MONGODB_URI)
+        _mongo_client = client_factory(MONGODB_URI, maxPoolSize=MONGODB_MAX_POOL_SIZE)
 
     return _mongo_client
 
@@ -134,6 +143,27 @@ def find_active_user_by_api_key(api_key: str) -> Optional[Dict[str, Any]]:
         raise MongoStoreUnavailableError("MongoDB user lookup failed") from exc
 
 
+def open_users_change_stream() -> Any:
+    """
+    Open a change stream on the users collection (blocking).
+
+    Insert and update events carry the current document (updateLookup), so
+    a newly valid API key can be found from the event itself.
+
+    Returns:
+        pymongo change stream; iterate it with try_next() and close it when done.
+
+    Raises:
+        MongoStoreUnavailableError: If the stream cannot be opened (e.g. no replica set).
+    """
+    try:
+        users = _get_collection(MONGODB_USERS_COLLECTION)
+        return users.watch(full_document="updateLookup", max_await_time_ms=1000)
+    except MongoPyError as exc:
+        logger.error(f"MongoDB users change stream failed to open: {exc}")
+        raise MongoStoreUnavailableError("MongoDB users change stream failed to open") from exc
+
+
 def get_user_id_from_doc(user_doc: Dict[str, Any]) -> Any:
     """
     Extract user identifier from user document.
@@ -222,3 +252,141 @@ def deduct_credits_atomic(user_id: Any, amount: Decimal) -> bool:
     except MongoPyError as exc:
         logger.error(f"MongoDB atomic credit deduction failed: {exc}")
         return False
+
+
+
+@dataclass
+class CreditChargeResult:
+    """
+    Outcome of apply_credit_charges(), per charge.
+
+    Attributes:
+        applied: Charges deducted by this call.
+        duplicates: Charges whose request ID was already applied (retries and replays).
+        missing: Charges not known to be applied, e.g. for users without a
+                 credits document (nothing deducted).
+    """
+
+    applied: List[Any] = field(default_factory=list)
+    duplicates: List[Any] = field(default_factory=list)
+    missing: List[Any] = field(default_factory=list)
+
+
+def _recheck_unmatched_charges(credits_collection: Any, result: CreditChargeResult) -> None:
+    """
+    Re-read the credits documents after a bulk write that matched fewer charges than it sent.
+
+    The write result does not say which updates matched nothing. A charge
+    whose request ID is now in its document was applied once (by this write
+    or elsewhere) and is moved to duplicates, so the caller re-reads the
+    balance instead of subtracting it; any other charge is moved to missing
+    and stays unacknowledged.
+    """
+    applied_ids: Dict[Any, set] = {
+        doc[MONGODB_CREDITS_USER_ID_FIELD]: set(doc.get(MONGODB_CREDITS_APPLIED_FIELD) or ())
+        for doc in credits_collection.find(
+            {MONGODB_CREDITS_USER_ID_FIELD: {"$in": list({charge.user_id for charge in result.applied})}},
+            {MONGODB_CREDITS_USER_ID_FIELD: 1, MONGODB_CREDITS_APPLIED_FIELD: 1, "_id": 0},
+        )
+    }
+    for charge in result.applied:
+        if charge.request_id in applied_ids.get(charge.user_id, ()):
+            result.duplicates.append(charge)
+        else:
+            result.missing.append(charge)
+    result.applied = []
+
+
+def apply_credit_charges(charges: Iterable[Any]) -> Optional[CreditChargeResult]:
+    """
+    Deduct settled charges in one unordered bulk write, at most once per request ID.
+
+    Each charge is a conditional $inc that only matches while its request ID
+    is absent from the credits document's MONGODB_CREDITS_APPLIED_FIELD list;
+    the same update pushes the ID (keeping the last MONGODB_CREDITS_APPLIED_KEEP).
+    Retrying a batch, or replaying a journal after a crash, therefore never
+    charges a request twice while its ID is still in that list. Unlike
+    deduct_credits_atomic no sufficient balance is required: the charges are
+    for usage that already happened.
+
+    The credits documents of the batch are read first, so charges that were
+    already applied and charges for users without a credits document are
+    reported separately instead of silently matching nothing. If the write
+    still matches fewer charges than it sent, the documents are read again
+    and no charge of the batch is reported as applied by this call.
+
+    Args:
+        charges: Objects with request_id, user_id and amount (ChargeRecord).
+
+    Returns:
+        CreditChargeResult, or None on MongoDB errors (nothing is known to be applied).
+    """
+    result = CreditChargeResult()
+    charges = [charge for charge in charges if charge.amount > Decimal("0")]
+    if not charges:
+        return result
+
+    try:
+        credits_collection = _get_collection(MONGODB_CREDITS_COLLECTION)
+        applied_ids: Dict[Any, set] = {
+            doc[MONGODB_CREDITS_USER_ID_FIELD]: set(doc.get(MONGODB_CREDITS_APPLIED_FIELD) or ())
+            for doc in credits_collection.find(
+                {MONGODB_CREDITS_USER_ID_FIELD: {"$in": list({charge.user_id for charge in charges})}},
+                {MONGODB_CREDITS_USER_ID_FIELD: 1, MONGODB_CREDITS_APPLIED_FIELD: 1, "_id": 0},
+            )
+        }
+        for charge in charges:
+            if charge.user_id not in applied_ids:
+                result.missing.append(charge)
+            elif charge.request_id in applied_ids[charge.user_id]:
+                result.duplicates.append(charge)
+            else:
+                result.applied.append(charge)
+                # A second charge with the same ID in this batch is a duplicate too
+                applied_ids[charge.user_id].add(charge.request_id)
+
+        if result.applied:
+            write_result = credits_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {
+                            MONGODB_CREDITS_USER_ID_FIELD: charge.user_id,
+                            MONGODB_CREDITS_APPLIED_FIELD: {"$ne": charge.request_id},
+                        },
+                        {
+                            "$inc": {MONGODB_CREDITS_BALANCE_FIELD: -float(charge.amount)},
+                            "$push": {
+                                MONGODB_CREDITS_APPLIED_FIELD: {
+                                    "$each": [charge.request_id],
+                                    "$slice": -MONGODB_CREDITS_APPLIED_KEEP,
+                                }
+                            },
+                        },
+                    )
+                    for charge in result.applied
+                ],
+                ordered=False,
+            )
+            if write_result.matched_count < len(result.applied):
+                # A credits document was deleted, or a charge applied elsewhere, since the read
+                logger.error(
+                    f"MongoDB credit deduction matched {write_result.matched_count} of "
+                    f"{len(result.applied)} charge(s): "
+                    f"{', '.join(str(charge.request_id) for charge in result.applied)}"
+                )
+                _recheck_unmatched_charges(credits_collection, result)
+    except MongoPyError as exc:
+        logger.error(f"MongoDB bulk credit deduction failed: {exc}")
+        return None
+
+    if result.missing:
+        logger.error(
+            f"No credits document for {len(result.missing)} charge(s), not deducted: "
+            f"{', '.join(f'{charge.request_id} (user {charge.user_id})' for charge in result.missing)}"
+        )
+    if result.duplicates:
+        logger.warning(
+            f"Skipped {len(result.duplicates)} already applied charge(s): "
+            f"{', '.join(str(charge.request_id) for charge in result.duplicates)}"
+        )
+    return result
@@ -27,15 +27,106 @@ Contains classes and functions for:
 - Content deduplication
 """
 
+import codecs
 import json
 import re
-from typing import Any, Dict, List, Optional
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
 
 from loguru import logger
 
 from kiro.utils import generate_tool_call_id
 
 
+# AWS event-stream framing (application/vnd.amazon.eventstream):
+# [total_length:4][headers_length:4][prelude_crc:4][headers][payload][message_crc:4]
+EVENT_STREAM_PRELUDE_LENGTH = 12
+EVENT_STREAM_MESSAGE_CRC_LENGTH = 4
+EVENT_STREAM_MIN_MESSAGE_LENGTH = EVENT_STREAM_PRELUDE_LENGTH + EVENT_STREAM_MESSAGE_CRC_LENGTH
+
+# Upper bound for a single frame - protects against treating garbage as a huge length
+EVENT_STREAM_MAX_MESSAGE_LENGTH = 16 * 1024 * 1024
+
+_PRELUDE_STRUCT = struct.Struct(">III")
+
+# Fixed-size header value types: type_id -> value length in bytes
+_FIXED_HEADER_VALUE_LENGTHS = {
+    0: 0,   # bool true
+    1: 0,   # bool false
+    2: 1,   # byte
+    3: 2,   # short
+    4: 4,   # integer
+    5: 8,   # long
+    8: 8,   # timestamp
+    9: 16,  # uuid
+}
+
+
+class EventStreamFrameError(ValueError):
+    """Raised when a binary event-stream frame is malformed (bad length or CRC)."""
+
+
+def parse_event_stream_headers(data: bytes, start: int, end: int) -> Dict[str, Any]:
+    """
+    Parses the headers section of a binary event-stream frame.
+    
+    Only string (type 7) and byte-array (type 6) values are decoded,
+    other types are skipped by their fixed length - Kiro only sends
+    string headers (:message-type, :event-type, :content-type).
+    
+    Args:
+        data: Buffer containing the frame
+        start: Offset of the first header byte
+        end: Offset right after the last header byte
+    
+    Returns:
+        Dictionary of header name -> value
+    
+    Raises:
+        EventStreamFrameError: If headers section is malformed
+    
+    Example:
+        >>> raw = b'\x0b:event-type\x07\x00\x05hello'
+        >>> parse_event_stream_headers(raw, 0, len(raw))
+        {':event-type': 'hello'}
+    """
+    headers: Dict[str, Any] = {}
+    pos = start
+    
+    while pos < end:
+        name_length = data[pos]
+        pos += 1
+        name = bytes(data[pos:pos + name_length]).decode('utf-8', errors='replace')
+        pos += name_length
+        if pos >= end:
+            raise EventStreamFrameError(f"Header '{name}' has no value type")
+        
+        value_type = data[pos]
+        pos += 1
+        
+        if value_type in (6, 7):
+            if pos + 2 > end:
+                raise EventStreamFrameError(f"Header '{name}' value length is truncated")
+            value_length = (data[pos] << 8) | data[pos + 1]
+            pos += 2
+            raw_value = bytes(data[pos:pos + value_length])
+            pos += value_length
+            headers[name] = raw_value.decode('utf-8', errors='replace') if value_type == 7 else raw_value
+        elif value_type in _FIXED_HEADER_VALUE_LENGTHS:
+            value_length = _FIXED_HEADER_VALUE_LENGTHS[value_type]
+            if value_type in (0, 1):
+                headers[name] = value_type == 0
+            pos += value_length
+        else:
+            raise EventStreamFrameError(f"Unknown header value type {value_type} for '{name}'")
+    
+    if pos != end:
+        raise EventStreamFrameError("Headers section length mismatch")
+    
+    return headers
+
+
 def find_matching_brace(text: str, start_pos: int) -> int:
     """
     Finds the position of the closing brace considering nesting and strings.
@@ -212,8 +303,14 @@ class AwsEventStreamParser:
     """
     Parser for AWS Event Stream format.
     
-    AWS returns events in binary format with :message-type...event delimiters.
-    This class extracts JSON events from the stream and converts them to a convenient format.
+    Kiro returns application/vnd.amazon.eventstream - binary frames with a
+    length-prefixed prelude, typed headers, a JSON payload and CRC32 checksums.
+    Frames are decoded from a bytearray with an offset cursor and dispatched on
+    the :event-type header, so long responses are parsed in linear time and
+    multibyte UTF-8 characters split across chunks are never lost.
+    
+    If the stream does not look like binary framing (or a frame fails its CRC),
+    the parser falls back to scanning decoded text for known JSON prefixes.
     
     Supported event types:
     - content: Text content of response
@@ -224,7 +321,7 @@ class AwsEventStreamParser:
     - context_usage: Context usage percentage
     
     Attributes:
-        buffer: Buffer for accumulating data
+        buffer: Text buffer used by the fallback scanner
         last_content: Last processed content (for deduplication)
         current_tool_call: Current incomplete tool call
         tool_calls: List of completed tool calls
@@ -237,7 +334,7 @@ class AwsEventStreamParser:
         ...         print(event["data"])
     """
     
-    # Patterns for finding JSON events
+    # Patterns for finding JSON events (text fallback)
     EVENT_PATTERNS = [
         ('{"content":', 'content'),
         ('{"name":', 'tool_start'),
@@ -248,12 +345,39 @@ class AwsEventStreamParser:
         ('{"contextUsagePercentage":', 'context_usage'),
     ]
     
+    # :event-type header -> internal event type (binary framing)
+    EVENT_TYPE_MAP = {
+        'assistantResponseEvent': 'content',
+        'toolUseEvent': 'tool_use',
+        'meteringEvent': 'usage',
+        'contextUsageEvent': 'context_usage',
+        'followupPromptEvent': 'followup',
+    }
+    
+    # Streaming state of the current tool call (see _advance_tool_stream)
+    TOOL_HELD = "held"
+    TOOL_STREAMING = "streaming"
+    TOOL_SILENT = "silent"
+    
+    # Framing modes
+    MODE_UNKNOWN = "unknown"
+    MODE_BINARY = "binary"
+    MODE_TEXT = "text"
+    
     def __init__(self):
         """Initializes the parser."""
         self.buffer = ""
         self.last_content: Optional[str] = None  # For deduplicating repeating content
         self.current_tool_call: Optional[Dict[str, Any]] = None
         self.tool_calls: List[Dict[str, Any]] = []
+        self._streamed_tool_ids: set = set()
+        self._finished_tool_inputs: List[Tuple[str, str]] = []  # (name, raw arguments)
+        self._current_tool_state = self.TOOL_HELD
+        
+        self._mode: str = self.MODE_UNKNOWN
+        self._frame_buffer = bytearray()
+        self._frame_offset = 0
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
     
     def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
         """
@@ -265,8 +389,231 @@ class AwsEventStreamParser:
         Returns:
             List of events in {"type": str, "data": Any} format
         """
+        if not chunk:
+            return []
+        
+        if self._mode == self.MODE_TEXT:
+            return self._feed_text(chunk)
+        
+        self._frame_buffer += chunk
+        
+        if self._mode == self.MODE_UNKNOWN:
+            detected = self._detect_mode()
+            if detected is None:
+                # Not enough bytes to decide yet
+                return []
+            if detected == self.MODE_TEXT:
+                return self._switch_to_text()
+        
+        return self._feed_binary()
+    
+    def _detect_mode(self) -> Optional[str]:
+        """
+        Decides whether the stream uses binary framing.
+        
+        A binary frame starts with a big-endian total length, so its first byte
+        is 0 for any realistic frame size, and the prelude CRC must match.
+        
+        Returns:
+            MODE_BINARY, MODE_TEXT, or None if more bytes are needed
+        """
+        buf = self._frame_buffer
+        if buf[0] != 0:
+            self._mode = self.MODE_TEXT
+            return self._mode
+        if len(buf) < EVENT_STREAM_PRELUDE_LENGTH:
+            return None
+        
+        total_length, headers_length, prelude_crc = _PRELUDE_STRUCT.unpack_from(buf, 0)
+        if (
+            zlib.crc32(buf[:8]) == prelude_crc
+            and EVENT_STREAM_MIN_MESSAGE_LENGTH <= total_length <= EVENT_STREAM_MAX_MESSAGE_LENGTH
+            and headers_length <= total_length - EVENT_STREAM_MIN_MESSAGE_LENGTH
+        ):
+            self._mode = self.MODE_BINARY
+        else:
+            self._mode = self.MODE_TEXT
+        return self._mode
+    
+    def _switch_to_text(self) -> List[Dict[str, Any]]:
+        """Moves undecoded binary bytes into the text fallback scanner."""
+        if self._mode != self.MODE_TEXT:
+            logger.warning("Event-stream framing lost, falling back to text scanning")
+            self._mode = self.MODE_TEXT
+        remaining = bytes(self._frame_buffer[self._frame_offset:])
+        self._frame_buffer = bytearray()
+        self._frame_offset = 0
+        return self._feed_text(remaining)
+    
+    def _feed_binary(self) -> List[Dict[str, Any]]:
+        """
+        Decodes all complete binary frames in the buffer.
+        
+        Returns:
+            List of parsed events
+        """
+        events: List[Dict[str, Any]] = []
+        buf = self._frame_buffer
+        
+        while True:
+            try:
+                frame = self._next_frame()
+            except EventStreamFrameError as e:
+                logger.warning(f"Malformed event-stream frame: {e}")
+                events.extend(self._switch_to_text())
+                return events
+            
+            if frame is None:
+                break
+            
+            headers, payload = frame
+            event = self._process_frame(headers, payload)
+            if event:
+                events.append(event)
+        
+        # Compact consumed bytes once they dominate the buffer (amortized O(n))
+        if self._frame_offset and self._frame_offset * 2 >= len(buf):
+            del buf[:self._frame_offset]
+            self._frame_offset = 0
+        
+        return events
+    
+    def _next_frame(self) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """
+        Reads the next complete frame at the cursor.
+        
+        Returns:
+            Tuple of (headers, payload) or None if the frame is incomplete
+        
+        Raises:
+            EventStreamFrameError: On invalid lengths or CRC mismatch
+        """
+        buf = self._frame_buffer
+        start = self._frame_offset
+        available = len(buf) - start
+        if available < EVENT_STREAM_PRELUDE_LENGTH:
+            return None
+        
+        total_length, headers_length, prelude_crc = _PRELUDE_STRUCT.unpack_from(buf, start)
+        if zlib.crc32(buf[start:start + 8]) != prelude_crc:
+            raise EventStreamFrameError("prelude CRC mismatch")
+        if not EVENT_STREAM_MIN_MESSAGE_LENGTH <= total_length <= EVENT_STREAM_MAX_MESSAGE_LENGTH:
+            raise EventStreamFrameError(f"invalid frame length {total_length}")
+        if headers_length > total_length - EVENT_STREAM_MIN_MESSAGE_LENGTH:
+            raise EventStreamFrameError(f"invalid headers length {headers_length}")
+        if available < total_length:
+            return None
+        
+        end = start + total_length
+        message_crc = int.from_bytes(buf[end - 4:end], 'big')
+        if zlib.crc32(buf[start:end - 4]) != message_crc:
+            raise EventStreamFrameError("message CRC mismatch")
+        
+        headers_start = start + EVENT_STREAM_PRELUDE_LENGTH
+        payload_start = headers_start + headers_length
+        headers = parse_event_stream_headers(buf, headers_start, payload_start)
+        payload = bytes(buf[payload_start:end - 4])
+        
+        self._frame_offset = end
+        return headers, payload
+    
+    def _process_frame(self, headers: Dict[str, Any], payload: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Dispatches a decoded frame on its :event-type header.
+        
+        Args:
+            headers: Frame headers
+            payload: Raw JSON payload
+        
+        Returns:
+            Processed event or None
+        """
+        message_type = headers.get(':message-type', 'event')
+        if message_type != 'event':
+            error_type = headers.get(':exception-type') or headers.get(':error-code') or message_type
+            logger.warning(
+                f"Kiro stream {message_type} frame: {error_type} - "
+                f"{payload[:200].decode('utf-8', errors='replace')}"
+            )
+            return None
+        
+        if not payload:
+            return None
+        
         try:
-            self.buffer += chunk.decode('utf-8', errors='ignore')
+            data = json.loads(payload)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            logger.warning(f"Failed to parse event payload: {payload[:100]!r}")
+            return None
+        
+        if not isinstance(data, dict):
+            return None
+        
+        event_type = self.EVENT_TYPE_MAP.get(headers.get(':event-type', ''))
+        if event_type is None:
+            event_type = self._classify_payload(data)
+            if event_type is None:
+                logger.debug(f"Skipping unknown event type: {headers.get(':event-type')}")
+                return None
+        
+        if event_type == 'tool_use':
+            return self._process_tool_use_event(data)
+        if event_type == 'followup':
+            return None
+        return self._process_event(data, event_type)
+    
+    @staticmethod
+    def _classify_payload(data: dict) -> Optional[str]:
+        """Classifies a payload without a known :event-type by its keys."""
+        if 'content' in data:
+            return 'content'
+        if 'toolUseId' in data or 'name' in data or 'input' in data or 'stop' in data:
+            return 'tool_use'
+        if 'usage' in data:
+            return 'usage'
+        if 'contextUsagePercentage' in data:
+            return 'context_usage'
+        return None
+    
+    def _process_tool_use_event(self, data: dict) -> Optional[Dict[str, Any]]:
+        """
+        Processes a framed toolUseEvent.
+        
+        Every fragment of one tool call carries the same toolUseId, so a new id
+        starts a new call and the same id continues the current one.
+        """
+        tool_use_id = data.get('toolUseId')
+        current = self.current_tool_call
+        
+        if current is None or (tool_use_id and tool_use_id != current.get('id')):
+            if 'name' in data or tool_use_id:
+                return self._process_tool_start_event(data)
+            return None
+        
+        event = None
+        if data.get('input'):
+            event = self._process_tool_input_event(data)
+        if data.get('stop'):
+            stop_event = self._process_tool_stop_event(data)
+            if event is None:
+                event = stop_event
+            elif stop_event:
+                # Input and stop in one frame - report the fragment, stop is implied
+                event["data"]["stop"] = True
+        return event
+    
+    def _feed_text(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """
+        Text fallback: scans decoded text for known JSON prefixes.
+        
+        Args:
+            chunk: Bytes of data from stream
+        
+        Returns:
+            List of parsed events
+        """
+        try:
+            self.buffer += self._text_decoder.decode(chunk)
         except Exception:
             return []
         
@@ -348,7 +695,12 @@ class AwsEventStreamParser:
         return {"type": "content", "data": content}
     
     def _process_tool_start_event(self, data: dict) -> Optional[Dict[str, Any]]:
-        """Processes tool call start."""
+        """
+        Processes tool call start.
+        
+        Every call is collected for get_tool_calls(); whether it is also
+        reported for incremental forwarding is decided by _advance_tool_stream.
+        """
         # Finalize previous tool call if exists
         if self.current_tool_call:
             self._finalize_tool_call()
@@ -360,8 +712,9 @@ class AwsEventStreamParser:
         else:
             input_str = str(input_data) if input_data else ''
         
+        tool_id = data.get('toolUseId', generate_tool_call_id())
         self.current_tool_call = {
-            "id": data.get('toolUseId', generate_tool_call_id()),
+            "id": tool_id,
             "type": "function",
             "function": {
                 "name": data.get('name', ''),
@@ -369,10 +722,14 @@ class AwsEventStreamParser:
             }
         }
         
-        if data.get('stop'):
-            self._finalize_tool_call()
+        # Kiro sometimes re-sends a tool call; one already forwarded with input is not forwarded again
+        self._current_tool_state = self.TOOL_SILENT if tool_id in self._streamed_tool_ids else self.TOOL_HELD
         
-        return None
+        stop = bool(data.get('stop'))
+        event = self._advance_tool_stream(input_str, stop)
+        if stop:
+            self._finalize_tool_call()
+        return event
     
     def _process_tool_input_event(self, data: dict) -> Optional[Dict[str, Any]]:
         """Processes input continuation for tool call."""
@@ -384,12 +741,63 @@ class AwsEventStreamParser:
             else:
                 input_str = str(input_data) if input_data else ''
             self.current_tool_call['function']['arguments'] += input_str
+            if input_str:
+                return self._advance_tool_stream(input_str, False)
         return None
     
     def _process_tool_stop_event(self, data: dict) -> Optional[Dict[str, Any]]:
         """Processes tool call end."""
         if self.current_tool_call and data.get('stop'):
+            event = self._advance_tool_stream('', True)
             self._finalize_tool_call()
+            return event
+        return None
+    
+    def _advance_tool_stream(self, input_str: str, stop: bool) -> Optional[Dict[str, Any]]:
+        """
+        Decides what to report for the current tool call after new input or a stop.
+        
+        A call is held until its input is non-empty and is no longer a prefix
+        of an earlier call with the same name; only then is it reported
+        (tool_start carrying all input so far), followed by tool_input and
+        tool_stop events. Calls that never leave the held state (no input,
+        or a duplicate of an earlier call under a new id) are only collected,
+        so callers emit them from the deduplicated, normalized get_tool_calls().
+        
+        Args:
+            input_str: Input fragment that just arrived ('' for none)
+            stop: Whether the call just ended
+        
+        Returns:
+            tool_start, tool_input or tool_stop event, or None
+        """
+        tool = self.current_tool_call
+        tool_id = tool['id']
+        
+        if self._current_tool_state == self.TOOL_HELD:
+            name = tool['function'].get('name', '')
+            arguments = tool['function']['arguments']
+            if not arguments or any(
+                previous_name == name and previous.startswith(arguments)
+                for previous_name, previous in self._finished_tool_inputs
+            ):
+                return None
+            self._current_tool_state = self.TOOL_STREAMING
+            self._streamed_tool_ids.add(tool_id)
+            return {
+                "type": "tool_start",
+                "data": {"id": tool_id, "name": name, "input": arguments, "stop": stop}
+            }
+        
+        if self._current_tool_state != self.TOOL_STREAMING:
+            return None
+        if input_str:
+            event = {"type": "tool_input", "data": {"id": tool_id, "input": input_str}}
+            if stop:
+                event["data"]["stop"] = True
+            return event
+        if stop:
+            return {"type": "tool_stop", "data": {"id": tool_id}}
         return None
     
     def _finalize_tool_call(self) -> None:
@@ -400,6 +808,8 @@ class AwsEventStreamParser:
         # Try to parse and normalize arguments as JSON
         args = self.current_tool_call['function']['arguments']
         tool_name = self.current_tool_call['function'].get('name', 'unknown')
+        self._finished_tool_inputs.append((self.current_tool_call['function'].get('name', ''), args))
+        self._current_tool_state = self.TOOL_HELD
         
         logger.debug(f"Finalizing tool call '{tool_name}' with raw arguments: {repr(args)[:200]}")
         
@@ -557,4 +967,11 @@ class AwsEventStreamParser:
         self.buffer = ""
         self.last_content = None
         self.current_tool_call = None
-        self.tool_calls = []
\ No newline at end of file
+        self.tool_calls = []
+        self._streamed_tool_ids = set()
+        self._finished_tool_inputs = []
+        self._current_tool_state = self.TOOL_HELD
+        self._mode = self.MODE_UNKNOWN
+        self._frame_buffer = bytearray()
+        self._frame_offset = 0
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
\ No newline at end of file
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Process-wide retry budget and backoff jitter.
+
+Without a budget every request retries independently, so an upstream
+brownout turns N requests into N * MAX_RETRIES upstream calls arriving in
+lock-step waves. The budget is a token bucket shared by all requests:
+
+- every new upstream request deposits RETRY_BUDGET_RATIO tokens;
+- the bucket also refills at RETRY_BUDGET_MIN_PER_SECOND, so a quiet
+  gateway can still retry;
+- every retry withdraws one token; with an empty bucket the retry is
+  refused and the caller fails fast with 503.
+
+Retries are therefore limited to roughly RETRY_BUDGET_RATIO of request
+volume (plus a small floor), up to RETRY_BUDGET_BURST saved-up retries.
+
+decorrelated_jitter() spreads retry delays so clients that failed together
+do not retry together.
+"""
+
+import random
+import time
+from typing import Callable, Optional
+
+from kiro.config import (
+    BASE_RETRY_DELAY,
+    RETRY_BUDGET_BURST,
+    RETRY_BUDGET_ENABLED,
+    RETRY_BUDGET_MIN_PER_SECOND,
+    RETRY_BUDGET_RATIO,
+    RETRY_MAX_DELAY,
+)
+from kiro.services import services
+
+# Message used for 503 responses when the budget refuses a retry
+RETRY_BUDGET_EXHAUSTED_MESSAGE = (
+    "Upstream is failing and the gateway retry budget is exhausted. "
+    "Please try again shortly."
+)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of request volume.
+
+    All methods are synchronous and never await, so the bucket is updated
+    atomically on the event loop.
+    """
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+        burst: float = RETRY_BUDGET_BURST,
+        enabled: bool = RETRY_BUDGET_ENABLED,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            ratio: Tokens deposited per request (retries allowed per request).
+            min_per_second: Tokens added per second regardless of traffic.
+            burst: Bucket capacity; the bucket starts full.
+            enabled: When False, every retry is allowed.
+            clock: Monotonic time source (seconds).
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.burst = max(burst, 1.0)
+        self.enabled = enabled
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.min_per_second)
+
+    @property
+    def tokens(self) -> float:
+        """Currently available retry tokens."""
+        self._refill()
+        return self._tokens
+
+    def record_request(self) -> None:
+        """Deposit the per-request share of retry tokens."""
+        self._refill()
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """
+        Withdraw one token for a retry.
+
+        Returns:
+            True if the retry may proceed, False if the budget is exhausted.
+        """
+        if not self.enabled:
+            return True
+        self._refill()
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+def decorrelated_jitter(
+    previous_delay: float,
+    base: float = BASE_RETRY_DELAY,
+    cap: float = RETRY_MAX_DELAY,
+    rng: Optional[random.Random] = None,
+) -> float:
+    """
+    Next backoff delay using "decorrelated jitter".
+
+    delay = min(cap, uniform(base, previous_delay * 3))
+
+    Args:
+        previous_delay: Delay used for the previous retry (base for the first).
+        base: Minimum delay.
+        cap: Maximum delay.
+        rng: Optional random source (for tests).
+
+    Returns:
+        Delay in seconds.
+    """
+    upper = max(previous_delay * 3, base)
+    return min(cap, (rng or random).uniform(base, upper))
+
+
+services.register("retry_budget", RetryBudget)
+
+
+def get_retry_budget() -> RetryBudget:
+    """Return the process-wide retry budget (see kiro/services.py)."""
+    return services.get("retry_budget")
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+FastAPI routes for gateway administration.
+
+Contains:
+- /admin/accounts: Live state of the upstream account pool
+
+Admin endpoints use their own key (ADMIN_API_KEY, sent as
+Authorization: Bearer) and are disabled entirely when it is not set.
+"""
+
+import secrets
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Security
+from fastapi.security import APIKeyHeader
+from loguru import logger
+
+from kiro.auth import KiroAuthManager
+from kiro.config import ACCOUNT_STATUS_WINDOW_SECONDS, ADMIN_API_KEY
+
+
+# --- Security scheme ---
+admin_api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
+
+
+async def verify_admin_api_key(auth_header: Optional[str] = Security(admin_api_key_header)) -> bool:
+    """
+    Verify the admin API key in the Authorization header.
+
+    Args:
+        auth_header: Authorization header value
+
+    Returns:
+        True if key is valid
+
+    Raises:
+        HTTPException: 404 when admin endpoints are disabled, 401 if key is invalid or missing
+    """
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not auth_header or not secrets.compare_digest(auth_header, f"Bearer {ADMIN_API_KEY}"):
+        logger.warning("Access attempt with invalid admin API key.")
+        raise HTTPException(status_code=401, detail="Invalid or missing admin API Key")
+    return True
+
+
+# --- Router ---
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(verify_admin_api_key)])
+
+
+@router.get("/accounts")
+async def accounts(request: Request):
+    """
+    Live state of every account in the upstream account pool.
+
+    Reads in-memory state only (no I/O), so it is cheap enough to poll
+    every few seconds.
+
+    Returns:
+        Pool totals and one entry per account (see
+        KiroAuthManager.account_snapshot for the fields)
+    """
+    auth_manager: KiroAuthManager = request.app.state.auth_manager
+    rows = auth_manager.account_snapshot()
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "auth_source": auth_manager.auth_source,
+        "status_window_seconds": ACCOUNT_STATUS_WINDOW_SECONDS,
+        "total": len(rows),
+        "quarantined": sum(1 for row in rows if row["quarantined"]),
+        "in_flight": sum(row["in_flight"] for row in rows),
+        "accounts": rows,
+    }
@@ -26,6 +26,7 @@ Reference: https://docs.anthropic.com/en/api/messages
 """
 
 import json
+import time
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Security, Header
@@ -35,19 +36,29 @@ from loguru import logger
 
 from kiro.config import PROXY_API_KEY, API_KEY_SOURCE, BILLING_ENABLED
 from kiro.models_anthropic import (
+    AnthropicCountTokensRequest,
     AnthropicMessagesRequest,
     TextContentBlock,
 )
 from kiro.auth import KiroAuthManager, AuthType
 from kiro.cache import ModelInfoCache
-from kiro.converters_anthropic import anthropic_to_kiro
+from kiro.converters_anthropic import (
+    anthropic_to_kiro,
+    convert_anthropic_messages_for_tokenizer,
+    convert_anthropic_tools_for_tokenizer,
+)
 from kiro.streaming_anthropic import (
-    stream_kiro_to_anthropic,
+    stream_with_first_token_retry_anthropic,
     collect_anthropic_response,
 )
+from kiro.streaming_core import StreamStallError
 from kiro.http_client import KiroHttpClient
-from kiro.utils import generate_conversation_id
-from kiro.tokenizer import count_tools_tokens, count_message_tokens
+from kiro.utils import generate_conversation_id, generate_request_id
+from kiro.token_calibration import estimate_prompt_tokens, get_token_calibrator
+from kiro.adaptive_timeout import get_adaptive_first_token_timeout
+from kiro.hedging import get_hedge_policy
+from kiro.server_timing import get_server_timing
+from kiro.api_key_cache import get_api_key_cache
 from kiro.mongodb_store import (
     find_active_user_by_api_key,
     get_user_id_from_doc,
@@ -57,6 +68,7 @@ from kiro.billing import (
     calculate_preflight_charge,
     ensure_user_has_sufficient_credits,
     deduct_credits_for_usage,
+    release_credit_reservation,
     InsufficientCreditsError,
     UnknownModelPricingError,
 )
@@ -124,7 +136,7 @@ async def verify_anthropic_api_key(
             )
 
         try:
-            user_doc = find_active_user_by_api_key(token)
+            user_doc = await get_api_key_cache().get(token, find_active_user_by_api_key)
         except MongoStoreUnavailableError:
             raise HTTPException(
                 status_code=503,
@@ -216,11 +228,12 @@ async def verify_anthropic_api_key_dependency(
     Returns:
         True when request is authenticated.
     """
-    return await verify_anthropic_api_key(
-        x_api_key=x_api_key,
-        authorization=authorization,
-        request=request,
-    )
+    with get_server_timing(request).phase("auth"):
+        return await verify_anthropic_api_key(
+            x_api_key=x_api_key,
+            authorization=authorization,
+            request=request,
+        )
 
 
 # --- Router ---
@@ -265,6 +278,9 @@ async def messages(
     model_cache: ModelInfoCache = request.app.state.model_cache
     auth_context: Dict[str, Any] = getattr(request.state, "auth_context", {})
     billing_user_id = auth_context.get("user_id")
+    # One ID per request: the credit charge is applied at most once under it
+    request_id = request.state.request_id = generate_request_id()
+    timing = get_server_timing(request)
     
     # Note: prepare_new_request() and log_request_body() are now called by DebugLoggerMiddleware
     # This ensures debug logging works even for requests that fail Pydantic validation (422 errors)
@@ -274,6 +290,7 @@ async def messages(
     from kiro.truncation_recovery import generate_truncation_tool_result, generate_truncation_user_message
     from kiro.models_anthropic import AnthropicMessage
     
+    truncation_scan_started = time.perf_counter()
     modified_messages = []
     tool_results_modified = 0
     content_notices_added = 0
@@ -363,6 +380,7 @@ async def messages(
     if tool_results_modified > 0 or content_notices_added > 0:
         request_data.messages = modified_messages
         logger.info(f"Truncation recovery: modified {tool_results_modified} tool_result(s), added {content_notices_added} content notice(s)")
+    timing.record("truncation", time.perf_counter() - truncation_scan_started)
     
     # Generate conversation ID for Kiro API (random UUID, not used for tracking)
     conversation_id = generate_conversation_id()
@@ -372,7 +390,8 @@ async def messages(
     profile_arn_for_payload = ""
     if auth_manager.auth_type == AuthType.KIRO_DESKTOP:
         if hasattr(auth_manager, "get_profile_arn_for_request"):
-            request_profile_arn = await auth_manager.get_profile_arn_for_request()
+            with timing.phase("profile_arn"):
+                request_profile_arn = await auth_manager.get_profile_arn_for_request()
         else:
             request_profile_arn = auth_manager.profile_arn
 
@@ -380,11 +399,12 @@ async def messages(
             profile_arn_for_payload = request_profile_arn
     
     try:
-        kiro_payload = anthropic_to_kiro(
-            request_data,
-            conversation_id,
-            profile_arn_for_payload
-        )
+        with timing.phase("convert"):
+            kiro_payload = anthropic_to_kiro(
+                request_data,
+                conversation_id,
+                profile_arn_for_payload
+            )
     except ValueError as e:
         logger.error(f"Conversion error: {e}")
         return JSONResponse(
@@ -407,50 +427,66 @@ async def messages(
         logger.warning(f"Failed to log Kiro request: {e}")
     
     # Create HTTP client with retry logic
-    # For streaming: use per-request client to avoid CLOSE_WAIT leak on VPN disconnect (issue #54)
+    # For streaming: use the streaming pool, which recycles stale connections so they
+    # don't leak in CLOSE_WAIT on VPN disconnect (issue #54); without the pool a
+    # per-request client is created
     # For non-streaming: use shared client for connection pooling
     url = f"{auth_manager.api_host}/generateAssistantResponse"
     logger.debug(f"Kiro API URL: {url}")
     
     if request_data.stream:
-        # Streaming mode: per-request client prevents orphaned connections
-        # when network interface changes (VPN disconnect/reconnect)
-        http_client = KiroHttpClient(auth_manager, shared_client=None)
+        # Streaming mode: pooled keep-alive client (or per-request client when disabled)
+        streaming_pool = getattr(request.app.state, "streaming_client_pool", None)
+        http_client = KiroHttpClient(auth_manager, shared_client=None, streaming_pool=streaming_pool)
     else:
         # Non-streaming mode: shared client for efficient connection reuse
         shared_client = request.app.state.http_client
         http_client = KiroHttpClient(auth_manager, shared_client=shared_client)
     
     # Prepare data for token counting
-    # Convert Pydantic models to dicts for tokenizer
-    messages_for_tokenizer = [msg.model_dump() for msg in request_data.messages]
-    tools_for_tokenizer = [tool.model_dump() for tool in request_data.tools] if request_data.tools else None
-    prompt_tokens = count_message_tokens(messages_for_tokenizer, apply_claude_correction=False)
-    tool_tokens_for_billing = count_tools_tokens(tools_for_tokenizer) if tools_for_tokenizer else 0
-
+    # Same tokenizer input as /v1/messages/count_tokens (system, tool calls and results included)
+    with timing.phase("tokenize"):
+        messages_for_tokenizer = convert_anthropic_messages_for_tokenizer(request_data.messages, request_data.system)
+        tools_for_tokenizer = convert_anthropic_tools_for_tokenizer(request_data.tools)
+        # Static tiktoken estimate until the model is calibrated against Kiro's context usage
+        calibration_key = ("anthropic", request_data.model)
+        prompt_estimate = await estimate_prompt_tokens(calibration_key, messages_for_tokenizer, tools_for_tokenizer)
+        prompt_tokens = prompt_estimate.prompt_tokens
+        tool_tokens_for_billing = prompt_estimate.tool_tokens
+        on_context_usage = get_token_calibrator().observer(calibration_key, prompt_estimate)
+
+    # First-token timeout learned for this model and prompt size
+    adaptive_timeout = get_adaptive_first_token_timeout()
+    timeout_key = adaptive_timeout.key(request_data.model, prompt_tokens + tool_tokens_for_billing)
+    first_token_timeout = adaptive_timeout.timeout_for(timeout_key)
+
+    credit_reservation = None
     if BILLING_ENABLED and billing_user_id is not None:
         try:
-            required_credits = calculate_preflight_charge(
-                model_id=request_data.model,
-                prompt_tokens=prompt_tokens,
-                tool_tokens=tool_tokens_for_billing,
-            )
-            ensure_user_has_sufficient_credits(billing_user_id, required_credits)
+            with timing.phase("billing"):
+                required_credits = calculate_preflight_charge(
+                    model_id=request_data.model,
+                    prompt_tokens=prompt_tokens,
+                    tool_tokens=tool_tokens_for_billing,
+                )
+                credit_reservation = await ensure_user_has_sufficient_credits(billing_user_id, required_credits)
         except UnknownModelPricingError as exc:
             raise HTTPException(status_code=400, detail=str(exc))
         except InsufficientCreditsError as exc:
             raise HTTPException(status_code=402, detail=str(exc))
     
+    reservation_handed_to_stream = False
     try:
         # Make request to Kiro API (for both streaming and non-streaming modes)
         # Important: we wait for Kiro response BEFORE returning StreamingResponse,
         # so that we can return proper HTTP error codes if Kiro fails
-        response = await http_client.request_with_retry(
-            "POST",
-            url,
-            kiro_payload,
-            stream=True
-        )
+        with timing.phase("upstream_connect"):
+            response = await http_client.request_with_retry(
+                "POST",
+                url,
+                kiro_payload,
+                stream=True
+            )
         
         if response.status_code != 200:
             try:
@@ -496,19 +532,34 @@ async def messages(
             )
         
         if request_data.stream:
+            first_response = [response]
+            
+            async def make_request():
+                # The first attempt streams the response already accepted above;
+                # first-token retries open a new request
+                if first_response:
+                    return first_response.pop()
+                return await http_client.request_with_retry("POST", url, kiro_payload, stream=True)
+            
             # Streaming mode - Kiro already returned 200, now stream the response
             async def stream_wrapper():
+                stream_started = time.perf_counter()
                 streaming_error = None
                 client_disconnected = False
                 deduction_applied = False
                 observability_logged = False
                 try:
-                    async for chunk in stream_kiro_to_anthropic(
-                        response,
+                    async for chunk in stream_with_first_token_retry_anthropic(
+                        make_request,
                         request_data.model,
                         model_cache,
                         auth_manager,
-                        request_messages=messages_for_tokenizer
+                        first_token_timeout=first_token_timeout,
+                        request_messages=messages_for_tokenizer,
+                        hedge_request=http_client.hedge_request_factory("POST", url, kiro_payload),
+                        hedge_policy=get_hedge_policy(),
+                        on_first_token_wait=timing.observer("upstream_first_byte", adaptive_timeout.observer(timeout_key)),
+                        on_context_usage=on_context_usage
                     ):
                         if chunk.startswith("event: message_delta"):
                             lines = chunk.strip().splitlines()
@@ -529,10 +580,12 @@ async def messages(
 
                                         if BILLING_ENABLED and billing_user_id is not None and not deduction_applied:
                                             try:
-                                                charged = deduct_credits_for_usage(
+                                                charged = await deduct_credits_for_usage(
                                                     billing_user_id,
                                                     request_data.model,
                                                     usage_for_charge,
+                                                    reservation=credit_reservation,
+                                                    request_id=request_id,
                                                 )
                                             except UnknownModelPricingError as exc:
                                                 logger.error(f"Anthropic streaming billing failed (unknown model): {exc}")
@@ -568,7 +621,7 @@ async def messages(
                                                 billing_user_id=billing_user_id,
                                                 prompt_tokens=prompt_tokens,
                                                 tool_tokens=tool_tokens_for_billing,
-                                                message_count=len(messages_for_tokenizer),
+                                                message_count=len(request_data.messages),
                                                 usage_payload=usage_payload,
                                                 cache_fields=cache_fields,
                                                 status="streaming_usage_received",
@@ -579,6 +632,15 @@ async def messages(
                 except GeneratorExit:
                     client_disconnected = True
                     logger.debug("Client disconnected during streaming (GeneratorExit in routes)")
+                except StreamStallError as e:
+                    # Upstream hung mid-stream: structured error, no message_delta usage,
+                    # so nothing is deducted for the aborted response
+                    streaming_error = e
+                    try:
+                        error_event = f'event: error\ndata: {json.dumps({"type": "error", "error": {"type": "timeout_error", "message": f"{e}. The request was not billed."}})}\n\n'
+                        yield error_event
+                    except Exception:
+                        pass
                 except Exception as e:
                     streaming_error = e
                     # Send error event to client, then gracefully end the stream
@@ -588,7 +650,9 @@ async def messages(
                     except Exception:
                         pass
                 finally:
-                    await http_client.close()
+                    await http_client.close(error=streaming_error)
+                    # No-op once the usage was charged
+                    release_credit_reservation(credit_reservation)
                     if streaming_error:
                         error_type = type(streaming_error).__name__
                         error_msg = str(streaming_error) if str(streaming_error) else "(empty message)"
@@ -607,10 +671,14 @@ async def messages(
                             billing_user_id=billing_user_id,
                             prompt_tokens=prompt_tokens,
                             tool_tokens=tool_tokens_for_billing,
-                            message_count=len(messages_for_tokenizer),
+                            message_count=len(request_data.messages),
                             usage_payload=None,
                             cache_fields={},
-                            status="streaming_completed_without_usage",
+                            status=(
+                                "streaming_stalled"
+                                if isinstance(streaming_error, StreamStallError)
+                                else "streaming_completed_without_usage"
+                            ),
                         )
                         logger.info("billing_observability={}", observability_payload)
                     
@@ -619,7 +687,15 @@ async def messages(
                             debug_logger.flush_on_error(500, str(streaming_error))
                         else:
                             debug_logger.discard_buffers()
+
+                # Full phase breakdown, including upstream first byte and stream
+                # total, which were not known when the headers were sent
+                if not client_disconnected:
+                    timing.record("stream", time.perf_counter() - stream_started)
+                    yield timing.sse_comment()
             
+            # From here the stream releases or settles the reservation
+            reservation_handed_to_stream = True
             return StreamingResponse(
                 stream_wrapper(),
                 media_type="text/event-stream",
@@ -635,19 +711,26 @@ async def messages(
                 raise HTTPException(status_code=500, detail="Internal Server Error: HTTP client not initialized")
 
             # Non-streaming mode - collect entire response
-            anthropic_response = await collect_anthropic_response(
-                response,
-                request_data.model,
-                model_cache,
-                auth_manager,
-                request_messages=messages_for_tokenizer
-            )
+            with timing.phase("stream"):
+                anthropic_response = await collect_anthropic_response(
+                    response,
+                    request_data.model,
+                    model_cache,
+                    auth_manager,
+                    request_messages=messages_for_tokenizer,
+                    first_token_timeout=first_token_timeout,
+                    on_first_token_wait=timing.observer("upstream_first_byte", adaptive_timeout.observer(timeout_key)),
+                    on_context_usage=on_context_usage
+                )
 
             if BILLING_ENABLED and billing_user_id is not None:
                 usage_payload = anthropic_response.get("usage") if isinstance(anthropic_response, dict) else None
                 if isinstance(usage_payload, dict):
                     try:
-                        charged = deduct_credits_for_usage(billing_user_id, request_data.model, usage_payload)
+                        charged = await deduct_credits_for_usage(
+                            billing_user_id, request_data.model, usage_payload,
+                            reservation=credit_reservation, request_id=request_id
+                        )
                         if "credits_used" in usage_payload and "kiro_credits_used" not in usage_payload:
                             usage_payload["kiro_credits_used"] = usage_payload["credits_used"]
                         usage_payload["credits_used"] = float(charged)
@@ -670,7 +753,7 @@ async def messages(
                 billing_user_id=billing_user_id,
                 prompt_tokens=prompt_tokens,
                 tool_tokens=tool_tokens_for_billing,
-                message_count=len(messages_for_tokenizer),
+                message_count=len(request_data.messages),
                 usage_payload=usage_payload if isinstance(usage_payload, dict) else None,
                 cache_fields=cache_fields,
                 status="non_streaming_completed",
@@ -682,6 +765,21 @@ async def messages(
             
             return JSONResponse(content=anthropic_response)
     
+    except StreamStallError as e:
+        await http_client.close(error=e)
+        logger.error(f"HTTP 504 - POST /v1/messages - {e}")
+        if debug_logger:
+            debug_logger.flush_on_error(504, str(e))
+        return JSONResponse(
+            status_code=504,
+            content={
+                "type": "error",
+                "error": {
+                    "type": "timeout_error",
+                    "message": f"{e}. The request was not billed."
+                }
+            }
+        )
     except HTTPException as e:
         await http_client.close()
         logger.error(f"HTTP {e.status_code} - POST /v1/messages - {e.detail}")
@@ -705,3 +803,44 @@ async def messages(
                 }
             }
         )
+    finally:
+        if not reservation_handed_to_stream:
+            # No-op once the usage was charged
+            release_credit_reservation(credit_reservation)
+
+
+
+@router.post("/v1/messages/count_tokens", dependencies=[Depends(verify_anthropic_api_key_dependency)])
+async def count_tokens(
+    request: Request,
+    request_data: AnthropicCountTokensRequest,
+    anthropic_version: Optional[str] = Header(None, alias="anthropic-version")
+):
+    """
+    Anthropic Token Counting API endpoint.
+    
+    Compatible with Anthropic's /v1/messages/count_tokens endpoint.
+    Counts the input tokens of a Messages request locally, with the same
+    estimate the /v1/messages preflight bills (the per-model calibrated
+    factor once the model is calibrated, the static correction before).
+    Kiro API is never called and nothing is billed.
+    
+    Args:
+        request: FastAPI Request for Server-Timing
+        request_data: Request in Anthropic count_tokens format
+        anthropic_version: Anthropic API version header (optional)
+    
+    Returns:
+        JSONResponse with {"input_tokens": N}
+    """
+    logger.debug(f"Request to /v1/messages/count_tokens (model={request_data.model})")
+    
+    with get_server_timing(request).phase("tokenize"):
+        # Same estimate (and per-model calibration) as the /v1/messages preflight
+        estimate = await estimate_prompt_tokens(
+            ("anthropic", request_data.model),
+            convert_anthropic_messages_for_tokenizer(request_data.messages, request_data.system),
+            convert_anthropic_tools_for_tokenizer(request_data.tools),
+        )
+    
+    return JSONResponse(content={"input_tokens": estimate.total_tokens})
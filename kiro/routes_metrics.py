@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+FastAPI route for Prometheus scraping.
+
+Contains:
+- /metrics: Prometheus metrics
+
+The endpoint uses its own scrape key (METRICS_API_KEY, falling back to
+ADMIN_API_KEY, sent as Authorization: Bearer) and is disabled entirely when
+neither is set. Client API keys never grant access.
+"""
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Security
+from fastapi.responses import PlainTextResponse
+from fastapi.security import APIKeyHeader
+from loguru import logger
+
+from kiro.auth import KiroAuthManager
+from kiro.config import ADMIN_API_KEY, METRICS_API_KEY
+from kiro.metrics import PROMETHEUS_CONTENT_TYPE, render_metrics, update_account_gauges
+
+
+# --- Security scheme ---
+metrics_api_key_header = APIKeyHeader(name="Authorization", auto_error=False)
+
+
+async def verify_metrics_api_key(auth_header: Optional[str] = Security(metrics_api_key_header)) -> bool:
+    """
+    Verify the scrape key in the Authorization header.
+
+    Args:
+        auth_header: Authorization header value
+
+    Returns:
+        True if key is valid
+
+    Raises:
+        HTTPException: 404 when /metrics is disabled, 401 if key is invalid or missing
+    """
+    key = METRICS_API_KEY or ADMIN_API_KEY
+    if not key:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not auth_header or not secrets.compare_digest(auth_header, f"Bearer {key}"):
+        logger.warning("Access attempt with invalid metrics API key.")
+        raise HTTPException(status_code=401, detail="Invalid or missing metrics API Key")
+    return True
+
+
+# --- Router ---
+router = APIRouter(tags=["Metrics"], dependencies=[Depends(verify_metrics_api_key)])
+
+
+@router.get("/metrics")
+async def metrics(request: Request):
+    """
+    Prometheus metrics in the text exposition format.
+
+    Per-account gauges are refreshed from the auth manager on each scrape and
+    labelled with an opaque hash of the account key; everything else is
+    recorded on the request path.
+
+    Returns:
+        Plain text exposition of all gateway metrics
+    """
+    auth_manager: Optional[KiroAuthManager] = getattr(request.app.state, "auth_manager", None)
+    if auth_manager is not None:
+        update_account_gauges(auth_manager.account_snapshot())
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -27,6 +27,7 @@ Contains all API endpoints:
 """
 
 import json
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
@@ -50,10 +51,14 @@ from kiro.auth import KiroAuthManager, AuthType
 from kiro.cache import ModelInfoCache
 from kiro.model_resolver import ModelResolver
 from kiro.converters_openai import build_kiro_payload
-from kiro.streaming_openai import stream_kiro_to_openai, collect_stream_response
+from kiro.streaming_openai import StreamStallError, stream_with_first_token_retry, collect_stream_response
 from kiro.http_client import KiroHttpClient
-from kiro.tokenizer import count_message_tokens, count_tools_tokens
-from kiro.utils import generate_conversation_id
+from kiro.token_calibration import estimate_prompt_tokens, get_token_calibrator
+from kiro.adaptive_timeout import get_adaptive_first_token_timeout
+from kiro.hedging import get_hedge_policy
+from kiro.server_timing import get_server_timing
+from kiro.utils import generate_conversation_id, generate_request_id
+from kiro.api_key_cache import get_api_key_cache
 from kiro.mongodb_store import (
     find_active_user_by_api_key,
     get_user_id_from_doc,
@@ -63,6 +68,7 @@ from kiro.billing import (
     calculate_preflight_charge,
     ensure_user_has_sufficient_credits,
     deduct_credits_for_usage,
+    release_credit_reservation,
     InsufficientCreditsError,
     UnknownModelPricingError,
 )
@@ -126,7 +132,7 @@ async def verify_api_key(
             raise HTTPException(status_code=401, detail="Invalid or missing API Key")
 
         try:
-            user_doc = find_active_user_by_api_key(token)
+            user_doc = await get_api_key_cache().get(token, find_active_user_by_api_key)
         except MongoStoreUnavailableError:
             raise HTTPException(status_code=503, detail="Authentication datastore unavailable")
 
@@ -179,7 +185,8 @@ async def verify_api_key_dependency(
     Returns:
         True when request is authenticated.
     """
-    return await verify_api_key(auth_header=auth_header, request=request)
+    with get_server_timing(request).phase("auth"):
+        return await verify_api_key(auth_header=auth_header, request=request)
 
 
 # --- Router ---
@@ -215,6 +222,7 @@ async def health():
         "version": APP_VERSION
     }
 
+
 @router.get("/v1/models", response_model=ModelList, dependencies=[Depends(verify_api_key_dependency)])
 async def get_models(request: Request):
     """
@@ -274,6 +282,9 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
     model_cache: ModelInfoCache = request.app.state.model_cache
     auth_context: Dict[str, Any] = getattr(request.state, "auth_context", {})
     billing_user_id = auth_context.get("user_id")
+    # One ID per request: the credit charge is applied at most once under it
+    request_id = request.state.request_id = generate_request_id()
+    timing = get_server_timing(request)
     
     # Note: prepare_new_request() and log_request_body() are now called by DebugLoggerMiddleware
     # This ensures debug logging works even for requests that fail Pydantic validation (422 errors)
@@ -283,6 +294,7 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
     from kiro.truncation_recovery import generate_truncation_tool_result, generate_truncation_user_message
     from kiro.models_openai import ChatMessage
     
+    truncation_scan_started = time.perf_counter()
     modified_messages = []
     tool_results_modified = 0
     content_notices_added = 0
@@ -329,6 +341,7 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
     if tool_results_modified > 0 or content_notices_added > 0:
         request_data.messages = modified_messages
         logger.info(f"Truncation recovery: modified {tool_results_modified} tool_result(s), added {content_notices_added} content notice(s)")
+    timing.record("truncation", time.perf_counter() - truncation_scan_started)
     
     # Generate conversation ID for Kiro API (random UUID, not used for tracking)
     conversation_id = generate_conversation_id()
@@ -339,7 +352,8 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
     profile_arn_for_payload = ""
     if auth_manager.auth_type == AuthType.KIRO_DESKTOP:
         if hasattr(auth_manager, "get_profile_arn_for_request"):
-            request_profile_arn = await auth_manager.get_profile_arn_for_request()
+            with timing.phase("profile_arn"):
+                request_profile_arn = await auth_manager.get_profile_arn_for_request()
         else:
             request_profile_arn = auth_manager.profile_arn
 
@@ -347,11 +361,12 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
             profile_arn_for_payload = request_profile_arn
     
     try:
-        kiro_payload = build_kiro_payload(
-            request_data,
-            conversation_id,
-            profile_arn_for_payload
-        )
+        with timing.phase("convert"):
+            kiro_payload = build_kiro_payload(
+                request_data,
+                conversation_id,
+                profile_arn_for_payload
+            )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -365,49 +380,65 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
     
     # Prepare data for fallback token counting and billing
     # Convert Pydantic models to dicts for tokenizer
-    messages_for_tokenizer = [msg.model_dump() for msg in request_data.messages]
-    tools_for_tokenizer = [tool.model_dump() for tool in request_data.tools] if request_data.tools else None
-
-    prompt_tokens = count_message_tokens(messages_for_tokenizer, apply_claude_correction=False)
-    tool_tokens = count_tools_tokens(tools_for_tokenizer) if tools_for_tokenizer else 0
-
+    with timing.phase("tokenize"):
+        messages_for_tokenizer = [msg.model_dump() for msg in request_data.messages]
+        tools_for_tokenizer = [tool.model_dump() for tool in request_data.tools] if request_data.tools else None
+
+        # Static tiktoken estimate until the model is calibrated against Kiro's context usage
+        calibration_key = ("openai", request_data.model)
+        prompt_estimate = await estimate_prompt_tokens(calibration_key, messages_for_tokenizer, tools_for_tokenizer)
+        prompt_tokens = prompt_estimate.prompt_tokens
+        tool_tokens = prompt_estimate.tool_tokens
+        on_context_usage = get_token_calibrator().observer(calibration_key, prompt_estimate)
+
+    # First-token timeout learned for this model and prompt size
+    adaptive_timeout = get_adaptive_first_token_timeout()
+    timeout_key = adaptive_timeout.key(request_data.model, prompt_tokens + tool_tokens)
+    first_token_timeout = adaptive_timeout.timeout_for(timeout_key)
+
+    credit_reservation = None
     if BILLING_ENABLED and billing_user_id is not None:
         try:
-            required_credits = calculate_preflight_charge(
-                model_id=request_data.model,
-                prompt_tokens=prompt_tokens,
-                tool_tokens=tool_tokens,
-            )
-            ensure_user_has_sufficient_credits(billing_user_id, required_credits)
+            with timing.phase("billing"):
+                required_credits = calculate_preflight_charge(
+                    model_id=request_data.model,
+                    prompt_tokens=prompt_tokens,
+                    tool_tokens=tool_tokens,
+                )
+                credit_reservation = await ensure_user_has_sufficient_credits(billing_user_id, required_credits)
         except UnknownModelPricingError as exc:
             raise HTTPException(status_code=400, detail=str(exc))
         except InsufficientCreditsError as exc:
             raise HTTPException(status_code=402, detail=str(exc))
 
     # Create HTTP client with retry logic
-    # For streaming: use per-request client to avoid CLOSE_WAIT leak on VPN disconnect (issue #54)
+    # For streaming: use the streaming pool, which recycles stale connections so they
+    # don't leak in CLOSE_WAIT on VPN disconnect (issue #54); without the pool a
+    # per-request client is created
     # For non-streaming: use shared client for connection pooling
     url = f"{auth_manager.api_host}/generateAssistantResponse"
     logger.debug(f"Kiro API URL: {url}")
     
     if request_data.stream:
-        # Streaming mode: per-request client prevents orphaned connections
-        # when network interface changes (VPN disconnect/reconnect)
-        http_client = KiroHttpClient(auth_manager, shared_client=None)
+        # Streaming mode: pooled keep-alive client (or per-request client when disabled)
+        streaming_pool = getattr(request.app.state, "streaming_client_pool", None)
+        http_client = KiroHttpClient(auth_manager, shared_client=None, streaming_pool=streaming_pool)
     else:
         # Non-streaming mode: shared client for efficient connection reuse
         shared_client = request.app.state.http_client
         http_client = KiroHttpClient(auth_manager, shared_client=shared_client)
+    reservation_handed_to_stream = False
     try:
         # Make request to Kiro API (for both streaming and non-streaming modes)
         # Important: we wait for Kiro response BEFORE returning StreamingResponse,
         # so that 200 OK means Kiro accepted the request and started responding
-        response = await http_client.request_with_retry(
-            "POST",
-            url,
-            kiro_payload,
-            stream=True
-        )
+        with timing.phase("upstream_connect"):
+            response = await http_client.request_with_retry(
+                "POST",
+                url,
+                kiro_payload,
+                stream=True
+            )
         
         if response.status_code != 200:
             try:
@@ -456,21 +487,37 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
             stream_client = http_client.client
             if stream_client is None:
                 raise HTTPException(status_code=500, detail="Internal Server Error: HTTP client not initialized")
+            
+            first_response = [response]
+            
+            async def make_request():
+                # The first attempt streams the response already accepted above;
+                # first-token retries open a new request
+                if first_response:
+                    return first_response.pop()
+                return await http_client.request_with_retry("POST", url, kiro_payload, stream=True)
+            
             # Streaming mode
             async def stream_wrapper():
+                stream_started = time.perf_counter()
                 streaming_error = None
                 client_disconnected = False
                 deduction_applied = False
                 observability_logged = False
                 try:
-                    async for chunk in stream_kiro_to_openai(
+                    async for chunk in stream_with_first_token_retry(
+                        make_request,
                         stream_client,
-                        response,
                         request_data.model,
                         model_cache,
                         auth_manager,
+                        first_token_timeout=first_token_timeout,
                         request_messages=messages_for_tokenizer,
-                        request_tools=tools_for_tokenizer
+                        request_tools=tools_for_tokenizer,
+                        hedge_request=http_client.hedge_request_factory("POST", url, kiro_payload),
+                        hedge_policy=get_hedge_policy(),
+                        on_first_token_wait=timing.observer("upstream_first_byte", adaptive_timeout.observer(timeout_key)),
+                        on_context_usage=on_context_usage
                     ):
                         if chunk.startswith("data: ") and chunk.strip() != "data: [DONE]":
                             payload = chunk[len("data: "):].strip()
@@ -484,7 +531,10 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
                                 if isinstance(usage_data, dict):
                                     if BILLING_ENABLED and billing_user_id is not None and not deduction_applied:
                                         try:
-                                            charged = deduct_credits_for_usage(billing_user_id, request_data.model, usage_data)
+                                            charged = await deduct_credits_for_usage(
+                                                billing_user_id, request_data.model, usage_data,
+                                                reservation=credit_reservation, request_id=request_id
+                                            )
                                         except UnknownModelPricingError as exc:
                                             logger.error(f"OpenAI streaming billing failed (unknown model): {exc}")
                                             error_payload = {
@@ -539,6 +589,22 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
                     # Client disconnected - this is normal
                     client_disconnected = True
                     logger.debug("Client disconnected during streaming (GeneratorExit in routes)")
+                except StreamStallError as e:
+                    # Upstream hung mid-stream: end with a structured error and no usage chunk,
+                    # so nothing is deducted for the aborted response
+                    streaming_error = e
+                    error_payload = {
+                        "error": {
+                            "message": f"{e}. The request was not billed.",
+                            "type": "upstream_stall",
+                            "code": 504,
+                        }
+                    }
+                    try:
+                        yield f"data: {json.dumps(error_payload)}\n\n"
+                        yield "data: [DONE]\n\n"
+                    except Exception:
+                        pass
                 except Exception as e:
                     streaming_error = e
                     # Try to send [DONE] to client before finishing
@@ -549,7 +615,9 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
                         pass  # Client already disconnected
                     raise
                 finally:
-                    await http_client.close()
+                    await http_client.close(error=streaming_error)
+                    # No-op once the usage was charged
+                    release_credit_reservation(credit_reservation)
                     # Log access log for streaming (success or error)
                     if streaming_error:
                         error_type = type(streaming_error).__name__
@@ -572,7 +640,11 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
                             message_count=len(messages_for_tokenizer),
                             usage_payload=None,
                             cache_fields={},
-                            status="streaming_completed_without_usage",
+                            status=(
+                                "streaming_stalled"
+                                if isinstance(streaming_error, StreamStallError)
+                                else "streaming_completed_without_usage"
+                            ),
                         )
                         logger.info("billing_observability={}", observability_payload)
                     # Write debug logs AFTER streaming completes
@@ -581,7 +653,15 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
                             debug_logger.flush_on_error(500, str(streaming_error))
                         else:
                             debug_logger.discard_buffers()
+
+                # Full phase breakdown, including upstream first byte and stream
+                # total, which were not known when the headers were sent
+                if not client_disconnected:
+                    timing.record("stream", time.perf_counter() - stream_started)
+                    yield timing.sse_comment()
             
+            # From here the stream releases or settles the reservation
+            reservation_handed_to_stream = True
             return StreamingResponse(stream_wrapper(), media_type="text/event-stream")
         
         else:
@@ -591,21 +671,28 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
             if non_stream_client is None:
                 raise HTTPException(status_code=500, detail="Internal Server Error: HTTP client not initialized")
 
-            openai_response = await collect_stream_response(
-                non_stream_client,
-                response,
-                request_data.model,
-                model_cache,
-                auth_manager,
-                request_messages=messages_for_tokenizer,
-                request_tools=tools_for_tokenizer
-            )
+            with timing.phase("stream"):
+                openai_response = await collect_stream_response(
+                    non_stream_client,
+                    response,
+                    request_data.model,
+                    model_cache,
+                    auth_manager,
+                    request_messages=messages_for_tokenizer,
+                    request_tools=tools_for_tokenizer,
+                    first_token_timeout=first_token_timeout,
+                    on_first_token_wait=timing.observer("upstream_first_byte", adaptive_timeout.observer(timeout_key)),
+                    on_context_usage=on_context_usage
+                )
 
             if BILLING_ENABLED and billing_user_id is not None:
                 usage_payload = openai_response.get("usage") if isinstance(openai_response, dict) else None
                 if isinstance(usage_payload, dict):
                     try:
-                        charged = deduct_credits_for_usage(billing_user_id, request_data.model, usage_payload)
+                        charged = await deduct_credits_for_usage(
+                            billing_user_id, request_data.model, usage_payload,
+                            reservation=credit_reservation, request_id=request_id
+                        )
                         if "credits_used" in usage_payload and "kiro_credits_used" not in usage_payload:
                             usage_payload["kiro_credits_used"] = usage_payload["credits_used"]
                         usage_payload["credits_used"] = float(charged)
@@ -642,6 +729,21 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
             
             return JSONResponse(content=openai_response)
     
+    except StreamStallError as e:
+        await http_client.close(error=e)
+        logger.error(f"HTTP 504 - POST /v1/chat/completions - {e}")
+        if debug_logger:
+            debug_logger.flush_on_error(504, str(e))
+        return JSONResponse(
+            status_code=504,
+            content={
+                "error": {
+                    "message": f"{e}. The request was not billed.",
+                    "type": "upstream_stall",
+                    "code": 504,
+                }
+            }
+        )
     except HTTPException as e:
         await http_client.close()
         # Log access log for HTTP error
@@ -659,3 +761,7 @@ async def chat_completions(request: Request, request_data: ChatCompletionRequest
         if debug_logger:
             debug_logger.flush_on_error(500, str(e))
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+    finally:
+        if not reservation_handed_to_stream:
+            # No-op once the usage was charged
+            release_credit_reservation(credit_reservation)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Per-request Server-Timing breakdown for the API endpoints.
+
+Route handlers record how long each phase of a request took (API-key
+auth, truncation-recovery scan, profile ARN lookup, payload conversion,
+tokenization, billing preflight, upstream connect, upstream first byte,
+stream total) on a ServerTiming object kept in request.state.
+
+ServerTimingMiddleware creates that object for /v1/messages,
+/v1/messages/count_tokens and /v1/chat/completions and adds the
+Server-Timing header when the response starts. A streaming response
+starts before upstream has produced any content, so its header only
+covers the phases up to upstream connect; the full breakdown is sent
+again as a trailing SSE comment.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Endpoints whose responses carry a Server-Timing header
+TIMED_ENDPOINTS = frozenset({
+    "/v1/chat/completions",        # OpenAI-compatible endpoint
+    "/v1/messages",                # Anthropic-compatible endpoint
+    "/v1/messages/count_tokens",   # Anthropic token counting (no upstream call)
+})
+
+# Key of the ServerTiming object in request.state
+_STATE_KEY = "server_timing"
+
+
+class ServerTiming:
+    """
+    Ordered phase durations of one request.
+
+    Recording the same phase again replaces its duration, so a retried
+    upstream wait reports the attempt that was finally used.
+    """
+
+    __slots__ = ("_phases",)
+
+    def __init__(self) -> None:
+        self._phases: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Record the duration of a phase.
+
+        Args:
+            name: Phase name (a Server-Timing metric token, e.g. "convert")
+            seconds: Phase duration in seconds
+        """
+        self._phases[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as phase `name`, even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = time.perf_counter() - started
+
+    def observer(
+        self,
+        name: str,
+        then: Optional[Callable[[float], None]] = None,
+    ) -> Callable[[float], None]:
+        """
+        Return a callback recording its argument (seconds) as phase `name`.
+
+        Args:
+            name: Phase name
+            then: Optional callback to forward the value to afterwards
+                (e.g. the adaptive first-token timeout observer)
+        """
+        def observe(seconds: float) -> None:
+            self._phases[name] = seconds
+            if then is not None:
+                then(seconds)
+        return observe
+
+    def get(self, name: str) -> Optional[float]:
+        """Return the recorded duration of a phase in seconds, or None."""
+        return self._phases.get(name)
+
+    def header_value(self) -> str:
+        """Render the phases as a Server-Timing header value (durations in ms)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self._phases.items())
+
+    def sse_comment(self) -> str:
+        """Render the phases as a trailing SSE comment (ignored by SSE parsers)."""
+        return f": server-timing {self.header_value()}\n\n"
+
+
+def get_server_timing(request: Request) -> ServerTiming:
+    """
+    Return the ServerTiming of a request, creating one if needed.
+
+    Without ServerTimingMiddleware the object is still usable but its
+    header is not sent.
+    """
+    timing = getattr(request.state, _STATE_KEY, None)
+    if not isinstance(timing, ServerTiming):
+        timing = ServerTiming()
+        setattr(request.state, _STATE_KEY, timing)
+    return timing
+
+
+class ServerTimingMiddleware:
+    """
+    Adds the Server-Timing header to responses of TIMED_ENDPOINTS.
+
+    Implemented as a plain ASGI middleware: other paths pass straight
+    through, and timed paths only get their send() wrapped to append one
+    header at http.response.start.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in TIMED_ENDPOINTS:
+            await self.app(scope, receive, send)
+            return
+
+        timing = ServerTiming()
+        scope.setdefault("state", {})[_STATE_KEY] = timing
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                value = timing.header_value()
+                if value:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
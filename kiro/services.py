@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Registry of process-wide service objects.
+
+Objects that live on app.state (auth manager, model cache, HTTP clients)
+are only reachable from request handlers. Services that are also used
+below the routes (HTTP client retries, streaming, billing, tokenizer) are
+registered here instead:
+
+- a module registers a factory once, at import time, and exposes a typed
+  get_*() accessor that calls services.get();
+- the instance is created on first use and shared by the whole process;
+- the main.py lifespan closes the services on shutdown and then calls
+  services.reset(), which drops every instance (running its discard
+  callback) so the next use starts fresh. Tests call reset() between
+  tests for the same reason.
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+
+class ServiceRegistry:
+    """
+    Lazily created, named service objects.
+
+    Example:
+        >>> services.register("retry_budget", RetryBudget)
+        >>> budget = services.get("retry_budget")
+    """
+
+    def __init__(self) -> None:
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._discards: Dict[str, Callable[[Any], None]] = {}
+        self._instances: Dict[str, Any] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        discard: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """
+        Register how to build a service.
+
+        Args:
+            name: Unique service name
+            factory: Creates the service on first use
+            discard: Optional callback stopping the background work of an
+                     instance dropped by reset() (tasks, threads, pools)
+
+        Raises:
+            ValueError: If the name is already registered
+        """
+        if name in self._factories:
+            raise ValueError(f"Service '{name}' is already registered")
+        self._factories[name] = factory
+        if discard is not None:
+            self._discards[name] = discard
+
+    def get(self, name: str) -> Any:
+        """Return the service instance, creating it on first use."""
+        instance = self._instances.get(name)
+        if instance is None:
+            instance = self._factories[name]()
+            self._instances[name] = instance
+        return instance
+
+    def reset(self) -> None:
+        """Drop every created instance, running its discard callback."""
+        instances, self._instances = self._instances, {}
+        for name, instance in instances.items():
+            discard = self._discards.get(name)
+            if discard is not None:
+                discard(instance)
+
+
+services = ServiceRegistry()
@@ -34,7 +34,7 @@ Reference: https://docs.anthropic.com/en/api/messages-streaming
 import json
 import time
 import uuid
-from typing import TYPE_CHECKING, AsyncGenerator, Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Dict, List, Optional
 
 import httpx
 from loguru import logger
@@ -43,11 +43,15 @@ from kiro.streaming_core import (
     parse_kiro_stream,
     collect_stream_to_result,
     FirstTokenTimeoutError,
+    StreamStallError,
     KiroEvent,
     calculate_tokens_from_context_usage,
     stream_with_first_token_retry,
+    HedgeRequestFactory,
 )
-from kiro.tokenizer import count_tokens, count_message_tokens, count_tools_tokens
+from kiro.hedging import HedgePolicy
+from kiro.tokenizer import StreamingTokenCounter, count_tokens, count_message_tokens, count_tools_tokens
+from kiro.token_calibration import get_token_calibrator
 from kiro.parsers import parse_bracket_tool_calls, deduplicate_tool_calls
 from kiro.config import FIRST_TOKEN_TIMEOUT, FIRST_TOKEN_MAX_RETRIES, FAKE_REASONING_HANDLING
 
@@ -105,7 +109,10 @@ async def stream_kiro_to_anthropic(
     auth_manager: "KiroAuthManager",
     first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
     request_messages: Optional[list] = None,
-    conversation_id: Optional[str] = None
+    conversation_id: Optional[str] = None,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    on_context_usage: Optional[Callable[[int], None]] = None,
+    stream_tool_input: Optional[bool] = None
 ) -> AsyncGenerator[str, None]:
     """
     Generator for converting Kiro stream to Anthropic SSE format.
@@ -121,6 +128,10 @@ async def stream_kiro_to_anthropic(
         first_token_timeout: First token wait timeout (seconds)
         request_messages: Original request messages (for token counting)
         conversation_id: Stable conversation ID for truncation recovery (optional)
+        on_first_token_wait: Optional callback receiving the first-token wait (seconds)
+        on_context_usage: Optional callback receiving the prompt tokens derived from
+                          Kiro's context usage, e.g. TokenCalibrator.observer()
+        stream_tool_input: Forward tool_use input as it arrives (None: TOOL_INPUT_STREAMING)
     
     Yields:
         Strings in Anthropic SSE format
@@ -132,11 +143,13 @@ async def stream_kiro_to_anthropic(
     input_tokens = 0
     output_tokens = 0
     full_content = ""
-    full_thinking_content = ""
+    # Output tokens of content and thinking, counted as deltas arrive
+    output_counter = StreamingTokenCounter()
     
-    # Count input tokens from request messages
+    # Count input tokens from request messages (corrected once the model is calibrated)
     if request_messages:
         input_tokens = count_message_tokens(request_messages, apply_claude_correction=False)
+        input_tokens = get_token_calibrator().calibrated_tokens(("anthropic", model), input_tokens)
     
     # Track content blocks - thinking block is index 0, text block is index 1 (when thinking enabled)
     current_block_index = 0
@@ -156,6 +169,25 @@ async def stream_kiro_to_anthropic(
     # Track truncated tool calls for recovery
     truncated_tools: List[Dict[str, Any]] = []
     
+    # Tool calls forwarded while streaming: tool id -> {"index", "name"}
+    streamed_tools: Dict[str, Dict[str, Any]] = {}
+    open_tool_id: Optional[str] = None
+    
+    def close_streamed_tool_block() -> List[str]:
+        """Closes the currently streaming tool_use block, if any."""
+        nonlocal open_tool_id, current_block_index
+        if open_tool_id is None:
+            return []
+        
+        # Streamed calls always carry input, so no "{}" placeholder is needed
+        events = [format_sse_event("content_block_stop", {
+            "type": "content_block_stop",
+            "index": streamed_tools[open_tool_id]["index"]
+        })]
+        open_tool_id = None
+        current_block_index += 1
+        return events
+    
     try:
         # Send message_start event
         yield format_sse_event("message_start", {
@@ -175,10 +207,25 @@ async def stream_kiro_to_anthropic(
             }
         })
         
-        async for event in parse_kiro_stream(response, first_token_timeout):
+        async for event in parse_kiro_stream(
+            response,
+            first_token_timeout,
+            on_first_token_wait=on_first_token_wait,
+            stream_tool_input=stream_tool_input,
+        ):
+            if event.type == "keepalive":
+                yield format_sse_event("ping", {"type": "ping"})
+                continue
+            
             if event.type == "content":
                 content = event.content or ""
                 full_content += content
+                output_counter.feed(content)
+                
+                # Close tool block if text resumes after a streamed tool call
+                if open_tool_id is not None:
+                    for sse_event in close_streamed_tool_block():
+                        yield sse_event
                 
                 # Close thinking block if it was open and we're now getting regular content
                 if thinking_block_started and thinking_block_index is not None:
@@ -215,7 +262,11 @@ async def stream_kiro_to_anthropic(
             
             elif event.type == "thinking":
                 thinking_content = event.thinking_content or ""
-                full_thinking_content += thinking_content
+                output_counter.feed(thinking_content)
+                
+                if open_tool_id is not None:
+                    for sse_event in close_streamed_tool_block():
+                        yield sse_event
                 
                 # Handle thinking content based on mode
                 if FAKE_REASONING_HANDLING == "as_reasoning_content":
@@ -278,7 +329,7 @@ async def stream_kiro_to_anthropic(
                         })
                 # For "strip" mode, we just skip the thinking content
             
-            elif event.type == "tool_use" and event.tool_use:
+            elif event.type == "tool_use_start" and event.tool_use:
                 # Close thinking block if open
                 if thinking_block_started and thinking_block_index is not None:
                     yield format_sse_event("content_block_stop", {
@@ -297,6 +348,49 @@ async def stream_kiro_to_anthropic(
                     text_block_started = False
                     current_block_index += 1
                 
+                # Previous tool ended without explicit stop
+                if open_tool_id is not None:
+                    for sse_event in close_streamed_tool_block():
+                        yield sse_event
+                
+                tool_id = event.tool_use["id"]
+                tool_name = event.tool_use.get("name", "")
+                
+                yield format_sse_event("content_block_start", {
+                    "type": "content_block_start",
+                    "index": current_block_index,
+                    "content_block": {
+                        "type": "tool_use",
+                        "id": tool_id,
+                        "name": tool_name,
+                        "input": {}
+                    }
+                })
+                
+                streamed_tools[tool_id] = {
+                    "index": current_block_index,
+                    "name": tool_name
+                }
+                open_tool_id = tool_id
+            
+            elif event.type == "tool_use_delta" and event.tool_use:
+                if event.tool_use["id"] == open_tool_id:
+                    fragment = event.tool_use.get("arguments", "")
+                    yield format_sse_event("content_block_delta", {
+                        "type": "content_block_delta",
+                        "index": streamed_tools[open_tool_id]["index"],
+                        "delta": {
+                            "type": "input_json_delta",
+                            "partial_json": fragment
+                        }
+                    })
+            
+            elif event.type == "tool_use_stop" and event.tool_use:
+                if event.tool_use["id"] == open_tool_id:
+                    for sse_event in close_streamed_tool_block():
+                        yield sse_event
+            
+            elif event.type == "tool_use" and event.tool_use:
                 tool = event.tool_use
                 tool_id = tool.get("id") or f"toolu_{uuid.uuid4().hex[:24]}"
                 tool_name = tool.get("function", {}).get("name", "") or tool.get("name", "")
@@ -317,6 +411,37 @@ async def stream_kiro_to_anthropic(
                     except json.JSONDecodeError:
                         tool_input = {}
                 
+                if open_tool_id is not None:
+                    for sse_event in close_streamed_tool_block():
+                        yield sse_event
+                
+                # Already forwarded incrementally - only record it
+                if tool_id in streamed_tools:
+                    tool_blocks.append({
+                        "id": tool_id,
+                        "name": tool_name,
+                        "input": tool_input
+                    })
+                    continue
+                
+                # Close thinking block if open
+                if thinking_block_started and thinking_block_index is not None:
+                    yield format_sse_event("content_block_stop", {
+                        "type": "content_block_stop",
+                        "index": thinking_block_index
+                    })
+                    thinking_block_started = False
+                    current_block_index += 1
+                
+                # Close text block if open
+                if text_block_started and text_block_index is not None:
+                    yield format_sse_event("content_block_stop", {
+                        "type": "content_block_stop",
+                        "index": text_block_index
+                    })
+                    text_block_started = False
+                    current_block_index += 1
+                
                 # Send tool_use block start
                 yield format_sse_event("content_block_start", {
                     "type": "content_block_start",
@@ -356,6 +481,10 @@ async def stream_kiro_to_anthropic(
             elif event.type == "context_usage" and event.context_usage_percentage is not None:
                 context_usage_percentage = event.context_usage_percentage
         
+        if open_tool_id is not None:
+            for sse_event in close_streamed_tool_block():
+                yield sse_event
+        
         # Track completion signals for truncation detection
         stream_completed_normally = context_usage_percentage is not None
         
@@ -454,15 +583,17 @@ async def stream_kiro_to_anthropic(
                 f"{'Model will be notified automatically about truncation.' if TRUNCATION_RECOVERY else 'Set TRUNCATION_RECOVERY=true in .env to auto-notify model about truncation.'}"
             )
         
-        # Calculate output tokens
-        output_tokens = count_tokens(full_content + full_thinking_content)
+        # Calculate output tokens (only the buffered tail is encoded here)
+        output_tokens = output_counter.tokens()
         
         # Calculate total tokens from context usage if available
         if context_usage_percentage is not None:
-            prompt_tokens, total_tokens, _, _ = calculate_tokens_from_context_usage(
+            prompt_tokens, total_tokens, prompt_source, _ = calculate_tokens_from_context_usage(
                 context_usage_percentage, output_tokens, model_cache, model
             )
             input_tokens = prompt_tokens
+            if prompt_source == "subtraction" and on_context_usage:
+                on_context_usage(prompt_tokens)
         
         # Determine stop reason
         stop_reason = "tool_use" if tool_blocks else "end_turn"
@@ -514,7 +645,7 @@ async def stream_kiro_to_anthropic(
             f"tool_blocks={len(tool_blocks)}, stop_reason={stop_reason}"
         )
         
-    except FirstTokenTimeoutError:
+    except (FirstTokenTimeoutError, StreamStallError):
         raise
     except GeneratorExit:
         logger.debug("Client disconnected (GeneratorExit)")
@@ -545,7 +676,10 @@ async def collect_anthropic_response(
     model: str,
     model_cache: "ModelInfoCache",
     auth_manager: "KiroAuthManager",
-    request_messages: Optional[list] = None
+    request_messages: Optional[list] = None,
+    first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    on_context_usage: Optional[Callable[[int], None]] = None
 ) -> dict:
     """
     Collect full response from Kiro stream in Anthropic format.
@@ -558,19 +692,25 @@ async def collect_anthropic_response(
         model_cache: Model cache
         auth_manager: Authentication manager
         request_messages: Original request messages (for token counting)
+        first_token_timeout: First token wait timeout (seconds)
+        on_first_token_wait: Optional callback receiving the first-token wait (seconds)
+        on_context_usage: Optional callback receiving the prompt tokens derived from context usage
     
     Returns:
         Dictionary with full response in Anthropic Messages format
     """
     message_id = generate_message_id()
     
-    # Count input tokens
+    # Count input tokens (corrected once the model is calibrated)
     input_tokens = 0
     if request_messages:
         input_tokens = count_message_tokens(request_messages, apply_claude_correction=False)
+        input_tokens = get_token_calibrator().calibrated_tokens(("anthropic", model), input_tokens)
     
     # Collect stream result
-    result = await collect_stream_to_result(response)
+    result = await collect_stream_to_result(
+        response, first_token_timeout, on_first_token_wait=on_first_token_wait
+    )
     
     # Build content blocks
     content_blocks = []
@@ -619,10 +759,12 @@ async def collect_anthropic_response(
     
     # Calculate from context usage if available
     if result.context_usage_percentage is not None:
-        prompt_tokens, _, _, _ = calculate_tokens_from_context_usage(
+        prompt_tokens, _, prompt_source, _ = calculate_tokens_from_context_usage(
             result.context_usage_percentage, output_tokens, model_cache, model
         )
         input_tokens = prompt_tokens
+        if prompt_source == "subtraction" and on_context_usage:
+            on_context_usage(prompt_tokens)
     
     # Determine stop reason
     stop_reason = "tool_use" if result.tool_calls else "end_turn"
@@ -656,7 +798,11 @@ async def stream_with_first_token_retry_anthropic(
     max_retries: int = FIRST_TOKEN_MAX_RETRIES,
     first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
     request_messages: Optional[list] = None,
-    request_tools: Optional[list] = None
+    request_tools: Optional[list] = None,
+    hedge_request: Optional[HedgeRequestFactory] = None,
+    hedge_policy: Optional[HedgePolicy] = None,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    on_context_usage: Optional[Callable[[int], None]] = None
 ) -> AsyncGenerator[str, None]:
     """
     Streaming with automatic retry on first token timeout for Anthropic API.
@@ -676,6 +822,13 @@ async def stream_with_first_token_retry_anthropic(
         first_token_timeout: First token wait timeout (seconds)
         request_messages: Original request messages (for fallback token counting)
         request_tools: Original request tools (for fallback token counting)
+        hedge_request: Optional hedge request factory, e.g.
+                      KiroHttpClient.hedge_request_factory(); enables hedged
+                      first-token requests when HEDGE_ENABLED
+        hedge_policy: Hedge policy (default: process-wide get_hedge_policy())
+        on_first_token_wait: Optional callback receiving the first-token wait of
+                            every attempt (seconds), e.g. AdaptiveFirstTokenTimeout.observer()
+        on_context_usage: Optional callback receiving the prompt tokens derived from context usage
     
     Yields:
         Strings in Anthropic SSE format
@@ -711,7 +864,9 @@ async def stream_with_first_token_retry_anthropic(
             model_cache,
             auth_manager,
             first_token_timeout=first_token_timeout,
-            request_messages=request_messages
+            request_messages=request_messages,
+            on_first_token_wait=on_first_token_wait,
+            on_context_usage=on_context_usage
         ):
             yield chunk
     
@@ -722,5 +877,8 @@ async def stream_with_first_token_retry_anthropic(
         first_token_timeout=first_token_timeout,
         on_http_error=create_http_error,
         on_all_retries_failed=create_timeout_error,
+        hedge_request=hedge_request,
+        hedge_policy=hedge_policy,
+        on_first_token_wait=on_first_token_wait,
     ):
         yield chunk
\ No newline at end of file
@@ -24,7 +24,8 @@ This module contains shared logic used by both OpenAI and Anthropic streaming:
 - KiroEvent dataclass for unified events
 - Kiro SSE stream parsing
 - Full response collection
-- First token timeout handling
+- First token timeout handling (serial retries or hedged requests)
+- Inter-chunk stall watchdog with client keep-alives
 
 The core layer provides a unified interface that API-specific formatters use
 to convert Kiro events to their respective SSE formats.
@@ -32,7 +33,7 @@ to convert Kiro events to their respective SSE formats.
 
 import asyncio
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Awaitable, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterator, Callable, Awaitable, Dict, List, Optional, Tuple
 
 import httpx
 from loguru import logger
@@ -41,10 +42,22 @@ from kiro.parsers import AwsEventStreamParser, parse_bracket_tool_calls, dedupli
 from kiro.config import (
     FIRST_TOKEN_TIMEOUT,
     FIRST_TOKEN_MAX_RETRIES,
+    STREAM_KEEPALIVE_INTERVAL,
+    STREAM_STALL_TIMEOUT,
     FAKE_REASONING_ENABLED,
     FAKE_REASONING_HANDLING,
+    TOOL_INPUT_STREAMING,
 )
 from kiro.thinking_parser import ThinkingParser
+from kiro.retry_budget import RETRY_BUDGET_EXHAUSTED_MESSAGE, get_retry_budget
+from kiro.hedging import HedgePolicy, get_hedge_policy
+from kiro.http_client import FIRST_TOKEN_EXTENSION
+from kiro.metrics import (
+    FIRST_TOKEN_SECONDS,
+    STREAM_BYTES,
+    STREAM_DURATION_SECONDS,
+    UPSTREAM_FIRST_BYTE_SECONDS,
+)
 
 if TYPE_CHECKING:
     from kiro.cache import ModelInfoCache
@@ -67,11 +80,19 @@ class KiroEvent:
     
     This format is API-agnostic and can be converted to both OpenAI and Anthropic formats.
     
+    Tool calls are reported as a complete, normalized tool_use event after the
+    stream ends. On streaming paths they may also be reported incrementally
+    (tool_use_start with {"id", "name"}, tool_use_delta with {"id", "arguments"}
+    holding the raw JSON fragment, tool_use_stop with {"id"}); calls without
+    input and duplicates under a new id only get the final event.
+    
     Attributes:
-        type: Event type (content, thinking, tool_use, usage, context_usage, error)
+        type: Event type (content, thinking, tool_use, tool_use_start, tool_use_delta,
+            tool_use_stop, usage, context_usage, error, keepalive). keepalive
+            carries no data; formatters turn it into a client keep-alive.
         content: Text content (for content events)
         thinking_content: Thinking/reasoning content (for thinking events)
-        tool_use: Tool use data (for tool_use events)
+        tool_use: Tool use data (for tool_use* events)
         usage: Usage/metering data (for usage events)
         context_usage_percentage: Context usage percentage (for context_usage events)
         is_first_thinking_chunk: Whether this is the first thinking chunk
@@ -111,14 +132,107 @@ class FirstTokenTimeoutError(Exception):
     pass
 
 
+class StreamStallError(Exception):
+    """
+    Exception raised when upstream stops sending frames mid-stream.
+    
+    Attributes:
+        stalled_seconds: Time since the last upstream frame.
+    """
+    
+    def __init__(self, stalled_seconds: float):
+        self.stalled_seconds = stalled_seconds
+        super().__init__(
+            f"Upstream sent no data for {stalled_seconds:.0f} seconds; the response was aborted"
+        )
+
+
+async def _watch_stream(
+    byte_iterator: AsyncIterator[bytes],
+    stall_timeout: float,
+    keepalive_interval: float,
+) -> AsyncGenerator[Optional[bytes], None]:
+    """
+    Watchdog around the upstream byte iterator.
+    
+    Yields upstream chunks, and None every keepalive_interval seconds of
+    upstream silence. Reads run in a task that is awaited without being
+    cancelled, so a keep-alive tick never disturbs the pending read.
+    
+    Args:
+        byte_iterator: Upstream byte iterator (after the first chunk).
+        stall_timeout: Seconds without a frame before aborting (0 disables).
+        keepalive_interval: Seconds between keep-alive ticks (0 disables).
+    
+    Raises:
+        StreamStallError: No frame arrived within stall_timeout.
+    """
+    if stall_timeout <= 0 and keepalive_interval <= 0:
+        async for chunk in byte_iterator:
+            yield chunk
+        return
+    
+    loop = asyncio.get_running_loop()
+    last_frame = last_tick = loop.time()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(byte_iterator.__anext__())
+            
+            now = loop.time()
+            deadlines = []
+            if stall_timeout > 0:
+                deadlines.append(last_frame + stall_timeout)
+            if keepalive_interval > 0:
+                deadlines.append(max(last_frame, last_tick) + keepalive_interval)
+            
+            done, _ = await asyncio.wait({pending}, timeout=max(0.0, min(deadlines) - now))
+            if done:
+                task, pending = pending, None
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    return
+                last_frame = loop.time()
+                yield chunk
+                continue
+            
+            stalled = loop.time() - last_frame
+            if stall_timeout > 0 and stalled >= stall_timeout:
+                logger.warning(f"[StreamStall] Upstream sent no data for {stalled:.1f}s, aborting stream")
+                raise StreamStallError(stalled)
+            last_tick = loop.time()
+            yield None
+    finally:
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except BaseException:
+                pass
+
+
 # ==================================================================================================
 # Kiro Stream Parsing
 # ==================================================================================================
 
+def _notify_first_token(response: httpx.Response) -> None:
+    """Run the first-token callback KiroHttpClient attached to the response, if any."""
+    extensions = getattr(response, "extensions", None)
+    callback = extensions.get(FIRST_TOKEN_EXTENSION) if isinstance(extensions, dict) else None
+    if callback is not None:
+        callback()
+
+
 async def parse_kiro_stream(
     response: httpx.Response,
     first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
-    enable_thinking_parser: bool = True
+    enable_thinking_parser: bool = True,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    stall_timeout: float = STREAM_STALL_TIMEOUT,
+    keepalive_interval: float = STREAM_KEEPALIVE_INTERVAL,
+    stream_tool_input: Optional[bool] = None
 ) -> AsyncGenerator[KiroEvent, None]:
     """
     Parses Kiro SSE stream and yields unified events.
@@ -126,16 +240,32 @@ async def parse_kiro_stream(
     This is the core parsing function that converts Kiro's AWS SSE format
     into unified KiroEvent objects that can be formatted for any API.
     
+    At the first content or thinking event it runs the callback that
+    KiroHttpClient attaches to streaming responses, which feeds the
+    account's time-to-first-token EWMA used for scheduling.
+    
     Args:
         response: HTTP response with data stream
         first_token_timeout: First token wait timeout (seconds)
         enable_thinking_parser: Whether to enable thinking block parsing
+        on_first_token_wait: Optional callback receiving the seconds waited for
+                            the first chunk (the full timeout if none arrived),
+                            e.g. AdaptiveFirstTokenTimeout.observer()
+        stall_timeout: Seconds without an upstream frame after the first chunk
+                      before the stream is aborted (0 disables)
+        keepalive_interval: Seconds of upstream silence between keepalive
+                           events (0 disables)
+        stream_tool_input: Whether to report tool_use_start/delta/stop events
+                          while tool calls stream (None: TOOL_INPUT_STREAMING;
+                          non-streaming responses pass False and only use the
+                          final tool_use events)
     
     Yields:
         KiroEvent objects representing stream events
     
     Raises:
         FirstTokenTimeoutError: If first token not received within timeout
+        StreamStallError: If upstream goes silent for stall_timeout seconds
     """
     parser = AwsEventStreamParser()
     first_token_received = False
@@ -146,6 +276,13 @@ async def parse_kiro_stream(
         thinking_parser = ThinkingParser(handling_mode=FAKE_REASONING_HANDLING)
         logger.debug(f"Thinking parser initialized with mode: {FAKE_REASONING_HANDLING}")
     
+    loop = asyncio.get_running_loop()
+    wait_started = loop.time()
+    if isinstance(response, _PrimedResponse):
+        # The hedge race already waited for this response's first chunk
+        wait_started -= response.first_chunk_wait
+    stream_bytes = 0
+    
     try:
         # Create iterator for reading bytes
         byte_iterator = response.aiter_bytes()
@@ -158,8 +295,14 @@ async def parse_kiro_stream(
                 timeout=first_token_timeout
             )
             logger.debug("First token received")
+            first_byte_wait = loop.time() - wait_started
+            UPSTREAM_FIRST_BYTE_SECONDS.observe(first_byte_wait)
+            if on_first_token_wait:
+                on_first_token_wait(first_byte_wait)
         except asyncio.TimeoutError:
             logger.warning(f"[FirstTokenTimeout] Model did not respond within {first_token_timeout}s")
+            if on_first_token_wait:
+                on_first_token_wait(first_token_timeout)
             raise FirstTokenTimeoutError(f"No response within {first_token_timeout} seconds")
         except StopAsyncIteration:
             # Empty response - this is normal, just finish
@@ -169,18 +312,29 @@ async def parse_kiro_stream(
         # Process first chunk
         if debug_logger:
             debug_logger.log_raw_chunk(first_byte_chunk)
+        stream_bytes += len(first_byte_chunk)
         
-        async for event in _process_chunk(parser, first_byte_chunk, thinking_parser):
-            if event.type == "content" or event.type == "thinking":
+        async for event in _process_chunk(parser, first_byte_chunk, thinking_parser, stream_tool_input):
+            if not first_token_received and event.type in ("content", "thinking"):
                 first_token_received = True
+                FIRST_TOKEN_SECONDS.observe(loop.time() - wait_started)
+                _notify_first_token(response)
             yield event
         
-        # Continue reading remaining chunks
-        async for chunk in byte_iterator:
+        # Continue reading remaining chunks under the stall watchdog
+        async for chunk in _watch_stream(byte_iterator, stall_timeout, keepalive_interval):
+            if chunk is None:
+                yield KiroEvent(type="keepalive")
+                continue
             if debug_logger:
                 debug_logger.log_raw_chunk(chunk)
+            stream_bytes += len(chunk)
             
-            async for event in _process_chunk(parser, chunk, thinking_parser):
+            async for event in _process_chunk(parser, chunk, thinking_parser, stream_tool_input):
+                if not first_token_received and event.type in ("content", "thinking"):
+                    first_token_received = True
+                    FIRST_TOKEN_SECONDS.observe(loop.time() - wait_started)
+                    _notify_first_token(response)
                 yield event
         
         # Finalize thinking parser and yield any remaining content
@@ -215,7 +369,7 @@ async def parse_kiro_stream(
         for tc in all_tool_calls:
             yield KiroEvent(type="tool_use", tool_use=tc)
             
-    except FirstTokenTimeoutError:
+    except (FirstTokenTimeoutError, StreamStallError):
         raise
     except GeneratorExit:
         logger.debug("Client disconnected (GeneratorExit)")
@@ -225,12 +379,16 @@ async def parse_kiro_stream(
         error_msg = str(e) if str(e) else "(empty message)"
         logger.error(f"Error during stream parsing: [{error_type}] {error_msg}", exc_info=True)
         raise
+    finally:
+        STREAM_DURATION_SECONDS.observe(loop.time() - wait_started)
+        STREAM_BYTES.observe(stream_bytes)
 
 
 async def _process_chunk(
     parser: AwsEventStreamParser,
     chunk: bytes,
-    thinking_parser: Optional[ThinkingParser]
+    thinking_parser: Optional[ThinkingParser],
+    stream_tool_input: Optional[bool] = None
 ) -> AsyncGenerator[KiroEvent, None]:
     """
     Process a single chunk from Kiro stream.
@@ -239,6 +397,8 @@ async def _process_chunk(
         parser: AWS event stream parser
         chunk: Raw bytes chunk
         thinking_parser: Optional thinking parser for fake reasoning
+        stream_tool_input: Whether to report incremental tool_use_* events
+                          (None: TOOL_INPUT_STREAMING)
     
     Yields:
         KiroEvent objects
@@ -275,6 +435,22 @@ async def _process_chunk(
                 # No thinking parser - pass through as-is
                 yield KiroEvent(type="content", content=content)
         
+        elif event["type"] in ("tool_start", "tool_input", "tool_stop"):
+            if not (TOOL_INPUT_STREAMING if stream_tool_input is None else stream_tool_input):
+                continue
+            
+            data = event["data"]
+            tool_id = data["id"]
+            
+            if event["type"] == "tool_start":
+                yield KiroEvent(type="tool_use_start", tool_use={"id": tool_id, "name": data.get("name", "")})
+            
+            if data.get("input"):
+                yield KiroEvent(type="tool_use_delta", tool_use={"id": tool_id, "arguments": data["input"]})
+            
+            if event["type"] == "tool_stop" or data.get("stop"):
+                yield KiroEvent(type="tool_use_stop", tool_use={"id": tool_id})
+        
         elif event["type"] == "usage":
             yield KiroEvent(type="usage", usage=event["data"])
         
@@ -289,7 +465,8 @@ async def _process_chunk(
 async def collect_stream_to_result(
     response: httpx.Response,
     first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
-    enable_thinking_parser: bool = True
+    enable_thinking_parser: bool = True,
+    on_first_token_wait: Optional[Callable[[float], None]] = None
 ) -> StreamResult:
     """
     Collects full response from Kiro stream.
@@ -301,6 +478,7 @@ async def collect_stream_to_result(
         response: HTTP response with stream
         first_token_timeout: First token wait timeout
         enable_thinking_parser: Whether to enable thinking block parsing
+        on_first_token_wait: Optional callback receiving the first-token wait (seconds)
     
     Returns:
         StreamResult with full content, thinking, tool calls, and usage
@@ -308,7 +486,13 @@ async def collect_stream_to_result(
     result = StreamResult()
     full_content_for_bracket_tools = ""
     
-    async for event in parse_kiro_stream(response, first_token_timeout, enable_thinking_parser):
+    async for event in parse_kiro_stream(
+        response,
+        first_token_timeout,
+        enable_thinking_parser,
+        on_first_token_wait=on_first_token_wait,
+        stream_tool_input=False,
+    ):
         if event.type == "content" and event.content:
             result.content += event.content
             full_content_for_bracket_tools += event.content
@@ -366,6 +550,174 @@ def calculate_tokens_from_context_usage(
 # First Token Retry Logic
 # ==================================================================================================
 
+# Opens a hedge request; returns the response and a callback releasing its resources
+HedgeRequestFactory = Callable[[], Awaitable[Tuple[httpx.Response, Optional[Callable[[], Awaitable[None]]]]]]
+
+
+class _PrimedResponse:
+    """
+    Streaming response whose first body chunk was already read.
+    
+    Racing a hedge requires reading the first chunk before the stream
+    processor runs; aiter_bytes() replays it and then continues the
+    original iterator. first_chunk_wait keeps the time already spent
+    waiting so parse_kiro_stream reports the full first-token wait.
+    Everything else is delegated to the wrapped response.
+    """
+    
+    def __init__(
+        self,
+        response: httpx.Response,
+        first_chunk: bytes,
+        chunks: AsyncIterator[bytes],
+        first_chunk_wait: float = 0.0,
+    ):
+        self._response = response
+        self._first_chunk = first_chunk
+        self._chunks = chunks
+        self.first_chunk_wait = first_chunk_wait
+    
+    async def aiter_bytes(self) -> AsyncGenerator[bytes, None]:
+        if self._first_chunk:
+            yield self._first_chunk
+        async for chunk in self._chunks:
+            yield chunk
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+
+@dataclass
+class _OpenedStream:
+    """Response of one hedge race contender, with its first chunk when streaming."""
+    response: httpx.Response
+    release: Optional[Callable[[], Awaitable[None]]] = None
+    first_chunk: Optional[bytes] = None
+    chunks: Optional[AsyncIterator[bytes]] = None
+    first_chunk_wait: float = 0.0
+
+
+async def _discard_opened(opened: _OpenedStream) -> None:
+    """Close a losing contender and release its resources."""
+    try:
+        await opened.response.aclose()
+    except Exception:
+        pass
+    if opened.release is not None:
+        try:
+            await opened.release()
+        except Exception as e:
+            logger.warning(f"[Hedge] Failed to release hedge request: {e}")
+
+
+async def _open_first_chunk(open_request: HedgeRequestFactory, hedge_policy: HedgePolicy) -> _OpenedStream:
+    """
+    Open a request and wait for the first body chunk of a 200 response.
+    
+    The time from opening to first chunk is recorded as a TTFT sample.
+    On failure or cancellation the response is closed before re-raising.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    response, release = await open_request()
+    opened = _OpenedStream(response=response, release=release)
+    try:
+        if response.status_code != 200:
+            return opened
+        chunks = response.aiter_bytes().__aiter__()
+        try:
+            opened.first_chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            opened.first_chunk = b""
+        opened.chunks = chunks
+        opened.first_chunk_wait = loop.time() - started
+        hedge_policy.record_ttft(opened.first_chunk_wait)
+        return opened
+    except BaseException:
+        await _discard_opened(opened)
+        raise
+
+
+async def _race_first_chunk(
+    make_request: Callable[[], Awaitable[httpx.Response]],
+    hedge_request: HedgeRequestFactory,
+    first_token_timeout: float,
+    hedge_policy: HedgePolicy,
+) -> _OpenedStream:
+    """
+    Wait for a first chunk, firing a hedge request if it is late.
+    
+    The primary request gets hedge_policy.hedge_delay() seconds; after that
+    a hedge is fired if the hedge budget allows it. The first contender to
+    deliver a first chunk wins and the other is cancelled and closed. An
+    error response only wins when no other contender is left.
+    
+    Raises:
+        FirstTokenTimeoutError: No contender delivered a first chunk
+            within first_token_timeout.
+    """
+    async def open_primary():
+        return await make_request(), None
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + first_token_timeout
+    tasks = [asyncio.ensure_future(_open_first_chunk(open_primary, hedge_policy))]
+    pending = set(tasks)
+    done: set = set()
+    winner: Optional[_OpenedStream] = None
+    fallback: Optional[_OpenedStream] = None
+    error: Optional[BaseException] = None
+    
+    try:
+        hedge_delay = hedge_policy.hedge_delay(first_token_timeout)
+        if hedge_delay is not None:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if not done:
+                if hedge_policy.try_acquire():
+                    logger.info(f"[Hedge] No first token after {hedge_delay:.2f}s, firing hedge request")
+                    hedge_task = asyncio.ensure_future(_open_first_chunk(hedge_request, hedge_policy))
+                    tasks.append(hedge_task)
+                    pending.add(hedge_task)
+                else:
+                    logger.debug("[Hedge] Hedge budget exhausted, waiting on the primary request")
+        
+        while True:
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                opened = task.result()
+                if opened.first_chunk is not None:
+                    winner = opened
+                    if task is not tasks[0]:
+                        logger.info("[Hedge] Hedge request won the first-token race")
+                    return winner
+                if fallback is None:
+                    fallback = opened
+            if not pending:
+                if fallback is not None:
+                    winner = fallback
+                    return winner
+                raise error
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise FirstTokenTimeoutError(f"No response within {first_token_timeout} seconds")
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise FirstTokenTimeoutError(f"No response within {first_token_timeout} seconds")
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        for task in tasks:
+            if task.cancelled() or not task.done() or task.exception() is not None:
+                continue
+            opened = task.result()
+            if opened is not winner:
+                await _discard_opened(opened)
+
+
 async def stream_with_first_token_retry(
     make_request: Callable[[], Awaitable[httpx.Response]],
     stream_processor: Callable[[httpx.Response], AsyncGenerator[str, None]],
@@ -373,12 +725,22 @@ async def stream_with_first_token_retry(
     first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
     on_http_error: Optional[Callable[[int, str], Exception]] = None,
     on_all_retries_failed: Optional[Callable[[int, float], Exception]] = None,
+    hedge_request: Optional[HedgeRequestFactory] = None,
+    hedge_policy: Optional[HedgePolicy] = None,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
 ) -> AsyncGenerator[str, None]:
     """
     Generic streaming with automatic retry on first token timeout.
     
     If model doesn't respond within first_token_timeout seconds,
     request is cancelled and a new one is made. Maximum max_retries attempts.
+    Each new attempt spends a token from the process-wide retry budget; when
+    the budget is exhausted the stream fails fast with a 503 error.
+    
+    With hedge_request and hedging enabled (HEDGE_ENABLED), an attempt whose
+    first byte is later than the configured TTFT percentile also fires a
+    hedge request; the first to deliver a byte is streamed and the other is
+    closed (see kiro/hedging.py).
     
     This is seamless for user - they just see a delay,
     but eventually get a response (or error after all attempts).
@@ -395,12 +757,21 @@ async def stream_with_first_token_retry(
         on_all_retries_failed: Optional callback to create exception when all retries fail.
                               Receives (max_retries, timeout), returns Exception.
                               If None, raises generic Exception.
+        hedge_request: Optional factory opening a hedge request, ideally on a
+                      different account. Returns (response, release) where
+                      release frees the hedge's resources (may be None).
+                      Must be safe to run concurrently with make_request.
+        hedge_policy: Hedge policy (default: process-wide get_hedge_policy()).
+        on_first_token_wait: Optional callback receiving the full timeout when a
+                            hedged attempt times out before any first chunk
+                            (otherwise the stream processor reports the wait)
     
     Yields:
         Strings in SSE format (format depends on stream_processor)
     
     Raises:
-        Exception from on_http_error or on_all_retries_failed callbacks
+        Exception from on_http_error (including 503 for an exhausted retry
+        budget) or on_all_retries_failed callbacks
     
     Example:
         >>> async def make_req():
@@ -413,14 +784,44 @@ async def stream_with_first_token_retry(
     """
     last_error: Optional[Exception] = None
     
+    if hedge_request is not None:
+        hedge_policy = hedge_policy or get_hedge_policy()
+        if hedge_policy.enabled:
+            hedge_policy.record_request()
+        else:
+            hedge_request = None
+    
     for attempt in range(max_retries):
         response: Optional[httpx.Response] = None
+        release: Optional[Callable[[], Awaitable[None]]] = None
         try:
             # Make request
             if attempt > 0:
+                if not get_retry_budget().try_acquire():
+                    logger.warning(
+                        f"[FirstTokenTimeout] Retry budget exhausted, not retrying "
+                        f"(attempt {attempt + 1}/{max_retries})"
+                    )
+                    if on_http_error:
+                        raise on_http_error(503, RETRY_BUDGET_EXHAUSTED_MESSAGE)
+                    raise Exception(f"Upstream API error (503): {RETRY_BUDGET_EXHAUSTED_MESSAGE}")
                 logger.warning(f"Retry attempt {attempt + 1}/{max_retries} after first token timeout")
             
-            response = await make_request()
+            if hedge_request is not None:
+                try:
+                    opened = await _race_first_chunk(make_request, hedge_request, first_token_timeout, hedge_policy)
+                except FirstTokenTimeoutError:
+                    # The stream processor never ran, so report the timed-out wait here
+                    if on_first_token_wait:
+                        on_first_token_wait(first_token_timeout)
+                    raise
+                response, release = opened.response, opened.release
+                if opened.first_chunk is not None:
+                    response = _PrimedResponse(
+                        opened.response, opened.first_chunk, opened.chunks, opened.first_chunk_wait
+                    )
+            else:
+                response = await make_request()
             
             if response.status_code != 200:
                 # Error from API - close response and raise exception
@@ -478,6 +879,11 @@ async def stream_with_first_token_retry(
                 except Exception:
                     pass
             raise
+        
+        finally:
+            # Resources of a winning hedge request
+            if release is not None:
+                await release()
     
     # All attempts exhausted - raise error
     logger.error(
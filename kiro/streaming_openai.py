@@ -30,7 +30,7 @@ Uses streaming_core.py for parsing Kiro stream into unified KiroEvent objects.
 
 import json
 import time
-from typing import TYPE_CHECKING, AsyncGenerator, Callable, Awaitable, Optional
+from typing import TYPE_CHECKING, AsyncGenerator, Callable, Awaitable, Dict, Optional
 
 import httpx
 from fastapi import HTTPException
@@ -43,16 +43,20 @@ from kiro.config import (
     FIRST_TOKEN_MAX_RETRIES,
     FAKE_REASONING_HANDLING,
 )
-from kiro.tokenizer import count_tokens, count_message_tokens, count_tools_tokens
+from kiro.tokenizer import StreamingTokenCounter, count_message_tokens, count_tools_tokens
+from kiro.token_calibration import get_token_calibrator
 
 # Import from streaming_core - reuse shared parsing logic
 from kiro.streaming_core import (
     parse_kiro_stream,
     FirstTokenTimeoutError,
+    StreamStallError,
     KiroEvent,
     calculate_tokens_from_context_usage,
     stream_with_first_token_retry as stream_with_first_token_retry_core,
+    HedgeRequestFactory,
 )
+from kiro.hedging import HedgePolicy
 
 if TYPE_CHECKING:
     from kiro.auth import KiroAuthManager
@@ -66,7 +70,7 @@ except ImportError:
 
 
 # Re-export FirstTokenTimeoutError for backward compatibility
-__all__ = ['FirstTokenTimeoutError', 'stream_kiro_to_openai', 'stream_with_first_token_retry', 'collect_stream_response']
+__all__ = ['FirstTokenTimeoutError', 'StreamStallError', 'stream_kiro_to_openai', 'stream_with_first_token_retry', 'collect_stream_response']
 
 
 async def stream_kiro_to_openai_internal(
@@ -78,7 +82,10 @@ async def stream_kiro_to_openai_internal(
     first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
     request_messages: Optional[list] = None,
     request_tools: Optional[list] = None,
-    conversation_id: Optional[str] = None
+    conversation_id: Optional[str] = None,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    on_context_usage: Optional[Callable[[int], None]] = None,
+    stream_tool_input: Optional[bool] = None
 ) -> AsyncGenerator[str, None]:
     """
     Internal generator for converting Kiro stream to OpenAI format.
@@ -100,6 +107,12 @@ async def stream_kiro_to_openai_internal(
         request_tools: Original request tools (for fallback token counting)
         conversation_id: Stable conversation ID for truncation recovery (optional)
         conversation_id: Stable conversation ID for truncation recovery (optional)
+        on_first_token_wait: Optional callback receiving the first-token wait (seconds)
+        on_context_usage: Optional callback receiving the prompt tokens derived from
+                          Kiro's context usage, e.g. TokenCalibrator.observer()
+        stream_tool_input: Forward tool call arguments as they arrive
+                          (None: TOOL_INPUT_STREAMING). Off for collected
+                          responses, which need the normalized final calls.
     
     Yields:
         Strings in SSE format: "data: {...}\\n\\n" or "data: [DONE]\\n\\n"
@@ -121,18 +134,50 @@ async def stream_kiro_to_openai_internal(
     metering_data = None
     context_usage_percentage = None
     full_content = ""
-    full_thinking_content = ""  # Accumulated thinking content for non-streaming
+    # Completion tokens of content and thinking, counted as deltas arrive
+    completion_counter = StreamingTokenCounter()
     
     streaming_error_occurred = False
     tool_calls_from_stream = []
     
+    # Tool calls forwarded while streaming: tool id -> OpenAI tool_calls index
+    streamed_tool_indexes: Dict[str, int] = {}
+    
+    def format_tool_call_delta(tool_call_delta: dict) -> str:
+        """Formats a single delta.tool_calls entry as an OpenAI chunk."""
+        nonlocal first_chunk
+        delta = {"tool_calls": [tool_call_delta]}
+        if first_chunk:
+            delta["role"] = "assistant"
+            first_chunk = False
+        
+        openai_chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created_time,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+        }
+        return f"data: {json.dumps(openai_chunk, ensure_ascii=False)}\n\n"
+    
     try:
         # Use streaming_core.parse_kiro_stream for unified event parsing
         # This handles AWS SSE parsing, first token timeout, and thinking parser
-        async for event in parse_kiro_stream(response, first_token_timeout):
+        async for event in parse_kiro_stream(
+            response,
+            first_token_timeout,
+            on_first_token_wait=on_first_token_wait,
+            stream_tool_input=stream_tool_input,
+        ):
+            if event.type == "keepalive":
+                # SSE comment: keeps proxies and clients from timing out, ignored by parsers
+                yield ": keep-alive\n\n"
+                continue
+            
             if event.type == "content" and event.content:
                 # Accumulate content for bracket tool call detection
                 full_content += event.content
+                completion_counter.feed(event.content)
                 
                 # Format as OpenAI chunk
                 delta = {"content": event.content}
@@ -156,8 +201,8 @@ async def stream_kiro_to_openai_internal(
                 yield chunk_text
             
             elif event.type == "thinking" and event.thinking_content:
-                # Accumulate thinking content
-                full_thinking_content += event.thinking_content
+                # Count thinking content (not kept: only visible content is parsed afterwards)
+                completion_counter.feed(event.thinking_content)
                 
                 # Send as reasoning_content or content based on mode
                 if FAKE_REASONING_HANDLING == "as_reasoning_content":
@@ -184,6 +229,29 @@ async def stream_kiro_to_openai_internal(
                 
                 yield chunk_text
             
+            elif event.type == "tool_use_start" and event.tool_use:
+                # Forward tool call header immediately, arguments follow as fragments
+                tool_id = event.tool_use["id"]
+                if tool_id not in streamed_tool_indexes:
+                    streamed_tool_indexes[tool_id] = len(streamed_tool_indexes)
+                    yield format_tool_call_delta({
+                        "index": streamed_tool_indexes[tool_id],
+                        "id": tool_id,
+                        "type": "function",
+                        "function": {
+                            "name": event.tool_use.get("name", ""),
+                            "arguments": ""
+                        }
+                    })
+            
+            elif event.type == "tool_use_delta" and event.tool_use:
+                tool_id = event.tool_use["id"]
+                if tool_id in streamed_tool_indexes and event.tool_use.get("arguments"):
+                    yield format_tool_call_delta({
+                        "index": streamed_tool_indexes[tool_id],
+                        "function": {"arguments": event.tool_use["arguments"]}
+                    })
+            
             elif event.type == "tool_use" and event.tool_use:
                 # Collect tool calls from stream
                 tool_calls_from_stream.append(event.tool_use)
@@ -222,35 +290,39 @@ async def stream_kiro_to_openai_internal(
         # Determine finish_reason
         finish_reason = "tool_calls" if all_tool_calls else "stop"
         
-        # Count completion_tokens (output) using tiktoken
-        completion_tokens = count_tokens(full_content + full_thinking_content)
+        # Count completion_tokens (output) using tiktoken; only the buffered tail is encoded here
+        completion_tokens = completion_counter.tokens()
         
         # Calculate total_tokens based on context_usage_percentage from Kiro API
         # context_usage shows TOTAL percentage of context usage (input + output)
         prompt_tokens, total_tokens, prompt_source, total_source = calculate_tokens_from_context_usage(
             context_usage_percentage, completion_tokens, model_cache, model
         )
+        if prompt_source == "subtraction" and on_context_usage:
+            on_context_usage(prompt_tokens)
         
         # Fallback: Kiro API didn't return context_usage, use tiktoken
         # Count prompt_tokens from original messages
-        # IMPORTANT: Don't apply correction coefficient for prompt_tokens,
-        # as it was calibrated for completion_tokens
+        # IMPORTANT: Don't apply the static correction coefficient for prompt_tokens,
+        # as it was calibrated for completion_tokens; use the per-model fitted one if any
         if prompt_source == "unknown" and request_messages:
             prompt_tokens = count_message_tokens(request_messages, apply_claude_correction=False)
             if request_tools:
                 prompt_tokens += count_tools_tokens(request_tools, apply_claude_correction=False)
+            prompt_tokens = get_token_calibrator().calibrated_tokens(("openai", model), prompt_tokens)
             total_tokens = prompt_tokens + completion_tokens
             prompt_source = "tiktoken"
             total_source = "tiktoken"
         
-        # Send tool calls if present
-        if all_tool_calls:
-            logger.debug(f"Processing {len(all_tool_calls)} tool calls for streaming response")
+        # Send tool calls that were not forwarded while streaming
+        pending_tool_calls = [tc for tc in all_tool_calls if tc.get("id") not in streamed_tool_indexes]
+        if pending_tool_calls:
+            logger.debug(f"Processing {len(pending_tool_calls)} tool calls for streaming response")
             
             # Add required index field to each tool_call
             # according to OpenAI API specification for streaming
             indexed_tool_calls = []
-            for idx, tc in enumerate(all_tool_calls):
+            for idx, tc in enumerate(pending_tool_calls, start=len(streamed_tool_indexes)):
                 # Extract function with None protection
                 func = tc.get("function") or {}
                 # Use "or" for protection against explicit None in values
@@ -337,8 +409,8 @@ async def stream_kiro_to_openai_internal(
         yield f"data: {json.dumps(final_chunk, ensure_ascii=False)}\n\n"
         yield "data: [DONE]\n\n"
         
-    except FirstTokenTimeoutError:
-        # Propagate timeout up for retry
+    except (FirstTokenTimeoutError, StreamStallError):
+        # Propagate timeout up for retry, stall up for a structured error in routes
         raise
     except GeneratorExit:
         # Client disconnected - this is normal, don't log as error
@@ -375,7 +447,11 @@ async def stream_kiro_to_openai(
     model_cache: "ModelInfoCache",
     auth_manager: "KiroAuthManager",
     request_messages: Optional[list] = None,
-    request_tools: Optional[list] = None
+    request_tools: Optional[list] = None,
+    first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    on_context_usage: Optional[Callable[[int], None]] = None,
+    stream_tool_input: Optional[bool] = None
 ) -> AsyncGenerator[str, None]:
     """
     Generator for converting Kiro stream to OpenAI format.
@@ -391,14 +467,22 @@ async def stream_kiro_to_openai(
         auth_manager: Authentication manager
         request_messages: Original request messages (for fallback token counting)
         request_tools: Original request tools (for fallback token counting)
+        first_token_timeout: First token wait timeout (seconds)
+        on_first_token_wait: Optional callback receiving the first-token wait (seconds)
+        on_context_usage: Optional callback receiving the prompt tokens derived from context usage
+        stream_tool_input: Forward tool call arguments as they arrive (None: TOOL_INPUT_STREAMING)
     
     Yields:
         Strings in SSE format: "data: {...}\\n\\n" or "data: [DONE]\\n\\n"
     """
     async for chunk in stream_kiro_to_openai_internal(
         client, response, model, model_cache, auth_manager,
+        first_token_timeout=first_token_timeout,
         request_messages=request_messages,
-        request_tools=request_tools
+        request_tools=request_tools,
+        on_first_token_wait=on_first_token_wait,
+        on_context_usage=on_context_usage,
+        stream_tool_input=stream_tool_input
     ):
         yield chunk
 
@@ -412,7 +496,11 @@ async def stream_with_first_token_retry(
     max_retries: int = FIRST_TOKEN_MAX_RETRIES,
     first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
     request_messages: Optional[list] = None,
-    request_tools: Optional[list] = None
+    request_tools: Optional[list] = None,
+    hedge_request: Optional[HedgeRequestFactory] = None,
+    hedge_policy: Optional[HedgePolicy] = None,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    on_context_usage: Optional[Callable[[int], None]] = None
 ) -> AsyncGenerator[str, None]:
     """
     Streaming with automatic retry on first token timeout.
@@ -435,6 +523,13 @@ async def stream_with_first_token_retry(
         first_token_timeout: First token wait timeout (seconds)
         request_messages: Original request messages (for fallback token counting)
         request_tools: Original request tools (for fallback token counting)
+        hedge_request: Optional hedge request factory, e.g.
+                      KiroHttpClient.hedge_request_factory(); enables hedged
+                      first-token requests when HEDGE_ENABLED
+        hedge_policy: Hedge policy (default: process-wide get_hedge_policy())
+        on_first_token_wait: Optional callback receiving the first-token wait of
+                            every attempt (seconds), e.g. AdaptiveFirstTokenTimeout.observer()
+        on_context_usage: Optional callback receiving the prompt tokens derived from context usage
     
     Yields:
         Strings in SSE format
@@ -472,7 +567,9 @@ async def stream_with_first_token_retry(
             auth_manager,
             first_token_timeout=first_token_timeout,
             request_messages=request_messages,
-            request_tools=request_tools
+            request_tools=request_tools,
+            on_first_token_wait=on_first_token_wait,
+            on_context_usage=on_context_usage
         ):
             yield chunk
     
@@ -483,6 +580,9 @@ async def stream_with_first_token_retry(
         first_token_timeout=first_token_timeout,
         on_http_error=create_http_error,
         on_all_retries_failed=create_timeout_error,
+        hedge_request=hedge_request,
+        hedge_policy=hedge_policy,
+        on_first_token_wait=on_first_token_wait,
     ):
         yield chunk
 
@@ -494,7 +594,10 @@ async def collect_stream_response(
     model_cache: "ModelInfoCache",
     auth_manager: "KiroAuthManager",
     request_messages: Optional[list] = None,
-    request_tools: Optional[list] = None
+    request_tools: Optional[list] = None,
+    first_token_timeout: float = FIRST_TOKEN_TIMEOUT,
+    on_first_token_wait: Optional[Callable[[float], None]] = None,
+    on_context_usage: Optional[Callable[[int], None]] = None
 ) -> dict:
     """
     Collect full response from streaming stream.
@@ -510,6 +613,9 @@ async def collect_stream_response(
         auth_manager: Authentication manager
         request_messages: Original request messages (for fallback token counting)
         request_tools: Original request tools (for fallback token counting)
+        first_token_timeout: First token wait timeout (seconds)
+        on_first_token_wait: Optional callback receiving the first-token wait (seconds)
+        on_context_usage: Optional callback receiving the prompt tokens derived from context usage
     
     Returns:
         Dictionary with full response in OpenAI chat.completion format
@@ -527,7 +633,11 @@ async def collect_stream_response(
         model_cache,
         auth_manager,
         request_messages=request_messages,
-        request_tools=request_tools
+        request_tools=request_tools,
+        first_token_timeout=first_token_timeout,
+        on_first_token_wait=on_first_token_wait,
+        on_context_usage=on_context_usage,
+        stream_tool_input=False
     ):
         if not chunk_str.startswith("data:"):
             continue
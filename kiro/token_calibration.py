@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+
+# Kiro Gateway
+# https://github.com/jwadow/kiro-gateway
+# Copyright (C) 2025 Jwadow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Online calibration of local token estimates against Kiro's context usage.
+
+The tokenizer (kiro/tokenizer.py) estimates Claude tokens with tiktoken and
+a fixed CLAUDE_CORRECTION_FACTOR. Every response that reports
+contextUsagePercentage gives the real prompt size, so the gateway fits a
+correction per (API, model) online instead:
+
+    actual_prompt_tokens ≈ factor * tiktoken_tokens(messages + tools)
+    actual_prompt_tokens ≈ tokens_per_char * chars(messages + tools)
+
+Both are least-squares fits through the origin with exponential forgetting
+(half-life TOKEN_CALIBRATION_HALF_LIFE samples), so they follow changes in
+Kiro's hidden prompt overhead. Until a fit has TOKEN_CALIBRATION_MIN_SAMPLES
+samples the previous static estimates are used unchanged.
+
+Fitted factors are used for preflight billing and for fallback usage when
+Kiro reports no context usage. Once calibrated, requests of at least
+TOKENIZER_ESTIMATE_ONLY_MIN_CHARS characters skip tiktoken entirely and are
+estimated from their length.
+
+The fits are persisted to TOKEN_CALIBRATION_FILE (JSON) periodically and at
+shutdown, and loaded at startup.
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+from kiro.config import (
+    TOKEN_CALIBRATION_ENABLED,
+    TOKEN_CALIBRATION_FILE,
+    TOKEN_CALIBRATION_HALF_LIFE,
+    TOKEN_CALIBRATION_MIN_SAMPLES,
+    TOKEN_CALIBRATION_SAVE_INTERVAL_SECONDS,
+    TOKENIZER_ESTIMATE_ONLY_MIN_CHARS,
+)
+from kiro.metrics import TOKEN_CORRECTION_FACTOR
+from kiro.tokenizer import (
+    CLAUDE_CORRECTION_FACTOR,
+    count_message_chars,
+    count_message_tokens_async,
+    count_tools_chars,
+    count_tools_tokens_async,
+)
+from kiro.services import services
+
+# (API, model)
+CalibrationKey = Tuple[str, str]
+
+# Samples from small prompts are dominated by noise and fixed overhead
+MIN_SAMPLE_TOKENS = 500
+
+# Samples whose actual/estimated ratio falls outside this range are treated as bogus
+# (e.g. a wrong max_input_tokens for the model)
+MIN_SAMPLE_RATIO = 0.25
+MAX_SAMPLE_RATIO = 8.0
+MIN_TOKENS_PER_CHAR = 0.02
+MAX_TOKENS_PER_CHAR = 2.0
+
+FILE_VERSION = 1
+
+
+@dataclass
+class PromptEstimate:
+    """Request-side token estimate used for billing, timeouts and calibration."""
+    prompt_tokens: int
+    tool_tokens: int
+    # Uncorrected tiktoken count of messages + tools (None when estimated from length)
+    tiktoken_tokens: Optional[int]
+    chars: int
+    method: str  # "static", "calibrated" or "length"
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.tool_tokens
+
+
+class _Fit:
+    """Weighted least-squares fit of y = slope * x through the origin, with forgetting."""
+
+    __slots__ = ("sxx", "sxy", "samples")
+
+    def __init__(self, sxx: float = 0.0, sxy: float = 0.0, samples: int = 0) -> None:
+        self.sxx = sxx
+        self.sxy = sxy
+        # Observations seen (not decayed), for the calibration threshold
+        self.samples = samples
+
+    def add(self, x: float, y: float, decay: float) -> None:
+        self.sxx = self.sxx * decay + x * x
+        self.sxy = self.sxy * decay + x * y
+        self.samples += 1
+
+    def slope(self) -> Optional[float]:
+        return self.sxy / self.sxx if self.sxx > 0 else None
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"sxx": self.sxx, "sxy": self.sxy, "samples": self.samples}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_Fit":
+        return cls(float(data["sxx"]), float(data["sxy"]), int(data["samples"]))
+
+
+class TokenCalibrator:
+    """
+    Per-(API, model) fits of actual prompt tokens against local estimates.
+
+    observe() and the lookups run on the event loop and never await;
+    only save() touches the disk, from a worker thread.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = TOKEN_CALIBRATION_ENABLED,
+        path: str = TOKEN_CALIBRATION_FILE,
+        min_samples: int = TOKEN_CALIBRATION_MIN_SAMPLES,
+        half_life: int = TOKEN_CALIBRATION_HALF_LIFE,
+        save_interval: float = TOKEN_CALIBRATION_SAVE_INTERVAL_SECONDS,
+    ) -> None:
+        """
+        Args:
+            enabled: Learn and apply corrections (False keeps the static estimates).
+            path: JSON file the fits are persisted to.
+            min_samples: Samples a fit needs before it is applied.
+            half_life: Number of samples after which an observation weighs half.
+            save_interval: Seconds between background saves of changed fits.
+        """
+        self.enabled = enabled
+        self._path = Path(path)
+        self._min_samples = min_samples
+        self._decay = 0.5 ** (1.0 / max(half_life, 1))
+        self._save_interval = save_interval
+        self._token_fits: Dict[CalibrationKey, _Fit] = {}
+        self._char_fits: Dict[CalibrationKey, _Fit] = {}
+        self._dirty = False
+        self._save_task: Optional["asyncio.Task[None]"] = None
+
+    # ------------------------------------------------------------------
+    # Learning
+    # ------------------------------------------------------------------
+
+    def observe(self, key: CalibrationKey, estimate: PromptEstimate, actual_tokens: int) -> None:
+        """
+        Record the prompt size Kiro reported for a request.
+
+        Args:
+            key: (API, model) the estimate was made for.
+            estimate: The request's PromptEstimate.
+            actual_tokens: Prompt tokens derived from contextUsagePercentage.
+        """
+        if not self.enabled or actual_tokens < MIN_SAMPLE_TOKENS:
+            return
+        if estimate.tiktoken_tokens is not None and estimate.tiktoken_tokens >= MIN_SAMPLE_TOKENS:
+            ratio = actual_tokens / estimate.tiktoken_tokens
+            if not MIN_SAMPLE_RATIO <= ratio <= MAX_SAMPLE_RATIO:
+                logger.debug(f"[Calibration] Ignoring {key} sample: actual/estimated ratio {ratio:.2f}")
+                return
+            self._token_fits.setdefault(key, _Fit()).add(estimate.tiktoken_tokens, actual_tokens, self._decay)
+            factor = self.factor(key)
+            if factor is not None:
+                TOKEN_CORRECTION_FACTOR.set(factor, *key)
+        if estimate.chars > 0 and MIN_TOKENS_PER_CHAR <= actual_tokens / estimate.chars <= MAX_TOKENS_PER_CHAR:
+            self._char_fits.setdefault(key, _Fit()).add(estimate.chars, actual_tokens, self._decay)
+        self._dirty = True
+
+    def observer(self, key: CalibrationKey, estimate: PromptEstimate) -> Callable[[int], None]:
+        """Return a callback recording the actual prompt tokens of one request (for the stream converters)."""
+        return lambda actual_tokens: self.observe(key, estimate, actual_tokens)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _calibrated_slope(self, fits: Dict[CalibrationKey, _Fit], key: CalibrationKey) -> Optional[float]:
+        if not self.enabled:
+            return None
+        fit = fits.get(key)
+        if fit is None or fit.samples < self._min_samples:
+            return None
+        return fit.slope()
+
+    def factor(self, key: CalibrationKey) -> Optional[float]:
+        """Fitted actual/tiktoken factor, or None while uncalibrated."""
+        return self._calibrated_slope(self._token_fits, key)
+
+    def tokens_per_char(self, key: CalibrationKey) -> Optional[float]:
+        """Fitted actual tokens per character, or None while uncalibrated."""
+        return self._calibrated_slope(self._char_fits, key)
+
+    def calibrated_tokens(self, key: CalibrationKey, tiktoken_tokens: int) -> int:
+        """
+        Correct an uncorrected tiktoken prompt count (fallback usage).
+
+        Returns the count unchanged while the key is uncalibrated.
+        """
+        factor = self.factor(key)
+        if factor is None:
+            return tiktoken_tokens
+        return int(tiktoken_tokens * factor)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Describe every fit, for diagnostics and persistence."""
+        rows: Dict[str, Dict[str, Any]] = {}
+        for key in sorted(set(self._token_fits) | set(self._char_fits)):
+            row: Dict[str, Any] = {}
+            if key in self._token_fits:
+                row["tokens"] = self._token_fits[key].to_dict()
+                row["factor"] = self._token_fits[key].slope()
+            if key in self._char_fits:
+                row["chars"] = self._char_fits[key].to_dict()
+                row["tokens_per_char"] = self._char_fits[key].slope()
+            rows[f"{key[0]}:{key[1]}"] = row
+        return rows
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self) -> int:
+        """
+        Load persisted fits (blocking). A missing or unreadable file is ignored.
+
+        Returns:
+            Number of (API, model) keys loaded.
+        """
+        try:
+            with open(self._path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+            models = data.get("models", {}) if data.get("version") == FILE_VERSION else {}
+            for name, row in models.items():
+                api, _, model = name.partition(":")
+                key = (api, model)
+                if "tokens" in row:
+                    self._token_fits[key] = _Fit.from_dict(row["tokens"])
+                if "chars" in row:
+                    self._char_fits[key] = _Fit.from_dict(row["chars"])
+                factor = self.factor(key)
+                if factor is not None:
+                    TOKEN_CORRECTION_FACTOR.set(factor, *key)
+            return len(models)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"[Calibration] Ignoring unreadable {self._path}: {e}")
+            return 0
+
+    def save(self) -> None:
+        """Write the fits atomically (blocking)."""
+        payload = {"version": FILE_VERSION, "saved_at": time.time(), "models": self.snapshot()}
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        if self._path.parent != Path(""):
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._path)
+
+    async def _save_if_dirty(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.save)
+        except OSError as e:
+            self._dirty = True
+            logger.warning(f"[Calibration] Failed to save {self._path}: {e}")
+
+    async def _save_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._save_interval)
+            await self._save_if_dirty()
+
+    def start(self) -> None:
+        """Start saving changed fits every save_interval seconds."""
+        if self.enabled and (self._save_task is None or self._save_task.done()):
+            self._save_task = asyncio.get_running_loop().create_task(self._save_loop())
+
+    async def close(self) -> None:
+        """Stop the background saver and save pending changes."""
+        task = self._save_task
+        self._save_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._save_if_dirty()
+
+
+async def estimate_prompt_tokens(
+    key: CalibrationKey,
+    messages: list,
+    tools: Optional[list] = None,
+    calibrator: Optional[TokenCalibrator] = None,
+) -> PromptEstimate:
+    """
+    Estimate the prompt and tool tokens of a request for billing and timeouts.
+
+    - Uncalibrated: uncorrected tiktoken message tokens plus corrected tool
+      tokens (the gateway's static estimate).
+    - Calibrated: tiktoken tokens times the fitted factor.
+    - Calibrated and at least TOKENIZER_ESTIMATE_ONLY_MIN_CHARS long:
+      length times the fitted tokens per character, without tiktoken.
+
+    Args:
+        key: (API, model) of the request.
+        messages: Messages in tokenizer (dict) form.
+        tools: Tool definitions in tokenizer (dict) form.
+        calibrator: Calibrator to use (default: the process-wide one).
+
+    Returns:
+        PromptEstimate.
+    """
+    calibrator = calibrator or get_token_calibrator()
+    message_chars = count_message_chars(messages)
+    tool_chars = count_tools_chars(tools)
+    chars = message_chars + tool_chars
+
+    per_char = calibrator.tokens_per_char(key)
+    if per_char is not None and TOKENIZER_ESTIMATE_ONLY_MIN_CHARS > 0 and chars >= TOKENIZER_ESTIMATE_ONLY_MIN_CHARS:
+        return PromptEstimate(
+            prompt_tokens=int(message_chars * per_char),
+            tool_tokens=int(tool_chars * per_char),
+            tiktoken_tokens=None,
+            chars=chars,
+            method="length",
+        )
+
+    message_tokens = await count_message_tokens_async(messages, apply_claude_correction=False)
+    tool_tokens = await count_tools_tokens_async(tools, apply_claude_correction=False) if tools else 0
+    factor = calibrator.factor(key)
+    if factor is None:
+        return PromptEstimate(
+            prompt_tokens=message_tokens,
+            tool_tokens=int(tool_tokens * CLAUDE_CORRECTION_FACTOR),
+            tiktoken_tokens=message_tokens + tool_tokens,
+            chars=chars,
+            method="static",
+        )
+    return PromptEstimate(
+        prompt_tokens=int(message_tokens * factor),
+        tool_tokens=int(tool_tokens * factor),
+        tiktoken_tokens=message_tokens + tool_tokens,
+        chars=chars,
+        method="calibrated",
+    )
+
+
+def _create_token_calibrator() -> TokenCalibrator:
+    """Build the calibrator persisted to TOKEN_CALIBRATION_FILE."""
+    return TokenCalibrator(path=TOKEN_CALIBRATION_FILE)
+
+
+def _discard_token_calibrator(calibrator: TokenCalibrator) -> None:
+    """Stop a dropped calibrator's save task (the persisted file is left alone)."""
+    if calibrator._save_task is not None:
+        calibrator._save_task.cancel()
+
+
+services.register("token_calibrator", _create_token_calibrator, discard=_discard_token_calibrator)
+
+
+def get_token_calibrator() -> TokenCalibrator:
+    """Return the process-wide token calibrator (see kiro/services.py)."""
+    return services.get("token_calibrator")
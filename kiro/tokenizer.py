@@ -30,11 +30,42 @@ so tiktoken with a correction coefficient is used.
 The correction coefficient CLAUDE_CORRECTION_FACTOR = 1.15 is based on
 empirical observations: Claude tokenizes text approximately 15%
 more than GPT-4 (cl100k_base). This is due to differences in BPE vocabularies.
+
+Token counts of individual messages and tool definitions are memoized in a
+byte-budgeted LRU (TokenCountCache) keyed by a hash of their content. Agent
+clients resend the whole conversation every turn, so only new or changed
+messages are encoded, and the route and the streaming code that count the
+same request share the cached counts.
+
+Large payloads are hashed and encoded on a dedicated thread pool (the
+*_async variants used by the routes), with all strings of a request
+encoded in one tiktoken encode_batch call so the work spreads across
+cores; small payloads stay inline on the event loop.
+
+Streamed completions are counted as they arrive (StreamingTokenCounter),
+so the final usage does not wait for one large encode of the whole output.
 """
 
-from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
 
+from kiro.config import (
+    TOKENIZER_CACHE_MAX_BYTES,
+    TOKENIZER_CACHE_MIN_CHARS,
+    TOKENIZER_OFFLOAD_MIN_CHARS,
+    TOKENIZER_THREADS,
+)
+from kiro.metrics import TOKENIZER_CACHE_LOOKUPS_TOTAL, TOKENIZER_SECONDS
+from kiro.services import services
+
 # Lazy loading of tiktoken to speed up import
 _encoding = None
 
@@ -87,6 +118,22 @@ def count_tokens(text: str, apply_claude_correction: bool = True) -> int:
     if not text:
         return 0
     
+    started = time.perf_counter()
+    tokens = _count_text_tokens(text, apply_claude_correction)
+    TOKENIZER_SECONDS.labels("count_tokens").observe(time.perf_counter() - started)
+    return tokens
+
+
+def _count_text_tokens(text: str, apply_claude_correction: bool = True) -> int:
+    """
+    Counts tokens in text without recording tokenizer metrics.
+    
+    Used by count_tokens() and by the message/tool counters, which time
+    themselves as a whole.
+    """
+    if not text:
+        return 0
+    
     encoding = _get_encoding()
     if encoding:
         try:
@@ -106,6 +153,364 @@ def count_tokens(text: str, apply_claude_correction: bool = True) -> int:
     return base_estimate
 
 
+class StreamingTokenCounter:
+    """
+    Counts the tokens of streamed text as deltas arrive.
+
+    Approximates count_tokens() on the concatenated text without keeping
+    that text: deltas are buffered until FLUSH_CHARS, encoded, and all
+    tokens except the last CARRY_TOKENS are committed. The text of those
+    trailing tokens is carried into the next buffer, so BPE merges across
+    a delta boundary are counted as in one string. A single pre-token
+    longer than the carry (a long word or whitespace run) can still be
+    split differently, off by a token or so per flush.
+    """
+
+    # Buffered characters that trigger an encode
+    FLUSH_CHARS = 2048
+    # Trailing tokens re-encoded with the next buffer (covers merges across the boundary)
+    CARRY_TOKENS = 8
+    # Buffered characters after which everything is committed, even without a safe boundary
+    MAX_PENDING_CHARS = 8192
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._committed_tokens = 0
+        self._chars = 0
+        self._flush_at = self.FLUSH_CHARS
+
+    def feed(self, text: str) -> None:
+        """Adds a streamed delta."""
+        if not text:
+            return
+        self._chars += len(text)
+        self._pending += text
+        if len(self._pending) >= self._flush_at:
+            self._flush()
+
+    def _flush(self) -> None:
+        encoding = _get_encoding()
+        if not encoding:
+            # Fallback estimate only needs the character count
+            self._pending = ""
+            return
+
+        started = time.perf_counter()
+        try:
+            tokens = encoding.encode(self._pending)
+        except Exception as e:
+            logger.warning(f"[Tokenizer] Error encoding streamed text: {e}")
+            self._committed_tokens += len(self._pending) // 4
+            self._pending = ""
+            self._flush_at = self.FLUSH_CHARS
+            return
+
+        committed = len(tokens) - self.CARRY_TOKENS
+        carry = ""
+        pending_bytes = self._pending.encode("utf-8")
+        while committed > 0:
+            # Tokens can end inside a multi-byte character; commit only on a character boundary
+            carry_bytes = len(encoding.decode_bytes(tokens[committed:]))
+            try:
+                carry = pending_bytes[len(pending_bytes) - carry_bytes:].decode("utf-8")
+                break
+            except UnicodeDecodeError:
+                committed -= 1
+
+        if committed <= 0 and len(self._pending) >= self.MAX_PENDING_CHARS:
+            # No safe boundary in a large buffer: commit it whole rather than re-encode it forever
+            committed, carry = len(tokens), ""
+        if committed > 0:
+            self._committed_tokens += committed
+            self._pending = carry
+        # Re-encode only after another FLUSH_CHARS, also when nothing could be committed
+        self._flush_at = len(self._pending) + self.FLUSH_CHARS
+        TOKENIZER_SECONDS.labels("streaming_token_counter").observe(time.perf_counter() - started)
+
+    def tokens(self, apply_claude_correction: bool = True) -> int:
+        """
+        Returns the token count of everything fed so far.
+
+        Only the buffered tail (at most MAX_PENDING_CHARS) is encoded here.
+
+        Args:
+            apply_claude_correction: Apply correction coefficient for Claude (default True)
+
+        Returns:
+            Number of tokens (approximate, with Claude correction)
+        """
+        if not self._chars:
+            return 0
+
+        if not _get_encoding():
+            # Same fallback estimate as count_tokens() on the whole text
+            return _correct(self._chars // 4 + 1, apply_claude_correction)
+
+        started = time.perf_counter()
+        base_tokens = self._committed_tokens + _count_text_tokens(self._pending, apply_claude_correction=False)
+        TOKENIZER_SECONDS.labels("streaming_token_counter").observe(time.perf_counter() - started)
+        return _correct(base_tokens, apply_claude_correction)
+
+
+class TokenCountCache:
+    """
+    LRU of content hash -> uncorrected token count, bounded by a memory budget.
+
+    Shared by the event loop and tokenizer worker threads, so access is
+    guarded by a lock.
+    """
+
+    # OrderedDict node and bookkeeping per entry, on top of the key and value objects
+    _ENTRY_OVERHEAD_BYTES = 100
+
+    def __init__(self, max_bytes: int = TOKENIZER_CACHE_MAX_BYTES) -> None:
+        """
+        Args:
+            max_bytes: Memory budget; least recently used entries are evicted beyond it.
+        """
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[bytes, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Estimated memory held by the cached entries."""
+        return self._bytes
+
+    @classmethod
+    def _entry_bytes(cls, key: bytes, tokens: int) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(tokens) + cls._ENTRY_OVERHEAD_BYTES
+
+    def get(self, key: bytes) -> Optional[int]:
+        """Return the cached count for a content hash, or None."""
+        with self._lock:
+            tokens = self._entries.get(key)
+            if tokens is not None:
+                self._entries.move_to_end(key)
+        TOKENIZER_CACHE_LOOKUPS_TOTAL.labels("hit" if tokens is not None else "miss").inc()
+        return tokens
+
+    def put(self, key: bytes, tokens: int) -> None:
+        """Cache a count, evicting least recently used entries over the budget."""
+        size = self._entry_bytes(key, tokens)
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._entry_bytes(key, previous)
+            self._entries[key] = tokens
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                evicted_key, evicted_tokens = self._entries.popitem(last=False)
+                self._bytes -= self._entry_bytes(evicted_key, evicted_tokens)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+services.register("token_count_cache", TokenCountCache)
+
+
+def get_token_count_cache() -> TokenCountCache:
+    """Return the process-wide token count cache (see kiro/services.py)."""
+    return services.get("token_count_cache")
+
+
+def _content_key(kind: bytes, item: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Hash a message or tool definition for the token count cache.
+
+    Returns:
+        16-byte digest, or None if the item is too small to be worth caching
+        (or caching is disabled).
+    """
+    if TOKENIZER_CACHE_MAX_BYTES <= 0:
+        return None
+    try:
+        serialized = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return None
+    if len(serialized) < TOKENIZER_CACHE_MIN_CHARS:
+        return None
+    digest = hashlib.blake2b(kind, digest_size=16)
+    digest.update(serialized.encode("utf-8", "surrogatepass"))
+    return digest.digest()
+
+
+# (cache key kind, item, fixed tokens, strings to encode)
+_Prepared = Tuple[bytes, Dict[str, Any], int, List[str]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Lazily create the dedicated tokenizer thread pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=TOKENIZER_THREADS, thread_name_prefix="tokenizer")
+    return _executor
+
+
+def shutdown_tokenizer_executor() -> None:
+    """Stop the tokenizer thread pool (recreated on next use)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _encode_lengths(texts: List[str]) -> List[int]:
+    """
+    Counts uncorrected tokens of several strings.
+    
+    Large batches go through tiktoken's encode_batch, which encodes on
+    TOKENIZER_THREADS threads (tiktoken releases the GIL); small ones are
+    encoded one by one.
+    """
+    if not texts:
+        return []
+    
+    encoding = _get_encoding()
+    if encoding and len(texts) > 1 and sum(len(text) for text in texts) >= TOKENIZER_OFFLOAD_MIN_CHARS:
+        try:
+            return [len(tokens) for tokens in encoding.encode_batch(texts, num_threads=TOKENIZER_THREADS)]
+        except Exception as e:
+            # E.g. a special token in the text: count string by string (with per-string fallback)
+            logger.warning(f"[Tokenizer] Batch encoding failed, encoding strings one by one: {e}")
+    return [_count_text_tokens(text, apply_claude_correction=False) for text in texts]
+
+
+def _count_prepared(prepared: List[_Prepared]) -> List[int]:
+    """
+    Counts uncorrected tokens of prepared items, using and filling the cache.
+    
+    The strings of all uncached items are encoded in one batch.
+    """
+    cache = get_token_count_cache()
+    counts = [0] * len(prepared)
+    keys: List[Optional[bytes]] = [None] * len(prepared)
+    pending_texts: List[str] = []
+    owners: List[int] = []
+    
+    for index, (kind, item, fixed, texts) in enumerate(prepared):
+        key = _content_key(kind, item)
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                counts[index] = cached
+                continue
+            keys[index] = key
+        counts[index] = fixed
+        pending_texts.extend(texts)
+        owners.extend([index] * len(texts))
+    
+    for index, tokens in zip(owners, _encode_lengths(pending_texts)):
+        counts[index] += tokens
+    
+    for index, key in enumerate(keys):
+        if key is not None:
+            cache.put(key, counts[index])
+    return counts
+
+
+async def _count_prepared_async(prepared: List[_Prepared]) -> List[int]:
+    """Runs _count_prepared() on the tokenizer pool unless the payload is small."""
+    chars = sum(len(text) for _, _, _, texts in prepared for text in texts)
+    if chars < TOKENIZER_OFFLOAD_MIN_CHARS:
+        return _count_prepared(prepared)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _count_prepared, prepared)
+
+
+def _correct(tokens: int, apply_claude_correction: bool) -> int:
+    if apply_claude_correction:
+        return int(tokens * CLAUDE_CORRECTION_FACTOR)
+    return tokens
+
+
+def _strings(*values: Any) -> List[str]:
+    """Non-empty strings among values."""
+    return [value for value in values if isinstance(value, str) and value]
+
+
+def _prepare_message(message: Dict[str, Any]) -> _Prepared:
+    """Splits a chat message into fixed service tokens and the strings to encode."""
+    # Base tokens per message (role, delimiters)
+    fixed = 4  # ~4 tokens for service information
+    
+    # Role tokens (without correction, these are short strings)
+    texts = _strings(message.get("role", ""))
+    
+    # Content tokens
+    content = message.get("content")
+    if content:
+        if isinstance(content, str):
+            texts.extend(_strings(content))
+        elif isinstance(content, list):
+            # Multimodal content (text + images)
+            for item in content:
+                if isinstance(item, dict):
+                    if item.get("type") == "text":
+                        texts.extend(_strings(item.get("text", "")))
+                    elif item.get("type") == "image_url":
+                        # Images take ~85-170 tokens depending on size
+                        fixed += 100  # Average estimate
+    
+    # tool_calls tokens (if present)
+    tool_calls = message.get("tool_calls")
+    if tool_calls:
+        for tc in tool_calls:
+            fixed += 4  # Service tokens
+            func = tc.get("function", {})
+            texts.extend(_strings(func.get("name", ""), func.get("arguments", "")))
+    
+    # tool_call_id tokens (for tool responses)
+    if message.get("tool_call_id"):
+        texts.extend(_strings(message["tool_call_id"]))
+    
+    return b"message", message, fixed, texts
+
+
+def _prepare_tool(tool: Dict[str, Any]) -> _Prepared:
+    """Splits a tool definition into fixed service tokens and the strings to encode."""
+    fixed = 4  # Service tokens
+    texts: List[str] = []
+    
+    if tool.get("type") == "function":
+        func = tool.get("function", {})
+        
+        # Function name and description
+        texts.extend(_strings(func.get("name", ""), func.get("description", "")))
+        
+        # Parameters (JSON schema)
+        params = func.get("parameters")
+        if params:
+            texts.append(json.dumps(params, ensure_ascii=False))
+    
+    return b"tool", tool, fixed, texts
+
+
+def _prepare_system(system_prompt: str) -> _Prepared:
+    return b"system", {"text": system_prompt}, 0, _strings(system_prompt)
+
+
+def count_message_chars(messages: Optional[List[Dict[str, Any]]]) -> int:
+    """Total length of the strings count_message_tokens() would encode (no encoding)."""
+    return sum(len(text) for message in messages or [] for text in _prepare_message(message)[3])
+
+
+def count_tools_chars(tools: Optional[List[Dict[str, Any]]]) -> int:
+    """Total length of the strings count_tools_tokens() would encode (no encoding)."""
+    return sum(len(text) for tool in tools or [] for text in _prepare_tool(tool)[3])
+
+
 def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction: bool = True) -> int:
     """
     Counts tokens in a list of chat messages.
@@ -115,6 +520,9 @@ def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction
     - content: text tokens
     - Service tokens between messages: ~3-4 tokens
     
+    Per-message counts are memoized, so a resent history only encodes
+    the messages that are new or changed.
+    
     Args:
         messages: List of messages in OpenAI format
         apply_claude_correction: Apply correction coefficient for Claude
@@ -125,51 +533,32 @@ def count_message_tokens(messages: List[Dict[str, Any]], apply_claude_correction
     if not messages:
         return 0
     
-    total_tokens = 0
+    started = time.perf_counter()
+    # Final service tokens: +3
+    total_tokens = sum(_count_prepared([_prepare_message(message) for message in messages])) + 3
+    TOKENIZER_SECONDS.labels("count_message_tokens").observe(time.perf_counter() - started)
     
-    for message in messages:
-        # Base tokens per message (role, delimiters)
-        total_tokens += 4  # ~4 tokens for service information
-        
-        # Role tokens (without correction, these are short strings)
-        role = message.get("role", "")
-        total_tokens += count_tokens(role, apply_claude_correction=False)
-        
-        # Content tokens
-        content = message.get("content")
-        if content:
-            if isinstance(content, str):
-                total_tokens += count_tokens(content, apply_claude_correction=False)
-            elif isinstance(content, list):
-                # Multimodal content (text + images)
-                for item in content:
-                    if isinstance(item, dict):
-                        if item.get("type") == "text":
-                            total_tokens += count_tokens(item.get("text", ""), apply_claude_correction=False)
-                        elif item.get("type") == "image_url":
-                            # Images take ~85-170 tokens depending on size
-                            total_tokens += 100  # Average estimate
-        
-        # tool_calls tokens (if present)
-        tool_calls = message.get("tool_calls")
-        if tool_calls:
-            for tc in tool_calls:
-                total_tokens += 4  # Service tokens
-                func = tc.get("function", {})
-                total_tokens += count_tokens(func.get("name", ""), apply_claude_correction=False)
-                total_tokens += count_tokens(func.get("arguments", ""), apply_claude_correction=False)
-        
-        # tool_call_id tokens (for tool responses)
-        if message.get("tool_call_id"):
-            total_tokens += count_tokens(message["tool_call_id"], apply_claude_correction=False)
+    # Apply correction to total count
+    return _correct(total_tokens, apply_claude_correction)
+
+
+async def count_message_tokens_async(
+    messages: List[Dict[str, Any]],
+    apply_claude_correction: bool = True
+) -> int:
+    """
+    Async variant of count_message_tokens().
     
-    # Final service tokens
-    total_tokens += 3
+    Payloads of TOKENIZER_OFFLOAD_MIN_CHARS or more are hashed and encoded
+    on the tokenizer thread pool instead of the event loop.
+    """
+    if not messages:
+        return 0
     
-    # Apply correction to total count
-    if apply_claude_correction:
-        return int(total_tokens * CLAUDE_CORRECTION_FACTOR)
-    return total_tokens
+    started = time.perf_counter()
+    counts = await _count_prepared_async([_prepare_message(message) for message in messages])
+    TOKENIZER_SECONDS.labels("count_message_tokens").observe(time.perf_counter() - started)
+    return _correct(sum(counts) + 3, apply_claude_correction)
 
 
 def count_tools_tokens(tools: Optional[List[Dict[str, Any]]], apply_claude_correction: bool = True) -> int:
@@ -186,31 +575,59 @@ def count_tools_tokens(tools: Optional[List[Dict[str, Any]]], apply_claude_corre
     if not tools:
         return 0
     
-    total_tokens = 0
-    
-    for tool in tools:
-        total_tokens += 4  # Service tokens
-        
-        if tool.get("type") == "function":
-            func = tool.get("function", {})
-            
-            # Function name
-            total_tokens += count_tokens(func.get("name", ""), apply_claude_correction=False)
-            
-            # Function description
-            total_tokens += count_tokens(func.get("description", ""), apply_claude_correction=False)
-            
-            # Parameters (JSON schema)
-            params = func.get("parameters")
-            if params:
-                import json
-                params_str = json.dumps(params, ensure_ascii=False)
-                total_tokens += count_tokens(params_str, apply_claude_correction=False)
+    started = time.perf_counter()
+    total_tokens = sum(_count_prepared([_prepare_tool(tool) for tool in tools]))
+    TOKENIZER_SECONDS.labels("count_tools_tokens").observe(time.perf_counter() - started)
     
     # Apply correction to total count
-    if apply_claude_correction:
-        return int(total_tokens * CLAUDE_CORRECTION_FACTOR)
-    return total_tokens
+    return _correct(total_tokens, apply_claude_correction)
+
+
+async def count_tools_tokens_async(
+    tools: Optional[List[Dict[str, Any]]],
+    apply_claude_correction: bool = True
+) -> int:
+    """Async variant of count_tools_tokens() (large payloads are counted off the event loop)."""
+    if not tools:
+        return 0
+    
+    started = time.perf_counter()
+    counts = await _count_prepared_async([_prepare_tool(tool) for tool in tools])
+    TOKENIZER_SECONDS.labels("count_tools_tokens").observe(time.perf_counter() - started)
+    return _correct(sum(counts), apply_claude_correction)
+
+
+def _request_breakdown(
+    counts: List[int],
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]],
+    system_prompt: Optional[str]
+) -> Dict[str, int]:
+    """Splits per-item counts of [messages..., tools..., system] into the estimate dictionary."""
+    message_count = len(messages) if messages else 0
+    tool_count = len(tools) if tools else 0
+    messages_tokens = _correct(sum(counts[:message_count]) + 3, True) if messages else 0
+    tools_tokens = _correct(sum(counts[message_count:message_count + tool_count]), True)
+    system_tokens = _correct(sum(counts[message_count + tool_count:]), True) if system_prompt else 0
+    
+    return {
+        "messages_tokens": messages_tokens,
+        "tools_tokens": tools_tokens,
+        "system_tokens": system_tokens,
+        "total_tokens": messages_tokens + tools_tokens + system_tokens
+    }
+
+
+def _prepare_request(
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]],
+    system_prompt: Optional[str]
+) -> List[_Prepared]:
+    prepared = [_prepare_message(message) for message in messages or []]
+    prepared.extend(_prepare_tool(tool) for tool in tools or [])
+    if system_prompt:
+        prepared.append(_prepare_system(system_prompt))
+    return prepared
 
 
 def estimate_request_tokens(
@@ -221,6 +638,8 @@ def estimate_request_tokens(
     """
     Estimates total number of tokens in request.
     
+    Message, tool and system prompt strings are encoded in one batch.
+    
     Args:
         messages: List of messages
         tools: List of tools (optional)
@@ -233,13 +652,19 @@ def estimate_request_tokens(
         - system_tokens: system prompt tokens
         - total_tokens: total count
     """
-    messages_tokens = count_message_tokens(messages)
-    tools_tokens = count_tools_tokens(tools)
-    system_tokens = count_tokens(system_prompt) if system_prompt else 0
-    
-    return {
-        "messages_tokens": messages_tokens,
-        "tools_tokens": tools_tokens,
-        "system_tokens": system_tokens,
-        "total_tokens": messages_tokens + tools_tokens + system_tokens
-    }
\ No newline at end of file
+    started = time.perf_counter()
+    counts = _count_prepared(_prepare_request(messages, tools, system_prompt))
+    TOKENIZER_SECONDS.labels("estimate_request_tokens").observe(time.perf_counter() - started)
+    return _request_breakdown(counts, messages, tools, system_prompt)
+
+
+async def estimate_request_tokens_async(
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]] = None,
+    system_prompt: Optional[str] = None
+) -> Dict[str, int]:
+    """Async variant of estimate_request_tokens() (large payloads are counted off the event loop)."""
+    started = time.perf_counter()
+    counts = await _count_prepared_async(_prepare_request(messages, tools, system_prompt))
+    TOKENIZER_SECONDS.labels("estimate_request_tokens").observe(time.perf_counter() - started)
+    return _request_breakdown(counts, messages, tools, system_prompt)
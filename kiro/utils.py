@@ -98,6 +98,18 @@ def generate_completion_id() -> str:
     return f"chatcmpl-{uuid.uuid4().hex}"
 
 
+def generate_request_id() -> str:
+    """
+    Generates a unique ID for one API request.
+    
+    Used as the idempotency key of the request's credit charge.
+    
+    Returns:
+        32-char hex string
+    """
+    return uuid.uuid4().hex
+
+
 def generate_conversation_id(messages: List[Dict[str, Any]] = None) -> str:
     """
     Generates a stable conversation ID based on message history.
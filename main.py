@@ -66,12 +66,20 @@ from kiro.config import (
     MONGODB_DB_NAME,
     MONGODB_AUTH_KV_COLLECTION,
     PROXY_API_KEY,
+    API_KEY_SOURCE,
+    API_KEY_CACHE_CHANGE_STREAM,
+    BILLING_ENABLED,
+    BILLING_LEDGER_ENABLED,
+    BILLING_JOURNAL_ENABLED,
+    BILLING_JOURNAL_DIR,
     LOG_LEVEL,
     SERVER_HOST,
     SERVER_PORT,
     DEFAULT_SERVER_HOST,
     DEFAULT_SERVER_PORT,
     STREAMING_READ_TIMEOUT,
+    STREAMING_POOL_ENABLED,
+    TOKEN_BACKGROUND_REFRESH_ENABLED,
     HIDDEN_MODELS,
     MODEL_ALIASES,
     HIDDEN_FROM_LIST,
@@ -80,12 +88,24 @@ from kiro.config import (
     _warn_timeout_configuration,
 )
 from kiro.auth import KiroAuthManager
+from kiro.api_key_cache import get_api_key_cache
+from kiro.mongodb_async import get_async_mongo_store
+from kiro.credit_ledger import get_credit_ledger
+from kiro.billing_journal import BillingJournal
+from kiro.tokenizer import shutdown_tokenizer_executor
+from kiro.token_calibration import get_token_calibrator
+from kiro.services import services
+from kiro.mongodb_store import open_users_change_stream
 from kiro.cache import ModelInfoCache
+from kiro.http_client import StreamingClientPool
 from kiro.model_resolver import ModelResolver
 from kiro.routes_openai import router as openai_router
 from kiro.routes_anthropic import router as anthropic_router
+from kiro.routes_admin import router as admin_router
+from kiro.routes_metrics import router as metrics_router
 from kiro.exceptions import validation_exception_handler
 from kiro.debug_middleware import DebugLoggerMiddleware
+from kiro.server_timing import ServerTimingMiddleware
 
 
 # --- Loguru Configuration ---
@@ -357,6 +377,13 @@ async def lifespan(app: FastAPI):
     )
     logger.info("Shared HTTP client created with connection pooling")
     
+    # Keep-alive pool for streaming requests (recycled on network change/read error/max age)
+    if STREAMING_POOL_ENABLED:
+        app.state.streaming_client_pool = StreamingClientPool()
+        logger.info("Streaming connection pool enabled")
+    else:
+        app.state.streaming_client_pool = None
+    
     # Create AuthManager
     # Priority: SQLite DB > JSON file > environment variables
     app.state.auth_manager = KiroAuthManager(
@@ -371,6 +398,28 @@ async def lifespan(app: FastAPI):
         mongodb_collection=MONGODB_AUTH_KV_COLLECTION,
     )
     app.state.auth_manager.start_periodic_account_pool_reload()
+    if TOKEN_BACKGROUND_REFRESH_ENABLED:
+        app.state.auth_manager.start_background_token_refresh()
+    
+    # Invalidate cached API-key lookups as soon as users change in MongoDB
+    if API_KEY_SOURCE == "mongodb" and API_KEY_CACHE_CHANGE_STREAM:
+        get_api_key_cache().start_change_stream(open_users_change_stream)
+
+    # Per-model token estimate corrections learned by previous runs
+    token_calibrator = get_token_calibrator()
+    if token_calibrator.enabled:
+        loaded = token_calibrator.load()
+        if loaded:
+            logger.info(f"Loaded token calibration for {loaded} model(s)")
+        token_calibrator.start()
+
+    # Crash-safe billing: journal ledger charges and replay what a previous run left
+    if BILLING_ENABLED and BILLING_LEDGER_ENABLED and BILLING_JOURNAL_ENABLED:
+        try:
+            recovered = await get_credit_ledger().open_journal(BillingJournal(BILLING_JOURNAL_DIR))
+            logger.info(f"Billing journal opened at {BILLING_JOURNAL_DIR} ({recovered} charge(s) to replay)")
+        except Exception as e:
+            logger.error(f"Billing journal unavailable, charges are not crash-safe: {e}")
     
     # Create model cache
     app.state.model_cache = ModelInfoCache()
@@ -453,11 +502,58 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Error stopping periodic auth account-pool reload: {e}")
 
+    try:
+        await app.state.auth_manager.stop_background_token_refresh()
+        logger.info("Background token refresh stopped")
+    except Exception as e:
+        logger.warning(f"Error stopping background token refresh: {e}")
+
+    try:
+        await get_api_key_cache().close()
+        logger.info("API-key cache closed")
+    except Exception as e:
+        logger.warning(f"Error closing API-key cache: {e}")
+
+    try:
+        await get_credit_ledger().close()
+        logger.info("Credit ledger flushed and billing journal closed")
+    except Exception as e:
+        logger.warning(f"Error flushing credit ledger: {e}")
+
+    try:
+        await get_token_calibrator().close()
+    except Exception as e:
+        logger.warning(f"Error saving token calibration: {e}")
+
+    shutdown_tokenizer_executor()
+
+    try:
+        get_async_mongo_store().close()
+        logger.info("MongoDB request pool closed")
+    except Exception as e:
+        logger.warning(f"Error closing MongoDB request pool: {e}")
+
+    # Drop the closed process-wide services so a restarted app builds new ones
+    services.reset()
+
+    try:
+        await app.state.auth_manager.close_credential_stores()
+        logger.info("Credential stores closed")
+    except Exception as e:
+        logger.warning(f"Error closing credential stores: {e}")
+
     try:
         await app.state.http_client.aclose()
         logger.info("Shared HTTP client closed")
     except Exception as e:
         logger.warning(f"Error closing shared HTTP client: {e}")
+    
+    if app.state.streaming_client_pool is not None:
+        try:
+            await app.state.streaming_client_pool.aclose()
+            logger.info("Streaming connection pool closed")
+        except Exception as e:
+            logger.warning(f"Error closing streaming connection pool: {e}")
 
 
 # --- FastAPI Application ---
@@ -489,6 +585,11 @@ app.add_middleware(
 app.add_middleware(DebugLoggerMiddleware)
 
 
+# --- Server-Timing Middleware ---
+# Adds the per-phase Server-Timing header to /v1/messages and /v1/chat/completions
+app.add_middleware(ServerTimingMiddleware)
+
+
 # --- Validation Error Handler Registration ---
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
@@ -497,9 +598,15 @@ app.add_exception_handler(RequestValidationError, validation_exception_handler)
 # OpenAI-compatible API: /v1/models, /v1/chat/completions
 app.include_router(openai_router)
 
-# Anthropic-compatible API: /v1/messages
+# Anthropic-compatible API: /v1/messages, /v1/messages/count_tokens
 app.include_router(anthropic_router)
 
+# Admin API (requires ADMIN_API_KEY): /admin/accounts
+app.include_router(admin_router)
+
+# Prometheus scrape endpoint (requires METRICS_API_KEY or ADMIN_API_KEY): /metrics
+app.include_router(metrics_router)
+
 
 # --- Uvicorn log config ---
 # Minimal configuration for redirecting uvicorn logs to loguru.
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+Microbenchmark: round-robin account selection cost versus pool size.
+
+Compares the previous linear scan over a list of account dicts with
+AccountPool.next_eligible_slot, with every account but the last one
+quarantined (the case where the scan is longest).
+
+Run:
+    python tests/benchmarks/bench_account_pool.py
+"""
+
+import sys
+import time
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from kiro.account_pool import AccountPool, AccountRecord  # noqa: E402
+
+POOL_SIZES = (10, 100, 1_000, 10_000)
+SELECTIONS = 500
+
+
+def _linear_select(accounts, index):
+    """Selection as done before the indexed pool: scan until an eligible account."""
+    total = len(accounts)
+    now = datetime.now(timezone.utc)
+    for _ in range(total):
+        index = (index + 1) % total
+        until = accounts[index]["quarantine_until"]
+        if until is None or until <= now:
+            return index
+    return (index + 1) % total
+
+
+def _bench(size):
+    """Return (linear_us, indexed_us) per selection for one pool size."""
+    until = datetime.now(timezone.utc) + timedelta(hours=1)
+    dicts = [{"key": f"acct-{i}", "quarantine_until": until if i < size - 1 else None} for i in range(size)]
+    pool = AccountPool([AccountRecord(key=f"acct-{i}") for i in range(size)])
+    for record in list(pool)[: size - 1]:
+        record.quarantine_until = until
+
+    state = {"linear": -1, "indexed": -1}
+
+    def linear():
+        state["linear"] = _linear_select(dicts, state["linear"])
+
+    def indexed():
+        slot = pool.next_eligible_slot(state["indexed"], time.time())
+        state["indexed"] = slot
+
+    linear_s = min(timeit.repeat(linear, number=SELECTIONS, repeat=3))
+    indexed_s = min(timeit.repeat(indexed, number=SELECTIONS, repeat=3))
+    return linear_s / SELECTIONS * 1e6, indexed_s / SELECTIONS * 1e6
+
+
+def main():
+    print(f"{'pool size':>10} {'linear scan (us)':>18} {'indexed (us)':>14}")
+    for size in POOL_SIZES:
+        linear_us, indexed_us = _bench(size)
+        print(f"{size:>10} {linear_us:>18.2f} {indexed_us:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
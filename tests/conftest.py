@@ -328,6 +328,28 @@ def mock_httpx_response():
     return _create_response
 
 
+# =============================================================================
+# Process-wide Service Isolation
+# =============================================================================
+
+@pytest.fixture(autouse=True)
+def fresh_services(tmp_path, monkeypatch):
+    """
+    Gives every test new process-wide services (kiro/services.py): retry budget,
+    hedge policy, API-key cache, MongoDB thread pool, credit ledger, token count
+    cache, token calibrator and adaptive first-token timeout.
+    Prevents state left by one test from leaking into the next one; the token
+    calibrator persists to a temporary file.
+    """
+    import kiro.token_calibration as token_calibration
+    from kiro.services import services
+
+    monkeypatch.setattr(token_calibration, "TOKEN_CALIBRATION_FILE", str(tmp_path / "token_calibration.json"))
+    services.reset()
+    yield
+    services.reset()
+
+
 # =============================================================================
 # Global Network Blocking
 # =============================================================================
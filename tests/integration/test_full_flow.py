@@ -332,6 +332,7 @@ class TestStreamingFlagHandling:
             mock_client_instance = AsyncMock()
             mock_client_instance.request_with_retry = AsyncMock(return_value=mock_response)
             mock_client_instance.client = AsyncMock()
+            mock_client_instance.hedge_request_factory = Mock()
             mock_client_instance.close = AsyncMock()
             MockHttpClient.return_value = mock_client_instance
             
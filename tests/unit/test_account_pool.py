@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the indexed account pool.
+Tests key lookups, round-robin selection over eligible slots and quarantine expiry.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from kiro.account_pool import AccountPool, AccountRecord
+
+
+def _make_pool(count: int) -> AccountPool:
+    """Build a pool of accounts keyed acct-0..acct-N."""
+    return AccountPool([AccountRecord(key=f"acct-{i}", refresh_token=f"r{i}") for i in range(count)])
+
+
+class TestAccountRecord:
+    """Tests for AccountRecord mapping-style access."""
+
+    def test_mapping_access_matches_attributes(self):
+        """
+        What it does: Verifies item access, get() and attributes see the same fields.
+        Purpose: Keep code written against account dicts working with records.
+        """
+        record = AccountRecord(key="acct-a", access_token="token")
+
+        record["access_token"] = "updated"
+
+        assert record.access_token == "updated"
+        assert record["key"] == "acct-a"
+        assert record.get("missing", "default") == "default"
+        assert record.get("_pool") is None
+        with pytest.raises(KeyError):
+            record["unknown"] = 1
+
+    def test_records_have_no_instance_dict(self):
+        """
+        What it does: Verifies records use __slots__.
+        Purpose: Keep per-account memory fixed and attribute access fast.
+        """
+        record = AccountRecord(key="acct-a")
+
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.extra = 1
+
+    def test_count_recent_statuses_respects_window(self):
+        """
+        What it does: Verifies only status events inside the window are counted.
+        Purpose: Report recent 429/403 counts rather than lifetime totals.
+        """
+        record = AccountRecord(key="acct-a")
+        record.record_status(429, now=10.0)
+        record.record_status(403, now=50.0)
+        record.record_status(429, now=60.0)
+
+        assert record.count_recent_statuses(since=40.0) == {403: 1, 429: 1}
+        assert record.count_recent_statuses(since=0.0) == {429: 2, 403: 1}
+        assert AccountRecord(key="acct-b").count_recent_statuses(since=0.0) == {}
+
+    def test_reload_keeps_status_history(self):
+        """
+        What it does: Verifies status events and refresh latency survive a reload.
+        Purpose: A DB reload must not reset per-account diagnostics.
+        """
+        previous = AccountRecord(key="acct-a")
+        previous.record_status(429, now=1.0)
+        previous.last_refresh_seconds = 0.4
+
+        record = AccountRecord(key="acct-a")
+        record.inherit_runtime_state(previous)
+
+        assert record.count_recent_statuses(since=0.0) == {429: 1}
+        assert record.last_refresh_seconds == 0.4
+
+
+class TestAccountPool:
+    """Tests for AccountPool indexing and selection."""
+
+    def test_find_uses_key_index(self):
+        """
+        What it does: Verifies lookups by key and slot.
+        Purpose: Ensure account lookups do not scan the pool.
+        """
+        pool = _make_pool(3)
+
+        assert pool.find("acct-2") is pool[2]
+        assert pool.slot_of("acct-1") == 1
+        assert pool.find("missing") is None
+        assert pool.find(None) is None
+        assert len(pool) == 3
+
+    def test_next_eligible_slot_wraps_round_robin(self):
+        """
+        What it does: Verifies selection walks slots in order and wraps around.
+        Purpose: Preserve deterministic round-robin order.
+        """
+        pool = _make_pool(3)
+        now = time.time()
+
+        assert pool.next_eligible_slot(-1, now) == 0
+        assert pool.next_eligible_slot(0, now) == 1
+        assert pool.next_eligible_slot(2, now) == 0
+
+    def test_quarantined_slots_are_skipped_until_expiry(self):
+        """
+        What it does: Verifies quarantine removes a slot and expiry brings it back.
+        Purpose: Ensure lazily released quarantine matches the time-based rule.
+        """
+        pool = _make_pool(3)
+        until = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+        print("Action: Quarantining acct-1 via mapping-style assignment...")
+        pool[1]["quarantine_until"] = until
+
+        assert pool.next_eligible_slot(0, time.time()) == 2
+        assert pool.next_eligible_slot(0, until.timestamp() + 1) == 1
+
+    def test_requarantine_ignores_stale_heap_entry(self):
+        """
+        What it does: Verifies an extended quarantine is not released at the old expiry.
+        Purpose: Ensure stale heap entries are skipped.
+        """
+        pool = _make_pool(2)
+        now = datetime.now(timezone.utc)
+        pool[0].quarantine_until = now + timedelta(seconds=10)
+        pool[0].quarantine_until = now + timedelta(seconds=100)
+
+        assert pool.next_eligible_slot(-1, (now + timedelta(seconds=20)).timestamp()) == 1
+        assert pool.next_eligible_slot(-1, (now + timedelta(seconds=101)).timestamp()) == 0
+
+    def test_all_quarantined_returns_none_until_cleared(self):
+        """
+        What it does: Verifies no slot is returned when every account is quarantined.
+        Purpose: Let the caller decide how to recover from a fully quarantined pool.
+        """
+        pool = _make_pool(2)
+        until = datetime.now(timezone.utc) + timedelta(seconds=60)
+        for record in pool:
+            record.quarantine_until = until
+
+        assert pool.next_eligible_slot(-1, time.time()) is None
+
+        pool.clear_quarantine()
+
+        assert pool.next_eligible_slot(-1, time.time()) == 0
+        assert all(record.quarantine_until is None for record in pool)
+
+    def test_replace_record_keeps_slot_and_quarantine_tracking(self):
+        """
+        What it does: Verifies replacing one account keeps its slot and eligibility.
+        Purpose: Ensure reloading one account does not disturb round-robin order.
+        """
+        pool = _make_pool(3)
+        old = pool[1]
+        replacement = AccountRecord(key="acct-1", access_token="fresh")
+        replacement.quarantine_until = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+        assert pool.replace_record(replacement) is True
+        assert pool[1] is replacement
+        assert pool.next_eligible_slot(0, time.time()) == 2
+
+        print("Action: Mutating the detached record must not affect the pool...")
+        old.quarantine_until = None
+        assert pool.next_eligible_slot(0, time.time()) == 2
+        assert pool.replace_record(AccountRecord(key="missing")) is False
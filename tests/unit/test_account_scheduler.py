@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for account scheduling policies.
+Tests round-robin, least-in-flight, power-of-two-choices and weighted selection.
+"""
+
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from kiro.account_pool import AccountPool, AccountRecord
+from kiro.account_scheduler import (
+    LeastInFlightPolicy,
+    PowerOfTwoTtftPolicy,
+    RoundRobinPolicy,
+    WeightedPolicy,
+    create_scheduling_policy,
+)
+
+
+def _make_pool(count: int) -> AccountPool:
+    """Build a pool of accounts keyed acct-0..acct-N."""
+    return AccountPool([AccountRecord(key=f"acct-{i}") for i in range(count)])
+
+
+class TestCreateSchedulingPolicy:
+    """Tests for create_scheduling_policy."""
+
+    def test_known_names_create_matching_policy(self):
+        """
+        What it does: Verifies each configured name maps to its policy class.
+        Purpose: Ensure ACCOUNT_SCHEDULING_POLICY values select the right policy.
+        """
+        assert isinstance(create_scheduling_policy("round_robin"), RoundRobinPolicy)
+        assert isinstance(create_scheduling_policy("least_in_flight"), LeastInFlightPolicy)
+        assert isinstance(create_scheduling_policy("p2c_ttft"), PowerOfTwoTtftPolicy)
+        assert isinstance(create_scheduling_policy("weighted"), WeightedPolicy)
+
+    def test_unknown_name_falls_back_to_round_robin(self):
+        """
+        What it does: Verifies an unknown policy name falls back to round-robin.
+        Purpose: Keep the gateway serving with a safe default.
+        """
+        assert isinstance(create_scheduling_policy("fastest"), RoundRobinPolicy)
+
+
+class TestLeastInFlightPolicy:
+    """Tests for LeastInFlightPolicy."""
+
+    def test_picks_least_loaded_account(self):
+        """
+        What it does: Verifies the account with the fewest in-flight calls wins.
+        Purpose: Stop piling streams onto busy accounts.
+        """
+        pool = _make_pool(3)
+        pool[0].in_flight = 4
+        pool[1].in_flight = 1
+        pool[2].in_flight = 2
+
+        assert LeastInFlightPolicy().select(pool, -1, time.time()) == 1
+
+    def test_ties_follow_rotation_order(self):
+        """
+        What it does: Verifies idle accounts are picked in round-robin order.
+        Purpose: Spread load evenly when nothing is in flight.
+        """
+        pool = _make_pool(3)
+        policy = LeastInFlightPolicy()
+
+        assert policy.select(pool, -1, time.time()) == 0
+        assert policy.select(pool, 0, time.time()) == 1
+        assert policy.select(pool, 2, time.time()) == 0
+
+    def test_skips_quarantined_accounts(self):
+        """
+        What it does: Verifies quarantined accounts are never picked even when idle.
+        Purpose: Ensure load balancing respects quarantine.
+        """
+        pool = _make_pool(2)
+        pool[0].quarantine_until = datetime.now(timezone.utc) + timedelta(seconds=60)
+        pool[1].in_flight = 5
+
+        assert LeastInFlightPolicy().select(pool, -1, time.time()) == 1
+
+
+class TestPowerOfTwoTtftPolicy:
+    """Tests for PowerOfTwoTtftPolicy."""
+
+    def test_prefers_faster_less_loaded_account(self):
+        """
+        What it does: Verifies the sampled account with lower expected wait wins.
+        Purpose: Route away from slow or saturated accounts.
+        """
+        pool = _make_pool(2)
+        pool[0].ttft_ewma = 2.0
+        pool[0].in_flight = 3
+        pool[1].ttft_ewma = 0.5
+
+        policy = PowerOfTwoTtftPolicy(rng=random.Random(7))
+
+        for _ in range(10):
+            assert policy.select(pool, -1, time.time()) == 1
+
+    def test_unmeasured_accounts_are_explored(self):
+        """
+        What it does: Verifies accounts without a latency sample beat measured ones.
+        Purpose: Ensure new accounts get measured.
+        """
+        pool = _make_pool(2)
+        pool[0].ttft_ewma = 0.3
+
+        policy = PowerOfTwoTtftPolicy(rng=random.Random(1))
+
+        assert policy.select(pool, -1, time.time()) == 1
+
+
+class TestWeightedPolicy:
+    """Tests for WeightedPolicy."""
+
+    def test_selection_share_follows_weights(self):
+        """
+        What it does: Verifies smooth weighted round-robin honours quota weights.
+        Purpose: Send more traffic to accounts with larger quota.
+        """
+        pool = AccountPool([
+            AccountRecord(key="big", weight=3.0),
+            AccountRecord(key="small", weight=1.0),
+        ])
+        policy = WeightedPolicy()
+
+        picks = [policy.select(pool, -1, time.time()) for _ in range(8)]
+
+        print(f"Comparing picks: {picks}")
+        assert Counter(picks) == {0: 6, 1: 2}
+        assert picks[:4].count(1) == 1
+
+    def test_zero_weights_fall_back_to_round_robin(self):
+        """
+        What it does: Verifies zero total weight still selects an account.
+        Purpose: Avoid starving requests on misconfigured weights.
+        """
+        pool = AccountPool([AccountRecord(key="a", weight=0.0), AccountRecord(key="b", weight=0.0)])
+
+        assert WeightedPolicy().select(pool, 0, time.time()) == 1
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the adaptive per-model first-token timeout.
+Tests the quantile sketch and timeouts learned per model and context bucket.
+"""
+
+import random
+
+from kiro.adaptive_timeout import AdaptiveFirstTokenTimeout, QuantileSketch
+
+
+def _make_model(**kwargs) -> AdaptiveFirstTokenTimeout:
+    """Build an enabled model with small, explicit settings."""
+    settings = dict(
+        enabled=True,
+        default_timeout=15.0,
+        quantile=0.99,
+        multiplier=1.5,
+        minimum=2.0,
+        maximum=60.0,
+        min_samples=10,
+        context_buckets=[8000, 32000],
+    )
+    settings.update(kwargs)
+    return AdaptiveFirstTokenTimeout(**settings)
+
+
+class TestQuantileSketch:
+    """Tests for QuantileSketch."""
+
+    def test_quantiles_within_relative_accuracy(self):
+        """
+        What it does: Verifies sketch quantiles match exact quantiles within 2%.
+        Purpose: Ensure learned timeouts are based on accurate percentiles.
+        """
+        rng = random.Random(3)
+        values = [rng.lognormvariate(0.5, 0.8) for _ in range(900)]
+        sketch = QuantileSketch(relative_accuracy=0.02, decay_count=10_000)
+        for value in values:
+            sketch.add(value)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            estimate = sketch.quantile(q)
+            print(f"Comparing q={q}: exact={exact:.3f}, estimate={estimate:.3f}")
+            assert abs(estimate - exact) / exact <= 0.03
+
+    def test_decay_follows_latency_drift(self):
+        """
+        What it does: Verifies old observations fade once decay_count is exceeded.
+        Purpose: Let the timeout adapt when upstream latency changes.
+        """
+        sketch = QuantileSketch(decay_count=100)
+        for _ in range(100):
+            sketch.add(10.0)
+        for _ in range(400):
+            sketch.add(1.0)
+
+        assert sketch.count <= 100
+        assert abs(sketch.quantile(0.9) - 1.0) < 0.05
+
+    def test_empty_sketch_has_no_quantile(self):
+        """
+        What it does: Verifies an empty sketch returns None.
+        Purpose: Let callers fall back to the static timeout.
+        """
+        assert QuantileSketch().quantile(0.99) is None
+
+
+class TestAdaptiveFirstTokenTimeout:
+    """Tests for AdaptiveFirstTokenTimeout."""
+
+    def test_default_until_enough_samples(self):
+        """
+        What it does: Verifies the static timeout is used for thin buckets.
+        Purpose: Avoid acting on a meaningless percentile.
+        """
+        model = _make_model()
+        key = model.key("claude-haiku-4.5", 1000)
+        for _ in range(9):
+            model.record(key, 1.0)
+
+        assert model.timeout_for(key) == 15.0
+
+        model.record(key, 1.0)
+
+        assert model.timeout_for(key) == 2.0
+
+    def test_learned_timeout_is_quantile_times_multiplier(self):
+        """
+        What it does: Verifies timeout = p99 * 1.5 within the clamp range.
+        Purpose: Give slow models room without waiting forever on fast ones.
+        """
+        model = _make_model()
+        key = model.key("claude-opus-4.5", 50_000)
+        for _ in range(50):
+            model.record(key, 20.0)
+
+        timeout = model.timeout_for(key)
+
+        print(f"Comparing learned timeout: {timeout}")
+        assert abs(timeout - 30.0) / 30.0 <= 0.02
+
+    def test_learned_timeout_is_clamped(self):
+        """
+        What it does: Verifies learned timeouts respect minimum and maximum.
+        Purpose: Never kill requests instantly nor wait without bound.
+        """
+        model = _make_model()
+        fast = model.key("fast", 0)
+        slow = model.key("slow", 0)
+        for _ in range(20):
+            model.record(fast, 0.1)
+            model.record(slow, 100.0)
+
+        assert model.timeout_for(fast) == 2.0
+        assert model.timeout_for(slow) == 60.0
+
+    def test_models_and_context_buckets_are_separate(self):
+        """
+        What it does: Verifies each model and prompt-size bucket learns its own timeout.
+        Purpose: Large-context requests must not inflate small-context timeouts.
+        """
+        model = _make_model()
+        small = model.key("claude-sonnet-4.5", 500)
+        large = model.key("claude-sonnet-4.5", 40_000)
+        for _ in range(20):
+            model.record(small, 2.0)
+            model.record(large, 20.0)
+
+        assert small != large
+        assert model.timeout_for(small) < 5.0
+        assert model.timeout_for(large) > 25.0
+        assert model.timeout_for(model.key("claude-haiku-4.5", 500)) == 15.0
+
+    def test_disabled_model_uses_static_timeout(self):
+        """
+        What it does: Verifies ADAPTIVE_FIRST_TOKEN_TIMEOUT=false keeps FIRST_TOKEN_TIMEOUT.
+        Purpose: Allow opting out of learned timeouts.
+        """
+        model = _make_model(enabled=False)
+        key = model.key("claude-sonnet-4.5", 0)
+        observe = model.observer(key)
+        for _ in range(20):
+            observe(1.0)
+
+        assert model.timeout_for(key) == 15.0
+        assert model.snapshot() == []
+
+    def test_observer_records_into_snapshot(self):
+        """
+        What it does: Verifies observer() callbacks feed the sketch reported by snapshot().
+        Purpose: Ensure parse_kiro_stream waits reach the right bucket.
+        """
+        model = _make_model(min_samples=1)
+        observe = model.observer(model.key("claude-sonnet-4.5", 10_000))
+
+        observe(4.0)
+
+        rows = model.snapshot()
+        assert len(rows) == 1
+        assert rows[0]["model"] == "claude-sonnet-4.5"
+        assert rows[0]["context_bucket"] == 1
+        assert rows[0]["samples"] == 1
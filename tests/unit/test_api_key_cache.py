@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the MongoDB API-key lookup cache.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from kiro.api_key_cache import ApiKeyCache
+from kiro.mongodb_store import MongoStoreUnavailableError
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingLoader:
+    """Blocking lookup stub counting how often MongoDB would be queried."""
+
+    def __init__(self, users=None) -> None:
+        self.users = users or {}
+        self.calls = []
+
+    def __call__(self, api_key):
+        self.calls.append(api_key)
+        return self.users.get(api_key)
+
+
+class TestApiKeyCache:
+    """Tests for ApiKeyCache hits, expiry and eviction."""
+
+    @pytest.mark.asyncio
+    async def test_active_user_is_served_from_cache(self):
+        """
+        What it does: Verifies a second lookup of the same key does not query MongoDB.
+        Purpose: Remove the per-request MongoDB round-trip.
+        """
+        loader = CountingLoader({"key-a": {"_id": "u1", "username": "alice"}})
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10)
+
+        first = await cache.get("key-a", loader)
+        second = await cache.get("key-a", loader)
+
+        print(f"Loader calls: {loader.calls}")
+        assert first == second == {"_id": "u1", "username": "alice"}
+        assert loader.calls == ["key-a"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_uses_negative_ttl(self):
+        """
+        What it does: Verifies unknown keys are cached for the shorter negative TTL.
+        Purpose: Stop invalid-key floods from reaching MongoDB without hiding new users for long.
+        """
+        clock = FakeClock()
+        loader = CountingLoader()
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10, clock=clock)
+
+        assert await cache.get("unknown", loader) is None
+        assert await cache.get("unknown", loader) is None
+        assert len(loader.calls) == 1
+
+        clock.now += 11
+        assert await cache.get("unknown", loader) is None
+        assert len(loader.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_disables_caching(self):
+        """
+        What it does: Verifies TTL 0 turns the cache into a pass-through.
+        Purpose: Allow operators to switch caching off.
+        """
+        loader = CountingLoader({"key-a": {"_id": "u1"}})
+        cache = ApiKeyCache(ttl=0, negative_ttl=0, max_entries=10)
+
+        await cache.get("key-a", loader)
+        await cache.get("key-a", loader)
+
+        assert len(loader.calls) == 2
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_key_is_evicted(self):
+        """
+        What it does: Verifies the cache stays within max_entries, evicting LRU first.
+        Purpose: Bound memory under many distinct keys.
+        """
+        loader = CountingLoader({key: {"_id": key} for key in ("a", "b", "c")})
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=2)
+
+        await cache.get("a", loader)
+        await cache.get("b", loader)
+        await cache.get("a", loader)  # "b" is now least recently used
+        await cache.get("c", loader)
+
+        assert len(cache) == 2
+        await cache.get("a", loader)
+        await cache.get("b", loader)
+        assert loader.calls == ["a", "b", "c", "b"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_lookup(self):
+        """
+        What it does: Verifies simultaneous first lookups of a key coalesce.
+        Purpose: A burst of requests with a cold key must cost one query.
+        """
+        release = threading.Event()
+        loader = CountingLoader({"key-a": {"_id": "u1"}})
+
+        def slow_loader(api_key):
+            release.wait(5)
+            return loader(api_key)
+
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10)
+        waiters = [asyncio.ensure_future(cache.get("key-a", slow_loader)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert all(result == {"_id": "u1"} for result in results)
+        assert loader.calls == ["key-a"]
+
+    @pytest.mark.asyncio
+    async def test_lookup_errors_are_not_cached(self):
+        """
+        What it does: Verifies a failed lookup is retried on the next request.
+        Purpose: A MongoDB outage must not lock users out after it ends.
+        """
+        attempts = []
+
+        def flaky_loader(api_key):
+            attempts.append(api_key)
+            if len(attempts) == 1:
+                raise MongoStoreUnavailableError("down")
+            return {"_id": "u1"}
+
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10)
+        with pytest.raises(MongoStoreUnavailableError):
+            await cache.get("key-a", flaky_loader)
+
+        assert await cache.get("key-a", flaky_loader) == {"_id": "u1"}
+
+
+class TestApiKeyCacheInvalidation:
+    """Tests for explicit and change-stream invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_update_event_invalidates_by_document_id(self):
+        """
+        What it does: Verifies an update to a user drops that user's cached keys.
+        Purpose: Deactivated users lose access without waiting for the TTL.
+        """
+        loader = CountingLoader({"key-a": {"_id": "u1"}})
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10)
+        await cache.get("key-a", loader)
+
+        cache.apply_change_event({"operationType": "update", "documentKey": {"_id": "u1"}})
+        await cache.get("key-a", loader)
+
+        assert loader.calls == ["key-a", "key-a"]
+
+    @pytest.mark.asyncio
+    async def test_insert_event_clears_negative_entry(self):
+        """
+        What it does: Verifies a new user's key is no longer cached as unknown.
+        Purpose: New API keys work immediately despite negative caching.
+        """
+        loader = CountingLoader()
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10)
+        assert await cache.get("new-key", loader) is None
+
+        loader.users["new-key"] = {"_id": "u2"}
+        cache.apply_change_event({
+            "operationType": "insert",
+            "documentKey": {"_id": "u2"},
+            "fullDocument": {"_id": "u2", "apiKey": "new-key"},
+        })
+
+        assert await cache.get("new-key", loader) == {"_id": "u2"}
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_lookup_is_not_overwritten(self):
+        """
+        What it does: Verifies a lookup racing an invalidation does not store its stale result.
+        Purpose: Change-stream invalidations must win over in-flight reads.
+        """
+        release = threading.Event()
+
+        def slow_loader(api_key):
+            release.wait(5)
+            return {"_id": "u1"}
+
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10)
+        pending = asyncio.ensure_future(cache.get("key-a", slow_loader))
+        await asyncio.sleep(0.01)
+        cache.invalidate_user("u1")
+        release.set()
+        await pending
+
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_change_stream_events_are_applied(self):
+        """
+        What it does: Verifies the watcher thread forwards stream events to the cache.
+        Purpose: Ensure change-stream invalidation works end to end.
+        """
+
+        class FakeStream:
+            alive = True
+
+            def __init__(self) -> None:
+                self.events = [{"operationType": "delete", "documentKey": {"_id": "u1"}}]
+
+            def try_next(self):
+                if self.events:
+                    return self.events.pop()
+                threading.Event().wait(0.01)
+                return None
+
+            def close(self) -> None:
+                pass
+
+        loader = CountingLoader({"key-a": {"_id": "u1"}})
+        cache = ApiKeyCache(ttl=60, negative_ttl=10, max_entries=10)
+        await cache.get("key-a", loader)
+
+        assert cache.start_change_stream(FakeStream) is True
+        for _ in range(100):
+            if len(cache) == 0:
+                break
+            await asyncio.sleep(0.01)
+        await cache.close()
+
+        assert len(cache) == 0
@@ -13,6 +13,7 @@ from unittest.mock import AsyncMock, Mock, patch
 import httpx
 
 from kiro.auth import KiroAuthManager, AuthType
+from kiro.account_pool import AccountPool
 from kiro.config import TOKEN_REFRESH_THRESHOLD, get_aws_sso_oidc_url
 
 
@@ -369,7 +370,7 @@ class TestKiroAuthManagerGetAccessToken:
     @pytest.mark.asyncio
     async def test_get_access_token_thread_safety(self, valid_kiro_token, mock_kiro_token_response):
         """
-        What it does: Verifies thread safety via asyncio.Lock.
+        What it does: Verifies parallel callers share one single-flight refresh.
         Purpose: Ensure parallel calls don't cause race conditions.
         """
         print("Setup: Creating KiroAuthManager...")
@@ -396,7 +397,7 @@ class TestKiroAuthManagerGetAccessToken:
             print("Verification: All calls got the same token...")
             assert all(token == valid_kiro_token for token in tokens)
             
-            print(f"Verification: _refresh_token called ONLY ONCE (thanks to lock)...")
+            print(f"Verification: _refresh_token called ONLY ONCE (single-flight)...")
             print(f"Comparing call count: Expected 1, Got {refresh_call_count}")
             assert refresh_call_count == 1
 
@@ -2668,7 +2669,7 @@ class TestKiroAuthManagerRoundRobin:
         now = datetime.now(timezone.utc)
         manager._account_pool[0]["expires_at"] = now - timedelta(minutes=1)
         manager._account_pool[1]["expires_at"] = now + timedelta(hours=1)
-        manager._reload_active_account_from_sqlite_locked = Mock()
+        manager._reload_active_account_from_source = AsyncMock()
         manager._refresh_token_request = AsyncMock(side_effect=ValueError("refresh failed"))
 
         token = await manager.get_access_token()
@@ -2746,6 +2747,50 @@ class TestKiroAuthManagerRoundRobin:
         keys = [account["key"] for account in manager._account_pool]
         assert "kirocli:social:token:acct-c" in keys
 
+    @pytest.mark.asyncio
+    async def test_async_pool_reload_reads_through_credential_store(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies the async pool reload reads SQLite on the store executor.
+        Purpose: Ensure periodic reloads do not block the event loop.
+        """
+        import sqlite3
+        import threading
+
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        conn = sqlite3.connect(temp_sqlite_db_round_robin)
+        conn.execute(
+            "UPDATE auth_kv SET value = ? WHERE key = ?",
+            (
+                json.dumps({
+                    "access_token": "reloaded_access_b",
+                    "refresh_token": "social_refresh_b",
+                    "expires_at": "2099-01-01T00:00:00Z",
+                }),
+                "kirocli:social:token:acct-b",
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+        store = manager._get_credential_store("sqlite", temp_sqlite_db_round_robin)
+        original_read = store.read
+        read_threads = []
+
+        def tracking_read(reader):
+            read_threads.append(threading.current_thread().name)
+            return original_read(reader)
+
+        store.read = tracking_read
+
+        reloaded = await manager._reload_account_pool_from_source()
+        await manager.close_credential_stores()
+
+        assert reloaded is True
+        assert read_threads and read_threads[0] != threading.current_thread().name
+        account_b = manager._find_account_by_key("kirocli:social:token:acct-b")
+        assert account_b is not None
+        assert account_b["access_token"] == "reloaded_access_b"
+
     @pytest.mark.asyncio
     async def test_periodic_reload_loop_invokes_pool_reload(self, temp_sqlite_db_round_robin):
         """
@@ -2765,7 +2810,7 @@ class TestKiroAuthManagerRoundRobin:
                 raise asyncio.CancelledError
             await original_sleep(0)
 
-        with patch.object(manager, "_reload_account_pool_from_source_locked", return_value=True) as reload_mock:
+        with patch.object(manager, "_reload_account_pool_from_source", AsyncMock(return_value=True)) as reload_mock:
             with patch("kiro.auth.asyncio.sleep", side_effect=fake_sleep):
                 with pytest.raises(asyncio.CancelledError):
                     await manager._periodic_account_pool_reload_loop()
@@ -2807,6 +2852,136 @@ class TestKiroAuthManagerRoundRobin:
         assert account_a is not None
         assert account_a["quarantine_until"] == quarantine_until
 
+    def test_reload_preserves_scheduling_state(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies full-pool reload keeps in-flight counters and latency EWMA.
+        Purpose: Ensure open streams are still released against the reloaded account.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._request_account_key.set("kirocli:social:token:acct-b")
+        acquired_key = manager.acquire_request_account()
+        manager.record_account_latency(acquired_key, 0.8)
+
+        manager._reload_account_pool_from_source_locked()
+
+        account_b = manager._find_account_by_key("kirocli:social:token:acct-b")
+        assert account_b.in_flight == 1
+        assert account_b.ttft_ewma == 0.8
+        manager.release_account(acquired_key)
+        assert account_b.in_flight == 0
+
+    def test_record_account_latency_updates_ewma(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies latency samples are folded into an EWMA.
+        Purpose: Ensure p2c_ttft sees smoothed per-account latency.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin)
+        manager._ttft_ewma_alpha = 0.5
+
+        manager.record_account_latency("kirocli:social:token", 1.0)
+        manager.record_account_latency("kirocli:social:token", 3.0)
+        manager.record_account_latency("missing", 9.0)
+
+        assert manager._find_account_by_key("kirocli:social:token").ttft_ewma == pytest.approx(2.0)
+
+    def test_selection_uses_configured_policy(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies selection delegates to the scheduling policy.
+        Purpose: Ensure least_in_flight avoids the busy account.
+        """
+        from kiro.account_scheduler import LeastInFlightPolicy
+
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin)
+        manager._scheduling_policy = LeastInFlightPolicy()
+        manager._account_pool[1].in_flight = 3
+
+        first = manager._select_next_account_locked()
+        second = manager._select_next_account_locked()
+
+        assert first["key"] == "kirocli:social:token"
+        assert second["key"] == "kirocli:social:token"
+
+    def test_account_weights_are_applied_on_load(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies ACCOUNT_WEIGHTS entries are attached to pool accounts.
+        Purpose: Ensure the weighted policy sees configured quota weights.
+        """
+        with patch('kiro.auth.ACCOUNT_WEIGHTS', {"kirocli:social:token:acct-b": 4.0}):
+            manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin)
+
+        assert manager._find_account_by_key("kirocli:social:token").weight == 1.0
+        assert manager._find_account_by_key("kirocli:social:token:acct-b").weight == 4.0
+
+    def test_cool_down_request_account_keeps_longer_cooldown(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies cooldown drops the request account and never shortens an existing cooldown.
+        Purpose: Ensure a short Retry-After does not cut a quota cooldown.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin)
+        manager._request_account_key.set("kirocli:social:token")
+        assert manager.cool_down_request_account(3600, "quota") is True
+        quota_until = manager._find_account_by_key("kirocli:social:token").quarantine_until
+
+        manager._request_account_key.set("kirocli:social:token")
+        manager.cool_down_request_account(5, "429")
+
+        assert manager._find_account_by_key("kirocli:social:token").quarantine_until == quota_until
+        assert manager._request_account_key.get() is None
+        assert manager.seconds_until_account_available() == 0.0
+
+        manager._request_account_key.set("kirocli:social:token:acct-b")
+        assert manager.cool_down_request_account(30, "429") is False
+        assert 25 < manager.seconds_until_account_available() <= 30
+
+    def test_cool_down_without_pool_returns_false(self):
+        """
+        What it does: Verifies single-account mode cannot rotate.
+        Purpose: Ensure the HTTP client falls back to backoff.
+        """
+        manager = KiroAuthManager(refresh_token="test_refresh_token")
+
+        assert manager.cool_down_request_account(30, "429") is False
+        assert manager.seconds_until_account_available() is None
+
+    def test_account_snapshot_reports_status_counts_and_reload(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies account_snapshot() exposes recent 429/403 counts and reload origin.
+        Purpose: Feed /admin/accounts without leaking tokens.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager.record_account_status("kirocli:social:token", 429)
+        manager.record_account_status("kirocli:social:token", 429)
+        manager.record_account_status("kirocli:social:token", 403)
+        manager.record_account_status("missing", 429)
+
+        manager._reload_account_pool_from_source_locked()
+        rows = {row["key"]: row for row in manager.account_snapshot()}
+
+        print(f"Snapshot: {rows}")
+        first = rows["kirocli:social:token"]
+        assert first["recent_429"] == 2
+        assert first["recent_403"] == 1
+        assert first["last_reload"]["source"] == "sqlite"
+        assert first["last_reload"]["trigger"] == "pool_reload"
+        assert rows["kirocli:social:token:acct-b"]["recent_429"] == 0
+        assert "access_token" not in first and "refresh_token" not in first
+
+    @pytest.mark.asyncio
+    async def test_account_refresh_records_latency(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies a pool account refresh stores its latency.
+        Purpose: Expose last refresh latency per account.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        account = manager._find_account_by_key("kirocli:social:token:acct-b")
+
+        with patch.object(manager, "_refresh_token_request", new=AsyncMock()):
+            await manager._run_account_refresh(account)
+
+        refreshed = manager._find_account_by_key("kirocli:social:token:acct-b")
+        assert refreshed.last_refresh_seconds is not None
+        assert refreshed.last_refresh_at is not None
+
     def test_reload_preserves_round_robin_cursor(self, temp_sqlite_db_round_robin):
         """
         What it does: Verifies periodic full-pool reload keeps round-robin cursor position.
@@ -2851,6 +3026,269 @@ class TestKiroAuthManagerRoundRobin:
         assert token == "forced_refresh_token_b"
         assert refreshed_for_key["key"] == "kirocli:social:token:acct-b"
 
+    @pytest.mark.asyncio
+    async def test_slow_refresh_does_not_block_other_account(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies a pending refresh on one account leaves other accounts servable.
+        Purpose: Ensure the token read path does not serialize on a global lock.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        account_a = manager._find_account_by_key("kirocli:social:token")
+        assert account_a is not None
+        account_a["expires_at"] = datetime.now(timezone.utc) - timedelta(minutes=1)
+        manager._reload_active_account_from_source = AsyncMock()
+
+        release_refresh = asyncio.Event()
+        refresh_started = asyncio.Event()
+
+        async def slow_refresh() -> None:
+            refresh_started.set()
+            await release_refresh.wait()
+            manager._resume_refresh_account()
+            manager._access_token = "refreshed_access_a"
+            manager._expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+
+        manager._refresh_token_request = AsyncMock(side_effect=slow_refresh)
+
+        async def request_for(key: str) -> str:
+            manager._request_account_key.set(key)
+            return await manager.get_access_token()
+
+        print("Action: Starting slow refresh for account A...")
+        task_a = asyncio.create_task(request_for("kirocli:social:token"))
+        await asyncio.wait_for(refresh_started.wait(), timeout=1)
+
+        print("Action: Requesting account B while A is refreshing...")
+        token_b = await asyncio.wait_for(request_for("kirocli:social:token:acct-b"), timeout=1)
+        assert token_b == "social_access_b"
+        assert not task_a.done()
+
+        release_refresh.set()
+        token_a = await asyncio.wait_for(task_a, timeout=1)
+
+        print(f"Comparing tokens: A={token_a}, B={token_b}")
+        assert token_a == "refreshed_access_a"
+        assert account_a is manager._find_account_by_key("kirocli:social:token")
+        assert account_a["access_token"] == "refreshed_access_a"
+        account_b = manager._find_account_by_key("kirocli:social:token:acct-b")
+        assert account_b is not None
+        assert account_b["access_token"] == "social_access_b"
+        assert manager._refresh_token_request.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_force_refresh_joins_in_flight_refresh(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies concurrent refreshes for one account share a single round-trip.
+        Purpose: Ensure per-account single-flight refresh for force_refresh and get_access_token.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        account_b = manager._find_account_by_key("kirocli:social:token:acct-b")
+        assert account_b is not None
+        account_b["expires_at"] = datetime.now(timezone.utc) - timedelta(minutes=1)
+        manager._reload_active_account_from_source = AsyncMock()
+
+        refresh_calls = 0
+
+        async def slow_refresh() -> None:
+            nonlocal refresh_calls
+            refresh_calls += 1
+            await asyncio.sleep(0.05)
+            manager._resume_refresh_account()
+            manager._access_token = "refreshed_access_b"
+            manager._expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+
+        manager._refresh_token_request = AsyncMock(side_effect=slow_refresh)
+
+        async def call(method_name: str) -> str:
+            manager._request_account_key.set("kirocli:social:token:acct-b")
+            return await getattr(manager, method_name)()
+
+        tokens = await asyncio.gather(
+            call("force_refresh"),
+            call("get_access_token"),
+            call("force_refresh"),
+        )
+
+        print(f"Comparing refresh calls: Expected 1, Got {refresh_calls}")
+        assert refresh_calls == 1
+        assert tokens == ["refreshed_access_b"] * 3
+        assert manager._refresh_flights == {}
+
+
+class TestKiroAuthManagerBackgroundRefresh:
+    """Tests for the proactive background token refresh scheduler."""
+
+    def test_reconcile_schedules_refresh_before_threshold(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies each pool account gets a deadline TOKEN_REFRESH_THRESHOLD before expiry.
+        Purpose: Ensure the min-heap orders accounts by refresh deadline.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._background_refresh_jitter_seconds = 0
+        now = datetime.now(timezone.utc)
+        manager._account_pool[0]["expires_at"] = now + timedelta(hours=2)
+        manager._account_pool[1]["expires_at"] = now + timedelta(hours=1)
+
+        print("Action: Reconciling schedule with account pool...")
+        manager._reconcile_token_refresh_schedule()
+
+        expected_b = (now + timedelta(hours=1)).timestamp() - TOKEN_REFRESH_THRESHOLD
+        print(f"Comparing heap head: Expected acct-b at {expected_b}, Got {manager._refresh_heap[0]}")
+        assert manager._refresh_heap[0][1] == "kirocli:social:token:acct-b"
+        assert manager._refresh_heap[0][0] == pytest.approx(expected_b, abs=1)
+        assert set(manager._refresh_due_at) == {"kirocli:social:token", "kirocli:social:token:acct-b"}
+
+    def test_pop_due_skips_superseded_entries(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies rescheduled accounts are popped once, at their latest deadline.
+        Purpose: Ensure lazy heap invalidation does not trigger duplicate refreshes.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        now = 1_000_000.0
+        manager._schedule_token_refresh("kirocli:social:token", now - 10)
+        manager._schedule_token_refresh("kirocli:social:token", now + 100)
+        manager._schedule_token_refresh("kirocli:social:token:acct-b", now - 5)
+
+        due = manager._pop_due_token_refreshes(now)
+
+        print(f"Comparing due keys: {due}")
+        assert due == ["kirocli:social:token:acct-b"]
+        assert manager._refresh_due_at == {"kirocli:social:token": now + 100}
+
+    def test_reconcile_reschedules_after_expiry_changes(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies a refreshed expiry produces a new deadline and removed accounts are dropped.
+        Purpose: Keep the schedule in sync with request-driven refreshes and pool reloads.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._background_refresh_jitter_seconds = 0
+        manager._reconcile_token_refresh_schedule()
+        first_due = manager._refresh_due_at["kirocli:social:token"]
+
+        manager._account_pool[0]["expires_at"] = datetime.now(timezone.utc) + timedelta(hours=1)
+        manager._account_pool = AccountPool([manager._account_pool[0]])
+        manager._reconcile_token_refresh_schedule()
+
+        assert manager._refresh_due_at["kirocli:social:token"] < first_due
+        assert "kirocli:social:token:acct-b" not in manager._refresh_due_at
+        assert "kirocli:social:token:acct-b" not in manager._refresh_scheduled_expiry
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_skips_account_refreshed_elsewhere(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies no refresh is issued when the expiry changed since scheduling.
+        Purpose: Avoid refreshing an account a request has already refreshed.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._reconcile_token_refresh_schedule()
+        manager._account_pool[0]["expires_at"] = datetime.now(timezone.utc) + timedelta(hours=5)
+        manager._refresh_token_request = AsyncMock()
+
+        await manager._background_refresh_account("kirocli:social:token")
+
+        manager._refresh_token_request.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_failure_schedules_retry(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies a single failed background refresh is retried later without quarantine.
+        Purpose: One transient failure must not take the account out of rotation.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._reconcile_token_refresh_schedule()
+        manager._pop_due_token_refreshes(float("inf"))
+        manager._refresh_token_request = AsyncMock(side_effect=ValueError("refresh failed"))
+
+        await manager._background_refresh_account("kirocli:social:token")
+
+        assert "kirocli:social:token" in manager._refresh_due_at
+        assert manager._refresh_due_at["kirocli:social:token"] > datetime.now(timezone.utc).timestamp()
+        assert manager._account_pool[0]["quarantine_until"] is None
+
+    @pytest.mark.asyncio
+    async def test_repeated_background_failures_back_off_and_quarantine(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies consecutive failures double the retry delay up to the cap and quarantine the account.
+        Purpose: A refresh that keeps failing must not retry every 30s forever or stay in rotation.
+        """
+        from kiro.auth import (
+            BACKGROUND_REFRESH_MAX_RETRY_SECONDS,
+            BACKGROUND_REFRESH_QUARANTINE_FAILURES,
+            BACKGROUND_REFRESH_RETRY_SECONDS,
+        )
+
+        key = "kirocli:social:token"
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._reconcile_token_refresh_schedule()
+        manager._refresh_token_request = AsyncMock(side_effect=ValueError("refresh failed"))
+
+        delays = []
+        for _ in range(10):
+            manager._pop_due_token_refreshes(float("inf"))
+            started = datetime.now(timezone.utc).timestamp()
+            await manager._background_refresh_account(key)
+            delays.append(round(manager._refresh_due_at[key] - started))
+            if len(delays) == BACKGROUND_REFRESH_QUARANTINE_FAILURES - 1:
+                assert manager._account_pool[0]["quarantine_until"] is None
+
+        print(f"Retry delays: {delays}")
+        assert delays[:3] == [BACKGROUND_REFRESH_RETRY_SECONDS * factor for factor in (1, 2, 4)]
+        assert delays[-1] == BACKGROUND_REFRESH_MAX_RETRY_SECONDS
+        quarantine_until = manager._account_pool[0]["quarantine_until"]
+        assert quarantine_until is not None
+        assert quarantine_until > datetime.now(timezone.utc) + timedelta(seconds=BACKGROUND_REFRESH_MAX_RETRY_SECONDS - 60)
+
+    @pytest.mark.asyncio
+    async def test_background_failures_reset_after_success(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies a successful refresh resets the backoff.
+        Purpose: A transient outage must not leave long retry delays behind.
+        """
+        key = "kirocli:social:token"
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._reconcile_token_refresh_schedule()
+        manager._refresh_token_request = AsyncMock(side_effect=ValueError("refresh failed"))
+        await manager._background_refresh_account(key)
+        await manager._background_refresh_account(key)
+        assert manager._refresh_failures[key] == 2
+
+        manager._refresh_token_request = AsyncMock()
+        await manager._background_refresh_account(key)
+
+        assert key not in manager._refresh_failures
+
+    @pytest.mark.asyncio
+    async def test_background_loop_refreshes_expiring_account(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies the running scheduler refreshes an expiring account without any request.
+        Purpose: Keep token refresh off the request critical path.
+        """
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin, auth_source="sqlite")
+        manager._account_pool[1]["expires_at"] = datetime.now(timezone.utc) + timedelta(seconds=30)
+        refreshed = asyncio.Event()
+
+        async def fake_refresh() -> None:
+            manager._access_token = f"background_{manager._sqlite_token_key}"
+            manager._expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+            refreshed.set()
+
+        manager._refresh_token_request = AsyncMock(side_effect=fake_refresh)
+
+        print("Action: Starting background refresh scheduler...")
+        assert manager.start_background_token_refresh() is True
+        assert manager.start_background_token_refresh() is False
+        try:
+            await asyncio.wait_for(refreshed.wait(), timeout=2)
+            await asyncio.sleep(0)
+        finally:
+            await manager.stop_background_token_refresh()
+
+        account_b = manager._find_account_by_key("kirocli:social:token:acct-b")
+        print(f"Comparing token: {account_b['access_token']}")
+        assert account_b["access_token"] == "background_kirocli:social:token:acct-b"
+        assert manager._refresh_token_request.await_count == 1
+        assert manager._background_refresh_task is None
+
 
 class TestKiroAuthManagerMongoDbSource:
     """Tests for MongoDB auth_kv credential source."""
@@ -6,10 +6,14 @@ Unit tests for billing calculation and credit enforcement.
 
 from decimal import Decimal
 import json
+import threading
+from unittest.mock import Mock
 
 import pytest
 
 import kiro.billing as billing
+import kiro.credit_ledger as credit_ledger
+from kiro.mongodb_async import AsyncMongoStore
 
 
 def _set_common_billing_config(monkeypatch: pytest.MonkeyPatch, prices_json: str) -> None:
@@ -82,19 +86,22 @@ class TestCalculateChargeFromUsage:
 class TestCreditEnforcement:
     """Tests for sufficient-credit checks and atomic deduction."""
 
-    def test_ensure_user_has_sufficient_credits_raises(self, monkeypatch: pytest.MonkeyPatch):
+    @pytest.mark.asyncio
+    async def test_ensure_user_has_sufficient_credits_raises(self, monkeypatch: pytest.MonkeyPatch):
         """
         What it does: Runs preflight credit check when balance is insufficient.
         Purpose: Ensure requests are blocked before upstream call.
         """
         monkeypatch.setattr(billing, "BILLING_ENABLED", True)
         monkeypatch.setattr(billing, "BILLING_ENFORCE_SUFFICIENT_CREDITS", True)
+        monkeypatch.setattr(billing, "BILLING_LEDGER_ENABLED", False)
         monkeypatch.setattr(billing, "has_sufficient_credits", lambda *_: False)
 
         with pytest.raises(billing.InsufficientCreditsError):
-            billing.ensure_user_has_sufficient_credits("u-1", Decimal("0.01"))
+            await billing.ensure_user_has_sufficient_credits("u-1", Decimal("0.01"))
 
-    def test_deduct_credits_for_usage_returns_charge(self, monkeypatch: pytest.MonkeyPatch):
+    @pytest.mark.asyncio
+    async def test_deduct_credits_for_usage_returns_charge(self, monkeypatch: pytest.MonkeyPatch):
         """
         What it does: Deducts credits for known usage and returns charged amount.
         Purpose: Ensure deduction path computes and applies charge.
@@ -113,12 +120,102 @@ class TestCreditEnforcement:
             ]""",
         )
         monkeypatch.setattr(billing, "BILLING_UNKNOWN_MODEL_POLICY", "reject")
+        monkeypatch.setattr(billing, "BILLING_LEDGER_ENABLED", False)
         monkeypatch.setattr(billing, "deduct_credits_atomic", lambda *_: True)
 
-        charged = billing.deduct_credits_for_usage(
+        charged = await billing.deduct_credits_for_usage(
             user_id="u-1",
             model_id="claude-haiku-4-5-20251001",
             usage={"prompt_tokens": 1000, "completion_tokens": 0},
         )
 
         assert charged == Decimal("0.001100")
+
+    @pytest.mark.asyncio
+    async def test_slow_deduction_fails_with_write_deadline(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        What it does: Verifies a deduction slower than its deadline is reported as failed.
+        Purpose: A slow MongoDB must end the request instead of stalling the stream.
+        """
+        _set_common_billing_config(monkeypatch, "[]")
+        release = threading.Event()
+
+        def slow_deduct(*_args):
+            release.wait(5)
+            return True
+
+        monkeypatch.setattr(billing, "BILLING_LEDGER_ENABLED", False)
+        monkeypatch.setattr(billing, "deduct_credits_atomic", slow_deduct)
+        monkeypatch.setattr(billing, "get_async_mongo_store", lambda: AsyncMongoStore(write_timeout=0.05))
+
+        try:
+            with pytest.raises(billing.InsufficientCreditsError):
+                await billing.deduct_credits_for_usage("u-1", "claude-haiku-4-5", {"prompt_tokens": 1000})
+        finally:
+            release.set()
+
+
+class TestLedgerBilling:
+    """Tests for billing through the credit reservation ledger."""
+
+    @pytest.mark.asyncio
+    async def test_preflight_reserves_and_usage_settles(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        What it does: Verifies the preflight returns a reservation and the final charge settles it.
+        Purpose: Ensure ledger billing needs no per-request MongoDB write.
+        """
+        _set_common_billing_config(monkeypatch, "[]")
+        monkeypatch.setattr(billing, "BILLING_ENFORCE_SUFFICIENT_CREDITS", True)
+        monkeypatch.setattr(billing, "BILLING_LEDGER_ENABLED", True)
+        monkeypatch.setattr(credit_ledger, "get_credit_balance", lambda _user_id: Decimal("1"))
+        monkeypatch.setattr(billing, "deduct_credits_atomic", Mock(side_effect=AssertionError("direct $inc")))
+
+        reservation = await billing.ensure_user_has_sufficient_credits("u-1", Decimal("0.5"))
+        assert reservation is not None and reservation.is_open
+
+        charged = await billing.deduct_credits_for_usage(
+            "u-1", "unknown-model", {"prompt_tokens": 1000}, reservation=reservation
+        )
+
+        ledger = credit_ledger.get_credit_ledger()
+        print(f"Charged: {charged}, available: {ledger.available('u-1')}")
+        assert not reservation.is_open
+        assert ledger.available("u-1") == Decimal("1") - charged
+
+    @pytest.mark.asyncio
+    async def test_usage_with_same_request_id_is_charged_once(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        What it does: Verifies deducting usage twice under one request ID lowers the balance once.
+        Purpose: Ensure a re-settled request is not billed twice.
+        """
+        _set_common_billing_config(monkeypatch, "[]")
+        monkeypatch.setattr(billing, "BILLING_LEDGER_ENABLED", True)
+        monkeypatch.setattr(credit_ledger, "get_credit_balance", lambda _user_id: Decimal("1"))
+
+        ledger = credit_ledger.get_credit_ledger()
+        await ledger.reserve("u-1", Decimal("0"))
+        for _ in range(2):
+            charged = await billing.deduct_credits_for_usage(
+                "u-1", "unknown-model", {"prompt_tokens": 1000}, request_id="req-1"
+            )
+
+        print(f"Charged: {charged}, available: {ledger.available('u-1')}")
+        assert ledger.available("u-1") == Decimal("1") - charged
+
+    @pytest.mark.asyncio
+    async def test_preflight_refuses_when_reservations_use_the_balance(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        What it does: Verifies concurrent requests cannot reserve more than the balance.
+        Purpose: Ensure the ledger enforces credits across in-flight requests.
+        """
+        _set_common_billing_config(monkeypatch, "[]")
+        monkeypatch.setattr(billing, "BILLING_ENFORCE_SUFFICIENT_CREDITS", True)
+        monkeypatch.setattr(billing, "BILLING_LEDGER_ENABLED", True)
+        monkeypatch.setattr(credit_ledger, "get_credit_balance", lambda _user_id: Decimal("1"))
+
+        first = await billing.ensure_user_has_sufficient_credits("u-1", Decimal("0.6"))
+        with pytest.raises(billing.InsufficientCreditsError):
+            await billing.ensure_user_has_sufficient_credits("u-1", Decimal("0.6"))
+
+        billing.release_credit_reservation(first)
+        assert await billing.ensure_user_has_sufficient_credits("u-1", Decimal("0.6")) is not None
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the durable billing journal.
+Tests append/recovery, the ack watermark, segment rotation, torn writes,
+ledger recovery and idempotent application to MongoDB.
+"""
+
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+import kiro.billing_journal as billing_journal
+import kiro.credit_ledger as credit_ledger
+import kiro.mongodb_store as mongodb_store
+from kiro.billing_journal import (
+    SEGMENT_SUFFIX,
+    BillingJournal,
+    ChargeRecord,
+    JournalLockedError,
+    replay_journal,
+)
+from kiro.credit_ledger import CreditLedger
+from kiro.mongodb_store import CreditChargeResult
+
+
+def _charge(request_id: str, user_id: str = "u-1", amount: str = "1.5") -> ChargeRecord:
+    return ChargeRecord(request_id, user_id, Decimal(amount), model="claude-sonnet-4")
+
+
+async def _reopen(directory) -> list:
+    """Open a journal on the directory again, as a restarted process would."""
+    journal = BillingJournal(str(directory))
+    pending = journal.open()
+    await journal.close()
+    return pending
+
+
+class TestJournalRecovery:
+    """Tests for appending and recovering charges."""
+
+    @pytest.mark.asyncio
+    async def test_unacknowledged_charges_are_recovered(self, tmp_path):
+        """
+        What it does: Verifies charges appended but never marked applied are returned on reopen.
+        Purpose: A crash before the MongoDB flush must not lose charges.
+        """
+        journal = BillingJournal(str(tmp_path))
+        assert journal.open() == []
+        await asyncio.gather(journal.append(_charge("r-1")), journal.append(_charge("r-2", "u-2", "0.25")))
+        await journal.close()
+
+        pending = await _reopen(tmp_path)
+
+        print(f"Recovered: {[(r.seq, r.request_id, r.amount) for r in pending]}")
+        assert [record.request_id for record in pending] == ["r-1", "r-2"]
+        assert pending[1].user_id == "u-2"
+        assert pending[1].amount == Decimal("0.25")
+        assert pending[0].model == "claude-sonnet-4"
+
+    @pytest.mark.asyncio
+    async def test_ack_watermark_is_contiguous(self, tmp_path):
+        """
+        What it does: Verifies applying charges out of order only acknowledges a contiguous prefix.
+        Purpose: A charge flushed late must still be replayed if the process dies first.
+        """
+        journal = BillingJournal(str(tmp_path))
+        journal.open()
+        records = [await journal.append(_charge(f"r-{index}")) for index in range(1, 4)]
+
+        journal.mark_applied([records[1].seq])
+        assert journal.acked_seq == 0
+        journal.mark_applied([records[0].seq])
+        assert journal.acked_seq == records[1].seq
+        await journal.close()
+
+        pending = await _reopen(tmp_path)
+        assert [record.request_id for record in pending] == ["r-3"]
+
+    @pytest.mark.asyncio
+    async def test_sequence_numbers_continue_after_reopen(self, tmp_path):
+        """
+        What it does: Verifies a reopened journal keeps numbering after the last recorded charge.
+        Purpose: Sequence numbers must stay unique across restarts.
+        """
+        journal = BillingJournal(str(tmp_path))
+        journal.open()
+        first = await journal.append(_charge("r-1"))
+        journal.mark_applied([first.seq])
+        await journal.close()
+
+        journal = BillingJournal(str(tmp_path))
+        assert journal.open() == []
+        second = await journal.append(_charge("r-2"))
+        await journal.close()
+
+        assert second.seq == first.seq + 1
+
+    @pytest.mark.asyncio
+    async def test_torn_last_line_is_ignored(self, tmp_path):
+        """
+        What it does: Verifies a partially written final record is skipped on recovery.
+        Purpose: A crash mid-write must not prevent the gateway from starting.
+        """
+        journal = BillingJournal(str(tmp_path))
+        journal.open()
+        await journal.append(_charge("r-1"))
+        await journal.close()
+
+        segment = sorted(tmp_path.glob(f"*{SEGMENT_SUFFIX}"))[-1]
+        with open(segment, "ab") as handle:
+            handle.write(b'{"t":"charge","seq":2,"rid":"r-')
+
+        pending = await _reopen(tmp_path)
+        assert [record.request_id for record in pending] == ["r-1"]
+
+    @pytest.mark.asyncio
+    async def test_second_open_is_refused(self, tmp_path):
+        """
+        What it does: Verifies a journal directory can only be opened by one owner at a time.
+        Purpose: Two processes appending to the same segments would corrupt them.
+        """
+        if billing_journal.fcntl is None:
+            pytest.skip("flock is not available on this platform")
+        journal = BillingJournal(str(tmp_path))
+        journal.open()
+
+        with pytest.raises(JournalLockedError):
+            BillingJournal(str(tmp_path)).open()
+
+        await journal.close()
+        assert await _reopen(tmp_path) == []
+
+
+class TestStatusCommand:
+    """Tests for python -m kiro.billing_journal status."""
+
+    @pytest.mark.asyncio
+    async def test_status_reads_a_live_journal_without_changing_it(self, tmp_path, capsys):
+        """
+        What it does: Verifies status reports pending charges while the journal is open, leaving every file as it was.
+        Purpose: Inspecting the journal must not lock, delete or start segments.
+        """
+        journal = BillingJournal(str(tmp_path))
+        journal.open()
+        first = await journal.append(_charge("r-1", amount="2"))
+        await journal.append(_charge("r-2", amount="0.5"))
+        journal.mark_applied([first.seq])
+        await journal.append(_charge("r-3", amount="1"))
+        files_before = {path.name: path.read_bytes() for path in tmp_path.iterdir()}
+
+        assert billing_journal.main(["status", "--dir", str(tmp_path)]) == 0
+
+        output = capsys.readouterr().out
+        print(f"Output: {output}")
+        assert "2 unacknowledged charge(s), 1.5 credits, acked through seq 1" in output
+        assert {path.name: path.read_bytes() for path in tmp_path.iterdir()} == files_before
+        await journal.close()
+
+    def test_status_does_not_create_a_missing_directory(self, tmp_path, capsys):
+        """
+        What it does: Verifies status on a missing directory reports an empty journal.
+        Purpose: A read-only command must not create the journal directory.
+        """
+        directory = tmp_path / "journal"
+
+        assert billing_journal.main(["status", "--dir", str(directory)]) == 0
+
+        assert "0 unacknowledged charge(s)" in capsys.readouterr().out
+        assert not directory.exists()
+
+
+class TestSegments:
+    """Tests for segment rotation and cleanup."""
+
+    @pytest.mark.asyncio
+    async def test_acknowledged_segments_are_deleted(self, tmp_path):
+        """
+        What it does: Verifies full segments are rotated and removed once all their charges are acked.
+        Purpose: The journal must not grow without bound.
+        """
+        journal = BillingJournal(str(tmp_path), segment_bytes=200)
+        journal.open()
+        records = [await journal.append(_charge(f"r-{index}")) for index in range(6)]
+        segments_before = len(list(tmp_path.glob(f"*{SEGMENT_SUFFIX}")))
+
+        journal.mark_applied([record.seq for record in records])
+        await journal.append(_charge("r-last"))
+        segments_after = len(list(tmp_path.glob(f"*{SEGMENT_SUFFIX}")))
+        await journal.close()
+
+        print(f"Segments: {segments_before} -> {segments_after}")
+        assert segments_before > 2
+        assert segments_after < segments_before
+        pending = await _reopen(tmp_path)
+        assert [record.request_id for record in pending] == ["r-last"]
+
+
+class FakeCredits:
+    """Stand-in for the credits collection behind get_credit_balance/apply_credit_charges."""
+
+    def __init__(self) -> None:
+        self.balances = {"u-1": Decimal("10")}
+        self.applied = []
+        self.fail = False
+
+    def get_credit_balance(self, user_id):
+        return self.balances.get(user_id)
+
+    def apply_credit_charges(self, charges):
+        if self.fail:
+            return None
+        result = CreditChargeResult()
+        for charge in charges:
+            if charge.user_id not in self.balances:
+                result.missing.append(charge)
+            elif charge.request_id in self.applied:
+                result.duplicates.append(charge)
+            else:
+                result.applied.append(charge)
+                self.applied.append(charge.request_id)
+                self.balances[charge.user_id] -= charge.amount
+        return result
+
+
+@pytest.fixture
+def credits(monkeypatch):
+    """Patch the MongoDB helpers used by the ledger and the replay CLI."""
+    fake = FakeCredits()
+    monkeypatch.setattr(credit_ledger, "get_credit_balance", fake.get_credit_balance)
+    monkeypatch.setattr(credit_ledger, "apply_credit_charges", fake.apply_credit_charges)
+    monkeypatch.setattr(mongodb_store, "apply_credit_charges", fake.apply_credit_charges)
+    return fake
+
+
+class TestLedgerJournal:
+    """Tests for the credit ledger with a journal attached."""
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_then_restart_replays_charges(self, tmp_path, credits):
+        """
+        What it does: Verifies charges settled during a MongoDB outage are applied by the next process.
+        Purpose: End-to-end crash safety of ledger settlements.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        await ledger.open_journal(BillingJournal(str(tmp_path)))
+        await ledger.settle("u-1", Decimal("2"), request_id="r-1")
+        credits.fail = True
+        await ledger.close()
+        assert credits.applied == []
+
+        credits.fail = False
+        restarted = CreditLedger(flush_interval=60)
+        recovered = await restarted.open_journal(BillingJournal(str(tmp_path)))
+        assert await restarted.flush() is True
+        await restarted.close()
+
+        assert recovered == 1
+        assert credits.applied == ["r-1"]
+        assert credits.balances["u-1"] == Decimal("8")
+        assert await _reopen(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_replaying_applied_charges_is_idempotent(self, tmp_path, credits):
+        """
+        What it does: Verifies a charge applied before the crash but not yet acked is not charged twice.
+        Purpose: Replay relies on request-ID idempotency, not on the ack being durable.
+        """
+        journal = BillingJournal(str(tmp_path))
+        journal.open()
+        record = await journal.append(_charge("r-1", amount="3"))
+        credits.apply_credit_charges([record])
+        await journal.close()
+
+        replayed = await replay_journal(str(tmp_path))
+
+        assert replayed == 1
+        assert credits.balances["u-1"] == Decimal("7")
+        assert await _reopen(tmp_path) == []
+
+
+class FakeCreditsCollection:
+    """Records bulk writes against in-memory credits documents."""
+
+    def __init__(self, documents, matched=None) -> None:
+        self.documents = documents
+        self.matched = matched
+        self.operations = None
+        self.ordered = None
+
+    def find(self, query, projection):
+        users = query[mongodb_store.MONGODB_CREDITS_USER_ID_FIELD]["$in"]
+        return [doc for doc in self.documents if doc[mongodb_store.MONGODB_CREDITS_USER_ID_FIELD] in users]
+
+    def bulk_write(self, operations, ordered):
+        self.operations = operations
+        self.ordered = ordered
+        matched = len(operations) if self.matched is None else self.matched
+        user_field = mongodb_store.MONGODB_CREDITS_USER_ID_FIELD
+        applied_field = mongodb_store.MONGODB_CREDITS_APPLIED_FIELD
+        # The first `matched` updates take effect, the rest match nothing
+        for operation in operations[:matched]:
+            for doc in self.documents:
+                if doc[user_field] == operation._filter[user_field]:
+                    doc[applied_field].extend(operation._doc["$push"][applied_field]["$each"])
+        return type("BulkWriteResult", (), {"matched_count": matched})()
+
+
+class TestApplyCreditCharges:
+    """Tests for the idempotent bulk write in mongodb_store."""
+
+    @staticmethod
+    def _document(user_id, applied=()):
+        return {
+            mongodb_store.MONGODB_CREDITS_USER_ID_FIELD: user_id,
+            mongodb_store.MONGODB_CREDITS_APPLIED_FIELD: list(applied),
+        }
+
+    def test_updates_are_conditional_on_request_id(self, monkeypatch):
+        """
+        What it does: Verifies each charge becomes a $inc guarded by the absence of its request ID.
+        Purpose: Retried and replayed charges must be applied at most once.
+        """
+        collection = FakeCreditsCollection([self._document("u-1")])
+        monkeypatch.setattr(mongodb_store, "_get_collection", lambda name: collection)
+
+        result = mongodb_store.apply_credit_charges([_charge("r-1", amount="2"), _charge("r-0", amount="0")])
+
+        assert [charge.request_id for charge in result.applied] == ["r-1"]
+        assert collection.ordered is False
+        assert len(collection.operations) == 1
+        operation = collection.operations[0]
+        applied_field = mongodb_store.MONGODB_CREDITS_APPLIED_FIELD
+        assert operation._filter[applied_field] == {"$ne": "r-1"}
+        assert operation._doc["$inc"][mongodb_store.MONGODB_CREDITS_BALANCE_FIELD] == -2.0
+        assert operation._doc["$push"][applied_field]["$each"] == ["r-1"]
+
+    def test_duplicates_and_missing_documents_are_reported(self, monkeypatch):
+        """
+        What it does: Verifies already applied charges and charges without a credits document are not written.
+        Purpose: The ledger must neither acknowledge a lost charge nor count a replay twice.
+        """
+        collection = FakeCreditsCollection([self._document("u-1", applied=["r-old"])])
+        monkeypatch.setattr(mongodb_store, "_get_collection", lambda name: collection)
+
+        result = mongodb_store.apply_credit_charges([
+            _charge("r-old"), _charge("r-new"), _charge("r-lost", user_id="u-gone"),
+        ])
+
+        print(f"Result: {result}")
+        assert [charge.request_id for charge in result.applied] == ["r-new"]
+        assert [charge.request_id for charge in result.duplicates] == ["r-old"]
+        assert [charge.request_id for charge in result.missing] == ["r-lost"]
+        assert len(collection.operations) == 1
+
+    def test_unmatched_charges_are_not_reported_as_applied(self, monkeypatch):
+        """
+        What it does: Verifies a bulk write matching fewer charges than it sent re-reads the documents.
+        Purpose: A charge that matched nothing must stay queued instead of being acknowledged.
+        """
+        collection = FakeCreditsCollection([self._document("u-1"), self._document("u-2")], matched=1)
+        monkeypatch.setattr(mongodb_store, "_get_collection", lambda name: collection)
+
+        result = mongodb_store.apply_credit_charges([_charge("r-1"), _charge("r-2", user_id="u-2")])
+
+        print(f"Result: {result}")
+        assert result.applied == []
+        assert [charge.request_id for charge in result.duplicates] == ["r-1"]
+        assert [charge.request_id for charge in result.missing] == ["r-2"]
+
+    def test_repeated_request_id_in_one_batch_is_a_duplicate(self, monkeypatch):
+        """
+        What it does: Verifies a request ID appearing twice in one batch is written once.
+        Purpose: A re-submitted charge must not be applied twice by the same flush.
+        """
+        collection = FakeCreditsCollection([self._document("u-1")])
+        monkeypatch.setattr(mongodb_store, "_get_collection", lambda name: collection)
+
+        result = mongodb_store.apply_credit_charges([_charge("r-1"), _charge("r-1")])
+
+        print(f"Result: {result}")
+        assert [charge.request_id for charge in result.applied] == ["r-1"]
+        assert [charge.request_id for charge in result.duplicates] == ["r-1"]
+        assert len(collection.operations) == 1
+
+
+class TestLedgerDuplicates:
+    """Tests for replayed charges in the ledger."""
+
+    @pytest.mark.asyncio
+    async def test_replayed_charge_is_not_subtracted_locally_twice(self, tmp_path, credits):
+        """
+        What it does: Verifies a replayed charge already applied in MongoDB forces a balance re-read instead of a local subtraction.
+        Purpose: Replays must not lower the cached balance twice.
+        """
+        journal = BillingJournal(str(tmp_path))
+        journal.open()
+        record = await journal.append(_charge("r-1", amount="3"))
+        credits.apply_credit_charges([record])
+        await journal.close()
+
+        ledger = CreditLedger(flush_interval=60)
+        await ledger.reserve("u-1", Decimal("0"))
+        await ledger.open_journal(BillingJournal(str(tmp_path)))
+        assert await ledger.flush() is True
+        await ledger.reserve("u-1", Decimal("0"))
+        await asyncio.sleep(0.05)
+
+        print(f"Available: {ledger.available('u-1')}")
+        assert ledger.available("u-1") == Decimal("7")
+        await ledger.close()
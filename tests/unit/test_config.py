@@ -565,6 +565,50 @@ class TestKiroAuthSourceConfig:
             importlib.reload(config_module)
             assert config_module.AUTH_POOL_RELOAD_INTERVAL_SECONDS == 25
 
+    def test_account_scheduling_policy_defaults_to_round_robin(self):
+        """Verify ACCOUNT_SCHEDULING_POLICY defaults to round_robin and rejects unknown values."""
+        with patch.dict(os.environ, {"ACCOUNT_SCHEDULING_POLICY": "fastest"}):
+            import importlib
+            import kiro.config as config_module
+            importlib.reload(config_module)
+            assert config_module.ACCOUNT_SCHEDULING_POLICY == "round_robin"
+
+    def test_account_weights_parsing(self):
+        """Verify ACCOUNT_WEIGHTS parses key=weight pairs and skips invalid entries."""
+        with patch.dict(os.environ, {"ACCOUNT_WEIGHTS": "kirocli:social:token=3, acct-b=0.5,bad,neg=-1,x=abc"}):
+            import importlib
+            import kiro.config as config_module
+            importlib.reload(config_module)
+            assert config_module.ACCOUNT_WEIGHTS == {"kirocli:social:token": 3.0, "acct-b": 0.5}
+
+    def test_first_token_context_buckets_parsing(self):
+        """Verify FIRST_TOKEN_CONTEXT_BUCKETS is sorted, deduplicated and skips invalid entries."""
+        with patch.dict(os.environ, {"FIRST_TOKEN_CONTEXT_BUCKETS": "32000, 8000,abc,-5,8000"}):
+            import importlib
+            import kiro.config as config_module
+            importlib.reload(config_module)
+            assert config_module.FIRST_TOKEN_CONTEXT_BUCKETS == [8000, 32000]
+
+    def test_first_token_timeout_max_stays_below_read_timeout(self):
+        """Verify FIRST_TOKEN_TIMEOUT_MAX is clamped to STREAMING_READ_TIMEOUT."""
+        with patch.dict(os.environ, {"FIRST_TOKEN_TIMEOUT_MAX": "900", "STREAMING_READ_TIMEOUT": "300"}):
+            import importlib
+            import kiro.config as config_module
+            importlib.reload(config_module)
+            assert config_module.FIRST_TOKEN_TIMEOUT_MAX == 300
+
+    def test_tool_input_streaming_uses_bool_parsing(self):
+        """Verify TOOL_INPUT_STREAMING accepts on/off spellings and falls back to true on invalid values."""
+        import importlib
+        import kiro.config as config_module
+        with patch.dict(os.environ, {"TOOL_INPUT_STREAMING": " OFF "}):
+            importlib.reload(config_module)
+            assert config_module.TOOL_INPUT_STREAMING is False
+        with patch.dict(os.environ, {"TOOL_INPUT_STREAMING": "maybe"}):
+            importlib.reload(config_module)
+            assert config_module.TOOL_INPUT_STREAMING is True
+        importlib.reload(config_module)
+
 
 class TestFallbackModelsConfig:
     """Tests for FALLBACK_MODELS configuration."""
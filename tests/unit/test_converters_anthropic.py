@@ -23,6 +23,8 @@ from kiro.converters_anthropic import (
     extract_tool_uses_from_anthropic_content,
     convert_anthropic_messages,
     convert_anthropic_tools,
+    convert_anthropic_messages_for_tokenizer,
+    convert_anthropic_tools_for_tokenizer,
     anthropic_to_kiro,
 )
 from kiro.converters_core import UnifiedMessage, UnifiedTool
@@ -1435,6 +1437,52 @@ class TestConvertAnthropicTools:
         assert result[0].description is None
 
 
+# ==================================================================================================
+# Tests for tokenizer conversion
+# ==================================================================================================
+
+
+class TestConvertForTokenizer:
+    """Tests for convert_anthropic_messages_for_tokenizer and convert_anthropic_tools_for_tokenizer."""
+
+    def test_tool_traffic_and_system_are_kept(self):
+        """
+        What it does: Verifies system prompt, tool_use and tool_result become countable tokenizer dicts.
+        Purpose: Token estimates must include the tool traffic of agent turns.
+        """
+        messages = [
+            AnthropicMessage(role="user", content="Read main.py"),
+            AnthropicMessage(role="assistant", content=[
+                {"type": "tool_use", "id": "toolu_1", "name": "read_file", "input": {"path": "main.py"}}
+            ]),
+            AnthropicMessage(role="user", content=[
+                {"type": "tool_result", "tool_use_id": "toolu_1", "content": "import os"}
+            ]),
+        ]
+
+        result = convert_anthropic_messages_for_tokenizer(messages, system=[{"type": "text", "text": "Be brief"}])
+
+        print(f"Result: {result}")
+        assert result[0] == {"role": "system", "content": "Be brief"}
+        assert result[2]["tool_calls"][0]["function"] == {"name": "read_file", "arguments": '{"path": "main.py"}'}
+        assert result[-1] == {"role": "tool", "tool_call_id": "toolu_1", "content": "import os"}
+
+    def test_tools_become_function_definitions(self):
+        """
+        What it does: Verifies Anthropic tools become OpenAI function dicts with their schema.
+        Purpose: The tokenizer counts the name, description and parameters of functions.
+        """
+        tools = [AnthropicTool(name="search", description="Search docs", input_schema={"type": "object"})]
+
+        result = convert_anthropic_tools_for_tokenizer(tools)
+
+        assert result == [{
+            "type": "function",
+            "function": {"name": "search", "description": "Search docs", "parameters": {"type": "object"}},
+        }]
+        assert convert_anthropic_tools_for_tokenizer(None) is None
+
+
 # ==================================================================================================
 # Tests for anthropic_to_kiro
 # ==================================================================================================
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for credential stores.
+Tests off-loop execution, persistent connections and batched writes.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from unittest.mock import Mock
+
+import pytest
+
+from kiro.credential_store import (
+    CredentialStore,
+    FileCredentialStore,
+    MongoCredentialStore,
+    SqliteCredentialStore,
+    merge_token_payload,
+)
+
+
+def _make_record(key: str, access_token: str, **fields: Any) -> Dict[str, Any]:
+    """Build a credentials record for a single candidate key."""
+    record = {
+        "candidate_keys": [key],
+        "access_token": access_token,
+        "refresh_token": f"refresh_for_{access_token}",
+        "expires_at": "2099-01-01T00:00:00+00:00",
+        "region": "us-east-1",
+        "scopes": None,
+        "profile_arn": None,
+    }
+    record.update(fields)
+    return record
+
+
+def _read_token(db_path: str, key: str) -> Dict[str, Any]:
+    """Read a token payload from auth_kv with a fresh connection."""
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM auth_kv WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0])
+
+
+class RecordingStore(CredentialStore):
+    """Store that records each write batch and the thread it ran on."""
+
+    source = "recording"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.threads: List[str] = []
+
+    def write_records(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        self.batches.append(list(records))
+        self.threads.append(threading.current_thread().name)
+        return [record["candidate_keys"][0] for record in records]
+
+
+class TestMergeTokenPayload:
+    """Tests for merge_token_payload."""
+
+    def test_preserves_unmanaged_fields(self):
+        """
+        What it does: Verifies refreshed fields are merged without dropping provider metadata.
+        Purpose: Keep kiro-cli fields intact when the gateway saves tokens.
+        """
+        existing = {"provider": "google", "access_token": "old", "profile_arn": "arn:old"}
+
+        merged = merge_token_payload(existing, _make_record("k", "new"))
+
+        assert merged["provider"] == "google"
+        assert merged["access_token"] == "new"
+        assert merged["profile_arn"] == "arn:old"
+
+
+class TestCredentialStoreBatching:
+    """Tests for CredentialStore.save batching."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_saves_are_written_in_one_batch(self):
+        """
+        What it does: Verifies saves issued together are written in a single executor job.
+        Purpose: Ensure credential writes are batched and run off the event loop.
+        """
+        store = RecordingStore()
+
+        print("Action: Saving three accounts concurrently...")
+        results = await asyncio.gather(
+            store.save(_make_record("key-a", "a1")),
+            store.save(_make_record("key-b", "b1")),
+            store.save(_make_record("key-c", "c1")),
+        )
+        await store.aclose()
+
+        print(f"Comparing batches: {store.batches}")
+        assert results == ["key-a", "key-b", "key-c"]
+        assert len(store.batches) == 1
+        assert len(store.batches[0]) == 3
+        assert store.threads[0].startswith("credential-store-recording")
+        assert store.threads[0] != threading.current_thread().name
+
+    @pytest.mark.asyncio
+    async def test_saves_for_same_key_are_coalesced(self):
+        """
+        What it does: Verifies queued saves for one account collapse into the newest record.
+        Purpose: Avoid redundant writes after back-to-back refreshes.
+        """
+        store = RecordingStore()
+
+        results = await asyncio.gather(
+            store.save(_make_record("key-a", "old")),
+            store.save(_make_record("key-a", "new")),
+        )
+        await store.aclose()
+
+        assert results == ["key-a", "key-a"]
+        assert len(store.batches) == 1
+        assert [record["access_token"] for record in store.batches[0]] == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_write_error_is_delivered_to_all_waiters(self):
+        """
+        What it does: Verifies a failed batch write raises in every waiting save.
+        Purpose: Ensure callers can log persistence failures.
+        """
+        store = CredentialStore()
+        store.write_records = Mock(side_effect=sqlite3.OperationalError("database is locked"))
+
+        results = await asyncio.gather(
+            store.save(_make_record("key-a", "a1")),
+            store.save(_make_record("key-b", "b1")),
+            return_exceptions=True,
+        )
+        await store.aclose()
+
+        assert all(isinstance(result, sqlite3.OperationalError) for result in results)
+
+
+class TestSqliteCredentialStore:
+    """Tests for SqliteCredentialStore."""
+
+    def test_reuses_persistent_connection(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies reads and writes share one connection.
+        Purpose: Avoid opening a new SQLite connection per credential operation.
+        """
+        store = SqliteCredentialStore(temp_sqlite_db_round_robin)
+
+        store.read(lambda cursor: cursor.execute("SELECT 1").fetchone())
+        first_connection = store._connection
+        store.write_records([_make_record("kirocli:social:token", "updated_a")])
+
+        assert first_connection is not None
+        assert store._connection is first_connection
+        store.close()
+        assert store._connection is None
+
+    def test_write_records_updates_each_account_in_one_transaction(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies a batch updates several accounts and reports the saved keys.
+        Purpose: Ensure batched writes target each account's own key.
+        """
+        store = SqliteCredentialStore(temp_sqlite_db_round_robin)
+
+        saved_keys = store.write_records([
+            _make_record("kirocli:social:token", "updated_a"),
+            _make_record("kirocli:social:token:acct-b", "updated_b"),
+            _make_record("kirocli:social:token:missing", "ignored"),
+        ])
+        store.close()
+
+        print(f"Comparing saved keys: {saved_keys}")
+        assert saved_keys == ["kirocli:social:token", "kirocli:social:token:acct-b", None]
+        assert _read_token(temp_sqlite_db_round_robin, "kirocli:social:token")["access_token"] == "updated_a"
+        token_b = _read_token(temp_sqlite_db_round_robin, "kirocli:social:token:acct-b")
+        assert token_b["access_token"] == "updated_b"
+        assert token_b["provider"] == "github"
+
+    def test_missing_database_is_not_created(self, tmp_path):
+        """
+        What it does: Verifies a missing database file is reported, not created.
+        Purpose: Preserve the existing "database not found" behavior.
+        """
+        db_file = tmp_path / "missing.sqlite3"
+        store = SqliteCredentialStore(str(db_file))
+
+        assert store.read(lambda cursor: cursor.execute("SELECT 1").fetchone()) is None
+        assert store.write_records([_make_record("kirocli:social:token", "x")]) == [None]
+        assert not db_file.exists()
+
+    @pytest.mark.asyncio
+    async def test_save_runs_on_dedicated_thread(self, temp_sqlite_db_round_robin):
+        """
+        What it does: Verifies async saves persist through the store's executor.
+        Purpose: Ensure SQLite I/O never runs on the event loop thread.
+        """
+        store = SqliteCredentialStore(temp_sqlite_db_round_robin)
+        loop_thread = threading.current_thread().name
+
+        reader_thread = await store.run(store.read, lambda cursor: threading.current_thread().name)
+        saved_key = await store.save(_make_record("kirocli:social:token:acct-b", "async_b"))
+        await store.aclose()
+
+        assert reader_thread != loop_thread
+        assert saved_key == "kirocli:social:token:acct-b"
+        token_b = _read_token(temp_sqlite_db_round_robin, "kirocli:social:token:acct-b")
+        assert token_b["access_token"] == "async_b"
+        assert store._connection is None
+
+
+class TestMongoCredentialStore:
+    """Tests for MongoCredentialStore."""
+
+    def test_write_records_updates_first_existing_key(self):
+        """
+        What it does: Verifies MongoDB writes go to the first candidate key that exists.
+        Purpose: Ensure account-scoped save semantics for MongoDB source.
+        """
+        collection = Mock()
+        collection.find_one.side_effect = lambda query, projection: (
+            {"value": {"access_token": "old", "provider": "google"}}
+            if query["key"] == "key-b" else None
+        )
+        collection.update_one.return_value = Mock(modified_count=1, matched_count=1)
+        store = MongoCredentialStore(lambda: collection)
+
+        record = _make_record("key-a", "new")
+        record["candidate_keys"] = ["key-a", "key-b"]
+        saved_keys = store.write_records([record])
+
+        assert saved_keys == ["key-b"]
+        update_call = collection.update_one.call_args
+        assert update_call.args[0] == {"key": "key-b"}
+        assert update_call.args[1]["$set"]["value"]["access_token"] == "new"
+        assert update_call.args[1]["$set"]["value"]["provider"] == "google"
+
+    def test_unavailable_collection_skips_io(self):
+        """
+        What it does: Verifies no I/O happens when MongoDB is unavailable.
+        Purpose: Ensure a missing pymongo or URI degrades to no-op persistence.
+        """
+        store = MongoCredentialStore(lambda: None)
+
+        assert store.read(lambda collection: collection.find()) is None
+        assert store.write_records([_make_record("key-a", "new")]) == [None]
+
+
+class TestFileCredentialStore:
+    """Tests for FileCredentialStore."""
+
+    def test_write_preserves_other_fields(self, tmp_path):
+        """
+        What it does: Verifies the newest record is written in camelCase, keeping other fields.
+        Purpose: Match the Kiro IDE credentials file format.
+        """
+        creds_file = tmp_path / "creds.json"
+        creds_file.write_text(json.dumps({"refreshToken": "old", "region": "us-east-1"}))
+        store = FileCredentialStore(str(creds_file))
+
+        store.write_records([
+            _make_record("", "stale"),
+            _make_record("", "newest", profile_arn="arn:test"),
+        ])
+
+        saved = json.loads(creds_file.read_text())
+        assert saved["accessToken"] == "newest"
+        assert saved["refreshToken"] == "refresh_for_newest"
+        assert saved["expiresAt"] == "2099-01-01T00:00:00+00:00"
+        assert saved["profileArn"] == "arn:test"
+        assert saved["region"] == "us-east-1"
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the credit reservation ledger.
+Tests reservations against cached balances, settlement, write-behind flushes and expiry.
+"""
+
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+import kiro.credit_ledger as credit_ledger
+from kiro.credit_ledger import CreditLedger
+from kiro.mongodb_store import CreditChargeResult
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeCredits:
+    """Stand-in for the credits collection behind get_credit_balance/apply_credit_charges."""
+
+    def __init__(self, balances) -> None:
+        self.balances = {user_id: Decimal(str(value)) for user_id, value in balances.items()}
+        self.reads = []
+        self.flushes = []
+        self.fail_flushes = False
+
+    def get_credit_balance(self, user_id):
+        self.reads.append(user_id)
+        return self.balances.get(user_id)
+
+    def apply_credit_charges(self, charges):
+        if self.fail_flushes:
+            return None
+        result = CreditChargeResult()
+        totals = {}
+        for charge in charges:
+            if charge.user_id not in self.balances:
+                result.missing.append(charge)
+                continue
+            result.applied.append(charge)
+            totals[charge.user_id] = totals.get(charge.user_id, Decimal("0")) + charge.amount
+        self.flushes.append(totals)
+        for user_id, amount in totals.items():
+            self.balances[user_id] -= amount
+        return result
+
+
+@pytest.fixture
+def credits(monkeypatch):
+    """Patch the ledger's MongoDB helpers with an in-memory credits table."""
+    fake = FakeCredits({"u-1": "10", "u-2": "5"})
+    monkeypatch.setattr(credit_ledger, "get_credit_balance", fake.get_credit_balance)
+    monkeypatch.setattr(credit_ledger, "apply_credit_charges", fake.apply_credit_charges)
+    return fake
+
+
+class TestReservations:
+    """Tests for reserving credits."""
+
+    @pytest.mark.asyncio
+    async def test_reservations_use_cached_balance(self, credits):
+        """
+        What it does: Verifies only the first reservation for a user reads MongoDB.
+        Purpose: Remove the per-request balance round-trip.
+        """
+        ledger = CreditLedger(flush_interval=60)
+
+        first = await ledger.reserve("u-1", Decimal("2"))
+        second = await ledger.reserve("u-1", Decimal("3"))
+
+        print(f"Balance reads: {credits.reads}")
+        assert first is not None and second is not None
+        assert credits.reads == ["u-1"]
+        assert ledger.available("u-1") == Decimal("5")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_reservations_share_one_read(self, credits):
+        """
+        What it does: Verifies simultaneous cold reservations for a user coalesce into one read.
+        Purpose: A burst of requests must not stampede MongoDB.
+        """
+        ledger = CreditLedger(flush_interval=60)
+
+        results = await asyncio.gather(*(ledger.reserve("u-1", Decimal("1")) for _ in range(5)))
+
+        assert all(result is not None for result in results)
+        assert credits.reads == ["u-1"]
+        assert ledger.available("u-1") == Decimal("5")
+
+    @pytest.mark.asyncio
+    async def test_refuses_beyond_balance_and_rereads_once(self, credits):
+        """
+        What it does: Verifies a reservation above the available credits is refused after one re-read.
+        Purpose: Enforce the balance while still seeing top-ups immediately.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        await ledger.reserve("u-2", Decimal("4"))
+
+        assert await ledger.reserve("u-2", Decimal("2")) is None
+        assert credits.reads == ["u-2", "u-2"]
+
+        credits.balances["u-2"] = Decimal("100")
+        assert await ledger.reserve("u-2", Decimal("2")) is not None
+
+    @pytest.mark.asyncio
+    async def test_missing_balance_record_is_refused(self, credits):
+        """
+        What it does: Verifies users without a credits record cannot reserve.
+        Purpose: Keep the previous has_sufficient_credits semantics.
+        """
+        ledger = CreditLedger(flush_interval=60)
+
+        assert await ledger.reserve("unknown", Decimal("1")) is None
+        assert ledger.available("unknown") is None
+
+    @pytest.mark.asyncio
+    async def test_release_is_idempotent(self, credits):
+        """
+        What it does: Verifies releasing twice gives the credits back once.
+        Purpose: Error paths can release unconditionally.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        reservation = await ledger.reserve("u-1", Decimal("4"))
+
+        reservation.release()
+        reservation.release()
+
+        assert ledger.available("u-1") == Decimal("10")
+
+    @pytest.mark.asyncio
+    async def test_expired_reservation_is_dropped(self, credits):
+        """
+        What it does: Verifies reservations past their TTL stop holding credits.
+        Purpose: Abandoned streams must not lock a user's balance forever.
+        """
+        clock = FakeClock()
+        ledger = CreditLedger(flush_interval=60, balance_ttl=10_000, reservation_ttl=60, clock=clock)
+        abandoned = await ledger.reserve("u-1", Decimal("9"))
+
+        clock.now += 61
+        assert await ledger.reserve("u-1", Decimal("9")) is not None
+        assert not abandoned.is_open
+
+
+class TestSettlementAndFlush:
+    """Tests for settling charges and write-behind flushes."""
+
+    @pytest.mark.asyncio
+    async def test_settled_charges_are_flushed_as_one_bulk_write(self, credits):
+        """
+        What it does: Verifies charges from several requests and users reach MongoDB in one flush.
+        Purpose: Replace the per-request $inc with one batched bulk write.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        for user_id, charge in (("u-1", "1"), ("u-1", "2"), ("u-2", "0.5")):
+            reservation = await ledger.reserve(user_id, Decimal("0.1"))
+            await ledger.settle(user_id, Decimal(charge), reservation)
+
+        assert credits.flushes == []
+        assert await ledger.flush() is True
+
+        print(f"Flushes: {credits.flushes}")
+        assert credits.flushes == [{"u-1": Decimal("3"), "u-2": Decimal("0.5")}]
+        assert ledger.available("u-1") == Decimal("7")
+        await ledger.close()
+
+    @pytest.mark.asyncio
+    async def test_flush_runs_after_interval(self, credits):
+        """
+        What it does: Verifies a settlement schedules a background flush.
+        Purpose: Charges reach MongoDB without an explicit flush call.
+        """
+        ledger = CreditLedger(flush_interval=0.01)
+        await ledger.settle("u-1", Decimal("1"))
+
+        for _ in range(100):
+            if credits.flushes:
+                break
+            await asyncio.sleep(0.01)
+
+        assert credits.flushes == [{"u-1": Decimal("1")}]
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_charges_pending(self, credits):
+        """
+        What it does: Verifies charges survive a failed flush and are written by the next one.
+        Purpose: A MongoDB outage must not lose charges.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        await ledger.reserve("u-1", Decimal("0"))
+        await ledger.settle("u-1", Decimal("2"))
+
+        credits.fail_flushes = True
+        assert await ledger.flush() is False
+        assert ledger.available("u-1") == Decimal("8")
+
+        credits.fail_flushes = False
+        assert await ledger.flush() is True
+        assert credits.flushes == [{"u-1": Decimal("2")}]
+        assert credits.balances["u-1"] == Decimal("8")
+        assert ledger.available("u-1") == Decimal("8")
+
+    @pytest.mark.asyncio
+    async def test_charge_above_reservation_is_recorded(self, credits):
+        """
+        What it does: Verifies a final charge larger than the balance is still recorded.
+        Purpose: Usage that already happened is billed; further reservations are refused.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        reservation = await ledger.reserve("u-2", Decimal("1"))
+        await ledger.settle("u-2", Decimal("7"), reservation)
+
+        assert ledger.available("u-2") == Decimal("-2")
+        assert await ledger.reserve("u-2", Decimal("0.1")) is None
+        await ledger.close()
+        assert credits.balances["u-2"] == Decimal("-2")
+
+    @pytest.mark.asyncio
+    async def test_stale_balance_is_refreshed_in_background(self, credits):
+        """
+        What it does: Verifies a reservation after the balance TTL triggers a background re-read.
+        Purpose: Pick up deductions made by other gateway processes.
+        """
+        clock = FakeClock()
+        ledger = CreditLedger(flush_interval=60, balance_ttl=30, clock=clock)
+        await ledger.reserve("u-1", Decimal("1"))
+        credits.balances["u-1"] = Decimal("4")
+
+        clock.now += 31
+        assert await ledger.reserve("u-1", Decimal("1")) is not None
+        await asyncio.sleep(0.05)
+
+        assert credits.reads == ["u-1", "u-1"]
+        assert ledger.available("u-1") == Decimal("2")
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_charges(self, credits):
+        """
+        What it does: Verifies shutdown writes charges that were not flushed yet.
+        Purpose: Graceful restarts must not drop settled charges.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        await ledger.settle("u-1", Decimal("1.5"))
+
+        await ledger.close()
+
+        assert credits.flushes == [{"u-1": Decimal("1.5")}]
+
+    @pytest.mark.asyncio
+    async def test_charge_without_credits_document_stays_queued(self, credits):
+        """
+        What it does: Verifies a charge for a user without a credits document is not acknowledged as flushed.
+        Purpose: A missing document must not silently drop the charge.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        await ledger.settle("u-new", Decimal("2"))
+        await ledger.settle("u-1", Decimal("1"))
+
+        assert await ledger.flush() is False
+        assert credits.balances["u-1"] == Decimal("9")
+
+        credits.balances["u-new"] = Decimal("5")
+        assert await ledger.flush() is True
+        assert credits.balances["u-new"] == Decimal("3")
+        assert credits.flushes[-1] == {"u-new": Decimal("2")}
+
+    @pytest.mark.asyncio
+    async def test_same_request_id_is_charged_once(self, credits):
+        """
+        What it does: Verifies settling a request ID a second time charges nothing.
+        Purpose: A re-settled or re-submitted request must not be billed twice.
+        """
+        ledger = CreditLedger(flush_interval=60)
+        await ledger.reserve("u-1", Decimal("0"))
+        await ledger.settle("u-1", Decimal("2"), request_id="req-1")
+
+        print("Action: Settling req-1 again...")
+        await ledger.settle("u-1", Decimal("2"), request_id="req-1")
+
+        assert ledger.available("u-1") == Decimal("8")
+        assert await ledger.flush() is True
+        assert credits.flushes == [{"u-1": Decimal("2")}]
+        await ledger.close()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for hedged first-token requests.
+Tests the TTFT sample window and the hedge delay and budget guardrails.
+"""
+
+from kiro.hedging import HedgePolicy, TtftWindow
+from kiro.retry_budget import RetryBudget
+
+
+def _make_policy(samples, **kwargs) -> HedgePolicy:
+    """Build an enabled policy pre-filled with TTFT samples."""
+    kwargs.setdefault("min_samples", 1)
+    kwargs.setdefault("min_delay", 0.0)
+    policy = HedgePolicy(enabled=True, **kwargs)
+    for sample in samples:
+        policy.record_ttft(sample)
+    return policy
+
+
+class TestTtftWindow:
+    """Tests for TtftWindow."""
+
+    def test_quantile_uses_nearest_rank(self):
+        """
+        What it does: Verifies quantiles over a known sample set.
+        Purpose: Ensure the hedge delay follows the configured percentile.
+        """
+        window = TtftWindow(size=100)
+        for value in range(1, 101):
+            window.record(value / 100)
+
+        assert window.quantile(0.5) == 0.51
+        assert window.quantile(0.95) == 0.96
+        assert window.quantile(1.0) == 1.0
+        assert TtftWindow().quantile(0.95) is None
+
+    def test_window_keeps_only_recent_samples(self):
+        """
+        What it does: Verifies old samples fall out of the window.
+        Purpose: Let the hedge delay follow current upstream latency.
+        """
+        window = TtftWindow(size=3)
+        for value in (10.0, 10.0, 10.0, 1.0, 1.0, 1.0):
+            window.record(value)
+
+        assert len(window) == 3
+        assert window.quantile(1.0) == 1.0
+
+
+class TestHedgePolicy:
+    """Tests for HedgePolicy delay and guardrails."""
+
+    def test_no_hedge_until_enough_samples(self):
+        """
+        What it does: Verifies hedging waits for HEDGE_MIN_SAMPLES observations.
+        Purpose: Avoid hedging on a meaningless percentile at startup.
+        """
+        policy = _make_policy([0.5, 0.5], min_samples=3)
+
+        assert policy.hedge_delay(15.0) is None
+
+        policy.record_ttft(0.5)
+
+        assert policy.hedge_delay(15.0) == 0.5
+
+    def test_delay_is_clamped_to_minimum(self):
+        """
+        What it does: Verifies the hedge delay never drops below min_delay.
+        Purpose: Prevent hedging nearly every request when upstream is fast.
+        """
+        policy = _make_policy([0.05] * 10, min_delay=1.0)
+
+        assert policy.hedge_delay(15.0) == 1.0
+
+    def test_no_hedge_when_delay_reaches_timeout(self):
+        """
+        What it does: Verifies no hedge is scheduled at or after the first token timeout.
+        Purpose: Leave slow-upstream cases to the regular timeout retry.
+        """
+        policy = _make_policy([20.0] * 10)
+
+        assert policy.hedge_delay(15.0) is None
+
+    def test_disabled_policy_never_hedges(self):
+        """
+        What it does: Verifies HEDGE_ENABLED=false disables hedging.
+        Purpose: Keep hedging opt-in.
+        """
+        policy = HedgePolicy(enabled=False, min_samples=1)
+        policy.record_ttft(0.5)
+
+        assert policy.hedge_delay(15.0) is None
+
+    def test_budget_caps_hedge_rate(self):
+        """
+        What it does: Verifies hedges are limited by the per-request hedge budget.
+        Purpose: Ensure hedging cannot double upstream load during an outage.
+        """
+        budget = RetryBudget(ratio=0.1, min_per_second=0.0, burst=1)
+        policy = _make_policy([0.5], budget=budget)
+
+        granted = 0
+        for _ in range(100):
+            policy.record_request()
+            if policy.try_acquire():
+                granted += 1
+
+        print(f"Comparing hedges granted for 100 requests: {granted}")
+        assert granted <= 11
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the lock-free Prometheus metrics module.
+"""
+
+import threading
+
+import pytest
+
+from kiro.metrics import (
+    account_metrics_label,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    RETRIES_TOTAL,
+    render_metrics,
+    update_account_gauges,
+)
+
+
+class TestCounter:
+    """Tests for sharded counters."""
+
+    def test_labelled_counter_renders_per_series(self):
+        """
+        What it does: Verifies labelled increments are rendered per label set.
+        Purpose: Retries must be broken down by cause.
+        """
+        counter = Counter("test_retries_total", "Retries.", labelnames=("cause",))
+        counter.labels("timeout").inc()
+        counter.labels("timeout").inc(2)
+        counter.labels("quota_exhaustion").inc()
+
+        text = counter.render()
+        print(f"Rendered:\n{text}")
+        assert "# TYPE test_retries_total counter" in text
+        assert 'test_retries_total{cause="timeout"} 3' in text
+        assert 'test_retries_total{cause="quota_exhaustion"} 1' in text
+
+    def test_shards_from_threads_are_summed(self):
+        """
+        What it does: Verifies increments from several threads are all counted.
+        Purpose: Per-thread shards must not lose updates at scrape time.
+        """
+        counter = Counter("test_threads_total", "Threads.")
+
+        def work():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc()
+
+        assert counter.labels().get() == 4001
+
+    def test_wrong_label_count_raises(self):
+        """
+        What it does: Verifies label arity is checked.
+        Purpose: Catch mislabelled call sites early.
+        """
+        counter = Counter("test_arity_total", "Arity.", labelnames=("cause",))
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+
+class TestHistogram:
+    """Tests for sharded histograms."""
+
+    def test_buckets_are_cumulative(self):
+        """
+        What it does: Verifies bucket, sum and count samples.
+        Purpose: Output must be valid Prometheus histogram exposition.
+        """
+        histogram = Histogram("test_seconds", "Latency.", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+
+        text = histogram.render()
+        print(f"Rendered:\n{text}")
+        assert 'test_seconds_bucket{le="0.1"} 2' in text
+        assert 'test_seconds_bucket{le="1"} 3' in text
+        assert 'test_seconds_bucket{le="+Inf"} 4' in text
+        assert "test_seconds_sum 5.65" in text
+        assert "test_seconds_count 4" in text
+
+    def test_labelled_histogram_keeps_labels_before_le(self):
+        """
+        What it does: Verifies labelled series carry their labels and le.
+        Purpose: Conversion time is split by API.
+        """
+        histogram = Histogram("test_conv_seconds", "Conv.", labelnames=("api",), buckets=(1.0,))
+        histogram.labels("openai").observe(0.5)
+
+        text = histogram.render()
+        assert 'test_conv_seconds_bucket{api="openai",le="1"} 1' in text
+        assert 'test_conv_seconds_count{api="openai"} 1' in text
+
+
+class TestGauges:
+    """Tests for scrape-time account gauges."""
+
+    def test_replace_drops_stale_series(self):
+        """
+        What it does: Verifies replace() removes accounts no longer present.
+        Purpose: Removed accounts must disappear from /metrics.
+        """
+        gauge = Gauge("test_gauge", "Gauge.", labelnames=("account",))
+        gauge.set(1, "a")
+        gauge.replace({("b",): 2.0})
+
+        text = gauge.render()
+        assert 'account="a"' not in text
+        assert 'test_gauge{account="b"} 2' in text
+
+    def test_update_account_gauges_from_snapshot(self):
+        """
+        What it does: Verifies in-flight and quarantine gauges follow a snapshot.
+        Purpose: Expose per-account load and quarantine state.
+        """
+        update_account_gauges([
+            {"key": "acc-1", "in_flight": 3, "quarantined": False},
+            {"key": "acc-2", "in_flight": 0, "quarantined": True},
+        ])
+
+        label_1 = account_metrics_label("acc-1")
+        label_2 = account_metrics_label("acc-2")
+        text = render_metrics()
+        assert f'kiro_account_in_flight{{account="{label_1}"}} 3' in text
+        assert f'kiro_account_quarantined{{account="{label_1}"}} 0' in text
+        assert f'kiro_account_quarantined{{account="{label_2}"}} 1' in text
+
+    def test_account_labels_do_not_reveal_keys(self):
+        """
+        What it does: Verifies account gauges carry an opaque hash, not the key.
+        Purpose: A scrape must not leak which credentials the gateway holds.
+        """
+        key = "/home/user/.aws/sso/cache/kiro-auth-token.json"
+        update_account_gauges([{"key": key, "in_flight": 1, "quarantined": False}])
+
+        label = account_metrics_label(key)
+        print(f"Label: {label}")
+        text = render_metrics()
+        assert key not in text
+        assert len(label) == 12
+        assert label == account_metrics_label(key)
+        assert f'kiro_account_in_flight{{account="{label}"}} 1' in text
+
+
+class TestRegistry:
+    """Tests for registry rendering."""
+
+    def test_registry_renders_metrics_in_order(self):
+        """
+        What it does: Verifies every registered metric is rendered.
+        Purpose: One scrape must cover the whole registry.
+        """
+        registry = MetricsRegistry()
+        registry.register(Counter("test_a_total", "A."))
+        registry.register(Histogram("test_b_seconds", "B.", buckets=(1.0,)))
+
+        text = render_metrics(registry)
+        assert text.index("test_a_total") < text.index("test_b_seconds")
+
+    def test_label_values_are_escaped(self):
+        """
+        What it does: Verifies quotes, backslashes and newlines are escaped.
+        Purpose: Account keys must not break the exposition format.
+        """
+        counter = Counter("test_escape_total", "Escape.", labelnames=("key",))
+        counter.labels('a"b\\c\nd').inc()
+
+        assert 'test_escape_total{key="a\\"b\\\\c\\nd"} 1' in counter.render()
+
+    def test_process_registry_contains_hot_path_metrics(self):
+        """
+        What it does: Verifies the process registry exposes the gateway metrics.
+        Purpose: Guard against metrics being dropped from /metrics.
+        """
+        RETRIES_TOTAL.labels("timeout")
+        text = render_metrics()
+        for name in (
+            "kiro_upstream_first_byte_seconds",
+            "kiro_first_token_seconds",
+            "kiro_stream_duration_seconds",
+            "kiro_stream_bytes",
+            "kiro_request_conversion_seconds",
+            "kiro_tokenizer_seconds",
+            "kiro_retries_total",
+            "kiro_auth_refresh_seconds",
+            "kiro_account_in_flight",
+            "kiro_account_quarantined",
+        ):
+            assert f"# TYPE {name}" in text
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the async MongoDB access layer.
+Tests off-loop execution, deadlines, queued-operation expiry and latency metrics.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from kiro.metrics import MONGODB_OPERATION_SECONDS
+from kiro.mongodb_async import AsyncMongoStore
+from kiro.mongodb_store import MongoStoreTimeoutError, MongoStoreUnavailableError
+
+
+def _observation_count(operation: str, result: str) -> int:
+    """Number of observations recorded for one operation/result series."""
+    counts, _total = MONGODB_OPERATION_SECONDS.labels(operation, result).snapshot()
+    return sum(counts)
+
+
+class TestAsyncMongoStore:
+    """Tests for AsyncMongoStore.run()."""
+
+    @pytest.mark.asyncio
+    async def test_returns_result_and_records_latency(self):
+        """
+        What it does: Verifies run() returns the helper's result and records an "ok" observation.
+        Purpose: Ensure MongoDB latency is visible per operation.
+        """
+        store = AsyncMongoStore(max_workers=2)
+        before = _observation_count("test_lookup", "ok")
+
+        result = await store.run("test_lookup", lambda value: value * 2, 21)
+
+        store.close()
+        assert result == 42
+        assert _observation_count("test_lookup", "ok") == before + 1
+
+    @pytest.mark.asyncio
+    async def test_event_loop_keeps_running_during_slow_operation(self):
+        """
+        What it does: Verifies other coroutines progress while a MongoDB call blocks.
+        Purpose: A slow MongoDB must not stall every stream on the worker.
+        """
+        store = AsyncMongoStore(max_workers=2)
+        release = threading.Event()
+        ticks = []
+
+        async def ticker():
+            while not release.is_set():
+                ticks.append(1)
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.ensure_future(ticker())
+        pending = asyncio.ensure_future(store.run("test_slow", release.wait, 5))
+        await asyncio.sleep(0.05)
+        release.set()
+        await pending
+        await ticking
+
+        store.close()
+        print(f"Ticks while blocked: {len(ticks)}")
+        assert len(ticks) >= 3
+
+    @pytest.mark.asyncio
+    async def test_deadline_raises_timeout_error(self):
+        """
+        What it does: Verifies a call slower than its deadline raises MongoStoreTimeoutError.
+        Purpose: Callers get a bounded wait and can fail the request cleanly.
+        """
+        store = AsyncMongoStore(max_workers=1, read_timeout=0.05)
+        release = threading.Event()
+        before = _observation_count("test_timeout", "timeout")
+
+        with pytest.raises(MongoStoreTimeoutError):
+            await store.run("test_timeout", release.wait, 5)
+
+        release.set()
+        store.close()
+        assert issubclass(MongoStoreTimeoutError, MongoStoreUnavailableError)
+        assert _observation_count("test_timeout", "timeout") == before + 1
+
+    @pytest.mark.asyncio
+    async def test_write_uses_write_deadline(self):
+        """
+        What it does: Verifies write=True uses the longer write deadline.
+        Purpose: Credit deductions get more time than lookups.
+        """
+        store = AsyncMongoStore(max_workers=1, read_timeout=0.01, write_timeout=2.0)
+
+        def slow_write():
+            threading.Event().wait(0.05)
+            return True
+
+        assert await store.run("test_write", slow_write, write=True) is True
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_expired_queued_operation_is_not_started(self):
+        """
+        What it does: Verifies an operation whose caller gave up while it was queued never runs.
+        Purpose: A backlog behind a slow MongoDB must not keep executing abandoned work.
+        """
+        store = AsyncMongoStore(max_workers=1, read_timeout=0.05)
+        release = threading.Event()
+        started = []
+
+        blocker = asyncio.ensure_future(store.run("test_block", release.wait, 5, timeout=5.0))
+        await asyncio.sleep(0.01)
+        with pytest.raises(MongoStoreTimeoutError):
+            await store.run("test_queued", started.append, "ran")
+
+        release.set()
+        await blocker
+        await store.run("test_flush", lambda: None, timeout=5.0)
+
+        store.close()
+        assert started == []
+
+    @pytest.mark.asyncio
+    async def test_helper_errors_propagate(self):
+        """
+        What it does: Verifies exceptions from the helper reach the caller and are recorded as errors.
+        Purpose: Keep the helpers' own error contract (e.g. MongoStoreUnavailableError).
+        """
+        store = AsyncMongoStore(max_workers=1)
+        before = _observation_count("test_error", "error")
+
+        def failing():
+            raise MongoStoreUnavailableError("down")
+
+        with pytest.raises(MongoStoreUnavailableError):
+            await store.run("test_error", failing)
+
+        store.close()
+        assert _observation_count("test_error", "error") == before + 1
@@ -5,16 +5,44 @@ Unit tests for AwsEventStreamParser and auxiliary parsing functions.
 Tests the parsing logic for AWS SSE stream from Kiro API.
 """
 
+import json
+import struct
+import zlib
+
 import pytest
 
 from kiro.parsers import (
     AwsEventStreamParser,
+    EventStreamFrameError,
     find_matching_brace,
     parse_bracket_tool_calls,
+    parse_event_stream_headers,
     deduplicate_tool_calls
 )
 
 
+def encode_event_stream_frame(event_type: str, payload, message_type: str = "event") -> bytes:
+    """Builds a binary AWS event-stream frame the way Kiro API sends it."""
+    if not isinstance(payload, bytes):
+        payload = json.dumps(payload).encode("utf-8")
+    
+    headers = b""
+    for name, value in (
+        (":message-type", message_type),
+        (":event-type", event_type),
+        (":content-type", "application/json"),
+    ):
+        name_bytes = name.encode("utf-8")
+        value_bytes = value.encode("utf-8")
+        headers += bytes([len(name_bytes)]) + name_bytes + b"\x07" + struct.pack(">H", len(value_bytes)) + value_bytes
+    
+    total_length = 12 + len(headers) + len(payload) + 4
+    prelude = struct.pack(">II", total_length, len(headers))
+    prelude += struct.pack(">I", zlib.crc32(prelude))
+    message = prelude + headers + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
 class TestFindMatchingBrace:
     """Tests for find_matching_brace function."""
     
@@ -578,7 +606,8 @@ class TestAwsEventStreamParserToolCalls:
         print(f"Result: {events}")
         print(f"current_tool_call: {aws_event_parser.current_tool_call}")
         
-        # tool_start doesn't return event, but creates current_tool_call
+        # Nothing is reported before the call has input, but current_tool_call is created
+        assert events == []
         assert aws_event_parser.current_tool_call is not None
         assert aws_event_parser.current_tool_call["function"]["name"] == "get_weather"
     
@@ -612,6 +641,98 @@ class TestAwsEventStreamParserToolCalls:
         assert len(aws_event_parser.tool_calls) == 1
         assert aws_event_parser.current_tool_call is None
     
+    def test_tool_input_and_stop_return_incremental_events(self, aws_event_parser):
+        """
+        What it does: Tests events returned for tool input fragments and stop.
+        Goal: Ensure callers can forward tool input before the call is complete.
+        """
+        print("Setup: Tool call start...")
+        aws_event_parser.feed(b'{"name":"func","toolUseId":"call_1"}')
+        
+        print("Action: Parsing input fragment and stop...")
+        input_events = aws_event_parser.feed(b'{"input":"{\\"a\\": 1}"}')
+        stop_events = aws_event_parser.feed(b'{"stop":true}')
+        
+        print(f"Comparing result: {input_events} / {stop_events}")
+        assert input_events == [{
+            "type": "tool_start",
+            "data": {"id": "call_1", "name": "func", "input": '{"a": 1}', "stop": False}
+        }]
+        assert stop_events == [{"type": "tool_stop", "data": {"id": "call_1"}}]
+    
+    def test_repeated_tool_id_is_announced_once(self, aws_event_parser):
+        """
+        What it does: Tests a tool call re-sent by Kiro with the same toolUseId.
+        Goal: Ensure the duplicate is collected but not streamed a second time.
+        """
+        print("Setup: First tool call...")
+        aws_event_parser.feed(b'{"name":"func","toolUseId":"call_1"}{"input":"{}"}{"stop":true}')
+        
+        print("Action: Parsing duplicate tool call...")
+        events = aws_event_parser.feed(b'{"name":"func","toolUseId":"call_1"}{"input":"{}"}{"stop":true}')
+        
+        print(f"Comparing result: Expected [], Got {events}")
+        assert events == []
+        assert len(aws_event_parser.get_tool_calls()) == 1
+    
+    def test_resend_after_empty_call_is_streamed(self, aws_event_parser):
+        """
+        What it does: Tests a toolUseId first sent without input, then re-sent with input.
+        Goal: Ensure the input is streamed instead of being lost behind an empty "{}" call.
+        """
+        print("Setup: Tool call without input...")
+        first = aws_event_parser.feed(b'{"name":"func","toolUseId":"call_1"}{"stop":true}')
+        
+        print("Action: Parsing the re-sent call with input...")
+        resent = aws_event_parser.feed(b'{"name":"func","toolUseId":"call_1"}{"input":"{\\"a\\": 1}"}{"stop":true}')
+        
+        print(f"Comparing result: {first} / {resent}")
+        assert first == []
+        assert resent == [
+            {"type": "tool_start", "data": {"id": "call_1", "name": "func", "input": '{"a": 1}', "stop": False}},
+            {"type": "tool_stop", "data": {"id": "call_1"}},
+        ]
+        tool_calls = aws_event_parser.get_tool_calls()
+        assert len(tool_calls) == 1
+        assert json.loads(tool_calls[0]["function"]["arguments"]) == {"a": 1}
+    
+    def test_duplicate_with_new_id_is_not_streamed(self, aws_event_parser):
+        """
+        What it does: Tests a second call with the same name and input but a new toolUseId.
+        Goal: Ensure the duplicate is held back while it matches the earlier call and then dropped.
+        """
+        print("Setup: First tool call...")
+        aws_event_parser.feed(b'{"name":"func","toolUseId":"call_1"}{"input":"{\\"a\\": 1}"}{"stop":true}')
+        
+        print("Action: Parsing the same call under a new id...")
+        events = aws_event_parser.feed(
+            b'{"name":"func","toolUseId":"call_2"}{"input":"{\\"a\\""}{"input":": 1}"}{"stop":true}'
+        )
+        
+        print(f"Comparing result: Expected [], Got {events}")
+        assert events == []
+        tool_calls = aws_event_parser.get_tool_calls()
+        assert [tc["id"] for tc in tool_calls] == ["call_1"]
+    
+    def test_call_diverging_from_earlier_input_is_released(self, aws_event_parser):
+        """
+        What it does: Tests a second call whose input starts like an earlier call but differs.
+        Goal: Ensure held input is forwarded in one fragment once the calls diverge.
+        """
+        print("Setup: First tool call...")
+        aws_event_parser.feed(b'{"name":"func","toolUseId":"call_1"}{"input":"{\\"a\\": 1}"}{"stop":true}')
+        
+        print("Action: Parsing a different call with a shared prefix...")
+        held = aws_event_parser.feed(b'{"name":"func","toolUseId":"call_2"}{"input":"{\\"a\\""}')
+        released = aws_event_parser.feed(b'{"input":": 2}"}')
+        
+        print(f"Comparing result: {held} / {released}")
+        assert held == []
+        assert released == [{
+            "type": "tool_start",
+            "data": {"id": "call_2", "name": "func", "input": '{"a": 2}', "stop": False}
+        }]
+    
     def test_get_tool_calls_returns_all(self, aws_event_parser):
         """
         What it does: Tests getting all tool calls.
@@ -883,6 +1004,243 @@ class TestAwsEventStreamParserEdgeCases:
         assert events == []
 
 
+class TestParseEventStreamHeaders:
+    """Tests for parse_event_stream_headers function."""
+    
+    def test_parses_string_headers(self):
+        """
+        What it does: Tests decoding of string-typed headers.
+        Goal: Ensure :event-type and :message-type are extracted.
+        """
+        print("Setup: Building frame...")
+        frame = encode_event_stream_frame("assistantResponseEvent", {"content": "hi"})
+        headers_length = struct.unpack(">I", frame[4:8])[0]
+        
+        print("Action: Parsing headers...")
+        headers = parse_event_stream_headers(frame, 12, 12 + headers_length)
+        
+        print(f"Comparing result: {headers}")
+        assert headers[":event-type"] == "assistantResponseEvent"
+        assert headers[":message-type"] == "event"
+        assert headers[":content-type"] == "application/json"
+    
+    def test_skips_fixed_size_headers(self):
+        """
+        What it does: Tests skipping of non-string header types.
+        Goal: Ensure int/bool/uuid headers don't break decoding of following headers.
+        """
+        print("Setup: Headers with int, bool, uuid and string values...")
+        raw = (
+            b"\x03int\x04" + struct.pack(">i", 42)
+            + b"\x04flag\x00"
+            + b"\x02id\x09" + b"\x00" * 16
+            + b"\x0b:event-type\x07\x00\x05hello"
+        )
+        
+        print("Action: Parsing headers...")
+        headers = parse_event_stream_headers(raw, 0, len(raw))
+        
+        print(f"Comparing result: {headers}")
+        assert headers[":event-type"] == "hello"
+        assert headers["flag"] is True
+    
+    def test_raises_on_unknown_value_type(self):
+        """
+        What it does: Tests handling of unknown header value type.
+        Goal: Ensure malformed headers raise EventStreamFrameError.
+        """
+        print("Setup: Header with value type 42...")
+        raw = b"\x01x\x2a"
+        
+        print("Action: Parsing headers...")
+        with pytest.raises(EventStreamFrameError):
+            parse_event_stream_headers(raw, 0, len(raw))
+
+
+class TestAwsEventStreamParserBinaryFrames:
+    """Tests for decoding binary AWS event-stream frames."""
+    
+    def test_parses_content_frame(self, aws_event_parser):
+        """
+        What it does: Tests decoding of a single assistantResponseEvent frame.
+        Goal: Ensure content is dispatched by :event-type header.
+        """
+        print("Setup: Binary content frame...")
+        frame = encode_event_stream_frame("assistantResponseEvent", {"content": "Hello"})
+        
+        print("Action: Parsing frame...")
+        events = aws_event_parser.feed(frame)
+        
+        print(f"Comparing result: {events}")
+        assert events == [{"type": "content", "data": "Hello"}]
+    
+    def test_parses_frames_split_at_every_byte(self, aws_event_parser):
+        """
+        What it does: Tests feeding frames one byte at a time.
+        Goal: Ensure incomplete frames are buffered until complete.
+        """
+        print("Setup: Two frames...")
+        data = (
+            encode_event_stream_frame("assistantResponseEvent", {"content": "A"})
+            + encode_event_stream_frame("assistantResponseEvent", {"content": "B"})
+        )
+        
+        print("Action: Feeding byte by byte...")
+        events = []
+        for i in range(len(data)):
+            events.extend(aws_event_parser.feed(data[i:i + 1]))
+        
+        print(f"Comparing result: {events}")
+        assert [e["data"] for e in events] == ["A", "B"]
+    
+    def test_preserves_multibyte_utf8_split_across_chunks(self, aws_event_parser):
+        """
+        What it does: Tests multibyte characters split between chunks.
+        Goal: Ensure no characters are lost (previously dropped by errors='ignore').
+        """
+        print("Setup: Frame with Cyrillic and emoji content...")
+        frame = encode_event_stream_frame(
+            "assistantResponseEvent",
+            json.dumps({"content": "Привет 🌍"}, ensure_ascii=False).encode("utf-8")
+        )
+        split_at = frame.index("🌍".encode("utf-8")) + 2
+        
+        print("Action: Feeding in two chunks splitting the emoji...")
+        events = aws_event_parser.feed(frame[:split_at])
+        events += aws_event_parser.feed(frame[split_at:])
+        
+        print(f"Comparing result: {events}")
+        assert events == [{"type": "content", "data": "Привет 🌍"}]
+    
+    def test_dispatches_usage_and_context_usage(self, aws_event_parser):
+        """
+        What it does: Tests metering and context usage frames.
+        Goal: Ensure both are mapped to usage/context_usage events.
+        """
+        print("Setup: Metering and context usage frames...")
+        data = (
+            encode_event_stream_frame("meteringEvent", {"usage": 0.5})
+            + encode_event_stream_frame("contextUsageEvent", {"contextUsagePercentage": 12.5})
+        )
+        
+        print("Action: Parsing frames...")
+        events = aws_event_parser.feed(data)
+        
+        print(f"Comparing result: {events}")
+        assert events == [
+            {"type": "usage", "data": 0.5},
+            {"type": "context_usage", "data": 12.5},
+        ]
+    
+    def test_skips_followup_prompt_frame(self, aws_event_parser):
+        """
+        What it does: Tests followupPromptEvent frames.
+        Goal: Ensure followup prompts don't produce content.
+        """
+        print("Setup: Followup prompt frame...")
+        frame = encode_event_stream_frame("followupPromptEvent", {"followupPrompt": {"content": "Next?"}})
+        
+        print("Action: Parsing frame...")
+        events = aws_event_parser.feed(frame)
+        
+        print(f"Comparing result: Expected [], Got {events}")
+        assert events == []
+    
+    def test_assembles_tool_use_frames(self, aws_event_parser):
+        """
+        What it does: Tests tool call spread over several toolUseEvent frames.
+        Goal: Ensure input fragments are concatenated and call is finalized on stop.
+        """
+        print("Setup: Tool use frames...")
+        data = b"".join([
+            encode_event_stream_frame("toolUseEvent", {"name": "get_weather", "toolUseId": "tooluse_1", "input": ""}),
+            encode_event_stream_frame("toolUseEvent", {"name": "get_weather", "toolUseId": "tooluse_1", "input": '{"city": '}),
+            encode_event_stream_frame("toolUseEvent", {"name": "get_weather", "toolUseId": "tooluse_1", "input": '"London"}'}),
+            encode_event_stream_frame("toolUseEvent", {"name": "get_weather", "toolUseId": "tooluse_1", "stop": True}),
+        ])
+        
+        print("Action: Parsing frames...")
+        aws_event_parser.feed(data)
+        tool_calls = aws_event_parser.get_tool_calls()
+        
+        print(f"Comparing result: {tool_calls}")
+        assert len(tool_calls) == 1
+        assert tool_calls[0]["id"] == "tooluse_1"
+        assert tool_calls[0]["function"]["name"] == "get_weather"
+        assert json.loads(tool_calls[0]["function"]["arguments"]) == {"city": "London"}
+    
+    def test_tool_use_frames_stream_incrementally(self, aws_event_parser):
+        """
+        What it does: Tests events returned for each toolUseEvent frame.
+        Goal: Ensure start, input fragments and stop are reported as they arrive.
+        """
+        print("Setup: Tool use frames...")
+        frames = [
+            encode_event_stream_frame("toolUseEvent", {"name": "write", "toolUseId": "t1", "input": '{"path": '}),
+            encode_event_stream_frame("toolUseEvent", {"name": "write", "toolUseId": "t1", "input": '"a.txt"}'}),
+            encode_event_stream_frame("toolUseEvent", {"name": "write", "toolUseId": "t1", "stop": True}),
+        ]
+        
+        print("Action: Parsing frames one by one...")
+        events = [aws_event_parser.feed(frame) for frame in frames]
+        
+        print(f"Comparing result: {events}")
+        assert events[0] == [{
+            "type": "tool_start",
+            "data": {"id": "t1", "name": "write", "input": '{"path": ', "stop": False}
+        }]
+        assert events[1] == [{"type": "tool_input", "data": {"id": "t1", "input": '"a.txt"}'}}]
+        assert events[2] == [{"type": "tool_stop", "data": {"id": "t1"}}]
+    
+    def test_exception_frame_produces_no_event(self, aws_event_parser):
+        """
+        What it does: Tests :message-type exception frames.
+        Goal: Ensure exceptions are logged, not emitted as content.
+        """
+        print("Setup: Exception frame...")
+        frame = encode_event_stream_frame(
+            "throttlingException", {"message": "slow down"}, message_type="exception"
+        )
+        
+        print("Action: Parsing frame...")
+        events = aws_event_parser.feed(frame)
+        
+        print(f"Comparing result: Expected [], Got {events}")
+        assert events == []
+    
+    def test_falls_back_to_text_on_crc_mismatch(self, aws_event_parser):
+        """
+        What it does: Tests a frame with corrupted message CRC.
+        Goal: Ensure parser falls back to text scanning instead of losing content.
+        """
+        print("Setup: Valid frame followed by corrupted frame...")
+        good = encode_event_stream_frame("assistantResponseEvent", {"content": "one"})
+        bad = bytearray(encode_event_stream_frame("assistantResponseEvent", {"content": "two"}))
+        bad[-1] ^= 0xFF
+        
+        print("Action: Parsing frames...")
+        events = aws_event_parser.feed(good + bytes(bad))
+        
+        print(f"Comparing result: {events}")
+        assert [e["data"] for e in events] == ["one", "two"]
+    
+    def test_reset_clears_binary_state(self, aws_event_parser):
+        """
+        What it does: Tests reset after a partial binary frame.
+        Goal: Ensure the next stream starts with a clean frame buffer.
+        """
+        print("Setup: Feeding half a frame...")
+        frame = encode_event_stream_frame("assistantResponseEvent", {"content": "x"})
+        aws_event_parser.feed(frame[:10])
+        
+        print("Action: Reset and feed a full frame...")
+        aws_event_parser.reset()
+        events = aws_event_parser.feed(frame)
+        
+        print(f"Comparing result: {events}")
+        assert events == [{"type": "content", "data": "x"}]
+
+
 class TestDiagnoseJsonTruncation:
     """
     Tests for _diagnose_json_truncation method for diagnosing truncated JSON.
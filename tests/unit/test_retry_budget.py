@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the process-wide retry budget and decorrelated jitter.
+"""
+
+import random
+
+from kiro.retry_budget import (
+    RetryBudget,
+    decorrelated_jitter,
+    get_retry_budget,
+)
+from kiro.services import services
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRetryBudget:
+    """Tests for RetryBudget token bucket."""
+
+    def test_retries_limited_to_ratio_of_requests(self):
+        """
+        What it does: Verifies an empty bucket allows one retry per 1/ratio requests.
+        Purpose: Keep retries near RETRY_BUDGET_RATIO of traffic during outages.
+        """
+        clock = FakeClock()
+        budget = RetryBudget(ratio=0.25, min_per_second=0.0, burst=2, clock=clock)
+
+        print("Action: Draining the initial burst...")
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is False
+
+        for _ in range(3):
+            budget.record_request()
+        assert budget.try_acquire() is False
+
+        budget.record_request()
+        assert budget.try_acquire() is True
+
+    def test_refills_over_time_up_to_burst(self):
+        """
+        What it does: Verifies the time-based refill and the burst cap.
+        Purpose: Let low-traffic gateways retry without unbounded saving.
+        """
+        clock = FakeClock()
+        budget = RetryBudget(ratio=0.0, min_per_second=1.0, burst=3, clock=clock)
+        for _ in range(3):
+            budget.try_acquire()
+        assert budget.try_acquire() is False
+
+        clock.now += 1.5
+        assert budget.try_acquire() is True
+        assert budget.try_acquire() is False
+
+        clock.now += 100
+        assert budget.tokens == 3
+
+    def test_disabled_budget_allows_every_retry(self):
+        """
+        What it does: Verifies RETRY_BUDGET_ENABLED=false restores unlimited retries.
+        Purpose: Allow opting out of the budget.
+        """
+        budget = RetryBudget(ratio=0.0, min_per_second=0.0, burst=1, enabled=False)
+
+        assert all(budget.try_acquire() for _ in range(10))
+
+    def test_global_budget_is_shared_until_reset(self):
+        """
+        What it does: Verifies get_retry_budget returns one shared instance.
+        Purpose: Ensure all requests draw from the same bucket.
+        """
+        first = get_retry_budget()
+        assert get_retry_budget() is first
+
+        services.reset()
+        assert get_retry_budget() is not first
+
+
+class TestDecorrelatedJitter:
+    """Tests for decorrelated_jitter."""
+
+    def test_delays_stay_within_bounds(self):
+        """
+        What it does: Verifies delays stay between base and 3x previous, capped.
+        Purpose: Spread retries without exceeding RETRY_MAX_DELAY.
+        """
+        rng = random.Random(42)
+        previous = 1.0
+        for _ in range(50):
+            delay = decorrelated_jitter(previous, base=1.0, cap=8.0, rng=rng)
+            assert 1.0 <= delay <= min(previous * 3, 8.0)
+            previous = delay
+
+    def test_delays_are_not_lock_step(self):
+        """
+        What it does: Verifies two clients with the same history pick different delays.
+        Purpose: Break up synchronized retry waves.
+        """
+        delays = {decorrelated_jitter(1.0, base=1.0, cap=8.0) for _ in range(20)}
+
+        assert len(delays) > 1
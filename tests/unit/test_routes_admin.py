@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for admin endpoints (routes_admin.py).
+
+Tests the following endpoints:
+- GET /admin/accounts - Account pool introspection
+"""
+
+import kiro.routes_admin as routes_admin
+
+
+ADMIN_KEY = "test-admin-key"
+
+
+class TestAdminAccountsEndpoint:
+    """Tests for the GET /admin/accounts endpoint."""
+
+    def test_disabled_without_admin_key(self, test_client, monkeypatch):
+        """
+        What it does: Verifies the endpoint is hidden when ADMIN_API_KEY is unset.
+        Purpose: Admin endpoints must be opt-in.
+        """
+        monkeypatch.setattr(routes_admin, "ADMIN_API_KEY", "")
+
+        print("Action: GET /admin/accounts with admin endpoints disabled...")
+        response = test_client.get("/admin/accounts", headers={"Authorization": "Bearer anything"})
+
+        print(f"Status: {response.status_code}")
+        assert response.status_code == 404
+
+    def test_rejects_client_api_key(self, test_client, monkeypatch, valid_proxy_api_key):
+        """
+        What it does: Verifies the regular proxy key does not grant admin access.
+        Purpose: Keep account details away from API clients.
+        """
+        monkeypatch.setattr(routes_admin, "ADMIN_API_KEY", ADMIN_KEY)
+
+        print("Action: GET /admin/accounts with the client API key...")
+        response = test_client.get(
+            "/admin/accounts",
+            headers={"Authorization": f"Bearer {valid_proxy_api_key}"},
+        )
+
+        print(f"Status: {response.status_code}")
+        assert response.status_code == 401
+
+    def test_returns_pool_state(self, test_client, monkeypatch):
+        """
+        What it does: Verifies the endpoint returns totals and per-account rows.
+        Purpose: Ensure dashboards can poll the pool state.
+        """
+        monkeypatch.setattr(routes_admin, "ADMIN_API_KEY", ADMIN_KEY)
+        rows = [
+            {"key": "acct-a", "in_flight": 2, "quarantined": False, "recent_429": 1},
+            {"key": "acct-b", "in_flight": 0, "quarantined": True, "recent_429": 4},
+        ]
+        monkeypatch.setattr(
+            test_client.app.state.auth_manager, "account_snapshot", lambda: rows
+        )
+
+        print("Action: GET /admin/accounts with the admin key...")
+        response = test_client.get("/admin/accounts", headers={"Authorization": f"Bearer {ADMIN_KEY}"})
+
+        print(f"Response: {response.json()}")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 2
+        assert body["quarantined"] == 1
+        assert body["in_flight"] == 2
+        assert body["accounts"] == rows
+        assert "status_window_seconds" in body
@@ -10,6 +10,7 @@ Tests the following endpoint:
 For OpenAI API tests, see test_routes_openai.py.
 """
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from datetime import datetime, timezone
@@ -20,7 +21,10 @@ from fastapi.testclient import TestClient
 
 import kiro.routes_anthropic as routes_anthropic
 from kiro.routes_anthropic import verify_anthropic_api_key, router
+from kiro.auth import KiroAuthManager
 from kiro.config import PROXY_API_KEY
+from kiro.hedging import HedgePolicy
+from kiro.tokenizer import count_message_tokens
 
 
 # =============================================================================
@@ -758,7 +762,7 @@ class TestMessagesOptionalParams:
         mock_response = MagicMock()
         mock_response.status_code = 200
         
-        with patch('kiro.routes_anthropic.stream_kiro_to_anthropic', mock_stream), \
+        with patch('kiro.streaming_anthropic.stream_kiro_to_anthropic', mock_stream), \
              patch('kiro.http_client.KiroHttpClient.request_with_retry', return_value=mock_response):
             response = test_client.post(
                 "/v1/messages",
@@ -866,6 +870,121 @@ class TestMessagesAnthropicVersion:
         assert response.status_code != 422
 
 
+# =============================================================================
+# Tests for /v1/messages/count_tokens endpoint
+# =============================================================================
+
+class TestCountTokens:
+    """Tests for the local token counting endpoint."""
+    
+    def _count(self, test_client, api_key, **body):
+        body.setdefault("model", "claude-sonnet-4-5")
+        body.setdefault("messages", [{"role": "user", "content": "Hello"}])
+        with patch("kiro.routes_anthropic.KiroHttpClient") as http_client_class:
+            response = test_client.post(
+                "/v1/messages/count_tokens",
+                headers={"x-api-key": api_key},
+                json=body
+            )
+        assert not http_client_class.called
+        return response
+    
+    def test_count_tokens_requires_authentication(self, test_client):
+        """
+        What it does: Verifies count_tokens requires authentication.
+        Purpose: Ensure the endpoint is protected like /v1/messages.
+        """
+        response = test_client.post(
+            "/v1/messages/count_tokens",
+            json={"model": "claude-sonnet-4-5", "messages": [{"role": "user", "content": "Hello"}]}
+        )
+        
+        assert response.status_code == 401
+    
+    def test_returns_input_tokens_without_upstream_call(self, test_client, valid_proxy_api_key):
+        """
+        What it does: Verifies the endpoint answers locally with input_tokens.
+        Purpose: Anthropic SDK clients get a count without a Kiro request (max_tokens is not required).
+        """
+        response = self._count(test_client, valid_proxy_api_key)
+        
+        print(f"Response: {response.json()}")
+        assert response.status_code == 200
+        assert set(response.json()) == {"input_tokens"}
+        assert response.json()["input_tokens"] > 0
+    
+    def test_counts_system_tools_and_tool_blocks(self, test_client, valid_proxy_api_key):
+        """
+        What it does: Verifies system prompt, tool definitions, tool_use and tool_result blocks add tokens.
+        Purpose: Agent turns consist mostly of tool traffic; none of it may be dropped.
+        """
+        base = self._count(test_client, valid_proxy_api_key).json()["input_tokens"]
+        with_system = self._count(
+            test_client, valid_proxy_api_key,
+            system=[{"type": "text", "text": "You are a meticulous code reviewer. " * 20}]
+        ).json()["input_tokens"]
+        with_tools = self._count(
+            test_client, valid_proxy_api_key,
+            tools=[{
+                "name": "read_file",
+                "description": "Read a file from the workspace and return its contents",
+                "input_schema": {"type": "object", "properties": {"path": {"type": "string"}}}
+            }]
+        ).json()["input_tokens"]
+        with_tool_turn = self._count(
+            test_client, valid_proxy_api_key,
+            messages=[
+                {"role": "user", "content": "Hello"},
+                {"role": "assistant", "content": [
+                    {"type": "tool_use", "id": "toolu_1", "name": "read_file", "input": {"path": "main.py"}}
+                ]},
+                {"role": "user", "content": [
+                    {"type": "tool_result", "tool_use_id": "toolu_1", "content": "import os\n" * 50}
+                ]}
+            ]
+        ).json()["input_tokens"]
+        
+        print(f"Base: {base}, system: {with_system}, tools: {with_tools}, tool turn: {with_tool_turn}")
+        assert with_system > base + 100
+        assert with_tools > base
+        assert with_tool_turn > base + 100
+    
+    def test_calibrated_model_uses_fitted_factor(self, test_client, valid_proxy_api_key):
+        """
+        What it does: Verifies a calibrated model's count uses the same fitted factor as the /v1/messages preflight.
+        Purpose: count_tokens must agree with what the gateway estimates and bills.
+        """
+        from kiro.token_calibration import PromptEstimate, get_token_calibrator
+
+        key = ("anthropic", "claude-sonnet-4-5")
+        calibrator = get_token_calibrator()
+        for index in range(calibrator._min_samples):
+            estimated = 10_000 + index * 1000
+            calibrator.observe(key, PromptEstimate(estimated, 0, estimated, estimated * 4, "static"), int(estimated * 1.4))
+        text = "Summarize the following text. " * 40
+
+        calibrated = self._count(
+            test_client, valid_proxy_api_key, messages=[{"role": "user", "content": text}]
+        ).json()["input_tokens"]
+
+        raw = count_message_tokens([{"role": "user", "content": text}], apply_claude_correction=False)
+        print(f"Calibrated: {calibrated}, raw: {raw}")
+        assert calibrated == int(raw * calibrator.factor(key))
+
+    def test_rejects_empty_messages(self, test_client, valid_proxy_api_key):
+        """
+        What it does: Verifies an empty messages list fails validation.
+        Purpose: Match the /v1/messages request contract.
+        """
+        response = test_client.post(
+            "/v1/messages/count_tokens",
+            headers={"x-api-key": valid_proxy_api_key},
+            json={"model": "claude-sonnet-4-5", "messages": []}
+        )
+        
+        assert response.status_code == 422
+
+
 # =============================================================================
 # Tests for router integration
 # =============================================================================
@@ -1024,23 +1143,23 @@ class TestAnthropicHTTPClientSelection:
     """
     Tests for HTTP client selection in Anthropic routes (issue #54).
     
-    Verifies that streaming requests use per-request clients to avoid CLOSE_WAIT leak
-    when network interface changes (VPN disconnect/reconnect), while non-streaming
-    requests use shared client for connection pooling.
+    Verifies that streaming requests borrow from the streaming connection pool
+    (which recycles stale connections to avoid CLOSE_WAIT leaks when the network
+    interface changes), while non-streaming requests use the shared client.
     """
     
     @patch('kiro.routes_anthropic.KiroHttpClient')
-    def test_streaming_uses_per_request_client(
+    def test_streaming_uses_streaming_pool(
         self,
         mock_kiro_http_client_class,
         test_client,
         valid_proxy_api_key
     ):
         """
-        What it does: Verifies streaming requests create per-request HTTP client.
-        Purpose: Prevent CLOSE_WAIT leak on VPN disconnect (issue #54).
+        What it does: Verifies streaming requests use the streaming connection pool.
+        Purpose: Reuse connections without CLOSE_WAIT leak on VPN disconnect (issue #54).
         """
-        print("\n--- Test: Anthropic streaming uses per-request client ---")
+        print("\n--- Test: Anthropic streaming uses streaming pool ---")
         
         # Setup mock
         mock_client_instance = AsyncMock()
@@ -1065,13 +1184,15 @@ class TestAnthropicHTTPClientSelection:
         except Exception:
             pass
         
-        print("Checking: KiroHttpClient(shared_client=None)...")
+        print("Checking: KiroHttpClient(shared_client=None, streaming_pool=app pool)...")
         assert mock_kiro_http_client_class.called
         call_args = mock_kiro_http_client_class.call_args
         print(f"Call args: {call_args}")
         assert call_args[1]['shared_client'] is None, \
-            "Streaming should use per-request client"
-        print("✅ Anthropic streaming correctly uses per-request client")
+            "Streaming should not use the non-streaming shared client"
+        assert call_args[1]['streaming_pool'] is test_client.app.state.streaming_client_pool, \
+            "Streaming should use the streaming connection pool"
+        print("✅ Anthropic streaming correctly uses streaming pool")
     
     @patch('kiro.routes_anthropic.KiroHttpClient')
     def test_non_streaming_uses_shared_client(
@@ -1118,6 +1239,93 @@ class TestAnthropicHTTPClientSelection:
         print("✅ Anthropic non-streaming correctly uses shared client")
 
 
+# =============================================================================
+# Tests for hedged first-token requests
+# =============================================================================
+
+class _FakeKiroStream:
+    """Streaming response whose first chunk arrives after first_delay seconds."""
+    
+    def __init__(self, chunks, first_delay=0.0):
+        self.status_code = 200
+        self.extensions = {}
+        self._chunks = chunks
+        self._first_delay = first_delay
+        self.aclose = AsyncMock()
+    
+    async def aiter_bytes(self):
+        await asyncio.sleep(self._first_delay)
+        for chunk in self._chunks:
+            yield chunk
+
+
+class TestMessagesHedging:
+    """
+    Tests for hedging on the streaming /v1/messages path.
+    
+    The endpoint streams through the first-token retry wrapper, so a late
+    first token fires a hedge request on another account.
+    """
+    
+    def test_late_first_token_fires_hedge_on_another_account(
+        self,
+        test_client,
+        valid_proxy_api_key,
+        temp_sqlite_db_round_robin,
+        monkeypatch
+    ):
+        """
+        What it does: Verifies a slow primary stream is hedged on the second account and the hedge is streamed.
+        Purpose: Ensure the endpoint is wired to hedged first-token requests.
+        """
+        print("Setup: Two accounts, slow primary stream, fast hedge...")
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin)
+        monkeypatch.setattr(test_client.app.state, "auth_manager", manager)
+        
+        policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.0)
+        policy.record_ttft(0.05)
+        monkeypatch.setattr(routes_anthropic, "get_hedge_policy", lambda: policy)
+        
+        primary = _FakeKiroStream([b'{"content":"slow"}'], first_delay=5.0)
+        hedge = _FakeKiroStream([b'{"content":"Hello from hedge"}'])
+        responses = [primary, hedge]
+        sent_tokens = []
+        
+        fake_client = Mock(is_closed=False)
+        fake_client.build_request = Mock(side_effect=lambda method, url, json, headers: headers)
+        
+        async def send(headers, stream=False):
+            sent_tokens.append(headers["Authorization"])
+            return responses.pop(0)
+        
+        fake_client.send = send
+        
+        async def get_client(self, stream=False):
+            self.client = fake_client
+            return fake_client
+        
+        monkeypatch.setattr("kiro.http_client.KiroHttpClient._get_client", get_client)
+        
+        print("Action: POST /v1/messages with stream=true...")
+        response = test_client.post(
+            "/v1/messages",
+            headers={"x-api-key": valid_proxy_api_key},
+            json={
+                "model": "claude-sonnet-4-5",
+                "max_tokens": 1024,
+                "messages": [{"role": "user", "content": "Hello"}],
+                "stream": True
+            }
+        )
+        
+        print(f"Sent with tokens: {sent_tokens}")
+        assert response.status_code == 200
+        assert sent_tokens == ["Bearer social_access_a", "Bearer social_access_b"]
+        assert "Hello from hedge" in response.text
+        assert "slow" not in response.text
+        primary.aclose.assert_awaited()
+
+
 # =============================================================================
 # Tests for Truncation Recovery message modification (Issue #56)
 # =============================================================================
@@ -1787,7 +1995,7 @@ class TestAnthropicBillingObservabilityLogging:
 
         with patch("kiro.routes_anthropic.KiroHttpClient", return_value=mock_http_client), \
              patch("kiro.routes_anthropic.anthropic_to_kiro", return_value={"model": "claude-sonnet-4.5"}), \
-             patch("kiro.routes_anthropic.stream_kiro_to_anthropic", mock_stream), \
+             patch("kiro.streaming_anthropic.stream_kiro_to_anthropic", mock_stream), \
              patch("kiro.routes_anthropic.logger.info", mocked_info):
             response = test_client.post(
                 "/v1/messages",
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the Prometheus scrape endpoint (routes_metrics.py).
+
+Tests the following endpoints:
+- GET /metrics - Prometheus text exposition
+"""
+
+import kiro.routes_metrics as routes_metrics
+from kiro.metrics import account_metrics_label
+
+
+METRICS_KEY = "test-metrics-key"
+ADMIN_KEY = "test-admin-key"
+
+
+class TestMetricsEndpoint:
+    """Tests for the GET /metrics endpoint."""
+
+    def test_disabled_without_keys(self, test_client, monkeypatch):
+        """
+        What it does: Verifies /metrics is hidden when no scrape or admin key is set.
+        Purpose: Metrics exposure must be opt-in.
+        """
+        monkeypatch.setattr(routes_metrics, "METRICS_API_KEY", "")
+        monkeypatch.setattr(routes_metrics, "ADMIN_API_KEY", "")
+
+        print("Action: GET /metrics with metrics disabled...")
+        response = test_client.get("/metrics", headers={"Authorization": "Bearer anything"})
+
+        print(f"Status: {response.status_code}")
+        assert response.status_code == 404
+
+    def test_rejects_client_api_key(self, test_client, monkeypatch, valid_proxy_api_key):
+        """
+        What it does: Verifies the regular proxy key does not grant scrape access.
+        Purpose: Keep pool state away from API clients.
+        """
+        monkeypatch.setattr(routes_metrics, "METRICS_API_KEY", METRICS_KEY)
+
+        print("Action: GET /metrics with the client API key...")
+        response = test_client.get("/metrics", headers={"Authorization": f"Bearer {valid_proxy_api_key}"})
+
+        print(f"Status: {response.status_code}")
+        assert response.status_code == 401
+
+    def test_falls_back_to_admin_key(self, test_client, monkeypatch):
+        """
+        What it does: Verifies the admin key is accepted when no scrape key is set.
+        Purpose: One key is enough for small deployments.
+        """
+        monkeypatch.setattr(routes_metrics, "METRICS_API_KEY", "")
+        monkeypatch.setattr(routes_metrics, "ADMIN_API_KEY", ADMIN_KEY)
+
+        print("Action: GET /metrics with the admin key...")
+        response = test_client.get("/metrics", headers={"Authorization": f"Bearer {ADMIN_KEY}"})
+
+        print(f"Status: {response.status_code}")
+        assert response.status_code == 200
+
+    def test_returns_prometheus_text_with_opaque_account_labels(self, test_client, monkeypatch):
+        """
+        What it does: Verifies /metrics serves the exposition format with hashed account labels.
+        Purpose: Prometheus can scrape the gateway without learning account keys.
+        """
+        monkeypatch.setattr(routes_metrics, "METRICS_API_KEY", METRICS_KEY)
+        rows = [{"key": "/secret/path/creds.json", "in_flight": 2, "quarantined": False}]
+        monkeypatch.setattr(test_client.app.state.auth_manager, "account_snapshot", lambda: rows)
+
+        print("Action: GET /metrics with the scrape key...")
+        response = test_client.get("/metrics", headers={"Authorization": f"Bearer {METRICS_KEY}"})
+
+        print(f"Status: {response.status_code}")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE kiro_stream_duration_seconds histogram" in response.text
+        label = account_metrics_label("/secret/path/creds.json")
+        assert f'kiro_account_in_flight{{account="{label}"}} 2' in response.text
+        assert "/secret/path/creds.json" not in response.text
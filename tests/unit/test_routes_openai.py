@@ -13,9 +13,11 @@ Tests the following endpoints:
 For Anthropic API tests, see test_routes_anthropic.py.
 """
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from datetime import datetime, timezone
+from decimal import Decimal
 import json
 
 from fastapi import HTTPException
@@ -23,7 +25,10 @@ from fastapi.testclient import TestClient
 
 import kiro.routes_openai as routes_openai
 from kiro.routes_openai import verify_api_key, router
+from kiro.auth import KiroAuthManager
 from kiro.config import PROXY_API_KEY, APP_VERSION
+from kiro.hedging import HedgePolicy
+from kiro.streaming_core import StreamStallError
 
 
 # =============================================================================
@@ -438,7 +443,25 @@ class TestChatCompletionsAuthentication:
         
         print(f"Status: {response.status_code}")
         assert response.status_code == 401
-    
+
+    def test_chat_completions_reports_auth_server_timing(self, test_client):
+        """
+        What it does: Verifies even rejected requests carry a Server-Timing header.
+        Purpose: API-key auth latency must be visible to clients.
+        """
+        print("Action: POST /v1/chat/completions without auth...")
+        response = test_client.post(
+            "/v1/chat/completions",
+            json={
+                "model": "claude-sonnet-4-5",
+                "messages": [{"role": "user", "content": "Hello"}]
+            }
+        )
+
+        print(f"Server-Timing: {response.headers.get('server-timing')}")
+        assert response.status_code == 401
+        assert response.headers["server-timing"].startswith("auth;dur=")
+
     def test_chat_completions_rejects_invalid_key(self, test_client, invalid_proxy_api_key):
         """
         What it does: Verifies chat completions rejects invalid API key.
@@ -921,23 +944,23 @@ class TestHTTPClientSelection:
     """
     Tests for HTTP client selection in routes (issue #54).
     
-    Verifies that streaming requests use per-request clients to avoid CLOSE_WAIT leak
-    when network interface changes (VPN disconnect/reconnect), while non-streaming
-    requests use shared client for connection pooling.
+    Verifies that streaming requests borrow from the streaming connection pool
+    (which recycles stale connections to avoid CLOSE_WAIT leaks when the network
+    interface changes), while non-streaming requests use the shared client.
     """
     
     @patch('kiro.routes_openai.KiroHttpClient')
-    def test_streaming_uses_per_request_client(
+    def test_streaming_uses_streaming_pool(
         self,
         mock_kiro_http_client_class,
         test_client,
         valid_proxy_api_key
     ):
         """
-        What it does: Verifies streaming requests create per-request HTTP client.
-        Purpose: Prevent CLOSE_WAIT leak on VPN disconnect (issue #54).
+        What it does: Verifies streaming requests use the streaming connection pool.
+        Purpose: Reuse connections without CLOSE_WAIT leak on VPN disconnect (issue #54).
         """
-        print("\n--- Test: Streaming uses per-request client ---")
+        print("\n--- Test: Streaming uses streaming pool ---")
         
         # Setup mock
         mock_client_instance = AsyncMock()
@@ -961,13 +984,15 @@ class TestHTTPClientSelection:
         except Exception:
             pass
         
-        print("Checking: KiroHttpClient(shared_client=None)...")
+        print("Checking: KiroHttpClient(shared_client=None, streaming_pool=app pool)...")
         assert mock_kiro_http_client_class.called
         call_args = mock_kiro_http_client_class.call_args
         print(f"Call args: {call_args}")
         assert call_args[1]['shared_client'] is None, \
-            "Streaming should use per-request client"
-        print("✅ Streaming correctly uses per-request client")
+            "Streaming should not use the non-streaming shared client"
+        assert call_args[1]['streaming_pool'] is test_client.app.state.streaming_client_pool, \
+            "Streaming should use the streaming connection pool"
+        print("✅ Streaming correctly uses streaming pool")
     
     @patch('kiro.routes_openai.KiroHttpClient')
     def test_non_streaming_uses_shared_client(
@@ -1013,6 +1038,92 @@ class TestHTTPClientSelection:
         print("✅ Non-streaming correctly uses shared client")
 
 
+# =============================================================================
+# Tests for hedged first-token requests
+# =============================================================================
+
+class _FakeKiroStream:
+    """Streaming response whose first chunk arrives after first_delay seconds."""
+    
+    def __init__(self, chunks, first_delay=0.0):
+        self.status_code = 200
+        self.extensions = {}
+        self._chunks = chunks
+        self._first_delay = first_delay
+        self.aclose = AsyncMock()
+    
+    async def aiter_bytes(self):
+        await asyncio.sleep(self._first_delay)
+        for chunk in self._chunks:
+            yield chunk
+
+
+class TestChatCompletionsHedging:
+    """
+    Tests for hedging on the streaming /v1/chat/completions path.
+    
+    The endpoint streams through the first-token retry wrapper, so a late
+    first token fires a hedge request on another account.
+    """
+    
+    def test_late_first_token_fires_hedge_on_another_account(
+        self,
+        test_client,
+        valid_proxy_api_key,
+        temp_sqlite_db_round_robin,
+        monkeypatch
+    ):
+        """
+        What it does: Verifies a slow primary stream is hedged on the second account and the hedge is streamed.
+        Purpose: Ensure the endpoint is wired to hedged first-token requests.
+        """
+        print("Setup: Two accounts, slow primary stream, fast hedge...")
+        manager = KiroAuthManager(sqlite_db=temp_sqlite_db_round_robin)
+        monkeypatch.setattr(test_client.app.state, "auth_manager", manager)
+        
+        policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.0)
+        policy.record_ttft(0.05)
+        monkeypatch.setattr(routes_openai, "get_hedge_policy", lambda: policy)
+        
+        primary = _FakeKiroStream([b'{"content":"slow"}'], first_delay=5.0)
+        hedge = _FakeKiroStream([b'{"content":"Hello from hedge"}'])
+        responses = [primary, hedge]
+        sent_tokens = []
+        
+        fake_client = Mock(is_closed=False)
+        fake_client.build_request = Mock(side_effect=lambda method, url, json, headers: headers)
+        
+        async def send(headers, stream=False):
+            sent_tokens.append(headers["Authorization"])
+            return responses.pop(0)
+        
+        fake_client.send = send
+        
+        async def get_client(self, stream=False):
+            self.client = fake_client
+            return fake_client
+        
+        monkeypatch.setattr("kiro.http_client.KiroHttpClient._get_client", get_client)
+        
+        print("Action: POST /v1/chat/completions with stream=true...")
+        response = test_client.post(
+            "/v1/chat/completions",
+            headers={"Authorization": f"Bearer {valid_proxy_api_key}"},
+            json={
+                "model": "claude-sonnet-4-5",
+                "messages": [{"role": "user", "content": "Hello"}],
+                "stream": True
+            }
+        )
+        
+        print(f"Sent with tokens: {sent_tokens}")
+        assert response.status_code == 200
+        assert sent_tokens == ["Bearer social_access_a", "Bearer social_access_b"]
+        assert "Hello from hedge" in response.text
+        assert "slow" not in response.text
+        primary.aclose.assert_awaited()
+
+
 # =============================================================================
 # Tests for Truncation Recovery message modification (Issue #56)
 # =============================================================================
@@ -1551,6 +1662,63 @@ class TestOpenAIBillingObservabilityLogging:
         assert payload["response"]["cache_hit"] is True
         assert payload["response"]["cache_write"] == 7
 
+    def test_non_streaming_charge_is_keyed_by_request_id(self, test_client, monkeypatch):
+        """What it does: Verifies the usage charge carries the request ID stored on request.state.
+
+        Purpose: Ensure the ledger can apply each request's charge at most once.
+        """
+        mock_http_response = MagicMock()
+        mock_http_response.status_code = 200
+
+        mock_http_client = MagicMock()
+        mock_http_client.request_with_retry = AsyncMock(return_value=mock_http_response)
+        mock_http_client.close = AsyncMock()
+        mock_http_client.client = Mock()
+
+        mocked_deduct = AsyncMock(return_value=Decimal("0.1"))
+
+        monkeypatch.setattr(routes_openai, "API_KEY_SOURCE", "mongodb")
+        monkeypatch.setattr(
+            routes_openai,
+            "find_active_user_by_api_key",
+            lambda _: {"_id": "user-123", "username": "alice"},
+        )
+        monkeypatch.setattr(routes_openai, "get_user_id_from_doc", lambda _: "user-123")
+        monkeypatch.setattr(routes_openai, "BILLING_ENABLED", True)
+        monkeypatch.setattr(routes_openai, "calculate_preflight_charge", lambda *_args, **_kwargs: Decimal("0"))
+        monkeypatch.setattr(routes_openai, "ensure_user_has_sufficient_credits", AsyncMock(return_value=None))
+        monkeypatch.setattr(routes_openai, "deduct_credits_for_usage", mocked_deduct)
+
+        with patch("kiro.routes_openai.KiroHttpClient", return_value=mock_http_client), \
+             patch("kiro.routes_openai.build_kiro_payload", return_value={"model": "claude-sonnet-4.5"}), \
+             patch(
+                 "kiro.routes_openai.collect_stream_response",
+                 AsyncMock(
+                     return_value={
+                         "id": "chatcmpl-1",
+                         "object": "chat.completion",
+                         "model": "claude-sonnet-4.5",
+                         "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+                         "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+                     }
+                 ),
+             ):
+            response = test_client.post(
+                "/v1/chat/completions",
+                headers={"Authorization": "Bearer user-key"},
+                json={
+                    "model": "claude-sonnet-4-5",
+                    "messages": [{"role": "user", "content": "Hello"}],
+                },
+            )
+
+        assert response.status_code == 200
+        mocked_deduct.assert_awaited_once()
+        request_id = mocked_deduct.await_args.kwargs["request_id"]
+        print(f"Request ID: {request_id}")
+        assert len(request_id) == 32
+        int(request_id, 16)
+
     def test_streaming_logs_observability_when_usage_arrives(self, test_client, monkeypatch):
         """What it does: Verifies streaming route emits billing observability log.
 
@@ -1584,7 +1752,7 @@ class TestOpenAIBillingObservabilityLogging:
 
         with patch("kiro.routes_openai.KiroHttpClient", return_value=mock_http_client), \
              patch("kiro.routes_openai.build_kiro_payload", return_value={"model": "claude-sonnet-4.5"}), \
-             patch("kiro.routes_openai.stream_kiro_to_openai", mock_stream), \
+             patch("kiro.streaming_openai.stream_kiro_to_openai_internal", mock_stream), \
              patch("kiro.routes_openai.logger.info", mocked_info):
             response = test_client.post(
                 "/v1/chat/completions",
@@ -1685,7 +1853,7 @@ class TestOpenAIBillingObservabilityLogging:
 
         with patch("kiro.routes_openai.KiroHttpClient", return_value=mock_http_client), \
              patch("kiro.routes_openai.build_kiro_payload", return_value={"model": "claude-sonnet-4.5"}), \
-             patch("kiro.routes_openai.stream_kiro_to_openai", mock_stream), \
+             patch("kiro.streaming_openai.stream_kiro_to_openai_internal", mock_stream), \
              patch("kiro.routes_openai.logger.info", mocked_info):
             response = test_client.post(
                 "/v1/chat/completions",
@@ -1708,3 +1876,53 @@ class TestOpenAIBillingObservabilityLogging:
         assert payload["response"]["usage"] is None
         assert payload["response"]["cache_hit"] is None
         assert payload["response"]["cache_write"] is None
+
+    def test_streaming_stall_ends_with_structured_error_without_billing(self, test_client, valid_proxy_api_key, monkeypatch):
+        """What it does: Verifies a mid-stream upstream stall ends with a structured 504 error.
+
+        Purpose: Ensure hung streams are aborted cleanly and never deduct credits.
+        """
+        mock_http_response = MagicMock()
+        mock_http_response.status_code = 200
+
+        mock_http_client = MagicMock()
+        mock_http_client.request_with_retry = AsyncMock(return_value=mock_http_response)
+        mock_http_client.close = AsyncMock()
+        mock_http_client.client = Mock()
+
+        mocked_info = Mock()
+        mocked_deduct = Mock()
+
+        async def mock_stream(_stream_client, _response, _model, _model_cache, _auth_manager, **_kwargs):
+            yield 'data: {"choices": [{"index": 0, "delta": {"content": "hi"}}]}\n\n'
+            yield ": keep-alive\n\n"
+            raise StreamStallError(120.0)
+
+        monkeypatch.setattr(routes_openai, "API_KEY_SOURCE", "env")
+        monkeypatch.setattr(routes_openai, "BILLING_ENABLED", True)
+        monkeypatch.setattr(routes_openai, "deduct_credits_for_usage", mocked_deduct)
+
+        with patch("kiro.routes_openai.KiroHttpClient", return_value=mock_http_client), \
+             patch("kiro.routes_openai.build_kiro_payload", return_value={"model": "claude-sonnet-4.5"}), \
+             patch("kiro.streaming_openai.stream_kiro_to_openai_internal", mock_stream), \
+             patch("kiro.routes_openai.logger.info", mocked_info):
+            response = test_client.post(
+                "/v1/chat/completions",
+                headers={"Authorization": f"Bearer {valid_proxy_api_key}"},
+                json={
+                    "model": "claude-sonnet-4-5",
+                    "messages": [{"role": "user", "content": "Hello"}],
+                    "stream": True,
+                },
+            )
+
+        print(f"Comparing body: {response.text}")
+        assert response.status_code == 200
+        assert '"type": "upstream_stall"' in response.text
+        assert "data: [DONE]\n\n: server-timing " in response.text
+        mocked_deduct.assert_not_called()
+
+        observability_calls = [
+            call for call in mocked_info.call_args_list if call.args and call.args[0] == "billing_observability={}"
+        ]
+        assert observability_calls[-1].args[1]["status"] == "streaming_stalled"
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the per-request Server-Timing breakdown.
+"""
+
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from kiro.server_timing import ServerTiming, ServerTimingMiddleware, get_server_timing
+
+
+class TestServerTiming:
+    """Tests for ServerTiming phase recording and rendering."""
+
+    def test_header_value_lists_phases_in_order_in_ms(self):
+        """
+        What it does: Verifies phases render in recording order, in milliseconds.
+        Purpose: Server-Timing durations are milliseconds by spec.
+        """
+        timing = ServerTiming()
+        timing.record("auth", 0.0012)
+        timing.record("convert", 0.25)
+
+        print(f"Header: {timing.header_value()}")
+        assert timing.header_value() == "auth;dur=1.20, convert;dur=250.00"
+
+    def test_phase_records_even_when_block_raises(self):
+        """
+        What it does: Verifies phase() records the duration of a failing block.
+        Purpose: A slow phase that ends in an error must still be visible.
+        """
+        timing = ServerTiming()
+        with pytest.raises(ValueError):
+            with timing.phase("billing"):
+                raise ValueError("insufficient credits")
+
+        assert timing.get("billing") is not None
+
+    def test_observer_records_and_forwards(self):
+        """
+        What it does: Verifies observer() records the value and calls the next callback.
+        Purpose: First-byte waits feed both Server-Timing and the adaptive timeout.
+        """
+        forwarded = []
+        timing = ServerTiming()
+        observe = timing.observer("upstream_first_byte", forwarded.append)
+
+        observe(1.5)
+        observe(0.5)
+
+        assert timing.get("upstream_first_byte") == 0.5
+        assert forwarded == [1.5, 0.5]
+
+    def test_sse_comment_is_a_comment_line(self):
+        """
+        What it does: Verifies the trailing SSE form is a comment event.
+        Purpose: SSE parsers must ignore it.
+        """
+        timing = ServerTiming()
+        timing.record("stream", 2.0)
+
+        assert timing.sse_comment() == ": server-timing stream;dur=2000.00\n\n"
+
+
+class TestServerTimingMiddleware:
+    """Tests for ServerTimingMiddleware."""
+
+    @staticmethod
+    def _make_client() -> TestClient:
+        async def handler(request: Request) -> PlainTextResponse:
+            get_server_timing(request).record("convert", 0.001)
+            return PlainTextResponse("ok")
+
+        app = Starlette(routes=[
+            Route("/v1/messages", handler, methods=["POST"]),
+            Route("/health", handler),
+        ])
+        app.add_middleware(ServerTimingMiddleware)
+        return TestClient(app)
+
+    def test_timed_endpoint_gets_header(self):
+        """
+        What it does: Verifies recorded phases reach the Server-Timing header.
+        Purpose: Clients can see where gateway latency is spent.
+        """
+        response = self._make_client().post("/v1/messages")
+
+        print(f"Server-Timing: {response.headers.get('server-timing')}")
+        assert response.headers["server-timing"] == "convert;dur=1.00"
+
+    def test_other_endpoints_are_untouched(self):
+        """
+        What it does: Verifies paths outside TIMED_ENDPOINTS get no header.
+        Purpose: Keep health checks and metrics free of per-request work.
+        """
+        response = self._make_client().get("/health")
+
+        assert "server-timing" not in response.headers
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for the process-wide service registry.
+Tests lazy creation, sharing and reset of registered services.
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from kiro.services import ServiceRegistry
+
+
+class TestServiceRegistry:
+    """Tests for ServiceRegistry."""
+
+    def test_service_is_created_once_and_shared(self):
+        """
+        What it does: Verifies a service is built on first use and then reused.
+        Purpose: Ensure all callers share one instance.
+        """
+        registry = ServiceRegistry()
+        factory = Mock(side_effect=object)
+        registry.register("budget", factory)
+
+        print("Checking: No instance before first use...")
+        factory.assert_not_called()
+
+        first = registry.get("budget")
+        assert registry.get("budget") is first
+        factory.assert_called_once()
+
+    def test_reset_discards_and_recreates(self):
+        """
+        What it does: Verifies reset() runs the discard callback and the next get() builds a new instance.
+        Purpose: Shutdown and test isolation must stop background work and start fresh.
+        """
+        registry = ServiceRegistry()
+        discard = Mock()
+        registry.register("ledger", object, discard=discard)
+        first = registry.get("ledger")
+
+        print("Action: reset()...")
+        registry.reset()
+
+        discard.assert_called_once_with(first)
+        assert registry.get("ledger") is not first
+
+    def test_reset_skips_services_never_used(self):
+        """
+        What it does: Verifies reset() does not build or discard unused services.
+        Purpose: Resetting must not create services only to drop them.
+        """
+        registry = ServiceRegistry()
+        factory = Mock()
+        discard = Mock()
+        registry.register("cache", factory, discard=discard)
+
+        registry.reset()
+
+        factory.assert_not_called()
+        discard.assert_not_called()
+
+    def test_duplicate_name_is_rejected(self):
+        """
+        What it does: Verifies a name can only be registered once.
+        Purpose: Catch two modules claiming the same service.
+        """
+        registry = ServiceRegistry()
+        registry.register("policy", object)
+
+        with pytest.raises(ValueError, match="already registered"):
+            registry.register("policy", object)
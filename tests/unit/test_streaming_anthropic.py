@@ -24,7 +24,7 @@ from kiro.streaming_anthropic import (
     collect_anthropic_response,
     stream_with_first_token_retry_anthropic,
 )
-from kiro.streaming_core import KiroEvent, StreamResult
+from kiro.streaming_core import KiroEvent, StreamResult, StreamStallError
 
 
 # ==================================================================================================
@@ -472,6 +472,131 @@ class TestStreamKiroToAnthropic:
         assert len(tool_use_events) >= 1
         print("✓ Bracket tool calls handled correctly")
     
+    @pytest.mark.asyncio
+    async def test_streams_tool_input_incrementally(self, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Forwards tool_use_start/tool_use_delta events as they arrive.
+        Goal: Verify one tool_use block with input_json_delta per fragment and no end-of-stream duplicate.
+        """
+        print("Setup: Mock stream with incremental tool events...")
+        
+        async def mock_parse_kiro_stream(*args, **kwargs):
+            yield KiroEvent(type="content", content="Writing file")
+            yield KiroEvent(type="tool_use_start", tool_use={"id": "toolu_1", "name": "write"})
+            yield KiroEvent(type="tool_use_delta", tool_use={"id": "toolu_1", "arguments": '{"path": '})
+            yield KiroEvent(type="tool_use_delta", tool_use={"id": "toolu_1", "arguments": '"a.txt"}'})
+            yield KiroEvent(type="tool_use_stop", tool_use={"id": "toolu_1"})
+            yield KiroEvent(type="tool_use", tool_use={
+                "id": "toolu_1",
+                "function": {"name": "write", "arguments": '{"path": "a.txt"}'}
+            })
+        
+        print("Action: Streaming to Anthropic format...")
+        events = []
+        
+        with patch('kiro.streaming_anthropic.parse_kiro_stream', mock_parse_kiro_stream):
+            with patch('kiro.streaming_anthropic.parse_bracket_tool_calls', return_value=[]):
+                async for event in stream_kiro_to_anthropic(
+                    mock_response, "claude-sonnet-4", mock_model_cache, mock_auth_manager
+                ):
+                    events.append(event)
+        
+        parsed = [json.loads(e.split("data: ", 1)[1]) for e in events]
+        tool_starts = [
+            p for p in parsed
+            if p["type"] == "content_block_start" and p["content_block"]["type"] == "tool_use"
+        ]
+        input_deltas = [
+            p["delta"]["partial_json"] for p in parsed
+            if p["type"] == "content_block_delta" and p["delta"]["type"] == "input_json_delta"
+        ]
+        message_delta = next(p for p in parsed if p["type"] == "message_delta")
+        
+        print(f"Comparing result: starts={tool_starts}, deltas={input_deltas}")
+        assert len(tool_starts) == 1
+        assert tool_starts[0]["index"] == 1
+        assert input_deltas == ['{"path": ', '"a.txt"}']
+        assert message_delta["delta"]["stop_reason"] == "tool_use"
+    
+    @staticmethod
+    async def _stream_raw_tool_events(mock_response, mock_model_cache, mock_auth_manager, raw: bytes):
+        """Runs raw Kiro tool events through the real parser and returns the parsed SSE payloads."""
+        async def mock_aiter_bytes():
+            yield raw
+        
+        mock_response.aiter_bytes = mock_aiter_bytes
+        events = []
+        with patch('kiro.streaming_core.FAKE_REASONING_ENABLED', False):
+            with patch('kiro.streaming_anthropic.parse_bracket_tool_calls', return_value=[]):
+                async for event in stream_kiro_to_anthropic(
+                    mock_response, "claude-sonnet-4", mock_model_cache, mock_auth_manager,
+                    stream_tool_input=True
+                ):
+                    events.append(event)
+        return [json.loads(e.split("data: ", 1)[1]) for e in events]
+    
+    @pytest.mark.asyncio
+    async def test_resent_tool_after_empty_call_streams_real_input(self, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Streams a toolUseId sent first without input, then re-sent with input.
+        Goal: Verify the client gets one tool_use block with the real input, not "{}".
+        """
+        print("Setup: Empty tool call followed by a resend with input...")
+        raw = (
+            b'{"name":"list","toolUseId":"toolu_1"}{"stop":true}'
+            b'{"name":"list","toolUseId":"toolu_1"}{"input":"{\\"dir\\": \\"src\\"}"}{"stop":true}'
+        )
+        
+        print("Action: Streaming to Anthropic format...")
+        parsed = await self._stream_raw_tool_events(mock_response, mock_model_cache, mock_auth_manager, raw)
+        
+        starts = [p for p in parsed if p["type"] == "content_block_start"]
+        input_json = "".join(
+            p["delta"]["partial_json"] for p in parsed
+            if p["type"] == "content_block_delta" and p["delta"]["type"] == "input_json_delta"
+        )
+        print(f"Comparing result: {len(starts)} block(s), input {input_json}")
+        assert [s["content_block"]["id"] for s in starts] == ["toolu_1"]
+        assert json.loads(input_json) == {"dir": "src"}
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_tool_with_new_id_is_sent_once(self, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Streams the same tool call twice under different toolUseIds.
+        Goal: Verify the duplicate is not forwarded as a second tool_use block.
+        """
+        print("Setup: Two identical tool calls with different ids...")
+        raw = (
+            b'{"name":"list","toolUseId":"toolu_1"}{"input":"{\\"dir\\": \\"src\\"}"}{"stop":true}'
+            b'{"name":"list","toolUseId":"toolu_2"}{"input":"{\\"dir\\": \\"src\\"}"}{"stop":true}'
+        )
+        
+        print("Action: Streaming to Anthropic format...")
+        parsed = await self._stream_raw_tool_events(mock_response, mock_model_cache, mock_auth_manager, raw)
+        
+        starts = [p for p in parsed if p["type"] == "content_block_start"]
+        print(f"Comparing result: {[s['content_block']['id'] for s in starts]}")
+        assert [s["content_block"]["id"] for s in starts] == ["toolu_1"]
+    
+    @pytest.mark.asyncio
+    async def test_tool_without_input_gets_empty_object(self, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Streams a tool call that has no input at all.
+        Goal: Verify it is sent from the final tool_use event with "{}" as input.
+        """
+        print("Setup: Tool call with start and stop only...")
+        raw = b'{"name":"list","toolUseId":"toolu_1"}{"stop":true}'
+        
+        print("Action: Streaming to Anthropic format...")
+        parsed = await self._stream_raw_tool_events(mock_response, mock_model_cache, mock_auth_manager, raw)
+        
+        input_deltas = [
+            p["delta"]["partial_json"] for p in parsed
+            if p["type"] == "content_block_delta" and p["delta"]["type"] == "input_json_delta"
+        ]
+        print(f"Comparing result: Expected ['{{}}'], Got {input_deltas}")
+        assert input_deltas == ["{}"]
+    
     @pytest.mark.asyncio
     async def test_closes_response_on_completion(self, mock_response, mock_model_cache, mock_auth_manager):
         """
@@ -889,6 +1014,28 @@ class TestStreamingAnthropicErrorHandling:
         
         print("✓ FirstTokenTimeoutError propagated correctly")
     
+    @pytest.mark.asyncio
+    async def test_keepalive_becomes_ping_and_stall_propagates(self, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Verifies keepalive events become Anthropic ping events and stalls reach the caller.
+        Goal: Keep clients connected while upstream is silent without emitting a second error event.
+        """
+        async def mock_parse_kiro_stream(*args, **kwargs):
+            yield KiroEvent(type="keepalive")
+            raise StreamStallError(120.0)
+        
+        events = []
+        with patch('kiro.streaming_anthropic.parse_kiro_stream', mock_parse_kiro_stream):
+            with pytest.raises(StreamStallError):
+                async for event in stream_kiro_to_anthropic(
+                    mock_response, "claude-sonnet-4", mock_model_cache, mock_auth_manager
+                ):
+                    events.append(event)
+        
+        print(f"Comparing events: {events}")
+        assert events[-1].startswith("event: ping")
+        assert not any(event.startswith("event: error") for event in events)
+    
     @pytest.mark.asyncio
     async def test_propagates_generator_exit(self, mock_response, mock_model_cache, mock_auth_manager):
         """
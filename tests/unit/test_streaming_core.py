@@ -22,12 +22,16 @@ from kiro.streaming_core import (
     KiroEvent,
     StreamResult,
     FirstTokenTimeoutError,
+    StreamStallError,
     parse_kiro_stream,
     collect_stream_to_result,
     calculate_tokens_from_context_usage,
     stream_with_first_token_retry,
     _process_chunk,
 )
+from kiro.http_client import FIRST_TOKEN_EXTENSION
+from kiro.hedging import HedgePolicy
+from kiro.retry_budget import RetryBudget
 
 
 # ==================================================================================================
@@ -345,6 +349,36 @@ class TestParseKiroStream:
         assert content_events[1].content == " World"
         print("✓ Content events parsed correctly")
     
+    @pytest.mark.asyncio
+    async def test_runs_first_token_callback_once(self, mock_response, mock_parser):
+        """
+        What it does: Verifies the client's first-token callback runs once, at the first content event.
+        Purpose: Account latency must be sampled when the model starts, not when headers arrive.
+        """
+        calls = []
+        mock_response.extensions = {FIRST_TOKEN_EXTENSION: lambda: calls.append(len(events))}
+        mock_parser.feed.side_effect = [
+            [{"type": "usage", "data": {"credits": 0.001}}],
+            [{"type": "content", "data": "Hello"}, {"type": "content", "data": " World"}],
+        ]
+        
+        async def mock_aiter_bytes():
+            yield b'chunk1'
+            yield b'chunk2'
+        
+        mock_response.aiter_bytes = mock_aiter_bytes
+        
+        print("Action: Parsing stream...")
+        events = []
+        
+        with patch('kiro.streaming_core.AwsEventStreamParser', return_value=mock_parser):
+            with patch('kiro.streaming_core.FAKE_REASONING_ENABLED', False):
+                async for event in parse_kiro_stream(mock_response, first_token_timeout=30):
+                    events.append(event)
+        
+        print(f"Callback calls (events seen before each): {calls}")
+        assert calls == [1]
+    
     @pytest.mark.asyncio
     async def test_parses_usage_events(self, mock_response, mock_parser):
         """
@@ -466,6 +500,47 @@ class TestParseKiroStream:
         assert "30" in str(exc_info.value)
         print("✓ FirstTokenTimeoutError raised on timeout")
     
+    @pytest.mark.asyncio
+    async def test_reports_first_token_wait(self, mock_response):
+        """
+        What it does: Verifies on_first_token_wait receives the first-chunk wait.
+        Goal: Feed the adaptive first-token timeout with observed waits.
+        """
+        async def mock_aiter_bytes():
+            yield b'chunk'
+        
+        mock_response.aiter_bytes = mock_aiter_bytes
+        waits = []
+        
+        async for _ in parse_kiro_stream(mock_response, first_token_timeout=30, on_first_token_wait=waits.append):
+            pass
+        
+        print(f"Comparing waits: {waits}")
+        assert len(waits) == 1
+        assert 0 <= waits[0] < 30
+    
+    @pytest.mark.asyncio
+    async def test_reports_full_timeout_when_no_first_token(self, mock_response):
+        """
+        What it does: Verifies a timed-out wait is reported as the full timeout.
+        Goal: Let repeated timeouts raise the learned timeout instead of being invisible.
+        """
+        async def mock_aiter_bytes():
+            yield b'chunk'
+        
+        mock_response.aiter_bytes = mock_aiter_bytes
+        waits = []
+        
+        async def mock_wait_for_timeout(*args, **kwargs):
+            raise asyncio.TimeoutError()
+        
+        with patch('kiro.streaming_core.asyncio.wait_for', side_effect=mock_wait_for_timeout):
+            with pytest.raises(FirstTokenTimeoutError):
+                async for _ in parse_kiro_stream(mock_response, first_token_timeout=12, on_first_token_wait=waits.append):
+                    pass
+        
+        assert waits == [12]
+    
     @pytest.mark.asyncio
     async def test_handles_empty_response(self, mock_response):
         """
@@ -677,6 +752,53 @@ class TestProcessChunk:
         print("✓ Thinking content yielded correctly")
 
 
+    @pytest.mark.asyncio
+    async def test_processes_incremental_tool_events(self, mock_parser):
+        """
+        What it does: Processes tool_start/tool_input/tool_stop parser events.
+        Goal: Verify they become tool_use_start/tool_use_delta/tool_use_stop KiroEvents.
+        """
+        print("Setup: Mock parser with incremental tool events...")
+        mock_parser.feed.return_value = [
+            {"type": "tool_start", "data": {"id": "t1", "name": "write", "input": '{"a":', "stop": False}},
+            {"type": "tool_input", "data": {"id": "t1", "input": " 1}"}},
+            {"type": "tool_stop", "data": {"id": "t1"}},
+        ]
+        
+        print("Action: Processing chunk...")
+        events = []
+        async for event in _process_chunk(mock_parser, b'chunk', None):
+            events.append(event)
+        
+        print(f"Received: {[(e.type, e.tool_use) for e in events]}")
+        assert [e.type for e in events] == [
+            "tool_use_start", "tool_use_delta", "tool_use_delta", "tool_use_stop"
+        ]
+        assert events[0].tool_use == {"id": "t1", "name": "write"}
+        assert events[1].tool_use == {"id": "t1", "arguments": '{"a":'}
+        assert events[2].tool_use == {"id": "t1", "arguments": " 1}"}
+    
+    @pytest.mark.asyncio
+    async def test_skips_incremental_tool_events_when_disabled(self, mock_parser):
+        """
+        What it does: Processes tool events with TOOL_INPUT_STREAMING disabled.
+        Goal: Verify tool calls are only reported at the end of the stream.
+        """
+        print("Setup: Mock parser with tool_start event...")
+        mock_parser.feed.return_value = [
+            {"type": "tool_start", "data": {"id": "t1", "name": "write", "input": "", "stop": True}},
+        ]
+        
+        print("Action: Processing chunk with streaming disabled...")
+        events = []
+        with patch('kiro.streaming_core.TOOL_INPUT_STREAMING', False):
+            async for event in _process_chunk(mock_parser, b'chunk', None):
+                events.append(event)
+        
+        print(f"Comparing result: Expected [], Got {events}")
+        assert events == []
+
+
 # ==================================================================================================
 # Tests for collect_stream_to_result()
 # ==================================================================================================
@@ -1443,6 +1565,47 @@ class TestStreamWithFirstTokenRetryCore:
         assert "Internal Server Error" in str(exc_info.value)
         print("✓ HTTP error handled correctly")
     
+    @pytest.mark.asyncio
+    async def test_exhausted_retry_budget_fails_fast_with_503(self):
+        """
+        What it does: Verifies a first-token retry is refused when the retry budget is empty.
+        Goal: Fail fast with 503 instead of adding load during an upstream outage.
+        """
+        from kiro.retry_budget import RetryBudget
+
+        call_count = 0
+
+        async def mock_make_request():
+            nonlocal call_count
+            call_count += 1
+            response = AsyncMock()
+            response.status_code = 200
+            response.aclose = AsyncMock()
+            return response
+
+        async def mock_stream_processor(response):
+            raise FirstTokenTimeoutError("Timeout!")
+            yield  # Make it a generator
+
+        empty_budget = RetryBudget(ratio=0.0, min_per_second=0.0, burst=1)
+        empty_budget.try_acquire()
+
+        print("Action: Streaming with an empty retry budget...")
+        with patch('kiro.streaming_core.get_retry_budget', return_value=empty_budget):
+            with pytest.raises(RuntimeError) as exc_info:
+                async for _ in stream_with_first_token_retry(
+                    make_request=mock_make_request,
+                    stream_processor=mock_stream_processor,
+                    max_retries=3,
+                    first_token_timeout=30,
+                    on_http_error=lambda status, text: RuntimeError(f"{status}: {text}"),
+                ):
+                    pass
+
+        print(f"Exception: {exc_info.value}")
+        assert call_count == 1
+        assert str(exc_info.value).startswith("503")
+
     @pytest.mark.asyncio
     async def test_uses_custom_http_error_callback(self):
         """
@@ -1681,4 +1844,340 @@ class TestStreamWithFirstTokenRetryCore:
         
         print(f"Response aclose called: {response.aclose.called}")
         response.aclose.assert_called()
-        print("✓ Response closed on HTTP error")
\ No newline at end of file
+        print("✓ Response closed on HTTP error")
+
+
+# ==================================================================================================
+# Tests for hedged first-token requests
+# ==================================================================================================
+
+class _FakeStreamResponse:
+    """Streaming response whose first chunk arrives after a delay."""
+    
+    def __init__(self, chunks, first_delay=0.0, status_code=200):
+        self.status_code = status_code
+        self._chunks = chunks
+        self._first_delay = first_delay
+        self.aclose = AsyncMock()
+        self.aread = AsyncMock(return_value=b"error")
+    
+    async def aiter_bytes(self):
+        await asyncio.sleep(self._first_delay)
+        for chunk in self._chunks:
+            yield chunk
+
+
+def _hedge_policy(ttft=0.05, budget=None) -> HedgePolicy:
+    """Enabled hedge policy whose hedge delay is `ttft` seconds."""
+    policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.0, budget=budget)
+    policy.record_ttft(ttft)
+    return policy
+
+
+async def _collect_bytes(response):
+    """Stream processor yielding the decoded body chunks."""
+    async for chunk in response.aiter_bytes():
+        yield chunk.decode()
+
+
+class TestStreamWithFirstTokenRetryHedging:
+    """
+    Tests for hedged first-token requests in stream_with_first_token_retry().
+    
+    A late first byte fires a hedge request; the first contender to deliver a
+    byte is streamed and the other is closed.
+    """
+    
+    @pytest.mark.asyncio
+    async def test_hedge_wins_when_primary_is_slow(self):
+        """
+        What it does: Verifies a fast hedge is streamed and the slow primary closed.
+        Purpose: Cut tail latency without waiting for the full first token timeout.
+        """
+        print("Setup: Slow primary, fast hedge...")
+        primary = _FakeStreamResponse([b"primary"], first_delay=5.0)
+        hedge = _FakeStreamResponse([b"hedge-1", b"hedge-2"])
+        release = AsyncMock()
+        
+        async def make_request():
+            return primary
+        
+        async def hedge_request():
+            return hedge, release
+        
+        print("Action: Streaming with hedging...")
+        chunks = [
+            chunk async for chunk in stream_with_first_token_retry(
+                make_request=make_request,
+                stream_processor=_collect_bytes,
+                max_retries=1,
+                first_token_timeout=2,
+                hedge_request=hedge_request,
+                hedge_policy=_hedge_policy(),
+            )
+        ]
+        
+        print(f"Comparing chunks: {chunks}")
+        assert chunks == ["hedge-1", "hedge-2"]
+        primary.aclose.assert_awaited()
+        hedge.aclose.assert_not_awaited()
+        release.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """
+        What it does: Verifies no hedge is fired when the first byte is on time.
+        Purpose: Hedging must not add load to healthy requests.
+        """
+        hedge_request = AsyncMock()
+        policy = _hedge_policy(ttft=1.0)
+        
+        async def make_request():
+            return _FakeStreamResponse([b"primary"])
+        
+        chunks = [
+            chunk async for chunk in stream_with_first_token_retry(
+                make_request=make_request,
+                stream_processor=_collect_bytes,
+                max_retries=1,
+                first_token_timeout=2,
+                hedge_request=hedge_request,
+                hedge_policy=policy,
+            )
+        ]
+        
+        assert chunks == ["primary"]
+        hedge_request.assert_not_called()
+        assert len(policy.window) == 2
+    
+    @pytest.mark.asyncio
+    async def test_exhausted_hedge_budget_waits_for_primary(self):
+        """
+        What it does: Verifies no hedge is fired once the hedge budget is spent.
+        Purpose: Ensure the hedge rate guardrail holds during an outage.
+        """
+        budget = RetryBudget(ratio=0.0, min_per_second=0.0, burst=1)
+        budget.try_acquire()
+        hedge_request = AsyncMock()
+        
+        async def make_request():
+            return _FakeStreamResponse([b"primary"], first_delay=0.2)
+        
+        chunks = [
+            chunk async for chunk in stream_with_first_token_retry(
+                make_request=make_request,
+                stream_processor=_collect_bytes,
+                max_retries=1,
+                first_token_timeout=2,
+                hedge_request=hedge_request,
+                hedge_policy=_hedge_policy(budget=budget),
+            )
+        ]
+        
+        assert chunks == ["primary"]
+        hedge_request.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_both_contenders_timing_out_closes_both(self):
+        """
+        What it does: Verifies a race with no first byte counts as a first token timeout.
+        Purpose: Ensure neither contender leaks when the attempt is abandoned.
+        """
+        primary = _FakeStreamResponse([b"primary"], first_delay=5.0)
+        hedge = _FakeStreamResponse([b"hedge"], first_delay=5.0)
+        release = AsyncMock()
+        
+        async def make_request():
+            return primary
+        
+        async def hedge_request():
+            return hedge, release
+        
+        with pytest.raises(RuntimeError, match="timeout"):
+            async for _ in stream_with_first_token_retry(
+                make_request=make_request,
+                stream_processor=_collect_bytes,
+                max_retries=1,
+                first_token_timeout=0.3,
+                on_all_retries_failed=lambda retries, timeout: RuntimeError("timeout"),
+                hedge_request=hedge_request,
+                hedge_policy=_hedge_policy(),
+            ):
+                pass
+        
+        primary.aclose.assert_awaited()
+        hedge.aclose.assert_awaited()
+        release.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_error_response_yields_to_pending_contender(self):
+        """
+        What it does: Verifies an error from the primary does not beat a pending hedge.
+        Purpose: Let the hedge on another account rescue the request.
+        """
+        failing = AsyncMock(side_effect=RuntimeError("primary failed"))
+        hedge = _FakeStreamResponse([b"hedge"], first_delay=0.2)
+        
+        async def make_request():
+            await asyncio.sleep(0.1)
+            return await failing()
+        
+        async def hedge_request():
+            return hedge, None
+        
+        chunks = [
+            chunk async for chunk in stream_with_first_token_retry(
+                make_request=make_request,
+                stream_processor=_collect_bytes,
+                max_retries=1,
+                first_token_timeout=2,
+                hedge_request=hedge_request,
+                hedge_policy=_hedge_policy(ttft=0.05),
+            )
+        ]
+        
+        assert chunks == ["hedge"]
+        failing.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_first_token_wait_includes_race_wait(self):
+        """
+        What it does: Verifies the stream processor reports the wait spent in the hedge race.
+        Purpose: Adaptive first-token timeout samples must not drop the pre-read first chunk.
+        """
+        waits = []
+        
+        async def make_request():
+            return _FakeStreamResponse([b'{"content":"Hello"}'], first_delay=0.2)
+        
+        async def process(response):
+            async for event in parse_kiro_stream(response, on_first_token_wait=waits.append):
+                yield event.type
+        
+        print("Action: Streaming a primary that answers before the hedge delay...")
+        chunks = [
+            chunk async for chunk in stream_with_first_token_retry(
+                make_request=make_request,
+                stream_processor=process,
+                max_retries=1,
+                first_token_timeout=2,
+                hedge_request=AsyncMock(),
+                hedge_policy=_hedge_policy(ttft=1.0),
+            )
+        ]
+        
+        print(f"Comparing waits: {waits}")
+        assert "content" in chunks
+        assert len(waits) == 1
+        assert waits[0] >= 0.15
+    
+    @pytest.mark.asyncio
+    async def test_race_timeout_reports_first_token_wait(self):
+        """
+        What it does: Verifies a hedged attempt that times out reports the full timeout.
+        Purpose: The stream processor never runs for that attempt, so the wrapper must report it.
+        """
+        waits = []
+        
+        async def make_request():
+            return _FakeStreamResponse([b"primary"], first_delay=5.0)
+        
+        async def hedge_request():
+            return _FakeStreamResponse([b"hedge"], first_delay=5.0), None
+        
+        with pytest.raises(RuntimeError, match="timeout"):
+            async for _ in stream_with_first_token_retry(
+                make_request=make_request,
+                stream_processor=_collect_bytes,
+                max_retries=1,
+                first_token_timeout=0.3,
+                on_all_retries_failed=lambda retries, timeout: RuntimeError("timeout"),
+                hedge_request=hedge_request,
+                hedge_policy=_hedge_policy(),
+                on_first_token_wait=waits.append,
+            ):
+                pass
+        
+        print(f"Comparing waits: {waits}")
+        assert waits == [0.3]
+
+
+# ==================================================================================================
+# Tests for the inter-chunk stall watchdog
+# ==================================================================================================
+
+class TestParseKiroStreamStallWatchdog:
+    """
+    Tests for the stall watchdog in parse_kiro_stream().
+    
+    After the first chunk, silence produces keepalive events and a stall
+    longer than stall_timeout aborts the stream.
+    """
+    
+    @staticmethod
+    def _response_with_gap(gap: float):
+        """Response sending a content frame, then another after `gap` seconds."""
+        response = AsyncMock()
+        
+        async def aiter_bytes():
+            yield b'{"content":"Hello"}'
+            await asyncio.sleep(gap)
+            yield b'{"content":" world"}'
+        
+        response.aiter_bytes = aiter_bytes
+        return response
+    
+    @pytest.mark.asyncio
+    async def test_stall_aborts_stream(self):
+        """
+        What it does: Verifies a silent upstream raises StreamStallError after stall_timeout.
+        Goal: Free the account slot, socket and client connection of hung streams early.
+        """
+        response = self._response_with_gap(5.0)
+        events = []
+        
+        with pytest.raises(StreamStallError) as exc_info:
+            async for event in parse_kiro_stream(
+                response, first_token_timeout=5, stall_timeout=0.2, keepalive_interval=0
+            ):
+                events.append(event)
+        
+        print(f"Caught exception: {exc_info.value}")
+        assert exc_info.value.stalled_seconds >= 0.2
+        assert [event.type for event in events] == ["content"]
+    
+    @pytest.mark.asyncio
+    async def test_keepalive_events_during_silence(self):
+        """
+        What it does: Verifies keepalive events are emitted while waiting for the next frame.
+        Goal: Keep client connections alive without disturbing the pending upstream read.
+        """
+        response = self._response_with_gap(0.35)
+        
+        events = [
+            event async for event in parse_kiro_stream(
+                response, first_token_timeout=5, stall_timeout=2, keepalive_interval=0.1
+            )
+        ]
+        
+        types = [event.type for event in events]
+        print(f"Comparing event types: {types}")
+        assert types[0] == "content"
+        assert types[-1] == "content"
+        assert 2 <= types.count("keepalive") <= 4
+    
+    @pytest.mark.asyncio
+    async def test_disabled_watchdog_waits_for_slow_frames(self):
+        """
+        What it does: Verifies stall_timeout=0 and keepalive_interval=0 disable the watchdog.
+        Goal: Keep the previous behavior available.
+        """
+        response = self._response_with_gap(0.2)
+        
+        events = [
+            event async for event in parse_kiro_stream(
+                response, first_token_timeout=5, stall_timeout=0, keepalive_interval=0
+            )
+        ]
+        
+        assert [event.type for event in events] == ["content", "content"]
@@ -23,7 +23,7 @@ from kiro.streaming_openai import (
     collect_stream_response,
     FirstTokenTimeoutError,
 )
-from kiro.streaming_core import KiroEvent
+from kiro.streaming_core import KiroEvent, StreamStallError
 
 
 # ==================================================================================================
@@ -357,6 +357,50 @@ class TestStreamKiroToOpenai:
         mock_response.aclose.assert_called()
         print("✓ Response closed on completion")
     
+    @pytest.mark.asyncio
+    async def test_streams_tool_call_arguments_incrementally(self, mock_http_client, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Forwards tool call header and argument fragments as they arrive.
+        Goal: Verify delta.tool_calls chunks share one index and no end-of-stream duplicate is sent.
+        """
+        print("Setup: Mock stream with incremental tool events...")
+        
+        async def mock_parse_kiro_stream(*args, **kwargs):
+            yield KiroEvent(type="tool_use_start", tool_use={"id": "call_1", "name": "write"})
+            yield KiroEvent(type="tool_use_delta", tool_use={"id": "call_1", "arguments": '{"path": '})
+            yield KiroEvent(type="tool_use_delta", tool_use={"id": "call_1", "arguments": '"a.txt"}'})
+            yield KiroEvent(type="tool_use_stop", tool_use={"id": "call_1"})
+            yield KiroEvent(type="tool_use", tool_use={
+                "id": "call_1",
+                "type": "function",
+                "function": {"name": "write", "arguments": '{"path": "a.txt"}'}
+            })
+        
+        print("Action: Streaming to OpenAI format...")
+        chunks = []
+        
+        with patch('kiro.streaming_openai.parse_kiro_stream', mock_parse_kiro_stream):
+            with patch('kiro.streaming_openai.parse_bracket_tool_calls', return_value=[]):
+                async for chunk in stream_kiro_to_openai(
+                    mock_http_client, mock_response, "claude-sonnet-4",
+                    mock_model_cache, mock_auth_manager
+                ):
+                    chunks.append(chunk)
+        
+        parsed = [json.loads(c[len("data: "):]) for c in chunks if c.startswith("data: {")]
+        tool_deltas = [
+            tc for p in parsed
+            for tc in p["choices"][0]["delta"].get("tool_calls", [])
+        ]
+        
+        print(f"Comparing result: {tool_deltas}")
+        assert len(tool_deltas) == 3
+        assert all(tc["index"] == 0 for tc in tool_deltas)
+        assert tool_deltas[0]["id"] == "call_1"
+        assert tool_deltas[0]["function"]["name"] == "write"
+        assert "".join(tc["function"]["arguments"] for tc in tool_deltas) == '{"path": "a.txt"}'
+        assert parsed[-1]["choices"][0]["finish_reason"] == "tool_calls"
+    
     @pytest.mark.asyncio
     async def test_closes_response_on_error(self, mock_http_client, mock_response, mock_model_cache, mock_auth_manager):
         """
@@ -1147,6 +1191,31 @@ class TestStreamingOpenaiErrorHandling:
         
         print("✓ FirstTokenTimeoutError propagated correctly")
     
+    @pytest.mark.asyncio
+    async def test_keepalive_becomes_sse_comment_and_stall_propagates(self, mock_http_client, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Verifies keepalive events become SSE comments and stalls reach the caller.
+        Goal: Keep clients connected while upstream is silent, and let routes end a hung stream.
+        """
+        async def mock_parse_kiro_stream(*args, **kwargs):
+            yield KiroEvent(type="content", content="Hello")
+            yield KiroEvent(type="keepalive")
+            raise StreamStallError(120.0)
+        
+        chunks = []
+        with patch('kiro.streaming_openai.parse_kiro_stream', mock_parse_kiro_stream):
+            with pytest.raises(StreamStallError):
+                async for chunk in stream_kiro_to_openai(
+                    mock_http_client, mock_response, "claude-sonnet-4",
+                    mock_model_cache, mock_auth_manager
+                ):
+                    chunks.append(chunk)
+        
+        print(f"Comparing chunks: {chunks}")
+        assert chunks[-1] == ": keep-alive\n\n"
+        assert not any('"usage"' in chunk for chunk in chunks)
+        mock_response.aclose.assert_called()
+    
     @pytest.mark.asyncio
     async def test_handles_generator_exit_gracefully(self, mock_http_client, mock_response, mock_model_cache, mock_auth_manager):
         """
@@ -1350,4 +1419,39 @@ class TestStreamingOpenaiMeteringData:
         # Final chunk should have credits_used
         final_chunk = chunks[-2]  # Before [DONE]
         assert '"credits_used"' in final_chunk
-        print("✓ credits_used included in usage")
\ No newline at end of file
+        print("✓ credits_used included in usage")    
+    @pytest.mark.asyncio
+    async def test_collect_uses_final_tool_calls(self, mock_http_client, mock_response, mock_model_cache, mock_auth_manager):
+        """
+        What it does: Collects a response whose tool call would stream as fragments.
+        Goal: Verify non-streaming clients get the deduplicated, normalized final call only.
+        """
+        print("Setup: Mock stream that only fragments tool input when asked to...")
+        
+        async def mock_parse_kiro_stream(*args, stream_tool_input=None, **kwargs):
+            if stream_tool_input is not False:
+                yield KiroEvent(type="tool_use_start", tool_use={"id": "call_1", "name": "write"})
+                yield KiroEvent(type="tool_use_delta", tool_use={"id": "call_1", "arguments": '{"path":  '})
+                yield KiroEvent(type="tool_use_delta", tool_use={"id": "call_1", "arguments": '"a.txt"}'})
+                yield KiroEvent(type="tool_use_stop", tool_use={"id": "call_1"})
+            yield KiroEvent(type="tool_use", tool_use={
+                "id": "call_1", "type": "function",
+                "function": {"name": "write", "arguments": '{"path": "a.txt"}'}
+            })
+        
+        print("Action: Collecting stream response...")
+        
+        with patch('kiro.streaming_openai.parse_kiro_stream', mock_parse_kiro_stream):
+            with patch('kiro.streaming_openai.parse_bracket_tool_calls', return_value=[]):
+                result = await collect_stream_response(
+                    mock_http_client, mock_response, "claude-sonnet-4",
+                    mock_model_cache, mock_auth_manager
+                )
+        
+        tool_calls = result["choices"][0]["message"]["tool_calls"]
+        print(f"Comparing result: {tool_calls}")
+        assert tool_calls == [{
+            "id": "call_1",
+            "type": "function",
+            "function": {"name": "write", "arguments": '{"path": "a.txt"}'}
+        }]
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""
+Unit tests for online token estimate calibration.
+Tests per-model fits, outlier rejection, estimate-only mode, persistence and the stream hooks.
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+import kiro.token_calibration as token_calibration
+from kiro.streaming_core import KiroEvent
+from kiro.token_calibration import PromptEstimate, TokenCalibrator, estimate_prompt_tokens
+from kiro.tokenizer import CLAUDE_CORRECTION_FACTOR, count_message_tokens, count_tools_tokens
+
+KEY = ("openai", "claude-sonnet-4")
+
+
+def _estimate(tiktoken_tokens, chars=None) -> PromptEstimate:
+    return PromptEstimate(
+        prompt_tokens=tiktoken_tokens or 0,
+        tool_tokens=0,
+        tiktoken_tokens=tiktoken_tokens,
+        chars=chars if chars is not None else (tiktoken_tokens or 0) * 4,
+        method="static",
+    )
+
+
+def _train(calibrator, ratio, samples=5, tokens=10_000):
+    for index in range(samples):
+        estimated = tokens + index * 1000
+        calibrator.observe(KEY, _estimate(estimated), int(estimated * ratio))
+
+
+def _request():
+    messages = [
+        {"role": "system", "content": "You are a careful assistant. " * 20},
+        {"role": "user", "content": "Summarize the following text. " * 40},
+    ]
+    tools = [{"type": "function", "function": {"name": "search", "description": "Search docs", "parameters": {"type": "object"}}}]
+    return messages, tools
+
+
+class TestFits:
+    """Tests for learning corrections."""
+
+    def test_uncalibrated_until_min_samples(self, tmp_path):
+        """
+        What it does: Verifies no correction is applied before the sample threshold.
+        Purpose: A handful of requests must not swing billing estimates.
+        """
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"), min_samples=5)
+        _train(calibrator, 1.3, samples=4)
+
+        assert calibrator.factor(KEY) is None
+        assert calibrator.calibrated_tokens(KEY, 1000) == 1000
+
+        _train(calibrator, 1.3, samples=1)
+        print(f"Factor: {calibrator.factor(KEY)}")
+        assert calibrator.factor(KEY) == pytest.approx(1.3, rel=0.01)
+        assert calibrator.calibrated_tokens(KEY, 1000) == pytest.approx(1300, abs=2)
+
+    def test_fit_follows_drift(self, tmp_path):
+        """
+        What it does: Verifies older samples fade so the factor tracks a changed ratio.
+        Purpose: Kiro's hidden prompt overhead changes over time.
+        """
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"), min_samples=5, half_life=10)
+        _train(calibrator, 1.1, samples=50)
+        _train(calibrator, 1.5, samples=50)
+
+        assert calibrator.factor(KEY) == pytest.approx(1.5, rel=0.02)
+
+    def test_outliers_and_small_prompts_are_ignored(self, tmp_path):
+        """
+        What it does: Verifies implausible ratios and tiny prompts do not update the fit.
+        Purpose: A wrong max_input_tokens or a short prompt must not poison the factor.
+        """
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"), min_samples=1)
+        calibrator.observe(KEY, _estimate(10_000), 200_000)
+        calibrator.observe(KEY, _estimate(100), 130)
+
+        assert calibrator.factor(KEY) is None
+
+    def test_keys_are_independent(self, tmp_path):
+        """
+        What it does: Verifies each (API, model) pair has its own correction.
+        Purpose: Models and API estimators differ in overhead.
+        """
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"), min_samples=1)
+        _train(calibrator, 1.2)
+
+        assert calibrator.factor(("anthropic", "claude-sonnet-4")) is None
+        assert calibrator.factor(("openai", "claude-haiku-4.5")) is None
+
+    def test_disabled_calibrator_learns_nothing(self, tmp_path):
+        """
+        What it does: Verifies TOKEN_CALIBRATION_ENABLED=false keeps the static estimates.
+        Purpose: Operators can opt out.
+        """
+        calibrator = TokenCalibrator(enabled=False, path=str(tmp_path / "c.json"), min_samples=1)
+        _train(calibrator, 1.2)
+
+        assert calibrator.factor(KEY) is None
+        assert calibrator.snapshot() == {}
+
+
+class TestEstimatePromptTokens:
+    """Tests for request-side estimates."""
+
+    @pytest.mark.asyncio
+    async def test_uncalibrated_matches_static_estimate(self, tmp_path):
+        """
+        What it does: Verifies the uncalibrated estimate equals the previous route computation.
+        Purpose: Billing must not change until a model is calibrated.
+        """
+        messages, tools = _request()
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"))
+
+        estimate = await estimate_prompt_tokens(KEY, messages, tools, calibrator)
+
+        assert estimate.method == "static"
+        assert estimate.prompt_tokens == count_message_tokens(messages, apply_claude_correction=False)
+        assert estimate.tool_tokens == count_tools_tokens(tools)
+
+    @pytest.mark.asyncio
+    async def test_calibrated_estimate_uses_factor(self, tmp_path):
+        """
+        What it does: Verifies a calibrated model scales tiktoken counts by its fitted factor.
+        Purpose: Preflight billing uses the learned correction.
+        """
+        messages, tools = _request()
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"), min_samples=5)
+        _train(calibrator, 1.4)
+
+        estimate = await estimate_prompt_tokens(KEY, messages, tools, calibrator)
+
+        raw_messages = count_message_tokens(messages, apply_claude_correction=False)
+        assert estimate.method == "calibrated"
+        assert estimate.prompt_tokens == int(raw_messages * calibrator.factor(KEY))
+        assert estimate.tiktoken_tokens == raw_messages + count_tools_tokens(tools, apply_claude_correction=False)
+
+    @pytest.mark.asyncio
+    async def test_large_calibrated_input_skips_tiktoken(self, tmp_path):
+        """
+        What it does: Verifies huge inputs of a calibrated model are estimated from their length.
+        Purpose: Estimate-only mode avoids tokenizing multi-megabyte prompts.
+        """
+        messages, tools = _request()
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"), min_samples=5)
+        _train(calibrator, 1.2)
+        per_char = calibrator.tokens_per_char(KEY)
+
+        with patch.object(token_calibration, "TOKENIZER_ESTIMATE_ONLY_MIN_CHARS", 100), \
+                patch.object(token_calibration, "count_message_tokens_async", AsyncMock(side_effect=AssertionError)):
+            estimate = await estimate_prompt_tokens(KEY, messages, tools, calibrator)
+
+        print(f"Estimate: {estimate}")
+        assert estimate.method == "length"
+        assert estimate.tiktoken_tokens is None
+        assert estimate.total_tokens == pytest.approx(estimate.chars * per_char, abs=2)
+
+    @pytest.mark.asyncio
+    async def test_large_uncalibrated_input_still_uses_tiktoken(self, tmp_path):
+        """
+        What it does: Verifies estimate-only mode waits for a calibrated length fit.
+        Purpose: Never guess from length without evidence for the model.
+        """
+        messages, tools = _request()
+        calibrator = TokenCalibrator(path=str(tmp_path / "c.json"))
+
+        with patch.object(token_calibration, "TOKENIZER_ESTIMATE_ONLY_MIN_CHARS", 100):
+            estimate = await estimate_prompt_tokens(KEY, messages, tools, calibrator)
+
+        assert estimate.method == "static"
+
+
+class TestPersistence:
+    """Tests for saving and loading fits."""
+
+    @pytest.mark.asyncio
+    async def test_fits_survive_restart(self, tmp_path):
+        """
+        What it does: Verifies fits saved at close are loaded by a new calibrator.
+        Purpose: Restarts must not discard calibration.
+        """
+        path = tmp_path / "calibration.json"
+        calibrator = TokenCalibrator(path=str(path), min_samples=5)
+        _train(calibrator, 1.25)
+        await calibrator.close()
+
+        restored = TokenCalibrator(path=str(path), min_samples=5)
+        loaded = restored.load()
+
+        print(f"Saved: {json.loads(path.read_text())['models']}")
+        assert loaded == 1
+        assert restored.factor(KEY) == pytest.approx(calibrator.factor(KEY))
+        assert restored.tokens_per_char(KEY) == pytest.approx(calibrator.tokens_per_char(KEY))
+
+    def test_unreadable_file_is_ignored(self, tmp_path):
+        """
+        What it does: Verifies a corrupt calibration file does not prevent startup.
+        Purpose: Fall back to static estimates instead of failing.
+        """
+        path = tmp_path / "calibration.json"
+        path.write_text("{not json")
+
+        calibrator = TokenCalibrator(path=str(path))
+
+        assert calibrator.load() == 0
+        assert calibrator.factor(KEY) is None
+
+    @pytest.mark.asyncio
+    async def test_nothing_is_written_without_observations(self, tmp_path):
+        """
+        What it does: Verifies close() does not create a file when nothing was learned.
+        Purpose: Avoid needless writes on every shutdown.
+        """
+        path = tmp_path / "calibration.json"
+        await TokenCalibrator(path=str(path)).close()
+
+        assert not path.exists()
+
+
+class TestStreamHooks:
+    """Tests for the calibration hooks in the stream converters."""
+
+    @pytest.mark.asyncio
+    async def test_context_usage_is_reported_to_observer(self):
+        """
+        What it does: Verifies the OpenAI stream passes prompt tokens from context usage to on_context_usage.
+        Purpose: Every response with context usage feeds the calibration.
+        """
+        from kiro.streaming_openai import stream_kiro_to_openai
+
+        model_cache = MagicMock()
+        model_cache.get_max_input_tokens.return_value = 200000
+        observed = []
+
+        async def mock_parse_kiro_stream(*args, **kwargs):
+            yield KiroEvent(type="content", content="Hello")
+            yield KiroEvent(type="context_usage", context_usage_percentage=5.0)
+
+        with patch("kiro.streaming_openai.parse_kiro_stream", mock_parse_kiro_stream), \
+                patch("kiro.streaming_openai.parse_bracket_tool_calls", return_value=[]):
+            async for _ in stream_kiro_to_openai(
+                AsyncMock(), AsyncMock(), "claude-sonnet-4", model_cache, MagicMock(),
+                on_context_usage=observed.append
+            ):
+                pass
+
+        print(f"Observed: {observed}")
+        assert len(observed) == 1
+        assert 9990 <= observed[0] <= 10000
+
+    @pytest.mark.asyncio
+    async def test_fallback_usage_uses_calibrated_factor(self):
+        """
+        What it does: Verifies fallback prompt tokens are corrected when the model is calibrated.
+        Purpose: Responses without context usage are billed with the learned correction.
+        """
+        from kiro.streaming_openai import stream_kiro_to_openai
+
+        messages, _ = _request()
+        calibrator = token_calibration.get_token_calibrator()
+        _train(calibrator, 1.5, samples=calibrator._min_samples)
+        chunks = []
+
+        async def mock_parse_kiro_stream(*args, **kwargs):
+            yield KiroEvent(type="content", content="Hello")
+
+        with patch("kiro.streaming_openai.parse_kiro_stream", mock_parse_kiro_stream), \
+                patch("kiro.streaming_openai.parse_bracket_tool_calls", return_value=[]):
+            async for chunk in stream_kiro_to_openai(
+                AsyncMock(), AsyncMock(), "claude-sonnet-4", MagicMock(), MagicMock(),
+                request_messages=messages
+            ):
+                chunks.append(chunk)
+
+        usage = next(json.loads(c[len("data: "):])["usage"] for c in chunks if '"usage"' in c)
+        raw = count_message_tokens(messages, apply_claude_correction=False)
+        assert usage["prompt_tokens"] == int(raw * calibrator.factor(KEY))
+        assert calibrator.factor(KEY) != CLAUDE_CORRECTION_FACTOR
@@ -856,4 +856,388 @@ class TestTokenizerIntegration:
         # Все результаты должны быть одинаковыми
         assert len(set(results)) == 1, "Результаты должны быть консистентными"
     
-    
\ No newline at end of file
+    
+
+class TestTokenCountCache:
+    """Tests for memoized per-message token counts."""
+
+    @staticmethod
+    def _history(turns):
+        return [
+            {"role": "user" if index % 2 == 0 else "assistant", "content": f"Turn {index}: " + "lorem ipsum " * 40}
+            for index in range(turns)
+        ]
+
+    def test_resent_history_only_encodes_new_messages(self):
+        """
+        What it does: Verifies a request that repeats earlier messages only encodes the new ones.
+        Purpose: Agent clients resend the whole history every turn.
+        """
+        import kiro.tokenizer as tokenizer_module
+
+        encoded = []
+        original = tokenizer_module._count_text_tokens
+
+        def counting(text, apply_claude_correction=True):
+            encoded.append(text)
+            return original(text, apply_claude_correction)
+
+        history = self._history(6)
+        with patch("kiro.tokenizer._count_text_tokens", side_effect=counting):
+            count_message_tokens(history[:5])
+            encoded.clear()
+            count_message_tokens(history)
+
+        print(f"Encoded on second request: {len(encoded)} strings")
+        assert any(text.startswith("Turn 5:") for text in encoded)
+        assert not any(text.startswith("Turn 0:") for text in encoded)
+
+    def test_cached_count_matches_uncached_count(self):
+        """
+        What it does: Verifies memoized counts equal counts computed without the cache.
+        Purpose: The cache must not change token estimates or billing.
+        """
+        import kiro.tokenizer as tokenizer_module
+
+        history = self._history(4)
+        first = count_message_tokens(history, apply_claude_correction=False)
+        second = count_message_tokens(history, apply_claude_correction=False)
+        with patch.object(tokenizer_module, "TOKENIZER_CACHE_MAX_BYTES", 0):
+            uncached = count_message_tokens(history, apply_claude_correction=False)
+
+        assert first == second == uncached
+
+    def test_changed_message_is_recounted(self):
+        """
+        What it does: Verifies an edited message gets a new count instead of the cached one.
+        Purpose: Keys must cover the whole message content.
+        """
+        history = self._history(2)
+        before = count_message_tokens(history)
+        history[1] = {**history[1], "content": history[1]["content"] + " extra words " * 50}
+
+        assert count_message_tokens(history) > before
+
+    def test_short_messages_are_not_cached(self):
+        """
+        What it does: Verifies messages below the size threshold bypass the cache.
+        Purpose: Short messages are cheaper to encode than to hash and store.
+        """
+        from kiro.tokenizer import get_token_count_cache
+
+        count_message_tokens([{"role": "user", "content": "Hi"}])
+
+        assert len(get_token_count_cache()) == 0
+
+    def test_tool_definitions_are_cached(self):
+        """
+        What it does: Verifies repeated tool definitions are served from the cache.
+        Purpose: Tool schemas are resent unchanged on every turn as well.
+        """
+        from kiro.tokenizer import get_token_count_cache
+
+        tools = [{
+            "type": "function",
+            "function": {"name": "read_file", "description": "Reads a file. " * 30, "parameters": {"type": "object"}},
+        }]
+        first = count_tools_tokens(tools)
+        second = count_tools_tokens(tools)
+
+        assert first == second
+        assert len(get_token_count_cache()) == 1
+
+    def test_evicts_least_recently_used_beyond_byte_budget(self):
+        """
+        What it does: Verifies the cache stays within its byte budget by evicting the oldest entries.
+        Purpose: Bound memory regardless of how many distinct messages are seen.
+        """
+        from kiro.tokenizer import TokenCountCache
+
+        entry_bytes = TokenCountCache._entry_bytes(b"k" * 16, 1)
+        cache = TokenCountCache(max_bytes=entry_bytes * 3)
+        for index in range(3):
+            cache.put(bytes([index]) * 16, index + 1)
+        assert cache.get(bytes([0]) * 16) == 1
+
+        cache.put(bytes([3]) * 16, 4)
+
+        print(f"Entries: {len(cache)}, bytes: {cache.size_bytes}/{entry_bytes * 3}")
+        assert len(cache) == 3
+        assert cache.size_bytes <= entry_bytes * 3
+        assert cache.get(bytes([1]) * 16) is None
+        assert cache.get(bytes([0]) * 16) == 1
+
+
+class FakeEncoding:
+    """Whitespace 'tokenizer' that records which thread encoded what."""
+
+    def __init__(self, fail_batch: bool = False) -> None:
+        self.fail_batch = fail_batch
+        self.single_calls = []
+        self.batch_calls = []
+
+    def encode(self, text):
+        import threading
+        self.single_calls.append((threading.current_thread().name, text))
+        return text.split()
+
+    def encode_batch(self, texts, num_threads=8):
+        import threading
+        if self.fail_batch:
+            raise ValueError("special token in text")
+        self.batch_calls.append((threading.current_thread().name, list(texts), num_threads))
+        return [text.split() for text in texts]
+
+
+class TestAsyncTokenization:
+    """Tests for off-loop batched tokenization."""
+
+    @staticmethod
+    def _request():
+        messages = [
+            {"role": "user", "content": "word " * 30},
+            {"role": "assistant", "content": [{"type": "text", "text": "reply " * 20}]},
+        ]
+        tools = [{"type": "function", "function": {"name": "search", "description": "Search the web", "parameters": {"type": "object"}}}]
+        return messages, tools, "system words " * 10
+
+    @pytest.mark.asyncio
+    async def test_large_request_is_batched_on_tokenizer_pool(self):
+        """
+        What it does: Verifies a large request is encoded in one encode_batch call on the tokenizer pool.
+        Purpose: Big prompts must not block the event loop and should use several cores.
+        """
+        from kiro.tokenizer import estimate_request_tokens_async
+
+        messages, tools, system = self._request()
+        fake = FakeEncoding()
+        with patch("kiro.tokenizer._get_encoding", return_value=fake), \
+                patch("kiro.tokenizer.TOKENIZER_OFFLOAD_MIN_CHARS", 1):
+            result = await estimate_request_tokens_async(messages, tools, system)
+
+        print(f"Batch calls: {[(name, len(texts)) for name, texts, _ in fake.batch_calls]}")
+        assert len(fake.batch_calls) == 1
+        thread_name, texts, _ = fake.batch_calls[0]
+        assert thread_name.startswith("tokenizer")
+        assert "search" in texts and system in texts
+        assert fake.single_calls == []
+        assert result["total_tokens"] == result["messages_tokens"] + result["tools_tokens"] + result["system_tokens"]
+
+    @pytest.mark.asyncio
+    async def test_small_request_stays_inline(self):
+        """
+        What it does: Verifies payloads under the threshold are encoded on the calling thread without batching.
+        Purpose: A thread hop costs more than encoding a short prompt.
+        """
+        import threading
+        from kiro.tokenizer import count_message_tokens_async
+
+        fake = FakeEncoding()
+        with patch("kiro.tokenizer._get_encoding", return_value=fake):
+            await count_message_tokens_async([{"role": "user", "content": "Hello there"}])
+
+        assert fake.batch_calls == []
+        assert {name for name, _ in fake.single_calls} == {threading.current_thread().name}
+
+    @pytest.mark.asyncio
+    async def test_async_variants_match_sync_counts(self):
+        """
+        What it does: Verifies async and sync variants return the same counts on both paths.
+        Purpose: Routes switching to the async variants must not change billing.
+        """
+        from kiro.tokenizer import (
+            count_message_tokens_async,
+            count_tools_tokens_async,
+            estimate_request_tokens_async,
+            get_token_count_cache,
+        )
+
+        messages, tools, system = self._request()
+        fake = FakeEncoding()
+        with patch("kiro.tokenizer._get_encoding", return_value=fake):
+            expected = (
+                count_message_tokens(messages, apply_claude_correction=False),
+                count_tools_tokens(tools),
+                estimate_request_tokens(messages, tools, system),
+            )
+            get_token_count_cache().clear()
+            with patch("kiro.tokenizer.TOKENIZER_OFFLOAD_MIN_CHARS", 1):
+                actual = (
+                    await count_message_tokens_async(messages, apply_claude_correction=False),
+                    await count_tools_tokens_async(tools),
+                    await estimate_request_tokens_async(messages, tools, system),
+                )
+
+        assert actual == expected
+
+    def test_failed_batch_falls_back_to_single_strings(self):
+        """
+        What it does: Verifies a failing encode_batch falls back to encoding each string.
+        Purpose: One special token must not break counting of the whole request.
+        """
+        messages, _, _ = self._request()
+        fake = FakeEncoding(fail_batch=True)
+        with patch("kiro.tokenizer._get_encoding", return_value=fake), \
+                patch("kiro.tokenizer.TOKENIZER_OFFLOAD_MIN_CHARS", 1):
+            result = count_message_tokens(messages, apply_claude_correction=False)
+
+        assert result > 50
+        assert len(fake.single_calls) > 0
+
+
+class PieceEncoding:
+    """
+    Byte-level 'BPE': each whitespace-led word is split into 3-byte tokens.
+
+    Splitting a word between two encode() calls changes its token count, and
+    tokens can end inside a multi-byte character, like real BPE.
+    """
+
+    def encode(self, text):
+        import re
+        tokens = []
+        for piece in re.findall(r"\s?\S+|\s+", text):
+            data = piece.encode("utf-8")
+            tokens.extend(data[i:i + 3] for i in range(0, len(data), 3))
+        return tokens
+
+    def decode_bytes(self, tokens):
+        return b"".join(tokens)
+
+
+class TestStreamingTokenCounter:
+    """Tests for incremental completion-token counting."""
+
+    @staticmethod
+    def _deltas():
+        text = ("Привет, мир! Streaming completion with unbroken_identifiers_like_this "
+                "and numbers 1234567 ") * 40
+        sizes = [1, 2, 3, 5, 7, 11]
+        deltas, position, index = [], 0, 0
+        while position < len(text):
+            deltas.append(text[position:position + sizes[index % len(sizes)]])
+            position += sizes[index % len(sizes)]
+            index += 1
+        return text, deltas
+
+    def test_matches_count_of_concatenated_text(self):
+        """
+        What it does: Verifies deltas split mid-word and mid-character give the same count as the whole text.
+        Purpose: The carry-over window must absorb merges across delta boundaries.
+        """
+        from kiro.tokenizer import StreamingTokenCounter
+
+        text, deltas = self._deltas()
+        with patch("kiro.tokenizer._get_encoding", return_value=PieceEncoding()), \
+                patch.object(StreamingTokenCounter, "FLUSH_CHARS", 64):
+            counter = StreamingTokenCounter()
+            for delta in deltas:
+                counter.feed(delta)
+            expected = count_tokens(text)
+
+            print(f"Streamed: {counter.tokens()}, whole text: {expected}")
+            assert counter.tokens() == expected
+            assert counter.tokens(apply_claude_correction=False) == count_tokens(text, apply_claude_correction=False)
+
+    def test_buffer_does_not_grow_with_output(self):
+        """
+        What it does: Verifies the buffered text stays bounded for a long stream.
+        Purpose: Memory for long outputs must not grow with output length.
+        """
+        from kiro.tokenizer import StreamingTokenCounter
+
+        _, deltas = self._deltas()
+        with patch("kiro.tokenizer._get_encoding", return_value=PieceEncoding()), \
+                patch.object(StreamingTokenCounter, "FLUSH_CHARS", 64):
+            counter = StreamingTokenCounter()
+            longest = 0
+            for delta in deltas * 5:
+                counter.feed(delta)
+                longest = max(longest, len(counter._pending))
+
+        print(f"Longest buffer: {longest} chars")
+        assert longest < 64 + 64
+
+    def test_fallback_matches_count_tokens(self):
+        """
+        What it does: Verifies the counter without tiktoken uses the same length estimate as count_tokens().
+        Purpose: Usage must not change when tiktoken is unavailable.
+        """
+        from kiro.tokenizer import StreamingTokenCounter
+
+        text, deltas = self._deltas()
+        with patch("kiro.tokenizer._get_encoding", return_value=None):
+            counter = StreamingTokenCounter()
+            for delta in deltas:
+                counter.feed(delta)
+
+            assert counter.tokens() == count_tokens(text)
+        assert StreamingTokenCounter().tokens() == 0
+
+    def test_long_pre_token_stays_close_and_bounded(self):
+        """
+        What it does: Verifies a pre-token much longer than the carry is counted within a token per flush.
+        Purpose: Adversarial input (one huge word) must not drift far or grow the buffer.
+        """
+        from kiro.tokenizer import StreamingTokenCounter
+
+        class TailAlignedEncoding(PieceEncoding):
+            """Splits each word into 3-byte tokens aligned to its end, so appending shifts every split."""
+
+            def encode(self, text):
+                import re
+                tokens = []
+                for piece in re.findall(r"\s?\S+|\s+", text):
+                    data = piece.encode("utf-8")
+                    head = len(data) % 3
+                    tokens.extend([data[:head]] if head else [])
+                    tokens.extend(data[i:i + 3] for i in range(head, len(data), 3))
+                return tokens
+
+        text = "x" * 5000
+        with patch("kiro.tokenizer._get_encoding", return_value=TailAlignedEncoding()), \
+                patch.object(StreamingTokenCounter, "FLUSH_CHARS", 64):
+            counter = StreamingTokenCounter()
+            flushes = 0
+            for start in range(0, len(text), 7):
+                before = counter._committed_tokens
+                counter.feed(text[start:start + 7])
+                flushes += counter._committed_tokens != before
+            expected = count_tokens(text, apply_claude_correction=False)
+            streamed = counter.tokens(apply_claude_correction=False)
+
+        print(f"Streamed: {streamed}, whole text: {expected}, flushes: {flushes}")
+        assert abs(streamed - expected) <= flushes
+        assert len(counter._pending) < 64 + 64
+
+    def test_buffer_without_safe_boundary_is_committed(self):
+        """
+        What it does: Verifies a buffer that never yields more than CARRY_TOKENS tokens is committed at MAX_PENDING_CHARS.
+        Purpose: No safe boundary must not make every feed re-encode an ever-growing buffer.
+        """
+        from kiro.tokenizer import StreamingTokenCounter
+
+        class OneTokenEncoding:
+            def __init__(self):
+                self.encoded_chars = 0
+
+            def encode(self, text):
+                self.encoded_chars += len(text)
+                return [text.encode("utf-8")]
+
+            def decode_bytes(self, tokens):
+                return b"".join(tokens)
+
+        encoding = OneTokenEncoding()
+        with patch("kiro.tokenizer._get_encoding", return_value=encoding), \
+                patch.object(StreamingTokenCounter, "FLUSH_CHARS", 64), \
+                patch.object(StreamingTokenCounter, "MAX_PENDING_CHARS", 256):
+            counter = StreamingTokenCounter()
+            longest = 0
+            for _ in range(2000):
+                counter.feed("y")
+                longest = max(longest, len(counter._pending))
+
+        print(f"Longest buffer: {longest}, encoded chars: {encoding.encoded_chars}")
+        assert longest <= 256
+        assert encoding.encoded_chars < 2000 * 4